@@ -0,0 +1,302 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     ast_correction.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Benchmark of the correction of Pandoc's JSON AST, `--ast`, and of the
+correction by the Lua filter, `--lua-filter`, compared to the correction of
+the Org-Mode text.
+
+Generates a synthetic vault of notes containing headings, tags, dates, links
+to the headings of other notes and code blocks in a temporary directory. The
+notes are converted by Pandoc and corrected both ways, the time of the Pandoc
+runs and of the corrections in Python are measured separately. The AST needs
+a second Pandoc run to convert the corrected AST to Org-Mode. The Lua filter
+corrects the notes inside Pandoc, only the tables of the notes are computed in
+Python.
+
+Run from the root of the repository:
+
+PYTHONPATH=. python benchmarks/ast_correction.py --notes 200 --sections 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+
+from obs2org.convert import run_pandoc
+from obs2org.heading_ids import predicted_heading_text
+from obs2org.heading_index import (
+    discard_predicted_headings,
+    set_pending_heading_text,
+    set_pending_headings,
+    set_predicted_headings,
+)
+from obs2org.lua_filter import (
+    correction_table,
+    filter_args,
+    filter_file,
+    filter_supported,
+    write_table,
+)
+from obs2org.pandoc_ast import ast_heading_text, correct_ast
+from obs2org.pandoc_info import PandocInfo, probe_pandoc
+from obs2org.parse_org_mode import correct_org_mode_file
+
+
+################################################################################
+def main() -> None:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "-n", "--notes", type=int, default=200, help="The number of notes."
+    )
+    arg_parser.add_argument(
+        "-s",
+        "--sections",
+        type=int,
+        default=20,
+        help="The number of sections of every note.",
+    )
+    arg_parser.add_argument(
+        "-p", "--pandoc", default="pandoc", help="The Pandoc executable to use."
+    )
+    args = arg_parser.parse_args()
+
+    pandoc = probe_pandoc(args.pandoc)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vault = Path(tmp_dir)
+        notes = make_vault(vault=vault, notes=args.notes, sections=args.sections)
+        vault_size = _vault_size(notes)
+        org_times = _org_text_times(pandoc=pandoc, notes=notes)
+        ast_times = _ast_times(pandoc=pandoc, notes=notes)
+        lua_times = _lua_times(pandoc=pandoc, notes=notes)
+
+    print(f"Notes:                       {len(notes)}")
+    print(f"Size of the vault:           {vault_size}")
+    print("                             Pandoc   Correction      Total")
+    for name, (pandoc_time, correct_time) in (
+        ("Org-Mode text", org_times),
+        ("JSON AST (--ast)", ast_times),
+        ("Lua filter (--lua-filter)", lua_times),
+    ):
+        if pandoc_time < 0:
+            print(f"{name:<28}Pandoc doesn't support the Lua filter")
+            continue
+        print(
+            f"{name:<28}{pandoc_time:7.2f} s {correct_time:10.2f} s"
+            f" {pandoc_time + correct_time:8.2f} s"
+        )
+
+
+################################################################################
+def make_vault(vault: Path, notes: int, sections: int) -> list[Path]:
+    """Generate a vault of `notes` notes with `sections` sections each.
+
+    Every section has a line of tags, a date, links to sections of other
+    notes and a code block containing a link and a date, which must not be
+    changed.
+
+    Parameters
+    ----------
+    vault : Path
+        The directory to generate the vault in.
+    notes : int
+        The number of notes to generate.
+    sections : int
+        The number of sections of every note.
+
+    Returns
+    -------
+    list[Path]
+        The paths to the generated notes.
+    """
+    paths = []
+    for note in range(notes):
+        lines = [f"# Note {note}", ""]
+        for section in range(sections):
+            target = (note * 7 + section) % notes
+            lines.extend(
+                (
+                    f"## Section {section} of note {note}",
+                    "",
+                    f"2021-{section % 12 + 1:02}-{note % 28 + 1:02}",
+                    "",
+                    f"Keywords: #topic{section % 5}, #note{note % 10}",
+                    "",
+                    f"See [[Note {target}#Section {section} of note {target}]] and"
+                    f" [[Note {target}|the note]], text with *emphasis* and"
+                    " `inline code` about the topic.",
+                    "",
+                    "```",
+                    f"[[Note {target}]]",
+                    "2021-01-01",
+                    "```",
+                    "",
+                )
+            )
+        path = vault / f"Note {note}.md"
+        path.write_text("\n".join(lines), encoding="utf-8")
+        paths.append(path)
+
+    return paths
+
+
+################################################################################
+def _org_text_times(pandoc: PandocInfo, notes: list[Path]) -> tuple[float, float]:
+    """Convert and correct the notes the Org-Mode text way.
+
+    Parameters
+    ----------
+    pandoc : PandocInfo
+        The Pandoc executable.
+    notes : list[Path]
+        The notes to convert.
+
+    Returns
+    -------
+    tuple[float, float]
+        The time of the Pandoc runs and of the corrections in seconds.
+    """
+    start = time.perf_counter()
+    texts = {}
+    for note in notes:
+        texts[note] = run_pandoc(in_file=note, pandoc=pandoc)
+        set_pending_headings(file_name=note.with_suffix(".org"), text=texts[note])
+    pandoc_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for note, text in texts.items():
+            correct_org_mode_file(
+                text, note.parent, remove_citations=False, add_uuid=False
+            )
+    return pandoc_time, time.perf_counter() - start
+
+
+################################################################################
+def _ast_times(pandoc: PandocInfo, notes: list[Path]) -> tuple[float, float]:
+    """Convert and correct the notes using Pandoc's JSON AST.
+
+    Parameters
+    ----------
+    pandoc : PandocInfo
+        The Pandoc executable.
+    notes : list[Path]
+        The notes to convert.
+
+    Returns
+    -------
+    tuple[float, float]
+        The time of both Pandoc runs and of the corrections in seconds.
+    """
+    start = time.perf_counter()
+    texts = {}
+    for note in notes:
+        texts[note] = run_pandoc(in_file=note, pandoc=pandoc, output_format="json")
+    pandoc_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    corrected = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for note, text in texts.items():
+            set_pending_heading_text(
+                file_name=note.with_suffix(".org"), headings=ast_heading_text(text)
+            )
+        for note, text in texts.items():
+            corrected[note] = correct_ast(
+                text=text, directory=note.parent, remove_citations=False
+            ).text
+    correct_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for note, text in corrected.items():
+        run_pandoc(
+            in_file=note,
+            pandoc=pandoc,
+            data=text.encode(encoding="utf-8"),
+            input_format="json",
+        )
+    return pandoc_time + time.perf_counter() - start, correct_time
+
+
+################################################################################
+def _lua_times(pandoc: PandocInfo, notes: list[Path]) -> tuple[float, float]:
+    """Convert and correct the notes using the Lua filter.
+
+    The headings of all notes are predicted, like `--lua-filter` does for the
+    notes that haven't been converted yet.
+
+    Parameters
+    ----------
+    pandoc : PandocInfo
+        The Pandoc executable.
+    notes : list[Path]
+        The notes to convert.
+
+    Returns
+    -------
+    tuple[float, float]
+        The time of the Pandoc runs and of the tables in seconds, `-1` for both
+        if Pandoc doesn't support the filter.
+    """
+    if not filter_supported(pandoc):
+        return -1, -1
+    discard_predicted_headings()
+    for note in notes:
+        set_predicted_headings(
+            file_name=note.with_suffix(".org"),
+            text=predicted_heading_text(note.read_bytes()),
+        )
+
+    filter_path = filter_file()
+    pandoc_time = 0.0
+    table_time = 0.0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for note in notes:
+            start = time.perf_counter()
+            table_path = write_table(
+                correction_table(
+                    markdown=note.read_text(encoding="utf-8"),
+                    directory=note.parent,
+                    remove_citations=False,
+                )
+            )
+            table_time += time.perf_counter() - start
+            start = time.perf_counter()
+            run_pandoc(
+                in_file=note,
+                pandoc=pandoc,
+                filter_args=filter_args(filter_path=filter_path, table_path=table_path),
+            )
+            pandoc_time += time.perf_counter() - start
+            table_path.unlink()
+    return pandoc_time, table_time
+
+
+################################################################################
+def _vault_size(notes: list[Path]) -> str:
+    """Return the size of the notes in megabytes.
+
+    Parameters
+    ----------
+    notes : list[Path]
+        The notes.
+
+    Returns
+    -------
+    str
+        The size in megabytes.
+    """
+    return f"{sum(note.stat().st_size for note in notes) / 1_000_000:.1f} MB"
+
+
+if __name__ == "__main__":
+    main()
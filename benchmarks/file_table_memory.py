@@ -0,0 +1,110 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     file_table_memory.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Benchmark of the memory needed to hold the files of a big vault.
+
+Generates a synthetic vault of empty notes in a temporary directory and
+measures the memory used by the `FileTable` of the vault and by a list of
+`FilePaths` of the same files, using `tracemalloc`.
+
+Run from the root of the repository:
+
+PYTHONPATH=. python benchmarks/file_table_memory.py --notes 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from obs2org.main import _walk_directory  # pylint: disable=protected-access
+
+
+################################################################################
+def main() -> None:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "-n", "--notes", type=int, default=100_000, help="The number of notes."
+    )
+    arg_parser.add_argument(
+        "-d",
+        "--dirs",
+        type=int,
+        default=500,
+        help="The number of directories of the vault.",
+    )
+    args = arg_parser.parse_args()
+
+    from obs2org.file_table import FileTable  # pylint: disable=import-outside-toplevel
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vault = Path(tmp_dir) / "vault"
+        make_vault(vault=vault, notes=args.notes, dirs=args.dirs)
+
+        tracemalloc.start()
+        files = FileTable()
+        _walk_directory(
+            out_path=str(Path(tmp_dir) / "out"),
+            arg_path=str(vault),
+            files=files,
+            create_dirs=False,
+        )
+        table_size, table_peak = tracemalloc.get_traced_memory()
+
+        tracemalloc.reset_peak()
+        list_of_files = list(files)
+        list_size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(f"Files in the vault:          {len(list_of_files)}")
+    print(f"FileTable:                   {_mega_bytes(table_size)}")
+    print(f"Peak while walking:          {_mega_bytes(table_peak)}")
+    print(f"List of FilePaths:           {_mega_bytes(list_size - table_size)}")
+
+
+################################################################################
+def make_vault(vault: Path, notes: int, dirs: int) -> None:
+    """Generate a vault of `notes` empty notes in `dirs` directories.
+
+    Parameters
+    ----------
+    vault : Path
+        The directory to generate the vault in.
+    notes : int
+        The number of notes to generate.
+    dirs : int
+        The number of directories to spread the notes over.
+    """
+    for note in range(notes):
+        directory = vault / f"area {note % dirs // 50}" / f"project {note % dirs}"
+        if note < dirs:
+            directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"A note about topic number {note}.md").touch()
+
+
+################################################################################
+def _mega_bytes(size: int) -> str:
+    """Return the size `size` in megabytes.
+
+    Parameters
+    ----------
+    size : int
+        The size in bytes.
+
+    Returns
+    -------
+    str
+        The size in megabytes.
+    """
+    return f"{size / 1_000_000:8.1f} MB"
+
+
+if __name__ == "__main__":
+    main()
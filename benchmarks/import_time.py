@@ -0,0 +1,95 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     import_time.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Benchmark of the startup time of Obs2Org.
+
+Measures the import time of the modules using `python -X importtime` and the
+wall clock time of `python -m obs2org --version`.
+
+Run from the root of the repository:
+
+python benchmarks/import_time.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess  # nosec B404
+import sys
+import time
+
+
+################################################################################
+def main() -> None:
+    """Run the benchmark and print the results."""
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "-r", "--runs", type=int, default=10, help="The number of runs."
+    )
+    arg_parser.add_argument(
+        "-t", "--top", type=int, default=15, help="The number of modules to show."
+    )
+    args = arg_parser.parse_args()
+
+    cumulative: dict[str, list[int]] = {}
+    for _ in range(args.runs):
+        for module, micro_secs in _import_times().items():
+            cumulative.setdefault(module, []).append(micro_secs)
+
+    print(f"Median cumulative import time of {args.runs} runs in µs:")
+    medians = sorted(
+        ((statistics.median(times), module) for module, times in cumulative.items()),
+        reverse=True,
+    )
+    for median, module in medians[: args.top]:
+        print(f"{median:10.0f}  {module}")
+
+    wall_times = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        subprocess.run(  # nosec
+            [sys.executable, "-m", "obs2org", "--version"],
+            check=True,
+            capture_output=True,
+        )
+        wall_times.append(time.perf_counter() - start)
+
+    print(
+        f"\nMedian wall time of 'python -m obs2org --version': "
+        f"{statistics.median(wall_times) * 1000:.1f} ms"
+    )
+
+
+################################################################################
+def _import_times() -> dict[str, int]:
+    """Return the cumulative import times of all modules imported by
+    `obs2org.main` in micro seconds.
+
+    Returns
+    -------
+    dict[str, int]
+        The cumulative import time of each module, keyed by module name.
+    """
+    import_out = subprocess.run(  # nosec
+        [sys.executable, "-X", "importtime", "-c", "import obs2org.main"],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    times: dict[str, int] = {}
+    for line in import_out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:") :].split("|")
+        times[module.strip()] = int(cumulative)
+
+    return times
+
+
+if __name__ == "__main__":
+    main()
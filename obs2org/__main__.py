@@ -27,8 +27,12 @@ if sys.version_info.major < 3 or sys.version_info.minor < 9:
 
 
 if __name__ == "__main__":
-    from asyncio import run
+    from obs2org.daemon import client_main
+
+    exit_code = client_main(argv=sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
 
     from obs2org import main
 
-    run(main.main())
+    main.main()
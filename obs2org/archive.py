@@ -0,0 +1,316 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     archive.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Writes the generated Org-Mode files into a tar or zip archive instead of an
+output directory.
+
+The archive is used like an output directory: the path of the Org-Mode file
+`a/b.org` in the archive `notes.tar` is `notes.tar/a/b.org`, but no file or
+directory is created, the text of the file is added to the archive from
+memory. The headings of the files stay in the heading index in memory, so
+links between files in the archive can be corrected.
+
+The archive is written to `ARCHIVE~` and renamed to it's final name when it
+is complete.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Optional, Union
+
+from obs2org.heading_index import discard_pending_headings
+from obs2org.output import OutputCommitter
+from obs2org.state import relative_out_path
+
+if TYPE_CHECKING:
+    import tarfile
+    import zipfile
+
+# The suffixes of the archive formats, the mode of `tarfile.open` for tar
+# archives, `None` for zip archives. Tar archives compressed with zstd are
+# written using the package `zstandard`.
+ARCHIVE_SUFFIXES: dict[str, Optional[str]] = {
+    ".tar": "w|",
+    ".tar.gz": "w|gz",
+    ".tgz": "w|gz",
+    ".tar.zst": "w|",
+    ".tzst": "w|",
+    ".zip": None,
+}
+
+# The suffixes of the tar archives compressed with zstd.
+_ZSTD_SUFFIXES = (".tar.zst", ".tzst")
+
+
+################################################################################
+class ArchiveError(Exception):
+    """The archive can't be written."""
+
+
+###############################################################################
+def archive_suffix(out_path: Union[str, Path]) -> Optional[str]:
+    """Return the suffix of the archive format of `out_path`, `None` if
+    `out_path` isn't the path to an archive.
+
+    Parameters
+    ----------
+    out_path : Union[str, Path]
+        The output path given on the command line.
+
+    Returns
+    -------
+    Optional[str]
+        The suffix, one of the keys of `ARCHIVE_SUFFIXES`, or `None`.
+    """
+    name = Path(out_path).name.lower()
+    for suffix in ARCHIVE_SUFFIXES:
+        if name.endswith(suffix) and name != suffix:
+            return suffix
+
+    return None
+
+
+################################################################################
+class ArchiveCommitter(OutputCommitter):
+    """Adds the committed files to a tar or zip archive, see the module
+    documentation.
+
+    Every file is added once, when it is committed, the archive can't be read
+    while it is written. The committer is used by more than one thread at the
+    same time.
+    """
+
+    on_disk = False
+
+    def __init__(self, archive_path: Path) -> None:
+        """Start writing the archive `archive_path`.
+
+        Parameters
+        ----------
+        archive_path : Path
+            The path to the archive, it's suffix must be one of
+            `ARCHIVE_SUFFIXES`.
+
+        Raises
+        ------
+        ArchiveError
+            If the archive can't be created or it's format needs the package
+            `zstandard`, which isn't installed.
+        """
+        super().__init__()
+        suffix = archive_suffix(archive_path)
+        if suffix is None:
+            raise ArchiveError(f"'{archive_path}' is not a tar or zip archive")
+
+        self.archive_path = archive_path
+        self._tmp_path = archive_path.with_name(archive_path.name + "~")
+        self._mtime = time.time()
+        self._archive_lock = threading.Lock()
+        self._file_paths: list[Path] = []
+        self._file: Optional[BinaryIO] = None
+        self._stream: Optional[BinaryIO] = None
+        self._tar: Optional[tarfile.TarFile] = None
+        self._zip: Optional[zipfile.ZipFile] = None
+        try:
+            self._open(suffix=suffix)
+        except OSError as excp:
+            self._close_all()
+            self._remove_tmp()
+            raise ArchiveError(f"can't write '{archive_path}': {excp}") from excp
+
+    ############################################################################
+    def _open(self, suffix: str) -> None:
+        """Open the temporary archive file and the archive writer.
+
+        Parameters
+        ----------
+        suffix : str
+            The suffix of the archive format.
+
+        Raises
+        ------
+        ArchiveError
+            If the format needs the package `zstandard`, which isn't installed.
+        """
+        # pylint: disable=import-outside-toplevel,consider-using-with
+        mode = ARCHIVE_SUFFIXES[suffix]
+        if mode is None:
+            import zipfile
+
+            self._zip = zipfile.ZipFile(
+                self._tmp_path, mode="w", compression=zipfile.ZIP_DEFLATED
+            )
+            return
+
+        zstandard = None
+        if suffix in _ZSTD_SUFFIXES:
+            try:
+                import zstandard
+            except ImportError as excp:
+                raise ArchiveError(
+                    f"writing '{suffix}' archives needs the Python package"
+                    " 'zstandard', install it using 'pip install zstandard'"
+                ) from excp
+
+        import tarfile
+
+        self._file = self._tmp_path.open(mode="wb")
+        self._stream = self._file
+        if zstandard is not None:
+            self._stream = zstandard.ZstdCompressor().stream_writer(
+                self._file, closefd=False
+            )
+        self._tar = tarfile.open(fileobj=self._stream, mode=mode)
+
+    ############################################################################
+    def commit(self, file_path: Path, text: str) -> bool:
+        """Add the file `file_path` with the content `text` to the archive.
+
+        Parameters
+        ----------
+        file_path : Path
+            The path to the file, in the virtual output directory
+            `archive_path`.
+        text : str
+            The content of the file.
+
+        Returns
+        -------
+        bool
+            Always `True`, the file has been added to the archive.
+
+        Raises
+        ------
+        OSError
+            If the archive has already been closed or can't be written.
+        """
+        data = text.encode(encoding="utf-8")
+        name = relative_out_path(out_file=file_path, out_path=self.archive_path)
+
+        with self._archive_lock:
+            if self._tar is not None:
+                self._add_tar_member(name=name, data=data)
+            elif self._zip is not None:
+                self._add_zip_member(name=name, data=data)
+            else:
+                raise OSError(f"the archive '{self.archive_path}' is closed")
+            self._file_paths.append(file_path)
+
+        return True
+
+    ############################################################################
+    def _add_tar_member(self, name: str, data: bytes) -> None:
+        """Add the file `name` with the content `data` to the tar archive.
+
+        Parameters
+        ----------
+        name : str
+            The path of the file in the archive.
+        data : bytes
+            The content of the file.
+        """
+        import io  # pylint: disable=import-outside-toplevel
+        import tarfile  # pylint: disable=import-outside-toplevel
+
+        info = tarfile.TarInfo(name=name)
+        info.size = len(data)
+        info.mtime = int(self._mtime)
+        info.mode = 0o644
+        if self._tar is not None:
+            self._tar.addfile(info, io.BytesIO(data))
+
+    ############################################################################
+    def _add_zip_member(self, name: str, data: bytes) -> None:
+        """Add the file `name` with the content `data` to the zip archive.
+
+        Parameters
+        ----------
+        name : str
+            The path of the file in the archive.
+        data : bytes
+            The content of the file.
+        """
+        import zipfile  # pylint: disable=import-outside-toplevel
+
+        info = zipfile.ZipInfo(filename=name, date_time=time.localtime(self._mtime)[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        if self._zip is not None:
+            self._zip.writestr(info, data)
+
+    ############################################################################
+    def flush(self) -> None:
+        """Do nothing, the archive is completed by `close`."""
+
+    ############################################################################
+    def close(self) -> None:
+        """Complete the archive and rename it to it's final name.
+
+        The headings of the files in the archive are removed from the heading
+        index.
+
+        Raises
+        ------
+        OSError
+            If the archive can't be written.
+        """
+        try:
+            self._close_all()
+            self._tmp_path.replace(self.archive_path)
+        except OSError:
+            self._remove_tmp()
+            raise
+        finally:
+            self._discard_headings()
+
+    ############################################################################
+    def discard(self) -> None:
+        """Stop writing the archive and delete the incomplete archive."""
+        try:
+            self._close_all()
+        except OSError:
+            pass
+        self._remove_tmp()
+        self._discard_headings()
+
+    ############################################################################
+    def _close_all(self) -> None:
+        """Close the archive writer and the archive file."""
+        with self._archive_lock:
+            tar, self._tar = self._tar, None
+            zip_file, self._zip = self._zip, None
+            stream, self._stream = self._stream, None
+            file, self._file = self._file, None
+        try:
+            if tar is not None:
+                tar.close()
+            if zip_file is not None:
+                zip_file.close()
+            if stream is not None and stream is not file:
+                stream.close()
+        finally:
+            if file is not None:
+                file.close()
+
+    ############################################################################
+    def _remove_tmp(self) -> None:
+        """Delete the temporary archive file, if it exists."""
+        try:
+            self._tmp_path.unlink()
+        except OSError:
+            pass
+
+    ############################################################################
+    def _discard_headings(self) -> None:
+        """Remove the headings of the files in the archive from the heading
+        index."""
+        with self._archive_lock:
+            file_paths, self._file_paths = self._file_paths, []
+        discard_pending_headings(file_names=file_paths)
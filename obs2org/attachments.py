@@ -0,0 +1,406 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     attachments.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Places the attachments the notes link to, like `[[image.png]]`, into the
+output directory.
+
+An attachment is searched relative to the Markdown file linking to it, then
+relative to the input directories and at last by it's file name anywhere in
+the input directories, like Obsidian does. It is placed relative to the
+generated Org-Mode file, where the converted link `[[file:image.png]]` points
+to.
+
+Every attachment is placed using the cheapest way that works: a hard link,
+a reflink (copy-on-write clone), a copy inside the kernel using
+`copy_file_range` and at last `shutil.copyfile`, which uses `sendfile` where
+possible. Attachments already present with the same size and content are
+not touched. Attachments with the same content are stored only once, every
+other place they are needed is a hard link to the first one, if the file
+system supports hard links.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+from os import path
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from obs2org.output import hash_file
+
+# The `ioctl` request to clone a file on Linux, `FICLONE` in `linux/fs.h`.
+_FICLONE = 0x40049409
+
+# Suffixes of files that are notes and not attachments.
+_NOTE_SUFFIXES = (".md", ".org")
+
+
+################################################################################
+class AttachmentStats(NamedTuple):
+    """Class holding the number of attachments placed in each way."""
+
+    linked: int
+    """Number of attachments placed as hard link."""
+    cloned: int
+    """Number of attachments placed as reflink."""
+    copied: int
+    """Number of attachments copied."""
+    unchanged: int
+    """Number of attachments that already have been in place."""
+    missing: int
+    """Number of attachments that have not been found."""
+
+
+################################################################################
+class AttachmentCollector:
+    """Places the attachments of the converted notes into the output
+    directory.
+
+    The collector is used by more than one thread at the same time.
+    """
+
+    def __init__(self, out_root: Path, search_dirs: list[Path]) -> None:
+        """Construct a collector.
+
+        Parameters
+        ----------
+        out_root : Path
+            The output directory, attachments are never placed outside of it.
+        search_dirs : list[Path]
+            The input directories to search for attachments.
+        """
+        self.out_root = Path(path.abspath(out_root))
+        self.search_dirs = search_dirs
+        self._lock = threading.Lock()
+        self._placed: set[Path] = set()
+        self._stored: dict[bytes, Path] = {}
+        self._digests: dict[tuple[Path, int, int], bytes] = {}
+        self._names: Optional[dict[str, Path]] = None
+        self._counts = {
+            "linked": 0,
+            "cloned": 0,
+            "copied": 0,
+            "unchanged": 0,
+            "missing": 0,
+        }
+
+    ############################################################################
+    def place_all(self, names: list[str], in_dir: Path, out_dir: Path) -> None:
+        """Place the attachments with the file names `names`, linked from a
+        Markdown file in `in_dir`, relative to the Org-Mode file in `out_dir`.
+
+        Errors are printed, but don't stop the placement of the other
+        attachments.
+
+        Parameters
+        ----------
+        names : list[str]
+            The file names of the links, like `images/image.png`.
+        in_dir : Path
+            The directory of the Markdown file.
+        out_dir : Path
+            The directory of the generated Org-Mode file.
+        """
+        for name in dict.fromkeys(names):
+            if "://" in name or name.lower().endswith(_NOTE_SUFFIXES):
+                continue
+            dest = Path(path.abspath(out_dir / name))
+            if self.out_root not in dest.parents:
+                print(f"Not placing attachment '{name}' outside of '{self.out_root}'")
+                continue
+
+            source = self._find_source(name=name, in_dir=in_dir)
+            if source is None:
+                print(f"Attachment '{name}' not found")
+                self._count("missing")
+                continue
+
+            try:
+                self.place(source=source, dest=dest)
+            except OSError as excp:
+                print(f"Error placing attachment '{source}' at '{dest}': {excp}")
+
+    ############################################################################
+    def place(self, source: Path, dest: Path) -> None:
+        """Place the attachment `source` at `dest`.
+
+        Parameters
+        ----------
+        source : Path
+            The path to the attachment.
+        dest : Path
+            The path in the output directory to place the attachment at.
+
+        Raises
+        ------
+        OSError
+            If the attachment can't be read or placed.
+        """
+        with self._lock:
+            if dest in self._placed:
+                return
+            self._placed.add(dest)
+
+        if dest.exists() and path.samefile(source, dest):
+            self._count("unchanged")
+            return
+
+        digest = self._digest(source)
+        if dest.exists() and dest.stat().st_size == source.stat().st_size:
+            if hash_file(dest) == digest:
+                with self._lock:
+                    self._stored.setdefault(digest, dest)
+                self._count("unchanged")
+                return
+
+        with self._lock:
+            origin = self._stored.get(digest, source)
+
+        dest.parent.mkdir(exist_ok=True, parents=True)
+        tmp_file = dest.with_name(dest.name + "~")
+        tmp_file.unlink(missing_ok=True)
+        how = _place_file(origin=origin, tmp_file=tmp_file)
+        if how != "linked":
+            shutil.copystat(source, tmp_file)
+        tmp_file.replace(dest)
+
+        with self._lock:
+            self._stored.setdefault(digest, dest)
+        self._count(how)
+
+    ############################################################################
+    def stats(self) -> AttachmentStats:
+        """Return the number of attachments placed in each way.
+
+        Returns
+        -------
+        AttachmentStats
+            The number of attachments placed in each way.
+        """
+        with self._lock:
+            return AttachmentStats(**self._counts)
+
+    ############################################################################
+    def _count(self, how: str) -> None:
+        """Increment the counter of attachments placed in the way `how`.
+
+        Parameters
+        ----------
+        how : str
+            The name of the counter, one of the fields of `AttachmentStats`.
+        """
+        with self._lock:
+            self._counts[how] += 1
+
+    ############################################################################
+    def _digest(self, source: Path) -> bytes:
+        """Return the hash of the content of `source`, the hash is calculated
+        only once per file and modification time.
+
+        Parameters
+        ----------
+        source : Path
+            The path to the attachment.
+
+        Returns
+        -------
+        bytes
+            The hash of the attachment's content.
+        """
+        stat = source.stat()
+        key = (source, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digest = self._digests.get(key)
+        if digest is None:
+            digest = hash_file(source)
+            with self._lock:
+                self._digests[key] = digest
+
+        return digest
+
+    ############################################################################
+    def _find_source(self, name: str, in_dir: Path) -> Optional[Path]:
+        """Return the path to the attachment `name` linked from a Markdown
+        file in `in_dir`, `None` if it doesn't exist.
+
+        Parameters
+        ----------
+        name : str
+            The file name of the link.
+        in_dir : Path
+            The directory of the Markdown file.
+
+        Returns
+        -------
+        Optional[Path]
+            The path to the attachment, `None` if it has not been found.
+        """
+        for directory in [in_dir, *self.search_dirs]:
+            source = directory / name
+            if source.is_file():
+                return Path(path.abspath(source))
+
+        with self._lock:
+            if self._names is None:
+                self._names = _index_file_names(search_dirs=self.search_dirs)
+            return self._names.get(_link_file_name(name))
+
+
+###############################################################################
+def _link_file_name(name: str) -> str:
+    """Return the last component of the link `name`.
+
+    Parameters
+    ----------
+    name : str
+        The file name of a link, which may contain directories.
+
+    Returns
+    -------
+    str
+        The file name without directories.
+    """
+    return name.replace("\\", "/").rsplit("/", maxsplit=1)[-1]
+
+
+###############################################################################
+def _index_file_names(search_dirs: list[Path]) -> dict[str, Path]:
+    """Return the paths of all files that are not notes in the directories
+    `search_dirs` and their subdirectories, keyed by their file name.
+
+    If there is more than one file with the same name, the first one found
+    is used.
+
+    Parameters
+    ----------
+    search_dirs : list[Path]
+        The directories to search.
+
+    Returns
+    -------
+    dict[str, Path]
+        The paths to the files, keyed by file name.
+    """
+    names: dict[str, Path] = {}
+    for search_dir in search_dirs:
+        for dirpath, dirnames, filenames in os.walk(search_dir, followlinks=True):
+            dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+            for file_name in filenames:
+                if not file_name.lower().endswith(_NOTE_SUFFIXES):
+                    names.setdefault(
+                        file_name, Path(path.abspath(path.join(dirpath, file_name)))
+                    )
+
+    return names
+
+
+###############################################################################
+def _place_file(origin: Path, tmp_file: Path) -> str:
+    """Place the file `origin` at `tmp_file`, which must not exist.
+
+    Tries a hard link, a reflink, `copy_file_range` and `shutil.copyfile`, in
+    this order.
+
+    Parameters
+    ----------
+    origin : Path
+        The file to place.
+    tmp_file : Path
+        The path to place the file at.
+
+    Returns
+    -------
+    str
+        How the file has been placed, `linked`, `cloned` or `copied`.
+
+    Raises
+    ------
+    OSError
+        If the file can't be copied.
+    """
+    try:
+        os.link(origin, tmp_file)
+        return "linked"
+    except OSError:
+        pass
+
+    with origin.open(mode="rb") as src, tmp_file.open(mode="wb") as dst:
+        if _clone_file(src_fd=src.fileno(), dst_fd=dst.fileno()):
+            return "cloned"
+        if _copy_file_range(src_fd=src.fileno(), dst_fd=dst.fileno()):
+            return "copied"
+
+    shutil.copyfile(origin, tmp_file)
+    return "copied"
+
+
+###############################################################################
+def _clone_file(src_fd: int, dst_fd: int) -> bool:
+    """Clone the file `src_fd` to `dst_fd` using a reflink, if the OS and
+    file system support that.
+
+    Parameters
+    ----------
+    src_fd : int
+        The file descriptor of the file to clone.
+    dst_fd : int
+        The file descriptor of the empty destination file.
+
+    Returns
+    -------
+    bool
+        `True` if the file has been cloned, `False` else.
+    """
+    try:
+        import fcntl  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return False
+
+    try:
+        fcntl.ioctl(dst_fd, _FICLONE, src_fd)
+    except OSError:
+        return False
+
+    return True
+
+
+###############################################################################
+def _copy_file_range(src_fd: int, dst_fd: int) -> bool:
+    """Copy the file `src_fd` to `dst_fd` inside the kernel using
+    `os.copy_file_range`, if the OS supports that.
+
+    Parameters
+    ----------
+    src_fd : int
+        The file descriptor of the file to copy.
+    dst_fd : int
+        The file descriptor of the empty destination file.
+
+    Returns
+    -------
+    bool
+        `True` if the file has been copied, `False` else.
+    """
+    if not hasattr(os, "copy_file_range"):
+        return False
+
+    size = os.fstat(src_fd).st_size
+    copied = 0
+    try:
+        while copied < size:
+            count = os.copy_file_range(src_fd, dst_fd, size - copied)
+            if count == 0:
+                break
+            copied += count
+    except OSError:
+        if copied == 0:
+            return False
+        raise
+
+    return copied == size
@@ -0,0 +1,294 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     bibliography.py
+# Date:     19.10.2026
+# ===============================================================================
+"""The citation keys of BibTeX and CSL-JSON bibliographies, used by
+`--bibliography` to report citations of keys that aren't in any of the
+bibliographies.
+
+Only the keys of the entries are read. They are cached in the file
+`.obs2org/bibliography.json` in the output directory, together with the size
+and modification time of every bibliography, so a bibliography is only parsed
+again if it has changed.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+from obs2org import org_scanner
+from obs2org.regexp import LazyPattern
+from obs2org.state import state_directory
+
+# The name of the cache file in the state directory.
+_CACHE_FILE_NAME = "bibliography.json"
+
+# The suffixes of the BibTeX and BibLaTeX files.
+_BIBTEX_SUFFIXES = (".bib", ".bibtex")
+
+# The suffix of the CSL-JSON files.
+_CSL_JSON_SUFFIX = ".json"
+
+# The BibTeX entry types that are not bibliography entries.
+_NON_ENTRY_TYPES = ("comment", "preamble", "string")
+
+# Matches the start of a BibTeX entry, the first group is the type of the
+# entry, the second the key.
+_bibtex_entry_regex: LazyPattern[str] = LazyPattern(
+    r"@\s*(\w+)\s*[{(]\s*([^\s,{}()\"#%'=]+)\s*,"
+)
+
+# Matches a citation key in the target of a `cite:` link, like `@Key` of
+# `[[cite:@Key]]` or `[[cite:@Key, p. 5; @Other]]`. Trailing punctuation
+# isn't part of the key.
+_citation_key_regex: LazyPattern[str] = LazyPattern(r"@(\w(?:[\w:.#$%&+?<>~/-]*\w)?)")
+
+
+################################################################################
+class BibliographyError(Exception):
+    """A bibliography can't be read."""
+
+
+################################################################################
+class Bibliography:
+    """The citation keys of all bibliographies given by `--bibliography`.
+
+    Every citation in a corrected file is looked up in a set of keys, the
+    citations of unknown keys are collected for the report at the end of the
+    run, see `report`. `check` is called by more than one thread at the same
+    time.
+    """
+
+    def __init__(
+        self, bib_files: Iterable[Union[str, Path]], out_path: Optional[Path]
+    ) -> None:
+        """Read the keys of the bibliographies `bib_files`, from the cache in
+        the output directory `out_path` if the bibliography hasn't changed.
+
+        Parameters
+        ----------
+        bib_files : Iterable[Union[str, Path]]
+            The BibTeX or CSL-JSON files.
+        out_path : Optional[Path]
+            The output directory containing the cache, `None` to not use a
+            cache.
+
+        Raises
+        ------
+        BibliographyError
+            If a bibliography can't be read or has an unknown format.
+        """
+        self.cache_path = (
+            state_directory(out_path) / _CACHE_FILE_NAME
+            if out_path is not None
+            else None
+        )
+        self.keys: set[str] = set()
+        self.num_parsed = 0
+        self._lock = threading.Lock()
+        self._unknown: dict[str, set[str]] = {}
+
+        cache = self._read_cache()
+        new_cache: dict[str, dict[str, object]] = {}
+        for bib_file in bib_files:
+            bib_path = Path(bib_file).resolve()
+            try:
+                stat = bib_path.stat()
+            except OSError as excp:
+                raise BibliographyError(
+                    f"can't read the bibliography '{bib_file}': {excp}"
+                ) from excp
+
+            cached = cache.get(str(bib_path))
+            if (
+                isinstance(cached, dict)
+                and cached.get("size") == stat.st_size
+                and cached.get("mtime_ns") == stat.st_mtime_ns
+                and isinstance(cached.get("keys"), list)
+            ):
+                keys = [str(key) for key in cached["keys"]]
+            else:
+                keys = parse_bibliography(bib_path)
+                self.num_parsed += 1
+
+            self.keys.update(keys)
+            new_cache[str(bib_path)] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "keys": keys,
+            }
+
+        if self.num_parsed > 0 or new_cache.keys() != cache.keys():
+            self._write_cache(new_cache)
+
+    ############################################################################
+    def check(self, text: str, file_name: Union[str, Path]) -> None:
+        """Look up the keys of all citations in the Org-Mode text `text` and
+        save the unknown keys.
+
+        Parameters
+        ----------
+        text : str
+            The Org-Mode text generated by Pandoc, containing the citations as
+            `[[cite:@Key]]` links.
+        file_name : Union[str, Path]
+            The path to the Org-Mode file, for the report.
+        """
+        self.check_keys(
+            keys=(
+                key_match.group(1)
+                for citation in org_scanner.citations(text)
+                for key_match in _citation_key_regex.finditer(citation.captures[0])
+            ),
+            file_name=file_name,
+        )
+
+    ############################################################################
+    def check_keys(self, keys: Iterable[str], file_name: Union[str, Path]) -> None:
+        """Look up the citation keys `keys` and save the unknown keys.
+
+        Parameters
+        ----------
+        keys : Iterable[str]
+            The cited keys, like the ids of the `Cite` elements of Pandoc's
+            AST.
+        file_name : Union[str, Path]
+            The path to the Org-Mode file, for the report.
+        """
+        unknown = [key for key in keys if key not in self.keys]
+        if not unknown:
+            return
+
+        with self._lock:
+            for key in unknown:
+                self._unknown.setdefault(key, set()).add(str(file_name))
+
+    ############################################################################
+    def unknown_keys(self) -> dict[str, list[str]]:
+        """Return the unknown citation keys and the files citing them.
+
+        Returns
+        -------
+        dict[str, list[str]]
+            The sorted files citing every unknown key.
+        """
+        with self._lock:
+            return {
+                key: sorted(file_names)
+                for key, file_names in sorted(self._unknown.items())
+            }
+
+    ############################################################################
+    def report(self) -> None:
+        """Print the unknown citation keys and the files citing them."""
+        unknown = self.unknown_keys()
+        print(f"Bibliography: {len(self.keys)} keys, {len(unknown)} unknown keys cited")
+        for key, file_names in unknown.items():
+            print(f"Unknown citation key '{key}' in '{', '.join(file_names)}'")
+
+    ############################################################################
+    def _read_cache(self) -> dict[str, object]:
+        """Return the content of the cache file, an empty dictionary if it
+        doesn't exist or can't be read.
+
+        Returns
+        -------
+        dict[str, object]
+            The cached keys, size and modification time of every bibliography,
+            the key is the absolute path of the bibliography.
+        """
+        if self.cache_path is None:
+            return {}
+        try:
+            with self.cache_path.open(mode="r", encoding="utf-8") as f_d:
+                content = json.load(f_d)
+        except (OSError, ValueError):
+            return {}
+
+        return content if isinstance(content, dict) else {}
+
+    ############################################################################
+    def _write_cache(self, cache: dict[str, dict[str, object]]) -> None:
+        """Write the cache file.
+
+        Parameters
+        ----------
+        cache : dict[str, dict[str, object]]
+            The keys, size and modification time of every bibliography.
+        """
+        if self.cache_path is None:
+            return
+        tmp_file = self.cache_path.with_name(self.cache_path.name + "~")
+        try:
+            self.cache_path.parent.mkdir(exist_ok=True, parents=True)
+            with tmp_file.open(mode="w", encoding="utf-8") as f_d:
+                json.dump(cache, f_d)
+            tmp_file.replace(self.cache_path)
+        except OSError as excp:
+            print(f"Error writing the bibliography cache '{self.cache_path}': {excp}")
+
+
+###############################################################################
+def parse_bibliography(bib_path: Path) -> list[str]:
+    """Return the citation keys of the entries of the BibTeX or CSL-JSON file
+    `bib_path`.
+
+    Parameters
+    ----------
+    bib_path : Path
+        The path to the bibliography, the format is chosen by it's suffix,
+        `.bib` and `.bibtex` for BibTeX and `.json` for CSL-JSON.
+
+    Returns
+    -------
+    list[str]
+        The keys of the entries, in the order of the file.
+
+    Raises
+    ------
+    BibliographyError
+        If the file can't be read or has an unknown format.
+    """
+    suffix = bib_path.suffix.lower()
+    if suffix not in _BIBTEX_SUFFIXES and suffix != _CSL_JSON_SUFFIX:
+        raise BibliographyError(
+            f"unknown format of the bibliography '{bib_path}', it must be a"
+            " BibTeX '.bib' or CSL-JSON '.json' file"
+        )
+
+    try:
+        with bib_path.open(mode="r", encoding="utf-8", errors="replace") as f_d:
+            if suffix != _CSL_JSON_SUFFIX:
+                return [
+                    entry.group(2)
+                    for entry in _bibtex_entry_regex.finditer(f_d.read())
+                    if entry.group(1).lower() not in _NON_ENTRY_TYPES
+                ]
+            content = json.load(f_d)
+    except OSError as excp:
+        raise BibliographyError(
+            f"can't read the bibliography '{bib_path}': {excp}"
+        ) from excp
+    except ValueError as excp:
+        raise BibliographyError(
+            f"the bibliography '{bib_path}' isn't valid CSL-JSON: {excp}"
+        ) from excp
+
+    if isinstance(content, dict):
+        content = content.get("items", [])
+    if not isinstance(content, list):
+        raise BibliographyError(
+            f"the bibliography '{bib_path}' isn't a CSL-JSON list of items"
+        )
+
+    return [
+        str(item["id"])
+        for item in content
+        if isinstance(item, dict) and item.get("id") is not None
+    ]
@@ -0,0 +1,39 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     cache.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Location of the per user cache directory of Obs2Org."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+
+###############################################################################
+def cache_directory() -> Path:
+    """Return the path to the cache directory of Obs2Org.
+
+    This is the directory `obs2org` in `XDG_CACHE_HOME` or `~/.cache` on Unix
+    like OSes and in `LOCALAPPDATA` on Windows. The directory is not created.
+
+    Returns
+    -------
+    Path
+        The path to the cache directory.
+    """
+    env_dir = os.environ.get("OBS2ORG_CACHE_DIR")
+    if env_dir:
+        return Path(env_dir)
+
+    if os.name == "nt" and os.environ.get("LOCALAPPDATA"):
+        base_dir = Path(os.environ["LOCALAPPDATA"])
+    elif os.environ.get("XDG_CACHE_HOME"):
+        base_dir = Path(os.environ["XDG_CACHE_HOME"])
+    else:
+        base_dir = Path.home() / ".cache"
+
+    return base_dir / "obs2org"
@@ -0,0 +1,167 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     changes.py
+# Date:     19.10.2026
+# ===============================================================================
+"""The Markdown files changed since a git revision, used by `--changed-since`
+to convert only the changed files and the files linking to them.
+"""
+
+from __future__ import annotations
+
+import posixpath
+from os import path
+from typing import NamedTuple, Optional
+
+from obs2org.sources import run_git
+
+# The suffix of the Markdown files.
+_MD_SUFFIX = ".md"
+
+
+################################################################################
+class FileChanges(NamedTuple):
+    """Class holding the Markdown files changed between two revisions.
+
+    The paths are relative to the directory given on the command line, using
+    slashes, or the file name, if a file has been given.
+    """
+
+    changed: list[str]
+    """The added, modified and renamed Markdown files, renamed files with
+    their new name."""
+    deleted: list[str]
+    """The deleted Markdown files and the old names of the renamed files."""
+
+
+###############################################################################
+def git_changes(
+    arg_path: str,
+    revision: str,
+    to_revision: Optional[str] = None,
+    git: str = "git",
+) -> FileChanges:
+    """Return the Markdown files at `arg_path` that have changed since the git
+    revision `revision`.
+
+    The files are compared to the revision `to_revision` or, if that is
+    `None`, to the work tree, including the files git doesn't track yet.
+
+    Parameters
+    ----------
+    arg_path : str
+        The directory or Markdown file given on the command line.
+    revision : str
+        The revision to compare to, like `HEAD~1` or a tag.
+    to_revision : Optional[str], optional
+        The revision containing the files to convert, by default `None`, the
+        work tree.
+    git : str, optional
+        The git executable, by default "git".
+
+    Returns
+    -------
+    FileChanges
+        The changed and deleted Markdown files.
+
+    Raises
+    ------
+    SourceError
+        If git fails, for example if the revision doesn't exist.
+    """
+    if path.isdir(arg_path):
+        run_dir, pathspec = arg_path, "."
+    else:
+        run_dir, pathspec = path.dirname(arg_path) or ".", path.basename(arg_path)
+
+    output = run_git(
+        git=git,
+        run_dir=run_dir,
+        args=[
+            "diff",
+            "--name-status",
+            "-z",
+            "-M",
+            "--relative",
+            "--no-ext-diff",
+            revision,
+            *([to_revision] if to_revision is not None else []),
+            "--",
+            pathspec,
+        ],
+    )
+    changes = _parse_name_status(output)
+
+    if to_revision is None:
+        untracked = run_git(
+            git=git,
+            run_dir=run_dir,
+            args=["ls-files", "-z", "--others", "--exclude-standard", "--", pathspec],
+        )
+        changes.changed.extend(
+            name
+            for name in untracked.decode(encoding="utf-8", errors="replace").split("\0")
+            if _is_markdown(name)
+        )
+
+    return changes
+
+
+###############################################################################
+def _parse_name_status(output: bytes) -> FileChanges:
+    """Parse the output of `git diff --name-status -z`.
+
+    Every entry is the status letter, followed by the path, or the old and the
+    new path of renamed and copied files, separated by NUL characters.
+
+    Parameters
+    ----------
+    output : bytes
+        The output of git.
+
+    Returns
+    -------
+    FileChanges
+        The changed and deleted Markdown files.
+    """
+    changes = FileChanges(changed=[], deleted=[])
+    fields = iter(output.decode(encoding="utf-8", errors="replace").split("\0"))
+    for status in fields:
+        if not status:
+            continue
+        if status[0] in "RC":
+            old_name, new_name = next(fields, ""), next(fields, "")
+            if status[0] == "R" and _is_markdown(old_name):
+                changes.deleted.append(old_name)
+            if _is_markdown(new_name):
+                changes.changed.append(new_name)
+            continue
+
+        name = next(fields, "")
+        if not _is_markdown(name):
+            continue
+        if status[0] == "D":
+            changes.deleted.append(name)
+        else:
+            changes.changed.append(name)
+
+    return changes
+
+
+###############################################################################
+def _is_markdown(name: str) -> bool:
+    """Return `True` if the file `name` is a Markdown file.
+
+    Parameters
+    ----------
+    name : str
+        The path of the file.
+
+    Returns
+    -------
+    bool
+        `True` if the file has the suffix `.md`.
+    """
+    return name.endswith(_MD_SUFFIX) and posixpath.basename(name) != _MD_SUFFIX
@@ -13,16 +13,202 @@ from __future__ import annotations
 
 import subprocess  # nosec B404
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 
-from obs2org.parse_org_mode import correct_org_mode_file
+from obs2org.heading_index import (
+    headings_written,
+    set_pending_heading_text,
+    set_pending_headings,
+)
+from obs2org.limits import (
+    LimitExceeded,
+    PandocLimits,
+    Quarantine,
+    cpu_limit_preexec,
+    exceeded_limit,
+    pandoc_limit_args,
+)
+from obs2org.output import OutputCommitter
+from obs2org.pandoc_info import PandocInfo
+from obs2org.parse_org_mode import add_file_header, correct_org_mode_file
+
+if TYPE_CHECKING:
+    from obs2org.attachments import AttachmentCollector
+    from obs2org.bibliography import Bibliography
 
 
 ###############################################################################
-def convert_single_file(path: Path, out_path: Path, pandoc: str) -> None:
+def convert_single_file(
+    path: Path,
+    out_path: Path,
+    pandoc: PandocInfo,
+    committer: OutputCommitter,
+    limits: Optional[PandocLimits] = None,
+    quarantine: Optional[Quarantine] = None,
+    data: Optional[bytes] = None,
+) -> bool:
     """Convert a markdown file to an Org-Mode formatted file.
 
     Convert the markdown file with the given path `path` to an Org-Mode file
-    with the given path `out_path`.
+    with the given path `out_path`. The file is only written to, if it's
+    content changes.
+
+    Parameters
+    ----------
+    path : Path
+        The path to the markdown file to convert.
+    out_path : Path
+        The path to the Org-Mode file to generate.
+    pandoc : PandocInfo
+        The pandoc executable to convert the file with.
+    committer : OutputCommitter
+        The object to write the generated Org-Mode file with.
+    limits : Optional[PandocLimits], optional
+        The limits of the Pandoc process, by default `None`, no limits.
+    quarantine : Optional[Quarantine], optional
+        The quarantine to add the file to if it exceeds the limits twice, by
+        default `None`.
+    data : Optional[bytes], optional
+        The content of the markdown file, if it isn't read from the file
+        `path`, see `obs2org.sources`. By default `None`.
+
+    Returns
+    -------
+    bool
+        `True` if the file has been converted, `False` on errors.
+    """
+    print(
+        f"Converting file '{path}' to '{out_path}' using '{pandoc.executable}'\n",
+        flush=True,
+    )
+    try:
+        org_text = _run_pandoc_retry(
+            in_file=path,
+            out_path=out_path,
+            pandoc=pandoc,
+            limits=limits,
+            quarantine=quarantine,
+            data=data,
+        )
+        committer.commit(file_path=out_path, text=org_text)
+    except subprocess.SubprocessError as excp:
+        print(
+            f"{excp} converting file '{path}' to '{out_path}'\n",
+            flush=True,
+        )
+    except OSError as excp:
+        print(
+            f"Error writing file '{out_path}': {excp}\n",
+            flush=True,
+        )
+    else:
+        print(f"File converted to '{out_path}'.\n", flush=True)
+        return True
+
+    return False
+
+
+###############################################################################
+def convert_to_text(
+    path: Path,
+    out_path: Path,
+    pandoc: PandocInfo,
+    limits: Optional[PandocLimits] = None,
+    quarantine: Optional[Quarantine] = None,
+    data: Optional[bytes] = None,
+    ast: bool = False,
+) -> Optional[str]:
+    """Convert a markdown file to Org-Mode and return the Org-Mode text, without
+    writing it to a file.
+
+    The headings of the text are added to the heading index as the headings of
+    the file `out_path`, so links in other files to this file can be corrected
+    before the file is written.
+
+    If `ast` is `True`, Pandoc's JSON AST is returned instead of the Org-Mode
+    text, see `obs2org.pandoc_ast`.
+
+    Parameters
+    ----------
+    path : Path
+        The path to the markdown file to convert.
+    out_path : Path
+        The path to the Org-Mode file the text is going to be written to.
+    pandoc : PandocInfo
+        The pandoc executable to convert the file with.
+    limits : Optional[PandocLimits], optional
+        The limits of the Pandoc process, by default `None`, no limits.
+    quarantine : Optional[Quarantine], optional
+        The quarantine to add the file to if it exceeds the limits twice, by
+        default `None`.
+    data : Optional[bytes], optional
+        The content of the markdown file, if it isn't read from the file
+        `path`, see `obs2org.sources`. By default `None`.
+    ast : bool, optional
+        Whether to return Pandoc's JSON AST, by default `False`.
+
+    Returns
+    -------
+    Optional[str]
+        The generated Org-Mode text or JSON AST, `None` if Pandoc failed.
+    """
+    print(
+        f"Converting file '{path}' to '{out_path}' using '{pandoc.executable}'\n",
+        flush=True,
+    )
+    try:
+        org_text = _run_pandoc_retry(
+            in_file=path,
+            out_path=out_path,
+            pandoc=pandoc,
+            limits=limits,
+            quarantine=quarantine,
+            data=data,
+            output_format="json" if ast else "org",
+        )
+        if ast:
+            from obs2org.pandoc_ast import (  # pylint: disable=import-outside-toplevel
+                ast_heading_text,
+            )
+
+            set_pending_heading_text(
+                file_name=out_path, headings=ast_heading_text(org_text)
+            )
+    except (subprocess.SubprocessError, OSError, ValueError) as excp:
+        print(
+            f"{excp} converting file '{path}' to '{out_path}'\n",
+            flush=True,
+        )
+        return None
+
+    if not ast:
+        set_pending_headings(file_name=out_path, text=org_text)
+
+    return org_text
+
+
+###############################################################################
+def convert_with_filter(
+    path: Path,
+    out_path: Path,
+    pandoc: PandocInfo,
+    remove_citations: bool,
+    add_uuid: bool,
+    committer: OutputCommitter,
+    limits: Optional[PandocLimits] = None,
+    quarantine: Optional[Quarantine] = None,
+    data: Optional[bytes] = None,
+    attachments: Optional[AttachmentCollector] = None,
+    front_matter: Optional[dict[str, list[str]]] = None,
+    bibliography: Optional[Bibliography] = None,
+) -> bool:
+    """Convert a markdown file to Org-Mode, correcting it's links, tags and
+    dates using the Lua filter of `obs2org.lua_filter`.
+
+    The links are resolved using the headings of the heading index before
+    Pandoc runs, so the files the file links to must have been converted or
+    their headings predicted. The text generated by Pandoc isn't corrected
+    again, only the file header is added.
 
     Parameters
     ----------
@@ -30,65 +216,287 @@ def convert_single_file(path: Path, out_path: Path, pandoc: str) -> None:
         The path to the markdown file to convert.
     out_path : Path
         The path to the Org-Mode file to generate.
-    pandoc : str
-        The path to the pandoc executable to convert the file.
+    pandoc : PandocInfo
+        The pandoc executable to convert the file with, which must support
+        the Lua filter, see `obs2org.lua_filter.filter_supported`.
+    remove_citations : bool
+        Whether to treat citations in double brackets as normal links.
+    add_uuid : bool
+        Whether to add an UUID-header to the file.
+    committer : OutputCommitter
+        The object to write the generated Org-Mode file with.
+    limits : Optional[PandocLimits], optional
+        The limits of the Pandoc process, by default `None`, no limits.
+    quarantine : Optional[Quarantine], optional
+        The quarantine to add the file to if it exceeds the limits twice, by
+        default `None`.
+    data : Optional[bytes], optional
+        The content of the markdown file, if it isn't read from the file
+        `path`, see `obs2org.sources`. By default `None`.
+    attachments : Optional[AttachmentCollector], optional
+        If this is not `None`, the attachments the file links to are placed
+        into the output directory using this collector.
+    front_matter : Optional[dict[str, list[str]]], optional
+        The YAML front matter of the Markdown file. If this is not `None`, the
+        keys Pandoc ignores are added as Org-Mode keywords.
+    bibliography : Optional[Bibliography], optional
+        If this is not `None`, the keys of the citations in the file are
+        looked up in this bibliography.
+
+    Returns
+    -------
+    bool
+        `True` if the file has been converted and written, `False` on errors.
     """
+    # pylint: disable=import-outside-toplevel
+    from obs2org.lua_filter import (
+        correction_table,
+        filter_args,
+        filter_file,
+        write_table,
+    )
+
     print(
-        f"Converting file '{path}' to '{out_path}' using '{pandoc}'\n",
+        f"Converting file '{path}' to '{out_path}' using '{pandoc.executable}'"
+        " and the Lua filter\n",
         flush=True,
     )
+    table_path = None
     try:
-        run_pandoc(in_file=path, out_path=out_path, pandoc=pandoc)
+        markdown = data if data is not None else path.read_bytes()
+        attachment_names: Optional[list[str]] = [] if attachments is not None else None
+        table_path = write_table(
+            correction_table(
+                markdown=markdown.decode(encoding="utf-8", errors="replace"),
+                directory=out_path.parent,
+                remove_citations=remove_citations,
+                attachments=attachment_names,
+            )
+        )
+        org_text = _run_pandoc_retry(
+            in_file=path,
+            out_path=out_path,
+            pandoc=pandoc,
+            limits=limits,
+            quarantine=quarantine,
+            data=data,
+            filter_args=filter_args(filter_path=filter_file(), table_path=table_path),
+        )
+        if bibliography is not None:
+            bibliography.check(text=org_text, file_name=out_path)
+        org_text = add_file_header(
+            text=org_text, add_uuid=add_uuid, front_matter=front_matter
+        )
+        committer.commit(file_path=out_path, text=org_text)
+        if committer.on_disk:
+            headings_written(file_name=out_path, text=org_text)
+        else:
+            set_pending_headings(file_name=out_path, text=org_text)
+        if attachments is not None and attachment_names:
+            attachments.place_all(
+                names=attachment_names, in_dir=path.parent, out_dir=out_path.parent
+            )
     except subprocess.SubprocessError as excp:
         print(
             f"{excp} converting file '{path}' to '{out_path}'\n",
             flush=True,
         )
+    except OSError as excp:
+        print(
+            f"Error converting file '{path}' to '{out_path}': {excp}\n",
+            flush=True,
+        )
     else:
         print(f"File converted to '{out_path}'.\n", flush=True)
+        return True
+    finally:
+        if table_path is not None:
+            table_path.unlink(missing_ok=True)
+
+    return False
 
 
 ###############################################################################
-def run_pandoc(in_file: Path, out_path: Path, pandoc: str) -> None:
+def _run_pandoc_retry(
+    in_file: Path,
+    out_path: Path,
+    pandoc: PandocInfo,
+    limits: Optional[PandocLimits],
+    quarantine: Optional[Quarantine],
+    data: Optional[bytes] = None,
+    output_format: str = "org",
+    filter_args: Optional[list[str]] = None,
+) -> str:
+    """Run Pandoc to convert `in_file`, a second time if the first run
+    exceeded the limits.
+
+    If the second run exceeds the limits too, the file is added to the
+    quarantine. If the conversion succeeds, the file is removed from the
+    quarantine.
+
+    Parameters
+    ----------
+    in_file : Path
+        Path to the markdown file to convert.
+    out_path : Path
+        The path to the Org-Mode file to generate.
+    pandoc : PandocInfo
+        The pandoc executable to run and it's capabilities.
+    limits : Optional[PandocLimits]
+        The limits of the Pandoc process, `None` for no limits.
+    quarantine : Optional[Quarantine]
+        The quarantine to add the file to, `None` to not use a quarantine.
+    data : Optional[bytes], optional
+        The content of the markdown file, if it isn't read from the file
+        `in_file`, by default `None`.
+    output_format : str, optional
+        The format to convert to, `org` or `json`, by default `org`.
+    filter_args : Optional[list[str]], optional
+        The arguments to run the Lua filter with, by default `None`.
+
+    Returns
+    -------
+    str
+        The Org-Mode text Pandoc generated.
+
+    Raises
+    ------
+    subprocess.SubprocessError
+        If Pandoc failed or exceeded the limits twice.
+    """
+    try:
+        org_text = run_pandoc(
+            in_file=in_file,
+            pandoc=pandoc,
+            limits=limits,
+            data=data,
+            output_format=output_format,
+            filter_args=filter_args,
+        )
+    except LimitExceeded as excp:
+        print(f"{excp} converting file '{in_file}', trying again\n", flush=True)
+        try:
+            org_text = run_pandoc(
+                in_file=in_file,
+                pandoc=pandoc,
+                limits=limits,
+                data=data,
+                output_format=output_format,
+                filter_args=filter_args,
+            )
+        except LimitExceeded as excp_again:
+            if quarantine is not None:
+                quarantine.add(
+                    in_file=in_file, out_file=out_path, reason=str(excp_again)
+                )
+            raise
+
+    if quarantine is not None:
+        quarantine.remove(out_file=out_path)
+
+    return org_text
+
+
+###############################################################################
+def run_pandoc(
+    in_file: Path,
+    pandoc: PandocInfo,
+    limits: Optional[PandocLimits] = None,
+    data: Optional[bytes] = None,
+    input_format: str = "markdown",
+    output_format: str = "org",
+    filter_args: Optional[list[str]] = None,
+) -> str:
     """Run the pandoc executable to convert the given markdown file.
 
     Execute `pandoc` to convert the given markdown file `in_file` to
-    an Org-Mode file with path `out_path`.
+    Org-Mode and return the generated Org-Mode text. If `data` is not `None`,
+    it is passed to Pandoc using stdin instead of the file `in_file`.
+    Pandoc's JSON AST is used as the input or output format by `--ast`.
 
     Parameters
     ----------
     in_file : Path
         Path to the markdown file to convert.
-    out_path : Path
-        Path to the Org-Mode file to generate.
-    pandoc : str
-        Path to the pandoc executable or the name of the executable if it is
-        in the PATH.
+    pandoc : PandocInfo
+        The pandoc executable to run and it's capabilities.
+    limits : Optional[PandocLimits], optional
+        The limits of the Pandoc process, by default `None`, no limits.
+    data : Optional[bytes], optional
+        The content of the markdown file, by default `None`, which reads the
+        file `in_file`.
+    input_format : str, optional
+        The format of the input, `markdown` or `json`, by default `markdown`.
+    output_format : str, optional
+        The format to convert to, `org` or `json`, by default `org`.
+    filter_args : Optional[list[str]], optional
+        The arguments to run the Lua filter of `--lua-filter` with, see
+        `obs2org.lua_filter.filter_args`. By default `None`, no filter.
+
+    Returns
+    -------
+    str
+        The Org-Mode text Pandoc generated.
+
+    Raises
+    ------
+    LimitExceeded
+        If Pandoc exceeded one of the `limits`.
+    subprocess.SubprocessError
+        If Pandoc returned an error.
     """
+    if limits is None:
+        limits = PandocLimits()
     args: list[str] = [
-        pandoc,
-        str(in_file),
+        pandoc.executable,
+        *pandoc_limit_args(limits=limits),
+        *([str(in_file)] if data is None else []),
         "-f",
-        "markdown",
+        input_format,
         "-t",
-        "org",
+        output_format,
         "-s",
-        "--eol=lf",
         "--toc",
         "--wrap=none",
-        "-o",
-        str(out_path),
+        *(filter_args or []),
     ]
-    pandoc_out = subprocess.run(
+    if pandoc.eol:
+        args.append("--eol=lf")
+    with subprocess.Popen(
         args=args,
-        check=False,
         shell=False,  # nosec
-        text=True,
-        capture_output=True,
-    )
+        encoding="utf-8",
+        stdin=None if data is None else subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        preexec_fn=cpu_limit_preexec(limits=limits),  # nosec
+    ) as process:
+        try:
+            stdout, stderr = process.communicate(
+                input=(
+                    None
+                    if data is None
+                    else data.decode(encoding="utf-8", errors="replace")
+                ),
+                timeout=limits.timeout,
+            )
+        except subprocess.TimeoutExpired as excp:
+            process.kill()
+            process.communicate()
+            raise LimitExceeded(
+                f"Pandoc timed out after {limits.timeout} seconds"
+            ) from excp
 
-    if pandoc_out.returncode != 0 and pandoc_out.stderr != "":
-        raise subprocess.SubprocessError(f"Pandoc error: '{pandoc_out.stderr.strip()}'")
+    if exceeded_limit(returncode=process.returncode, limits=limits):
+        raise LimitExceeded(
+            f"Pandoc exceeded the limits, exit code {process.returncode}"
+        )
+    if process.returncode != 0:
+        raise subprocess.SubprocessError(
+            f"Pandoc error, exit code {process.returncode}: '{stderr.strip()}'"
+        )
+
+    return stdout
 
 
 ###############################################################################
@@ -96,11 +504,27 @@ def correct_org_mode(
     file_path: Path,
     remove_citations: bool,
     add_uuid: bool,
-) -> None:
+    committer: OutputCommitter,
+    in_file: Optional[Path] = None,
+    attachments: Optional[AttachmentCollector] = None,
+    text: Optional[str] = None,
+    front_matter: Optional[dict[str, list[str]]] = None,
+    bibliography: Optional[Bibliography] = None,
+    pandoc: Optional[PandocInfo] = None,
+    limits: Optional[PandocLimits] = None,
+) -> bool:
     """Correct internal links, tags and dates in the generated Org-Mode file.
 
     Parse the generated Org-Mode file with path `out_path` and correct
-    internal links, tags and dates in this file.
+    internal links, tags and dates in this file. The file is only written to,
+    if the corrected text differs from the file's content.
+
+    If `text` is not `None`, this is corrected instead of the file's content,
+    so the output of Pandoc is written just once, after it's correction.
+
+    If `pandoc` is not `None`, `text` is Pandoc's JSON AST, which is corrected
+    by `obs2org.pandoc_ast.correct_ast` and converted to Org-Mode using
+    `pandoc`.
 
     Parameters
     ----------
@@ -111,23 +535,78 @@ def correct_org_mode(
         or not.
     add_uuid : bool
         Whether to add an UUID-header to each file.
+    committer : OutputCommitter
+        The object to write the corrected Org-Mode file with.
+    in_file : Optional[Path], optional
+        The path to the Markdown file the Org-Mode file has been generated
+        from, needed to find the attachments.
+    attachments : Optional[AttachmentCollector], optional
+        If this is not `None`, the attachments the file links to are placed
+        into the output directory using this collector.
+    text : Optional[str], optional
+        The Org-Mode text generated by Pandoc, as returned by
+        `convert_to_text`. If this is `None`, the file `file_path` is read.
+    front_matter : Optional[dict[str, list[str]]], optional
+        The YAML front matter of the Markdown file, see `scan_note`. If this is
+        not `None`, the keys Pandoc ignores are added as Org-Mode keywords.
+    bibliography : Optional[Bibliography], optional
+        If this is not `None`, the keys of the citations in the file are
+        looked up in this bibliography.
+    pandoc : Optional[PandocInfo], optional
+        The Pandoc executable to convert the corrected JSON AST `text` to
+        Org-Mode with, by default `None`, `text` is Org-Mode text.
+    limits : Optional[PandocLimits], optional
+        The limits of the Pandoc process converting the JSON AST, by default
+        `None`, no limits.
 
+    Returns
+    -------
+    bool
+        `True` if the file has been corrected and written, `False` on errors.
     """
     print(f"Correcting links, tags, ... in file '{file_path}'")
-    tmp_file = file_path.with_suffix(".org~")
+    tmp_file = file_path.with_name(file_path.name + "~")
     try:
-        with file_path.open(mode="r", encoding="utf-8") as f_d:
-            file_text = f_d.read()
+        if text is None:
+            with file_path.open(mode="r", encoding="utf-8") as f_d:
+                file_text = f_d.read()
+        else:
+            file_text = text
+        attachment_names: Optional[list[str]] = [] if attachments is not None else None
+        if pandoc is not None:
+            new_text = _correct_ast(
+                text=file_text,
+                file_path=file_path,
+                remove_citations=remove_citations,
+                add_uuid=add_uuid,
+                pandoc=pandoc,
+                limits=limits,
+                attachments=attachment_names,
+                front_matter=front_matter,
+                bibliography=bibliography,
+            )
+        else:
+            if bibliography is not None:
+                bibliography.check(text=file_text, file_name=file_path)
             new_text = correct_org_mode_file(
                 file_text,
                 file_path.parent,
                 add_uuid=add_uuid,
                 remove_citations=remove_citations,
+                attachments=attachment_names,
+                front_matter=front_matter,
+            )
+        committer.commit(file_path=file_path, text=new_text)
+        if text is not None and committer.on_disk:
+            headings_written(file_name=file_path, text=new_text)
+        elif text is not None:
+            set_pending_headings(file_name=file_path, text=new_text)
+        if attachments is not None and attachment_names:
+            attachments.place_all(
+                names=attachment_names,
+                in_dir=(in_file or file_path).parent,
+                out_dir=file_path.parent,
             )
-        with tmp_file.open(mode="w", encoding="utf-8") as tmp:
-            tmp.write(new_text)
-
-        tmp_file.replace(file_path)
 
     except FileNotFoundError as excp:
         print(f"Error, a file has not been found. '{excp}'")
@@ -138,3 +617,77 @@ def correct_org_mode(
 
     else:
         print("OK\n")
+        return True
+
+    return False
+
+
+###############################################################################
+def _correct_ast(
+    text: str,
+    file_path: Path,
+    remove_citations: bool,
+    add_uuid: bool,
+    pandoc: PandocInfo,
+    limits: Optional[PandocLimits],
+    attachments: Optional[list[str]],
+    front_matter: Optional[dict[str, list[str]]],
+    bibliography: Optional[Bibliography],
+) -> str:
+    """Correct Pandoc's JSON AST `text` and convert it to Org-Mode.
+
+    Parameters
+    ----------
+    text : str
+        The JSON AST generated by Pandoc.
+    file_path : Path
+        The path to the Org-Mode file to generate.
+    remove_citations : bool
+        Whether to treat citations in double brackets as normal links.
+    add_uuid : bool
+        Whether to add an UUID-header to the file.
+    pandoc : PandocInfo
+        The Pandoc executable to convert the AST to Org-Mode with.
+    limits : Optional[PandocLimits]
+        The limits of the Pandoc process.
+    attachments : Optional[list[str]]
+        The list to append the file names of the attachments to.
+    front_matter : Optional[dict[str, list[str]]]
+        The YAML front matter of the Markdown file.
+    bibliography : Optional[Bibliography]
+        The bibliography to look up the keys of the citations in.
+
+    Returns
+    -------
+    str
+        The corrected Org-Mode text.
+
+    Raises
+    ------
+    ValueError
+        If `text` isn't a JSON AST.
+    subprocess.SubprocessError
+        If Pandoc failed.
+    """
+    from obs2org.pandoc_ast import (  # pylint: disable=import-outside-toplevel
+        correct_ast,
+    )
+
+    corrected = correct_ast(
+        text=text,
+        directory=file_path.parent,
+        remove_citations=remove_citations,
+        attachments=attachments,
+    )
+    if bibliography is not None:
+        bibliography.check_keys(keys=corrected.citation_keys, file_name=file_path)
+
+    org_text = run_pandoc(
+        in_file=file_path,
+        pandoc=pandoc,
+        limits=limits,
+        data=corrected.text.encode(encoding="utf-8"),
+        input_format="json",
+    )
+
+    return add_file_header(text=org_text, add_uuid=add_uuid, front_matter=front_matter)
@@ -0,0 +1,429 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     daemon.py
+# Date:     19.10.2026
+# ===============================================================================
+"""The long running server `python -m obs2org serve` and the client that
+forwards the command line arguments to it.
+
+The server keeps the index of the headings of the Org-Mode files and the
+capabilities of Pandoc in memory, so these don't have to be read again for
+every conversion. Client and server talk using a Unix domain socket, every
+request and every response is a single line containing a JSON object.
+
+Requests:
+
+- `{"command": "convert", "cwd": DIR, "args": [ARGS]}` runs Obs2Org with the
+  command line arguments `ARGS` in the working directory `DIR`.
+- `{"command": "reconvert"}` runs the last `convert` request again.
+- `{"command": "resolve-link", "directory": DIR, "link": LINK}` returns the
+  corrected wiki-link `LINK` in the Org-Mode directory `DIR` in `stdout`.
+- `{"command": "stop"}` stops the server.
+
+Every response is of the form
+`{"status": EXIT_CODE, "stdout": TEXT, "stderr": TEXT}`.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+from typing import Any, Optional
+
+from obs2org.cache import cache_directory
+
+# The name of the socket file.
+_SOCKET_NAME = "obs2org.sock"
+
+# Commands of the client, that only work if the server is running.
+_CLIENT_COMMANDS = ("reconvert", "resolve-link", "stop")
+
+# The argument to forward the command line arguments to the server.
+DAEMON_ARG = "--daemon"
+
+# The argument to not forward the command line arguments to the server.
+NO_DAEMON_ARG = "--no-daemon"
+
+
+###############################################################################
+def socket_path() -> Path:
+    """Return the path to the socket of the server.
+
+    This is the environment variable `OBS2ORG_SOCKET`, if it is set, the file
+    `obs2org.sock` in `XDG_RUNTIME_DIR` or in the cache directory else.
+
+    Returns
+    -------
+    Path
+        The path to the server's socket.
+    """
+    env_socket = os.environ.get("OBS2ORG_SOCKET")
+    if env_socket:
+        return Path(env_socket)
+
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / _SOCKET_NAME
+
+    return cache_directory() / _SOCKET_NAME
+
+
+###############################################################################
+def _reads_stdin(argv: list[str]) -> bool:
+    """Return `True` if the arguments `argv` read the list of files to convert
+    from stdin.
+
+    Parameters
+    ----------
+    argv : list[str]
+        The command line arguments, without the program name.
+
+    Returns
+    -------
+    bool
+        `True` if `argv` contains `--files-from -`.
+    """
+    return "--files-from=-" in argv or any(
+        arg == "--files-from" and value == "-" for arg, value in zip(argv, argv[1:])
+    )
+
+
+###############################################################################
+def client_main(argv: list[str]) -> Optional[int]:
+    """Forward the command line arguments `argv` to the server, if it is
+    running.
+
+    The arguments of a conversion are only forwarded if they contain
+    `--daemon` or the environment variable `OBS2ORG_SOCKET` is set, the
+    client commands `reconvert`, `resolve-link` and `stop` always are.
+    Returns `None` if the arguments should be handled by this process: if the
+    server is not running, the first argument is `serve`, the arguments
+    contain `--no-daemon` or the list of files is read from stdin using
+    `--files-from -`, which the server can't read.
+
+    Parameters
+    ----------
+    argv : list[str]
+        The command line arguments, without the program name.
+
+    Returns
+    -------
+    Optional[int]
+        The exit code of the server's response, `None` if the arguments have
+        not been forwarded.
+    """
+    if argv[:1] == ["serve"] or NO_DAEMON_ARG in argv or _reads_stdin(argv):
+        return None
+
+    server_socket = socket_path()
+    if argv[:1] == ["reconvert"]:
+        request: dict[str, Any] = {"command": "reconvert"}
+    elif argv[:1] == ["stop"]:
+        request = {"command": "stop"}
+    elif argv[:1] == ["resolve-link"] and len(argv) == 3:
+        request = {
+            "command": "resolve-link",
+            "directory": str(Path(argv[1]).absolute()),
+            "link": argv[2],
+        }
+    elif argv[:1] == ["resolve-link"]:
+        print("usage: python -m obs2org resolve-link DIRECTORY LINK", file=sys.stderr)
+        return 2
+    elif DAEMON_ARG in argv or os.environ.get("OBS2ORG_SOCKET"):
+        request = {"command": "convert", "cwd": os.getcwd(), "args": argv}
+    else:
+        return None
+
+    if not server_socket.exists():
+        if argv[:1] and argv[0] in _CLIENT_COMMANDS:
+            print(
+                f"error: the Obs2Org server is not running at '{server_socket}'",
+                file=sys.stderr,
+            )
+            return 2
+        return None
+
+    response = send_request(server_socket=server_socket, request=request)
+    if response is None:
+        if argv[:1] and argv[0] in _CLIENT_COMMANDS:
+            print(
+                f"error: can't connect to the Obs2Org server at '{server_socket}'",
+                file=sys.stderr,
+            )
+            return 2
+        return None
+
+    sys.stdout.write(response.get("stdout", ""))
+    sys.stderr.write(response.get("stderr", ""))
+    return int(response.get("status", 1))
+
+
+###############################################################################
+def send_request(
+    server_socket: Path, request: dict[str, Any]
+) -> Optional[dict[str, Any]]:
+    """Send `request` to the server listening at `server_socket` and return
+    it's response.
+
+    Parameters
+    ----------
+    server_socket : Path
+        The path to the socket of the server.
+    request : dict[str, Any]
+        The request to send.
+
+    Returns
+    -------
+    Optional[dict[str, Any]]
+        The server's response, `None` if the server isn't reachable.
+    """
+    # pylint: disable=import-outside-toplevel
+    import json
+    import socket
+
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(server_socket))
+            sock.sendall(json.dumps(request).encode(encoding="utf-8") + b"\n")
+            with sock.makefile(mode="rb") as sock_file:
+                response_line = sock_file.readline()
+    except OSError:
+        return None
+
+    try:
+        response = json.loads(response_line)
+    except ValueError:
+        return None
+
+    return response if isinstance(response, dict) else None
+
+
+###############################################################################
+def serve(argv: list[str]) -> None:
+    """Run the server, this is the command `python -m obs2org serve`.
+
+    Parameters
+    ----------
+    argv : list[str]
+        The command line arguments after `serve`.
+    """
+    # pylint: disable=import-outside-toplevel
+    import argparse
+    import socket
+
+    cmd_line_parser = argparse.ArgumentParser(
+        prog="python -m obs2org serve",
+        description="""Run Obs2Org as a server, which keeps the heading index and
+Pandoc's capabilities in memory. While the server is running,
+'python -m obs2org' forwards it's arguments to the server.""",
+    )
+    cmd_line_parser.add_argument(
+        "-s",
+        "--socket",
+        metavar="SOCKET",
+        type=Path,
+        dest="socket",
+        default=None,
+        help="""The path to the Unix domain socket to listen on.""",
+    )
+    cmd_line_parser.add_argument(
+        "-w",
+        "--warm",
+        metavar="ORG_DIR",
+        dest="warm_dirs",
+        action="append",
+        default=[],
+        help="""Read the headings of all Org-Mode files in ORG_DIR at
+startup. Can be given more than once.""",
+    )
+    cmd_line_args = cmd_line_parser.parse_args(argv)
+
+    if not hasattr(socket, "AF_UNIX"):
+        cmd_line_parser.error("Unix domain sockets are not supported on this OS")
+
+    server_socket: Path = cmd_line_args.socket or socket_path()
+    if server_socket.exists():
+        if send_request(server_socket=server_socket, request={"command": "ping"}):
+            cmd_line_parser.error(f"the server is already running at '{server_socket}'")
+        server_socket.unlink()
+    server_socket.parent.mkdir(exist_ok=True, parents=True)
+
+    for warm_dir in cmd_line_args.warm_dirs:
+        _warm_heading_index(org_dir=Path(warm_dir))
+
+    state: dict[str, Any] = {}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(str(server_socket))
+        server.listen()
+        print(f"Obs2Org server listening on '{server_socket}'", flush=True)
+        try:
+            while not state.get("stop"):
+                connection, _ = server.accept()
+                with connection:
+                    _handle_connection(connection=connection, state=state)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server_socket.unlink(missing_ok=True)
+
+
+###############################################################################
+def _handle_connection(connection: Any, state: dict[str, Any]) -> None:
+    """Read the request from the client's connection, handle it and send the
+    response.
+
+    Parameters
+    ----------
+    connection : socket.socket
+        The connection to the client.
+    state : dict[str, Any]
+        The state of the server.
+    """
+    import json  # pylint: disable=import-outside-toplevel
+
+    try:
+        with connection.makefile(mode="rb") as conn_file:
+            request = json.loads(conn_file.readline())
+    except (OSError, ValueError):
+        request = {}
+    if not isinstance(request, dict):
+        request = {}
+
+    response = _handle_request(request=request, state=state)
+    try:
+        connection.sendall(json.dumps(response).encode(encoding="utf-8") + b"\n")
+    except OSError as excp:
+        print(f"Error sending the response: {excp}", flush=True)
+
+
+###############################################################################
+def _warm_heading_index(org_dir: Path) -> None:
+    """Read the headings of all Org-Mode files in `org_dir` and it's
+    subdirectories into the heading index.
+
+    Parameters
+    ----------
+    org_dir : Path
+        The directory containing the Org-Mode files.
+    """
+    from obs2org.heading_index import (  # pylint: disable=import-outside-toplevel
+        heading_text,
+    )
+
+    count = 0
+    for org_file in org_dir.rglob("*.org"):
+        try:
+            heading_text(file_name=org_file)
+            count += 1
+        except (OSError, ValueError) as excp:
+            print(f"Error reading file '{org_file}': {excp}", flush=True)
+
+    print(f"Read the headings of {count} files in '{org_dir}'", flush=True)
+
+
+###############################################################################
+def _handle_request(request: dict[str, Any], state: dict[str, Any]) -> dict[str, Any]:
+    """Handle a single request of a client and return the response.
+
+    Parameters
+    ----------
+    request : dict[str, Any]
+        The client's request.
+    state : dict[str, Any]
+        The state of the server, the last `convert` request and if the server
+        should stop.
+
+    Returns
+    -------
+    dict[str, Any]
+        The response to send to the client.
+    """
+    # pylint: disable=import-outside-toplevel
+    import contextlib
+    import io
+
+    command = request.get("command")
+    if command == "ping":
+        return {"status": 0, "stdout": "", "stderr": ""}
+
+    if command == "stop":
+        state["stop"] = True
+        return {"status": 0, "stdout": "Obs2Org server stopped\n", "stderr": ""}
+
+    if command == "resolve-link":
+        from obs2org.parse_org_mode import resolve_links
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            link = resolve_links(
+                text=str(request.get("link", "")),
+                directory=Path(str(request.get("directory", "."))),
+            )
+        return {"status": 0, "stdout": link + "\n", "stderr": out.getvalue()}
+
+    if command == "reconvert":
+        if "last_convert" not in state:
+            return {
+                "status": 2,
+                "stdout": "",
+                "stderr": "error: nothing to reconvert\n",
+            }
+        request = state["last_convert"]
+    elif command == "convert":
+        state["last_convert"] = request
+    else:
+        return {
+            "status": 2,
+            "stdout": "",
+            "stderr": f"error: unknown command '{command}'\n",
+        }
+
+    return _run_convert(cwd=str(request.get("cwd", ".")), args=request.get("args", []))
+
+
+###############################################################################
+def _run_convert(cwd: str, args: list[str]) -> dict[str, Any]:
+    """Run Obs2Org with the command line arguments `args` in the working
+    directory `cwd`.
+
+    Parameters
+    ----------
+    cwd : str
+        The working directory of the client.
+    args : list[str]
+        The command line arguments of the client.
+
+    Returns
+    -------
+    dict[str, Any]
+        The response containing the exit code and the output of the program.
+    """
+    # pylint: disable=import-outside-toplevel
+    import contextlib
+    import io
+
+    from obs2org import main
+
+    out = io.StringIO()
+    err = io.StringIO()
+    status = 0
+    old_cwd = os.getcwd()
+    try:
+        os.chdir(cwd)
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            main.main(argv=[str(arg) for arg in args])
+    except SystemExit as excp:
+        status = excp.code if isinstance(excp.code, int) else 1
+    except Exception as excp:  # pylint: disable=broad-except
+        err.write(f"Error: {excp}\n")
+        status = 1
+    finally:
+        os.chdir(old_cwd)
+
+    return {"status": status, "stdout": out.getvalue(), "stderr": err.getvalue()}
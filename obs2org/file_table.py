@@ -0,0 +1,352 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     file_table.py
+# Date:     19.10.2026
+# ===============================================================================
+"""The compact table of the Markdown files to convert.
+
+A vault can contain a million notes, so the files are not stored as a list of
+`FilePaths` holding two `Path` objects each. The table stores every directory
+once, the file names without their suffix in a list of strings and the size
+and modification time of the files in arrays. `FilePaths` are only built when
+a file is converted, by iterating over the table.
+"""
+
+from __future__ import annotations
+
+import sys
+from array import array
+from bisect import bisect_left
+from os import path
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+# The suffix of the generated Org-Mode files.
+_ORG_SUFFIX = ".org"
+
+
+################################################################################
+class FilePaths(NamedTuple):
+    """Class holding the path to the Markdown file to convert and the path to the
+    Org-Mode file to generate.
+    """
+
+    in_file: Path
+    """Path to the Markdown file to convert."""
+    out_file: Path
+    """Path to the generated Org-Mode file."""
+
+
+################################################################################
+class FileEntry(NamedTuple):
+    """Class holding a Markdown file to add to the `FileTable`."""
+
+    name: str
+    """The file name of the Markdown file, without the directory."""
+    size: int
+    """The size of the Markdown file in bytes."""
+    mtime_ns: int
+    """The modification time of the Markdown file in nanoseconds."""
+
+
+################################################################################
+class FileTable:
+    """The Markdown files to convert and the Org-Mode files to generate.
+
+    The files are added per directory, the files of a directory are stored
+    next to each other and sorted by name, so the Org-Mode file a link points
+    to can be found without a dictionary of all files. The order files are
+    converted in can be set using `set_order`, by default it is the order
+    they have been added in.
+    """
+
+    def __init__(self) -> None:
+        """Construct an empty file table."""
+        self._in_dirs: list[str] = []
+        self._out_dirs: list[str] = []
+        self._suffixes: list[str] = []
+        self._dir_starts = array("L")
+        self._out_dir_ids: dict[str, list[int]] = {}
+        self._row_dirs = array("L")
+        self._row_suffixes = array("B")
+        self._names: list[str] = []
+        self._sizes = array("q")
+        self._mtimes = array("q")
+        self._out_names: dict[int, str] = {}
+        self._order: Optional[array[int]] = None
+
+    ############################################################################
+    def add_directory(
+        self,
+        in_dir: str,
+        out_dir: str,
+        entries: Iterable[FileEntry],
+        out_name: Optional[str] = None,
+    ) -> None:
+        """Add the Markdown files `entries` in the directory `in_dir`, which are
+        converted to Org-Mode files in the directory `out_dir`.
+
+        Parameters
+        ----------
+        in_dir : str
+            The directory containing the Markdown files.
+        out_dir : str
+            The directory to write the Org-Mode files to.
+        entries : Iterable[FileEntry]
+            The Markdown files in `in_dir`.
+        out_name : Optional[str], optional
+            The name of the Org-Mode file without the suffix, if it differs
+            from the name of the Markdown file. Only used for a single file
+            converted to an output file given on the command line, such a
+            file isn't found by `index_of`. By default `None`.
+        """
+        sorted_entries = sorted(
+            (path.splitext(entry.name), entry.size, entry.mtime_ns) for entry in entries
+        )
+        if not sorted_entries:
+            return
+
+        dir_id = len(self._in_dirs)
+        self._in_dirs.append(sys.intern(in_dir))
+        self._out_dirs.append(sys.intern(out_dir))
+        self._dir_starts.append(len(self._names))
+        self._out_dir_ids.setdefault(path.normpath(out_dir), []).append(dir_id)
+        for (stem, suffix), size, mtime_ns in sorted_entries:
+            self._row_dirs.append(dir_id)
+            self._row_suffixes.append(self._suffix_id(suffix))
+            self._names.append(stem)
+            self._sizes.append(size)
+            self._mtimes.append(mtime_ns)
+        if out_name is not None:
+            self._out_names[len(self._names) - 1] = out_name
+        self._order = None
+
+    ############################################################################
+    def __len__(self) -> int:
+        """Return the number of files to convert.
+
+        Returns
+        -------
+        int
+            The number of files to convert, the files not in the order set by
+            `set_order` are not counted.
+        """
+        if self._order is not None:
+            return len(self._order)
+
+        return len(self._names)
+
+    ############################################################################
+    @property
+    def num_entries(self) -> int:
+        """The number of files in the table, including the files that are not
+        converted, the indices of the files are less than this number.
+        """
+        return len(self._names)
+
+    ############################################################################
+    def __iter__(self) -> Iterator[FilePaths]:
+        """Return an iterator over the files to convert.
+
+        Returns
+        -------
+        Iterator[FilePaths]
+            The paths of the files to convert, in the order to convert them.
+        """
+        return (self.file_paths(index) for index in self.indices())
+
+    ############################################################################
+    def indices(self) -> Iterator[int]:
+        """Return an iterator over the indices of the files to convert.
+
+        Returns
+        -------
+        Iterator[int]
+            The indices of the files to convert, in the order to convert them.
+        """
+        if self._order is not None:
+            return iter(self._order)
+
+        return iter(range(len(self._names)))
+
+    ############################################################################
+    def set_order(self, indices: Iterable[int]) -> None:
+        """Set the files to convert and the order to convert them in.
+
+        Files not in `indices` are still found by `index_of`, but are not
+        converted.
+
+        Parameters
+        ----------
+        indices : Iterable[int]
+            The indices of the files to convert.
+        """
+        self._order = array("L", indices)
+
+    ############################################################################
+    def biggest_first(self, indices: Iterable[int]) -> array[int]:
+        """Return the indices `indices` ordered by the size of the files,
+        biggest first.
+
+        The files are only sorted by the power of two of their size, which is
+        good enough to not start the conversion of a big file at the end and
+        doesn't need a sorted list of all files.
+
+        Parameters
+        ----------
+        indices : Iterable[int]
+            The indices of the files to order.
+
+        Returns
+        -------
+        array[int]
+            The ordered indices.
+        """
+        buckets: dict[int, array[int]] = {}
+        for index in indices:
+            buckets.setdefault(self._sizes[index].bit_length(), array("L")).append(
+                index
+            )
+
+        ordered = array("L")
+        for bucket in sorted(buckets, reverse=True):
+            ordered.extend(buckets[bucket])
+
+        return ordered
+
+    ############################################################################
+    def file_paths(self, index: int) -> FilePaths:
+        """Return the paths of the file with index `index`.
+
+        Parameters
+        ----------
+        index : int
+            The index of the file.
+
+        Returns
+        -------
+        FilePaths
+            The path to the Markdown file and to the Org-Mode file.
+        """
+        dir_id = self._row_dirs[index]
+        name = self._names[index]
+        return FilePaths(
+            in_file=Path(
+                self._in_dirs[dir_id],
+                name + self._suffixes[self._row_suffixes[index]],
+            ),
+            out_file=Path(
+                self._out_dirs[dir_id], self._out_names.get(index, name) + _ORG_SUFFIX
+            ),
+        )
+
+    ############################################################################
+    def out_file(self, index: int) -> str:
+        """Return the normalized path to the Org-Mode file of the file with
+        index `index`.
+
+        Parameters
+        ----------
+        index : int
+            The index of the file.
+
+        Returns
+        -------
+        str
+            The normalized path to the Org-Mode file.
+        """
+        return path.normpath(
+            path.join(
+                self._out_dirs[self._row_dirs[index]],
+                self._out_names.get(index, self._names[index]) + _ORG_SUFFIX,
+            )
+        )
+
+    ############################################################################
+    def size(self, index: int) -> int:
+        """Return the size in bytes of the Markdown file with index `index`.
+
+        Parameters
+        ----------
+        index : int
+            The index of the file.
+
+        Returns
+        -------
+        int
+            The size of the Markdown file when it has been added.
+        """
+        return self._sizes[index]
+
+    ############################################################################
+    def mtime_ns(self, index: int) -> int:
+        """Return the modification time of the Markdown file with index `index`.
+
+        Parameters
+        ----------
+        index : int
+            The index of the file.
+
+        Returns
+        -------
+        int
+            The modification time in nanoseconds when the file has been added.
+        """
+        return self._mtimes[index]
+
+    ############################################################################
+    def index_of(self, out_file: str) -> Optional[int]:
+        """Return the index of the file that is converted to the Org-Mode file
+        `out_file`.
+
+        Parameters
+        ----------
+        out_file : str
+            The normalized path to the Org-Mode file.
+
+        Returns
+        -------
+        Optional[int]
+            The index of the file, `None` if no file in the table is
+            converted to `out_file`.
+        """
+        out_dir, file_name = path.split(out_file)
+        stem, suffix = path.splitext(file_name)
+        if suffix != _ORG_SUFFIX:
+            return None
+
+        for dir_id in self._out_dir_ids.get(out_dir or ".", ()):
+            start = self._dir_starts[dir_id]
+            end = (
+                self._dir_starts[dir_id + 1]
+                if dir_id + 1 < len(self._dir_starts)
+                else len(self._names)
+            )
+            index = bisect_left(self._names, stem, start, end)
+            if index < end and self._names[index] == stem:
+                return index
+
+        return None
+
+    ############################################################################
+    def _suffix_id(self, suffix: str) -> int:
+        """Return the index of the suffix `suffix` of a Markdown file in the
+        list of suffixes, add it if it isn't in the list yet.
+
+        Parameters
+        ----------
+        suffix : str
+            The suffix of a Markdown file, like `.md`.
+
+        Returns
+        -------
+        int
+            The index of the suffix.
+        """
+        try:
+            return self._suffixes.index(suffix)
+        except ValueError:
+            self._suffixes.append(suffix)
+            return len(self._suffixes) - 1
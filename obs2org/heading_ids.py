@@ -0,0 +1,515 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     heading_ids.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Compute the ids Pandoc gives the headings of a Markdown file, without
+running Pandoc, used by `--predict-ids`.
+
+Pandoc's extension `auto_identifiers` generates the id of a heading from it's
+text: all formatting is removed, the text is converted to lower case, all
+characters except letters, numbers, `_`, `-` and `.` are removed, whitespace
+is replaced by `-` and everything before the first letter is removed. If the
+id is empty, it is `section`. If the id has already been used in the file,
+`-1`, `-2`, ... is appended. An explicit id like `{#id}` is used instead of
+the generated one.
+
+Only the headings Pandoc's Markdown reader recognizes are used: ATX
+headings starting in the first column with a space after the `#`, setext
+headings and both only after an empty line, a HTML tag or another heading.
+Headings in block quotes are recognized, headings in code blocks are not.
+Setext headings in bullet lists use up their id, but aren't returned, as
+Org-Mode has no headings in lists. Other headings in lists and lists
+continued by paragraphs are not recognized.
+"""
+
+from __future__ import annotations
+
+import html
+from typing import NamedTuple, Optional
+
+from obs2org.regexp import LazyPattern
+
+# Matches an ATX heading, the first group is the level, the second the text.
+_atx_heading_regex: LazyPattern[str] = LazyPattern(r"(#{1,6})(?:[ \t]+(.*))?")
+
+# Matches the closing sequence of an ATX heading.
+_atx_closing_regex: LazyPattern[str] = LazyPattern(r"(?:^|[ \t]+)#+[ \t]*$")
+
+# Matches the underline of a setext heading.
+_setext_underline_regex: LazyPattern[str] = LazyPattern(r"(?:=+|-+)[ \t]*")
+
+# Matches the markers of a block quote at the start of a line.
+_block_quote_regex: LazyPattern[str] = LazyPattern(r"(?:[ ]{0,3}>[ ]?)+")
+
+# Matches the marker of a bullet list item at the start of a line.
+_bullet_regex: LazyPattern[str] = LazyPattern(r"[ ]{0,3}[-*+][ \t]+")
+
+# Matches the start of a fenced code block, the first group is the fence.
+_code_fence_regex: LazyPattern[str] = LazyPattern(r"[ ]{0,3}(`{3,}|~{3,})")
+
+# Matches the attributes at the end of a heading, the first group contains
+# the attributes.
+_attributes_regex: LazyPattern[str] = LazyPattern(r"[ \t]*\{([^{}]*)\}[ \t]*$")
+
+# Matches a single attribute of a heading: an id, a class, `-` or a
+# key-value pair.
+_attribute_regex: LazyPattern[str] = LazyPattern(
+    r"#[^\s{}#.]+|\.[^\s{}#.]+|-|[\w-]+=(?:\"[^\"]*\"|'[^']*'|\S+)"
+)
+
+# Matches an autolink, the first group is the URL or email address.
+_autolink_regex: LazyPattern[str] = LazyPattern(
+    r"<((?:[A-Za-z][A-Za-z0-9.+-]{1,31}:[^\s<>]*)|(?:[^\s<>@]+@[^\s<>@]+))>"
+)
+
+# Matches a raw HTML tag or comment.
+_html_tag_regex: LazyPattern[str] = LazyPattern(
+    r"<(?:/?[A-Za-z][A-Za-z0-9-]*(?:\s[^<>]*)?/?|!--.*?--)>"
+)
+
+# Matches a HTML entity.
+_entity_regex: LazyPattern[str] = LazyPattern(r"&(?:#[0-9]+|#[xX][0-9a-fA-F]+|\w+);")
+
+# The punctuation characters Pandoc keeps in ids.
+_ID_PUNCTUATION = "_-."
+
+# The dashes and ellipsis Pandoc's extension `smart` replaces, the longest
+# first.
+_SMART_PUNCTUATION_REPLACEMENTS = (
+    ("---", "\u2014"),
+    ("--", "\u2013"),
+    ("...", "\u2026"),
+)
+
+# The start of the punctuation Pandoc's extension `smart` replaces.
+_SMART_PUNCTUATION = tuple(
+    punctuation for punctuation, _ in _SMART_PUNCTUATION_REPLACEMENTS
+)
+
+# The id of a heading without letters.
+_EMPTY_ID = "section"
+
+
+################################################################################
+class Heading(NamedTuple):
+    """Class holding a heading of a Markdown file and it's Pandoc id."""
+
+    level: int
+    """The level of the heading, 1 for `#`."""
+    title: str
+    """The Markdown text of the heading, without attributes."""
+    id: str
+    """The id Pandoc gives the heading."""
+
+
+###############################################################################
+def pandoc_identifier(title: str) -> str:
+    """Return the id Pandoc's extension `auto_identifiers` generates for a
+    heading with the Markdown text `title`, without the suffix that makes it
+    unique.
+
+    Parameters
+    ----------
+    title : str
+        The Markdown text of the heading.
+
+    Returns
+    -------
+    str
+        The id, the empty string if the text contains no letters.
+    """
+    kept = "".join(
+        char
+        for char in plain_text(title).lower()
+        if char.isalnum() or char in _ID_PUNCTUATION or char.isspace()
+    )
+    identifier = "-".join(kept.split())
+    for pos, char in enumerate(identifier):
+        if char.isalpha():
+            return identifier[pos:]
+
+    return ""
+
+
+###############################################################################
+def markdown_headings(text: str) -> list[Heading]:
+    """Return the headings of the Markdown text `text` and their Pandoc ids.
+
+    Parameters
+    ----------
+    text : str
+        The Markdown text.
+
+    Returns
+    -------
+    list[Heading]
+        The headings, in the order of the text.
+    """
+    headings: list[Heading] = []
+    used: set[str] = set()
+
+    def add(level: int, title: str, in_list: bool = False) -> None:
+        title, explicit_id = _split_attributes(title.strip())
+        identifier = explicit_id
+        if identifier is None:
+            base = pandoc_identifier(title) or _EMPTY_ID
+            identifier = base
+            suffix = 1
+            while identifier in used:
+                identifier = f"{base}-{suffix}"
+                suffix += 1
+        used.add(identifier)
+        if not in_list:
+            headings.append(Heading(level=level, title=title, id=identifier))
+
+    lines = text.replace("\r\n", "\n").split("\n")
+    line_num = _skip_front_matter(lines)
+    after_block = True
+    in_quote = False
+    fence: Optional[str] = None
+    while line_num < len(lines):
+        line = lines[line_num]
+        line_num += 1
+        if fence is not None:
+            if line.strip().startswith(fence) and line.strip().strip(fence[0]) == "":
+                fence = None
+                after_block = False
+            continue
+
+        quote = _block_quote_regex.match(line)
+        if quote is not None:
+            line = line[quote.end() :]
+            after_block = after_block or not in_quote
+        in_quote = quote is not None
+
+        if not line.strip() or _html_tag_regex.fullmatch(line.strip()):
+            after_block = True
+            continue
+
+        fence_match = _code_fence_regex.match(line)
+        if fence_match is not None:
+            fence = fence_match.group(1)
+            continue
+
+        if not after_block:
+            continue
+
+        atx_match = _atx_heading_regex.fullmatch(line)
+        if atx_match is not None:
+            add(
+                level=len(atx_match.group(1)),
+                title=_atx_closing_regex.sub("", atx_match.group(2) or ""),
+            )
+            continue
+
+        underline = lines[line_num] if line_num < len(lines) else ""
+        if quote is not None:
+            underline_quote = _block_quote_regex.match(underline)
+            underline = (
+                "" if underline_quote is None else underline[underline_quote.end() :]
+            )
+        if (
+            underline
+            and not line.startswith(("    ", "\t"))
+            and _setext_underline_regex.fullmatch(underline) is not None
+        ):
+            # The heading is in the item of a bullet list, it's id is used,
+            # but Org-Mode has no headings in lists.
+            bullet = _bullet_regex.match(line)
+            add(
+                level=1 if underline[0] == "=" else 2,
+                title=line if bullet is None else line[bullet.end() :],
+                in_list=bullet is not None,
+            )
+            line_num += 1
+            continue
+
+        after_block = False
+
+    return headings
+
+
+###############################################################################
+def predicted_heading_text(data: bytes) -> str:
+    """Return the headings of the Markdown file with the content `data` in the
+    format of `obs2org.heading_index.heading_text`, as if the file had been
+    converted by Pandoc.
+
+    Parameters
+    ----------
+    data : bytes
+        The UTF-8 encoded Markdown text.
+
+    Returns
+    -------
+    str
+        The headings and their `:CUSTOM_ID:` properties.
+    """
+    return "\n".join(
+        f"{'*' * heading.level} {heading.title}\n:PROPERTIES:\n:CUSTOM_ID: {heading.id}"
+        for heading in markdown_headings(
+            data.decode(encoding="utf-8", errors="replace")
+        )
+    )
+
+
+###############################################################################
+def plain_text(title: str) -> str:
+    """Return the text of the Markdown text `title` without formatting, like
+    Pandoc's `stringify`.
+
+    Removes the URLs of links and images, HTML tags, backslashes of escaped
+    characters and the pairs of `_` used for emphasis and replaces dashes and
+    ellipses like Pandoc's extension `smart`, the text of code spans is kept
+    as it is. All other punctuation is kept, as it is removed from ids
+    anyway.
+
+    Parameters
+    ----------
+    title : str
+        The Markdown text of a heading.
+
+    Returns
+    -------
+    str
+        The text without formatting.
+    """
+    parts: list[str] = []
+    openers: list[int] = []
+    pos = 0
+    while pos < len(title):
+        char = title[pos]
+        if char == "\\" and pos + 1 < len(title) and not title[pos + 1].isalnum():
+            parts.append(title[pos + 1])
+            pos += 2
+        elif char == "`":
+            pos = _code_span(title=title, pos=pos, parts=parts)
+        elif char == "<":
+            pos = _angle_bracket(title=title, pos=pos, parts=parts)
+        elif char == "[" or (char == "!" and title.startswith("[", pos + 1)):
+            pos = _link(title=title, pos=pos, parts=parts)
+        elif char == "_":
+            end = pos
+            while end < len(title) and title[end] == "_":
+                end += 1
+            before = title[pos - 1] if pos > 0 else " "
+            after = title[end] if end < len(title) else " "
+            if openers and not before.isspace() and not after.isalnum():
+                parts[openers.pop()] = ""
+            elif not after.isspace() and not before.isalnum():
+                openers.append(len(parts))
+                parts.append(title[pos:end])
+            else:
+                parts.append(title[pos:end])
+            pos = end
+        elif title.startswith(_SMART_PUNCTUATION, pos):
+            for punctuation, replacement in _SMART_PUNCTUATION_REPLACEMENTS:
+                if title.startswith(punctuation, pos):
+                    parts.append(replacement)
+                    pos += len(punctuation)
+                    break
+        elif char == "&":
+            entity = _entity_regex.match(title, pos)
+            if entity is None:
+                parts.append(char)
+                pos += 1
+            else:
+                parts.append(html.unescape(entity.group()))
+                pos = entity.end()
+        else:
+            parts.append(char)
+            pos += 1
+
+    return "".join(parts)
+
+
+###############################################################################
+def _code_span(title: str, pos: int, parts: list[str]) -> int:
+    """Add the text of the code span starting at `pos` to `parts`.
+
+    Parameters
+    ----------
+    title : str
+        The Markdown text.
+    pos : int
+        The position of the first backtick.
+    parts : list[str]
+        The text without formatting.
+
+    Returns
+    -------
+    int
+        The position after the code span, or after the backticks if they
+        don't start a code span.
+    """
+    end = pos
+    while end < len(title) and title[end] == "`":
+        end += 1
+    fence = title[pos:end]
+    close = title.find(fence, end)
+    while close != -1 and title.startswith("`", close + len(fence)):
+        close = title.find(fence, close + len(fence) + 1)
+    if close == -1:
+        parts.append(fence)
+        return end
+
+    parts.append(title[end:close].strip())
+    return close + len(fence)
+
+
+###############################################################################
+def _angle_bracket(title: str, pos: int, parts: list[str]) -> int:
+    """Add the text of the autolink or HTML tag starting at `pos` to `parts`.
+
+    Parameters
+    ----------
+    title : str
+        The Markdown text.
+    pos : int
+        The position of the `<`.
+    parts : list[str]
+        The text without formatting.
+
+    Returns
+    -------
+    int
+        The position after the autolink or tag, or after the `<`.
+    """
+    autolink = _autolink_regex.match(title, pos)
+    if autolink is not None:
+        parts.append(autolink.group(1))
+        return autolink.end()
+
+    tag = _html_tag_regex.match(title, pos)
+    if tag is not None:
+        return tag.end()
+
+    parts.append("<")
+    return pos + 1
+
+
+###############################################################################
+def _link(title: str, pos: int, parts: list[str]) -> int:
+    """Add the text of the link, image or span starting at `pos` to `parts`.
+
+    Parameters
+    ----------
+    title : str
+        The Markdown text.
+    pos : int
+        The position of the `[` or the `!` of an image.
+    parts : list[str]
+        The text without formatting.
+
+    Returns
+    -------
+    int
+        The position after the link, or after the `[` or `!` if there is no
+        link at `pos`.
+    """
+    start = pos + 1 if title[pos] == "!" else pos
+    close = _matching(title=title, pos=start, open_char="[", close_char="]")
+    if close != -1 and title.startswith("(", close + 1):
+        end = _matching(title=title, pos=close + 1, open_char="(", close_char=")")
+    elif close != -1 and title.startswith("{", close + 1):
+        end = title.find("}", close + 1)
+    else:
+        end = -1
+    if end == -1:
+        parts.append(title[pos : start + 1])
+        return start + 1
+
+    parts.append(plain_text(title[start + 1 : close]))
+    return end + 1
+
+
+###############################################################################
+def _matching(title: str, pos: int, open_char: str, close_char: str) -> int:
+    """Return the position of the bracket closing the bracket at `pos`.
+
+    Parameters
+    ----------
+    title : str
+        The Markdown text.
+    pos : int
+        The position of the opening bracket.
+    open_char : str
+        The opening bracket.
+    close_char : str
+        The closing bracket.
+
+    Returns
+    -------
+    int
+        The position of the closing bracket, -1 if there is none.
+    """
+    depth = 0
+    for end in range(pos, len(title)):
+        if title[end] == "\\":
+            continue
+        if title[end] == open_char and (end == pos or title[end - 1] != "\\"):
+            depth += 1
+        elif title[end] == close_char and title[end - 1] != "\\":
+            depth -= 1
+            if depth == 0:
+                return end
+
+    return -1
+
+
+###############################################################################
+def _split_attributes(title: str) -> tuple[str, Optional[str]]:
+    """Remove the attributes `{#id .class}` from the end of the heading text
+    `title` and return the text and the explicit id.
+
+    Parameters
+    ----------
+    title : str
+        The Markdown text of the heading.
+
+    Returns
+    -------
+    tuple[str, Optional[str]]
+        The text without the attributes and the explicit id, `None` if the
+        heading has no explicit id.
+    """
+    attributes = _attributes_regex.search(title)
+    if attributes is None:
+        return title, None
+    tokens = attributes.group(1).split()
+    if not all(_attribute_regex.fullmatch(token) for token in tokens):
+        return title, None
+
+    explicit_id = None
+    for token in tokens:
+        if token.startswith("#"):
+            explicit_id = token[1:]
+
+    return title[: attributes.start()].rstrip(), explicit_id
+
+
+###############################################################################
+def _skip_front_matter(lines: list[str]) -> int:
+    """Return the index of the first line after the YAML front matter.
+
+    Parameters
+    ----------
+    lines : list[str]
+        The lines of the Markdown text.
+
+    Returns
+    -------
+    int
+        The index of the first line after the front matter, 0 if the text has
+        no front matter.
+    """
+    if not lines or lines[0].rstrip() != "---":
+        return 0
+    for line_num in range(1, len(lines)):
+        if lines[line_num].rstrip() in ("---", "..."):
+            return line_num + 1
+
+    return 0
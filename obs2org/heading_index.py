@@ -0,0 +1,335 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     heading_index.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Index of the headings and their ids of the Org-Mode files links point to.
+
+Only the headings that have a `:CUSTOM_ID:` property are extracted from the
+files. The files are scanned using a memory map and a bytes regexp, only the
+matched headings are decoded. The result is cached per path and modification
+time of the file.
+
+Files that have been converted by Pandoc, but are not written yet, because
+they are corrected in memory, are in the index of pending headings. Pending
+headings are used instead of the file's content.
+
+Files that haven't been converted yet can have predicted headings, computed
+from the Markdown file by `obs2org.heading_ids`, see `--predict-ids`. They
+are used until the file has been converted.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from os import path
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Optional, Union
+
+from obs2org.regexp import LazyPattern
+
+if TYPE_CHECKING:
+    import mmap
+
+# Matches a heading line followed by a property drawer containing a
+# `:CUSTOM_ID:`, the whole match is the heading line, the `:PROPERTIES:` line
+# and all properties up to and including the `:CUSTOM_ID:` line.
+_heading_block_regexp: LazyPattern[bytes] = LazyPattern(
+    rb"^[^\S\n]*\*+[^\n]*\n(?:[^\S\n]*\n)*[^\S\n]*:PROPERTIES:[^\S\n]*\n"
+    rb"(?:[^\S\n]*:(?!END:|CUSTOM_ID:)[^\n]*\n)*:CUSTOM_ID:[^\n]*$",
+    flags=re.MULTILINE,
+)
+
+# Cache of the extracted headings, the key is the absolute path of the
+# Org-Mode file, see `_key`, the value a tuple of the modification time and
+# size of the file and the headings of the file.
+_heading_cache: dict[Path, tuple[int, int, str]] = {}
+
+# The headings of files that have been converted, but are not written yet,
+# the key is the absolute path of the Org-Mode file. Only valid during a run,
+# see `reset_run_headings`.
+_pending_headings: dict[Path, str] = {}
+
+# The headings predicted from the Markdown files of Org-Mode files that have
+# not been converted yet, the key is the absolute path of the Org-Mode file.
+# Only valid during a run, see `reset_run_headings`.
+_predicted_headings: dict[Path, str] = {}
+
+_cache_lock = threading.Lock()
+
+
+###############################################################################
+def heading_text(file_name: Path) -> str:
+    """Return the headings with their `:CUSTOM_ID:` of the Org-Mode file
+    `file_name`.
+
+    The returned text contains only the heading lines and property drawers of
+    the headings with a `:CUSTOM_ID:`, separated by newlines. This is enough
+    text to search for the id of a heading. The result is cached, the file is
+    only scanned again if it's modification time or size changes.
+
+    Parameters
+    ----------
+    file_name : Path
+        The path to the Org-Mode file.
+
+    Returns
+    -------
+    str
+        The headings and their `:CUSTOM_ID:` properties.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the file `file_name` does not exist.
+    """
+    key = _key(file_name)
+    with _cache_lock:
+        pending = _pending_headings.get(key)
+        if pending is None:
+            pending = _predicted_headings.get(key)
+    if pending is not None:
+        return pending
+
+    stat = file_name.stat()
+
+    with _cache_lock:
+        cached = _heading_cache.get(key)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+
+    text = _scan_file(file_name=file_name, size=stat.st_size)
+
+    with _cache_lock:
+        _heading_cache[key] = (stat.st_mtime_ns, stat.st_size, text)
+
+    return text
+
+
+###############################################################################
+def _scan_file(file_name: Path, size: int) -> str:
+    """Return the headings with their `:CUSTOM_ID:` of the file `file_name`.
+
+    Parameters
+    ----------
+    file_name : Path
+        The path to the Org-Mode file.
+    size : int
+        The size of the file in bytes, empty files can't be memory mapped.
+
+    Returns
+    -------
+    str
+        The headings and their `:CUSTOM_ID:` properties.
+    """
+    if size == 0:
+        return ""
+
+    import mmap  # pylint: disable=import-outside-toplevel
+
+    with file_name.open(mode="rb") as f_d, mmap.mmap(
+        f_d.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mapped:
+        return _scan_data(data=mapped)
+
+
+###############################################################################
+def _scan_data(data: Union[bytes, mmap.mmap]) -> str:
+    """Return the headings with their `:CUSTOM_ID:` contained in `data`.
+
+    Parameters
+    ----------
+    data : Union[bytes, mmap.mmap]
+        The UTF-8 encoded Org-Mode text.
+
+    Returns
+    -------
+    str
+        The headings and their `:CUSTOM_ID:` properties.
+    """
+    return "\n".join(
+        match.group().decode(encoding="utf-8")
+        for match in _heading_block_regexp.finditer(data)
+    )
+
+
+###############################################################################
+def set_pending_headings(file_name: Path, text: str) -> None:
+    """Add the headings of the Org-Mode text `text`, which is going to be
+    written to `file_name`, to the pending headings.
+
+    Parameters
+    ----------
+    file_name : Path
+        The path to the Org-Mode file `text` is going to be written to.
+    text : str
+        The Org-Mode text.
+    """
+    set_pending_heading_text(
+        file_name=file_name, headings=_scan_data(data=text.encode(encoding="utf-8"))
+    )
+
+
+###############################################################################
+def set_pending_heading_text(file_name: Path, headings: str) -> None:
+    """Add the headings `headings` of the Org-Mode file `file_name`, which is
+    going to be written, to the pending headings.
+
+    Parameters
+    ----------
+    file_name : Path
+        The path to the Org-Mode file.
+    headings : str
+        The headings and their `:CUSTOM_ID:` properties, in the format of
+        `heading_text`.
+    """
+    key = _key(file_name)
+    with _cache_lock:
+        _pending_headings[key] = headings
+        _predicted_headings.pop(key, None)
+
+
+###############################################################################
+def set_predicted_headings(file_name: Path, text: str) -> None:
+    """Add the headings `text` predicted from the Markdown file of the
+    Org-Mode file `file_name`, which hasn't been converted yet.
+
+    The prediction isn't used if the file has already been converted.
+
+    Parameters
+    ----------
+    file_name : Path
+        The path to the Org-Mode file.
+    text : str
+        The predicted headings, see
+        `obs2org.heading_ids.predicted_heading_text`.
+    """
+    key = _key(file_name)
+    with _cache_lock:
+        if key not in _pending_headings:
+            _predicted_headings[key] = text
+
+
+###############################################################################
+def headings_written(file_name: Path, text: str) -> None:
+    """Replace the pending headings of `file_name` with the headings of `text`,
+    which has been written to `file_name`.
+
+    Parameters
+    ----------
+    file_name : Path
+        The path to the written Org-Mode file.
+    text : str
+        The content of the file.
+    """
+    headings = _scan_data(data=text.encode(encoding="utf-8"))
+    stat = file_name.stat()
+    key = _key(file_name)
+    with _cache_lock:
+        _heading_cache[key] = (stat.st_mtime_ns, stat.st_size, headings)
+        _pending_headings.pop(key, None)
+        _predicted_headings.pop(key, None)
+
+
+###############################################################################
+def discard_pending_headings(file_names: Iterable[Path]) -> None:
+    """Remove the pending and predicted headings of the files `file_names`.
+
+    Parameters
+    ----------
+    file_names : Iterable[Path]
+        The paths to the Org-Mode files.
+    """
+    keys = [_key(file_name) for file_name in file_names]
+    with _cache_lock:
+        for key in keys:
+            _pending_headings.pop(key, None)
+            _predicted_headings.pop(key, None)
+
+
+###############################################################################
+def discard_predicted_headings() -> None:
+    """Remove all predicted headings, of the files that couldn't be
+    converted."""
+    with _cache_lock:
+        _predicted_headings.clear()
+
+
+###############################################################################
+def reset_run_headings() -> None:
+    """Remove all pending and predicted headings.
+
+    Called before and after every run, so a run that failed before writing
+    all files doesn't leave headings behind for the next run of the server,
+    see `obs2org.daemon`. The cache of the headings of the written files is
+    kept, it is checked against the modification time and size of the files.
+    """
+    with _cache_lock:
+        _pending_headings.clear()
+        _predicted_headings.clear()
+
+
+###############################################################################
+def cached_headings(file_name: Path) -> Optional[tuple[int, int, str]]:
+    """Return the cached headings of the file `file_name`.
+
+    Parameters
+    ----------
+    file_name : Path
+        The path to the Org-Mode file.
+
+    Returns
+    -------
+    Optional[tuple[int, int, str]]
+        The modification time and size of the file when it has been scanned
+        and it's headings, `None` if the file isn't in the cache.
+    """
+    with _cache_lock:
+        return _heading_cache.get(_key(file_name))
+
+
+###############################################################################
+def add_headings(file_name: Path, mtime_ns: int, size: int, text: str) -> None:
+    """Add the headings `text` of the file `file_name` to the cache.
+
+    Used to load headings that have been extracted by another process. The
+    headings are only used as long as the file's modification time and size
+    match `mtime_ns` and `size`.
+
+    Parameters
+    ----------
+    file_name : Path
+        The path to the Org-Mode file.
+    mtime_ns : int
+        The modification time of the file the headings have been extracted
+        from.
+    size : int
+        The size of the file the headings have been extracted from.
+    text : str
+        The headings, as returned by `heading_text`.
+    """
+    with _cache_lock:
+        _heading_cache[_key(file_name)] = (mtime_ns, size, text)
+
+
+###############################################################################
+def _key(file_name: Path) -> Path:
+    """Return the key of the file `file_name` in the caches.
+
+    The key is the normalized absolute path, so the same relative path in
+    another working directory of the server is another file.
+
+    Parameters
+    ----------
+    file_name : Path
+        The path to the Org-Mode file.
+
+    Returns
+    -------
+    Path
+        The normalized absolute path to the file.
+    """
+    return Path(path.abspath(file_name))
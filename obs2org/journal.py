@@ -0,0 +1,279 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     journal.py
+# Date:     19.10.2026
+# ===============================================================================
+"""The journal of the files a run has converted and corrected, used by
+`--resume` to continue an interrupted run.
+
+The journal is the file `.obs2org/journal.log` in the output directory. Every
+finished stage of a file is appended as a line of JSON as soon as it is
+done, so the journal survives the process being killed. A run without
+`--resume` starts a new journal. The journal of a run that isn't saved, like
+the conversion of a single file to an Org-Mode file, is only kept in memory.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, NamedTuple, Optional, TextIO, Union
+
+from obs2org.state import relative_out_path, state_directory
+
+# The name of the journal file in the state directory.
+_JOURNAL_FILE_NAME = "journal.log"
+
+# The stage of a file converted by Pandoc, but not yet corrected.
+STAGE_CONVERTED = "converted"
+
+# The stage of a file that has been corrected and written.
+STAGE_CORRECTED = "corrected"
+
+
+################################################################################
+class JournalEntry(NamedTuple):
+    """Class holding the last finished stage of a file."""
+
+    stage: str
+    """The finished stage, `STAGE_CONVERTED` or `STAGE_CORRECTED`."""
+    size: int
+    """The size of the Markdown file in bytes."""
+    mtime_ns: int
+    """The modification time of the Markdown file in nanoseconds."""
+    out_size: int
+    """The size of the written Org-Mode file, -1 if it hasn't been written."""
+    out_mtime_ns: int
+    """The modification time of the written Org-Mode file, -1 if it hasn't
+    been written."""
+
+
+################################################################################
+class Journal:
+    """The append-only journal of the finished stages of the files of a run.
+
+    The journal is used by more than one thread at the same time.
+    """
+
+    def __init__(
+        self, out_path: Union[str, Path], resume: bool, save: bool = True
+    ) -> None:
+        """Open the journal of the output directory `out_path`.
+
+        If `resume` is `True`, the entries of the journal are read and the
+        journal is compacted, else a new, empty journal is started.
+
+        Parameters
+        ----------
+        out_path : Union[str, Path]
+            The output directory.
+        resume : bool
+            Whether to continue the journal of an earlier run.
+        save : bool, optional
+            Whether to write the journal file, by default `True`. If this is
+            `False`, the journal file isn't touched.
+        """
+        self.out_path = out_path
+        self.file_path = state_directory(out_path) / _JOURNAL_FILE_NAME
+        self._lock = threading.Lock()
+        self._entries: dict[str, JournalEntry] = {}
+        self._file: Optional[TextIO] = None
+        if resume:
+            self._entries = _read_entries(self.file_path)
+        if not save:
+            return
+
+        try:
+            self.file_path.parent.mkdir(exist_ok=True, parents=True)
+            tmp_file = self.file_path.with_name(self.file_path.name + "~")
+            with tmp_file.open(mode="w", encoding="utf-8") as f_d:
+                for key, entry in self._entries.items():
+                    f_d.write(_entry_line(key=key, entry=entry))
+            tmp_file.replace(self.file_path)
+            # pylint: disable=consider-using-with
+            self._file = self.file_path.open(mode="a", encoding="utf-8")
+        except OSError as excp:
+            print(f"Error writing the journal '{self.file_path}': {excp}")
+
+    ############################################################################
+    def completed(
+        self, in_file: Path, out_file: Path, size: int, mtime_ns: int
+    ) -> bool:
+        """Return `True` if the file converted to `out_file` has been corrected
+        by an earlier run and neither the Markdown file nor the Org-Mode file
+        have changed since.
+
+        Parameters
+        ----------
+        in_file : Path
+            The path to the Markdown file.
+        out_file : Path
+            The path to the Org-Mode file.
+        size : int
+            The size of the Markdown file in bytes.
+        mtime_ns : int
+            The modification time of the Markdown file in nanoseconds.
+
+        Returns
+        -------
+        bool
+            `True` if the file doesn't need to be converted again.
+        """
+        entry = self.entry(out_file)
+        if (
+            entry is None
+            or entry.stage != STAGE_CORRECTED
+            or (entry.size, entry.mtime_ns) != (size, mtime_ns)
+        ):
+            return False
+
+        try:
+            stat = out_file.stat()
+        except OSError:
+            return False
+
+        return in_file.exists() and (entry.out_size, entry.out_mtime_ns) == (
+            stat.st_size,
+            stat.st_mtime_ns,
+        )
+
+    ############################################################################
+    def entry(self, out_file: Union[str, Path]) -> Optional[JournalEntry]:
+        """Return the last entry of the file converted to `out_file`.
+
+        Parameters
+        ----------
+        out_file : Union[str, Path]
+            The path to the Org-Mode file.
+
+        Returns
+        -------
+        Optional[JournalEntry]
+            The last finished stage, `None` if the file isn't in the journal.
+        """
+        key = relative_out_path(out_file=out_file, out_path=self.out_path)
+        with self._lock:
+            return self._entries.get(key)
+
+    ############################################################################
+    def unfinished(self) -> int:
+        """Return the number of files that have been converted, but not
+        corrected.
+
+        Returns
+        -------
+        int
+            The number of files whose last stage is `STAGE_CONVERTED`.
+        """
+        with self._lock:
+            return sum(
+                1 for entry in self._entries.values() if entry.stage == STAGE_CONVERTED
+            )
+
+    ############################################################################
+    def record(self, out_file: Path, stage: str, size: int, mtime_ns: int) -> None:
+        """Append the finished stage `stage` of the file converted to
+        `out_file` to the journal.
+
+        Parameters
+        ----------
+        out_file : Path
+            The path to the Org-Mode file.
+        stage : str
+            The finished stage, `STAGE_CONVERTED` or `STAGE_CORRECTED`.
+        size : int
+            The size of the Markdown file in bytes.
+        mtime_ns : int
+            The modification time of the Markdown file in nanoseconds.
+        """
+        out_size = -1
+        out_mtime_ns = -1
+        if stage == STAGE_CORRECTED:
+            try:
+                stat = out_file.stat()
+                out_size, out_mtime_ns = stat.st_size, stat.st_mtime_ns
+            except OSError:
+                return
+
+        key = relative_out_path(out_file=out_file, out_path=self.out_path)
+        entry = JournalEntry(
+            stage=stage,
+            size=size,
+            mtime_ns=mtime_ns,
+            out_size=out_size,
+            out_mtime_ns=out_mtime_ns,
+        )
+        with self._lock:
+            self._entries[key] = entry
+            if self._file is None:
+                return
+            try:
+                self._file.write(_entry_line(key=key, entry=entry))
+                self._file.flush()
+            except OSError as excp:
+                print(f"Error writing the journal '{self.file_path}': {excp}")
+                self._file = None
+
+    ############################################################################
+    def close(self) -> None:
+        """Close the journal file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+###############################################################################
+def _entry_line(key: str, entry: JournalEntry) -> str:
+    """Return the line of the journal file of the entry `entry`.
+
+    Parameters
+    ----------
+    key : str
+        The path of the Org-Mode file relative to the output directory.
+    entry : JournalEntry
+        The entry to save.
+
+    Returns
+    -------
+    str
+        The line of JSON, including the newline.
+    """
+    return json.dumps({"file": key, **entry._asdict()}) + "\n"
+
+
+###############################################################################
+def _read_entries(file_path: Path) -> dict[str, JournalEntry]:
+    """Return the last entry of every file in the journal file `file_path`.
+
+    Lines that can't be parsed, like the last line of a journal whose process
+    has been killed while writing it, are ignored.
+
+    Parameters
+    ----------
+    file_path : Path
+        The path to the journal file.
+
+    Returns
+    -------
+    dict[str, JournalEntry]
+        The entries, the key is the path of the Org-Mode file relative to the
+        output directory.
+    """
+    entries: dict[str, JournalEntry] = {}
+    try:
+        with file_path.open(mode="r", encoding="utf-8") as f_d:
+            for line in f_d:
+                try:
+                    values: dict[str, Any] = json.loads(line)
+                    key = values.pop("file")
+                    entries[key] = JournalEntry(**values)
+                except (ValueError, TypeError, KeyError, AttributeError):
+                    continue
+    except OSError:
+        pass
+
+    return entries
@@ -0,0 +1,279 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     limits.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Limits of the time and memory Pandoc may use to convert a single file and
+the quarantine of the files that exceeded them.
+
+A file that exceeds a limit is converted a second time. If that fails too,
+it is added to the quarantine, which is saved in the file
+`.obs2org/quarantine.json` in the output directory. Later runs convert
+quarantined files last or skip them, as long as the Markdown file doesn't
+change.
+"""
+
+from __future__ import annotations
+
+import json
+import signal
+import subprocess  # nosec B404
+import threading
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional, Union
+
+from obs2org.state import relative_out_path, state_directory
+
+# The name of the quarantine file in the state directory.
+_QUARANTINE_FILE_NAME = "quarantine.json"
+
+# The exit code of Pandoc if it's heap is exhausted, because of `+RTS -M`.
+_HEAP_EXHAUSTED_EXIT_CODE = 251
+
+# The signals stopping a process that exceeded it's CPU time, `SIGXCPU` at the
+# soft and `SIGKILL` at the hard limit. Windows has neither of them.
+_CPU_LIMIT_SIGNALS = tuple(
+    getattr(signal, name) for name in ("SIGXCPU", "SIGKILL") if hasattr(signal, name)
+)
+
+
+################################################################################
+class PandocLimits(NamedTuple):
+    """Class holding the limits of a single Pandoc process."""
+
+    timeout: Optional[float] = None
+    """The maximum wall-clock time in seconds, `None` for no limit."""
+    memory_mb: Optional[int] = None
+    """The maximum heap size in megabytes, `None` for no limit."""
+    cpu_seconds: Optional[int] = None
+    """The maximum CPU time in seconds, `None` for no limit."""
+
+
+################################################################################
+class LimitExceeded(subprocess.SubprocessError):
+    """Raised if Pandoc exceeded one of the `PandocLimits`."""
+
+
+###############################################################################
+def pandoc_limit_args(limits: PandocLimits) -> list[str]:
+    """Return the command line arguments of Pandoc to set it's memory limit.
+
+    The memory is limited using the option `-M` of the Haskell runtime, like
+    the Pandoc manual recommends for untrusted input. A limit on the address
+    space doesn't work, the Haskell runtime reserves a lot more address space
+    than it uses.
+
+    Parameters
+    ----------
+    limits : PandocLimits
+        The limits to set.
+
+    Returns
+    -------
+    list[str]
+        The arguments to add to the command line of Pandoc.
+    """
+    if limits.memory_mb is None:
+        return []
+
+    return ["+RTS", f"-M{limits.memory_mb}m", "-RTS"]
+
+
+###############################################################################
+def cpu_limit_preexec(limits: PandocLimits) -> Optional[Callable[[], None]]:
+    """Return the function to pass as `preexec_fn` to `subprocess.Popen`, that
+    sets the CPU time limit of the Pandoc process.
+
+    The limit is set in the child process before Pandoc is executed, so Pandoc
+    never runs without it.
+
+    Parameters
+    ----------
+    limits : PandocLimits
+        The limits to set.
+
+    Returns
+    -------
+    Optional[Callable[[], None]]
+        The function setting the limit, `None` if there is no CPU time limit
+        or the OS isn't POSIX.
+    """
+    if limits.cpu_seconds is None:
+        return None
+
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+
+    cpu_seconds = limits.cpu_seconds
+
+    def set_limit() -> None:
+        """Set the CPU time limit of this process, the child process."""
+        try:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+        except (OSError, ValueError):
+            pass
+
+    return set_limit
+
+
+###############################################################################
+def exceeded_limit(returncode: int, limits: PandocLimits) -> bool:
+    """Return `True` if the exit code `returncode` of Pandoc means that it has
+    been stopped because it exceeded a limit.
+
+    Parameters
+    ----------
+    returncode : int
+        The exit code of the Pandoc process.
+    limits : PandocLimits
+        The limits of the process.
+
+    Returns
+    -------
+    bool
+        `True` if Pandoc exceeded a limit, `False` else.
+    """
+    if limits.memory_mb is not None and returncode == _HEAP_EXHAUSTED_EXIT_CODE:
+        return True
+
+    return limits.cpu_seconds is not None and -returncode in _CPU_LIMIT_SIGNALS
+
+
+################################################################################
+class Quarantine:
+    """The list of Markdown files that exceeded the limits of Pandoc twice.
+
+    An entry is only valid as long as the size and modification time of the
+    Markdown file don't change. The quarantine is used by more than one thread
+    at the same time.
+    """
+
+    def __init__(self, out_path: Union[str, Path]) -> None:
+        """Construct the quarantine of the output directory `out_path` and read
+        it's entries from the quarantine file, if it exists.
+
+        Parameters
+        ----------
+        out_path : Union[str, Path]
+            The output directory.
+        """
+        self.out_path = out_path
+        self.file_path = state_directory(out_path) / _QUARANTINE_FILE_NAME
+        self._lock = threading.Lock()
+        self._changed = False
+        try:
+            with self.file_path.open(mode="r", encoding="utf-8") as f_d:
+                entries = json.load(f_d)
+        except (OSError, ValueError):
+            entries = {}
+        self._entries: dict[str, dict[str, object]] = (
+            entries if isinstance(entries, dict) else {}
+        )
+
+    ############################################################################
+    def __len__(self) -> int:
+        """Return the number of files in the quarantine.
+
+        Returns
+        -------
+        int
+            The number of entries, changed files are counted too.
+        """
+        with self._lock:
+            return len(self._entries)
+
+    ############################################################################
+    def contains(self, in_file: Path, out_file: Path) -> bool:
+        """Return `True` if the Markdown file `in_file`, which is converted to
+        `out_file`, is in the quarantine and hasn't changed since.
+
+        Parameters
+        ----------
+        in_file : Path
+            The path to the Markdown file.
+        out_file : Path
+            The path to the Org-Mode file to generate.
+
+        Returns
+        -------
+        bool
+            `True` if the file is in the quarantine, `False` else.
+        """
+        key = relative_out_path(out_file=out_file, out_path=self.out_path)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return False
+
+        try:
+            stat = in_file.stat()
+        except OSError:
+            return False
+
+        return entry.get("size") == stat.st_size and entry.get("mtime_ns") == (
+            stat.st_mtime_ns
+        )
+
+    ############################################################################
+    def add(self, in_file: Path, out_file: Path, reason: str) -> None:
+        """Add the Markdown file `in_file`, which is converted to `out_file`, to
+        the quarantine.
+
+        Parameters
+        ----------
+        in_file : Path
+            The path to the Markdown file.
+        out_file : Path
+            The path to the Org-Mode file to generate.
+        reason : str
+            The limit the file exceeded.
+        """
+        try:
+            stat = in_file.stat()
+        except OSError:
+            return
+
+        key = relative_out_path(out_file=out_file, out_path=self.out_path)
+        with self._lock:
+            self._entries[key] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "reason": reason,
+            }
+            self._changed = True
+
+    ############################################################################
+    def remove(self, out_file: Path) -> None:
+        """Remove the file converted to `out_file` from the quarantine.
+
+        Parameters
+        ----------
+        out_file : Path
+            The path to the generated Org-Mode file.
+        """
+        key = relative_out_path(out_file=out_file, out_path=self.out_path)
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._changed = True
+
+    ############################################################################
+    def save(self) -> None:
+        """Write the quarantine file, if the quarantine has changed."""
+        with self._lock:
+            if not self._changed:
+                return
+            entries = dict(self._entries)
+            self._changed = False
+
+        tmp_file = self.file_path.with_name(self.file_path.name + "~")
+        try:
+            self.file_path.parent.mkdir(exist_ok=True, parents=True)
+            with tmp_file.open(mode="w", encoding="utf-8") as f_d:
+                json.dump(entries, f_d, indent=2, sort_keys=True)
+            tmp_file.replace(self.file_path)
+        except OSError as excp:
+            print(f"Error writing the quarantine file '{self.file_path}': {excp}")
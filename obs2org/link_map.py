@@ -0,0 +1,193 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     link_map.py
+# Date:     19.10.2026
+# ===============================================================================
+"""The reverse-link map of the generated Org-Mode files, used by
+`--changed-since` to find the notes whose links have to be corrected again
+when the notes they link to change.
+
+The map is saved in the file `.obs2org/backlinks.json` in the output
+directory. It maps the path of every linked Org-Mode file, relative to the
+output directory, to the paths of the files linking to it. Links to files
+that don't exist are saved too, so the notes linking to a new note are
+corrected when the note is added.
+
+Runs converting only some files of the vault, like a single file or the files
+of `--files-from`, save the links of these files too. The map is only marked
+as complete after a run that converted all files of the vault, or after any
+run that started from a complete map.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Iterable, Union
+
+from obs2org.state import relative_out_path, state_directory
+
+# The name of the file of the reverse-link map in the state directory.
+_LINK_MAP_FILE_NAME = "backlinks.json"
+
+
+################################################################################
+class LinkMap:
+    """The files linking to every generated Org-Mode file.
+
+    The links of a file are replaced every time it is converted. `complete`
+    is `True` if the map has been read from the file of an earlier run, which
+    contains the links of all files of the vault. The map is used by more than
+    one thread at the same time.
+    """
+
+    def __init__(self, out_path: Union[str, Path]) -> None:
+        """Construct the reverse-link map of the output directory `out_path`
+        and read it from the file, if it exists.
+
+        Parameters
+        ----------
+        out_path : Union[str, Path]
+            The output directory.
+        """
+        self.out_path = out_path
+        self.file_path = state_directory(out_path) / _LINK_MAP_FILE_NAME
+        self._lock = threading.Lock()
+        self._changed = False
+        self._backlinks: dict[str, set[str]] = {}
+        self._links: dict[str, set[str]] = {}
+        self.complete = False
+        try:
+            with self.file_path.open(mode="r", encoding="utf-8") as f_d:
+                content = json.load(f_d)
+        except (OSError, ValueError):
+            return
+
+        if not isinstance(content, dict) or not isinstance(
+            content.get("backlinks"), dict
+        ):
+            return
+        for target, sources in content["backlinks"].items():
+            if not isinstance(sources, list):
+                continue
+            for source in sources:
+                self._backlinks.setdefault(target, set()).add(str(source))
+                self._links.setdefault(str(source), set()).add(target)
+        self.complete = content.get("complete") is True
+
+    ############################################################################
+    def set_links(self, out_file: Union[str, Path], targets: Iterable[str]) -> None:
+        """Replace the links of the Org-Mode file `out_file` with `targets`.
+
+        Parameters
+        ----------
+        out_file : Union[str, Path]
+            The path to the Org-Mode file containing the links.
+        targets : Iterable[str]
+            The paths to the Org-Mode files the links point to, see
+            `obs2org.prescan.link_target_path`.
+        """
+        source = relative_out_path(out_file=out_file, out_path=self.out_path)
+        new_links = {
+            relative_out_path(out_file=target, out_path=self.out_path)
+            for target in targets
+        }
+        with self._lock:
+            self._remove(source)
+            for target in new_links:
+                self._backlinks.setdefault(target, set()).add(source)
+            if new_links:
+                self._links[source] = new_links
+            self._changed = True
+
+    ############################################################################
+    def remove(self, out_file: Union[str, Path]) -> None:
+        """Remove the links of the Org-Mode file `out_file`, which has been
+        deleted.
+
+        Parameters
+        ----------
+        out_file : Union[str, Path]
+            The path to the deleted Org-Mode file.
+        """
+        source = relative_out_path(out_file=out_file, out_path=self.out_path)
+        with self._lock:
+            self._remove(source)
+            self._changed = True
+
+    ############################################################################
+    def _remove(self, source: str) -> None:
+        """Remove the links of the file `source`, the lock must be held.
+
+        Parameters
+        ----------
+        source : str
+            The path of the Org-Mode file relative to the output directory.
+        """
+        for target in self._links.pop(source, ()):
+            sources = self._backlinks.get(target)
+            if sources is None:
+                continue
+            sources.discard(source)
+            if not sources:
+                del self._backlinks[target]
+
+    ############################################################################
+    def linking_to(self, out_files: Iterable[Union[str, Path]]) -> set[str]:
+        """Return the files linking to one of the Org-Mode files `out_files`.
+
+        Parameters
+        ----------
+        out_files : Iterable[Union[str, Path]]
+            The paths to the linked Org-Mode files.
+
+        Returns
+        -------
+        set[str]
+            The paths of the files linking to them, relative to the output
+            directory.
+        """
+        result: set[str] = set()
+        with self._lock:
+            for out_file in out_files:
+                target = relative_out_path(out_file=out_file, out_path=self.out_path)
+                result.update(self._backlinks.get(target, ()))
+
+        return result
+
+    ############################################################################
+    def save(self, complete: bool = False) -> None:
+        """Write the map to it's file, if it has changed.
+
+        Parameters
+        ----------
+        complete : bool, optional
+            Whether all files of the vault have been converted in this run, by
+            default `False`. The map is complete if this is `True` or the map
+            read from the file is complete.
+        """
+        with self._lock:
+            complete = complete or self.complete
+            if not self._changed and complete == self.complete:
+                return
+            content = {
+                "complete": complete,
+                "backlinks": {
+                    target: sorted(sources)
+                    for target, sources in self._backlinks.items()
+                },
+            }
+            self.complete = complete
+            self._changed = False
+
+        tmp_file = self.file_path.with_name(self.file_path.name + "~")
+        try:
+            self.file_path.parent.mkdir(exist_ok=True, parents=True)
+            with tmp_file.open(mode="w", encoding="utf-8") as f_d:
+                json.dump(content, f_d, indent=2, sort_keys=True)
+            tmp_file.replace(self.file_path)
+        except OSError as excp:
+            print(f"Error writing the link map '{self.file_path}': {excp}")
@@ -0,0 +1,497 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     lua_filter.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Correct the links, tags and dates of a note inside the Pandoc process,
+using a generated Lua filter, used by `--lua-filter`.
+
+Before Pandoc converts a note, the wiki-style links, `Keywords:` lines and
+dates of it's Markdown text are looked up in Python, using the same functions
+as `obs2org.parse_org_mode`, and saved in a JSON table. The Lua filter reads
+this table and replaces the links, tags and dates of the AST while Pandoc
+converts the note, like `obs2org.pandoc_ast` does. So the generated Org-Mode
+text doesn't need to be corrected and Pandoc runs only once.
+
+The filter needs the module `pandoc.json` of Pandoc 3.1.1 or newer, see
+`filter_supported`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from hashlib import sha256
+from pathlib import Path
+from typing import Optional, Union
+
+from obs2org.cache import cache_directory
+from obs2org.org_scanner import date_of_line, is_tag_list
+from obs2org.pandoc_info import PandocInfo
+from obs2org.parse_org_mode import org_tags, resolve_links
+from obs2org.regexp import LazyPattern
+
+# Pandoc version that added the Lua module `pandoc.json`.
+_JSON_VERSION: tuple[int, ...] = (3, 1, 1)
+
+# The name of the metadata field holding the path to the table of a note.
+_TABLE_FIELD = "obs2org-table"
+
+# The text of the `Keywords:` line of a section.
+_KEYWORDS = "Keywords:"
+
+# The path to the written filter, once it has been written by this process.
+_filter_memo: dict[str, Path] = {}
+
+# Matches the start or end of a fenced code block.
+_fence_regexp: LazyPattern[str] = LazyPattern(r"^\s*(?:```|~~~)")
+
+# Matches inline code.
+_inline_code_regexp: LazyPattern[str] = LazyPattern(r"`[^`\n]*`")
+
+# The Lua filter. `keys` is the table of the note, read from the JSON file
+# given in the metadata field `obs2org-table`, see `correction_table`.
+_LUA_FILTER = r"""-- Generated by Obs2Org, don't edit.
+-- Corrects the wiki-style links, tags and dates of a note using the table
+-- Obs2Org computed from the Markdown text, see `obs2org/lua_filter.py`.
+
+local table_field = "obs2org-table"
+local keys = { links = {}, tags = {}, dates = {}, remove_citations = false }
+local break_types = { SoftBreak = true, LineBreak = true }
+
+-- Pandoc's extension `smart` changes these characters of the Markdown text.
+local smart = {
+  { "\u{2018}", "'" }, { "\u{2019}", "'" }, { "\u{2026}", "..." },
+  { "\u{2014}", "---" }, { "\u{2013}", "--" },
+}
+
+local function markdown_text(text)
+  for _, pair in ipairs(smart) do
+    text = text:gsub(pair[1], pair[2])
+  end
+  return text
+end
+
+local function append_all(list, elements)
+  for _, element in ipairs(elements) do
+    list:insert(element)
+  end
+end
+
+local function run_text(run)
+  local parts = {}
+  for _, element in ipairs(run) do
+    if element.t == "Str" then
+      parts[#parts + 1] = element.text
+    elseif element.t == "Space" then
+      parts[#parts + 1] = " "
+    else
+      parts[#parts + 1] = "\n"
+    end
+  end
+  return table.concat(parts)
+end
+
+local function text_inlines(text)
+  local inlines = pandoc.Inlines {}
+  local line_num = 0
+  for line in (text .. "\n"):gmatch("(.-)\n") do
+    if line_num > 0 then
+      inlines:insert(pandoc.SoftBreak())
+    end
+    line_num = line_num + 1
+    local word_num = 0
+    for word in (line .. " "):gmatch("(.-) ") do
+      if word_num > 0 then
+        inlines:insert(pandoc.Space())
+      end
+      word_num = word_num + 1
+      if word ~= "" then
+        inlines:insert(pandoc.Str(word))
+      end
+    end
+  end
+  return inlines
+end
+
+-- The same search for the innermost `[[...]]` on a line as `link_candidates`.
+local function correct_links(run, corrected)
+  local text = run_text(run)
+  local last_end = 1
+  local start = text:find("[[", 1, true)
+  while start do
+    local close = text:find("]]", start + 2, true)
+    if not close then
+      break
+    end
+    local inner = start
+    local next_start = text:find("[[", inner + 1, true)
+    while next_start and next_start <= close - 2 do
+      inner = next_start
+      next_start = text:find("[[", inner + 1, true)
+    end
+    local newline = text:find("\n", inner, true)
+    if not newline or newline > close then
+      local org_link = keys.links[markdown_text(text:sub(inner, close + 1))]
+      if org_link then
+        append_all(corrected, text_inlines(text:sub(last_end, inner - 1)))
+        corrected:insert(pandoc.RawInline("org", org_link))
+        last_end = close + 2
+      end
+    end
+    start = text:find("[[", close + 2, true)
+  end
+  if last_end == 1 then
+    append_all(corrected, run)
+  else
+    append_all(corrected, text_inlines(text:sub(last_end)))
+  end
+end
+
+-- `[[@Key]]` is parsed as `[`, the citation `[@Key]` and `]`.
+local function remove_citations(inlines)
+  local removed = pandoc.Inlines {}
+  for pos, inline in ipairs(inlines) do
+    local last = removed[#removed]
+    local next_inline = inlines[pos + 1]
+    if inline.t == "Cite"
+        and last and last.t == "Str" and last.text:sub(-1) == "["
+        and next_inline and next_inline.t == "Str"
+        and next_inline.text:sub(1, 1) == "]" then
+      append_all(removed, inline.content)
+    else
+      removed:insert(inline)
+    end
+  end
+  return removed
+end
+
+local function correct_inlines(inlines)
+  if keys.remove_citations then
+    inlines = remove_citations(inlines)
+  end
+  local corrected = pandoc.Inlines {}
+  local run = {}
+  for _, inline in ipairs(inlines) do
+    if inline.t == "Str" or inline.t == "Space" or inline.t == "SoftBreak" then
+      run[#run + 1] = inline
+    else
+      correct_links(run, corrected)
+      run = {}
+      corrected:insert(inline)
+    end
+  end
+  correct_links(run, corrected)
+  return corrected
+end
+
+local function line_text(line)
+  local parts = {}
+  for _, element in ipairs(line) do
+    if element.t == "Str" then
+      parts[#parts + 1] = element.text
+    elseif element.t == "Space" then
+      parts[#parts + 1] = " "
+    elseif not break_types[element.t] then
+      return nil
+    end
+  end
+  return table.concat(parts)
+end
+
+local function split_lines(inlines)
+  local lines = { {} }
+  for _, inline in ipairs(inlines) do
+    table.insert(lines[#lines], inline)
+    if break_types[inline.t] then
+      lines[#lines + 1] = {}
+    end
+  end
+  return lines
+end
+
+local function move_tags(heading, lines)
+  for index, line in ipairs(lines) do
+    local text = line_text(line)
+    local tags = text and keys.tags[text]
+    if tags then
+      local content = heading.content
+      content:insert(pandoc.RawInline("org", "\t\t\t" .. tags))
+      heading.content = content
+      table.remove(lines, index)
+      if index > 1 and index == #lines + 1 then
+        -- The line break before the removed last line.
+        table.remove(lines[#lines])
+      end
+      return true
+    end
+  end
+  return false
+end
+
+local function mark_date(line, corrected)
+  local text = line_text(line)
+  local date = text and keys.dates[text]
+  if not date then
+    append_all(corrected, line)
+    return
+  end
+  corrected:insert(pandoc.RawInline("org", "<" .. date .. ">"))
+  for _, element in ipairs(line) do
+    if break_types[element.t] then
+      corrected:insert(element)
+    end
+  end
+end
+
+local function correct_blocks(blocks)
+  local heading = nil
+  local corrected = pandoc.Blocks {}
+  for _, block in ipairs(blocks) do
+    if block.t == "Header" then
+      heading = block
+    elseif block.t == "Para" or block.t == "Plain" then
+      local lines = split_lines(block.content)
+      if heading and move_tags(heading, lines) then
+        heading = nil
+      end
+      local content = pandoc.Inlines {}
+      for _, line in ipairs(lines) do
+        mark_date(line, content)
+      end
+      block.content = content
+    end
+    if (block.t ~= "Para" and block.t ~= "Plain") or #block.content > 0 then
+      corrected:insert(block)
+    end
+  end
+  return corrected
+end
+
+-- Links, images and citations can't contain other links.
+local function skip(element)
+  return element, false
+end
+
+local corrections = {
+  traverse = "topdown",
+  Blocks = correct_blocks,
+  Inlines = correct_inlines,
+  Link = skip,
+  Image = skip,
+  Cite = skip,
+}
+
+local function correct_document(doc)
+  local table_path = doc.meta[table_field]
+  if table_path == nil then
+    return nil
+  end
+  doc.meta[table_field] = nil
+  local file = assert(io.open(pandoc.utils.stringify(table_path), "r"))
+  keys = pandoc.json.decode(file:read("a"), false)
+  file:close()
+  return doc:walk(corrections)
+end
+
+return { { Pandoc = correct_document } }
+"""
+
+
+###############################################################################
+def filter_supported(pandoc: PandocInfo) -> bool:
+    """Return `True` if the Pandoc executable `pandoc` can run the Lua filter.
+
+    Parameters
+    ----------
+    pandoc : PandocInfo
+        The Pandoc executable and it's capabilities.
+
+    Returns
+    -------
+    bool
+        `True` if Pandoc supports Lua filters and has the module `pandoc.json`.
+    """
+    return pandoc.lua and pandoc.version >= _JSON_VERSION
+
+
+###############################################################################
+def filter_file() -> Path:
+    """Return the path to the Lua filter, which is written to the cache
+    directory if it doesn't exist or has been changed.
+
+    The name of the file contains the hash of the filter, so every version of
+    Obs2Org uses it's own filter.
+
+    Returns
+    -------
+    Path
+        The path to the Lua filter.
+
+    Raises
+    ------
+    OSError
+        If the filter can't be written.
+    """
+    digest = sha256(_LUA_FILTER.encode(encoding="utf-8")).hexdigest()[:16]
+    memo = _filter_memo.get(digest)
+    if memo is not None:
+        return memo
+
+    path = cache_directory() / f"filter-{digest}.lua"
+    if not path.is_file():
+        path.parent.mkdir(exist_ok=True, parents=True)
+        tmp_file = path.with_name(f"{path.name}.{os.getpid()}~")
+        tmp_file.write_text(_LUA_FILTER, encoding="utf-8")
+        os.replace(tmp_file, path)
+    _filter_memo[digest] = path
+
+    return path
+
+
+###############################################################################
+def filter_args(filter_path: Path, table_path: Path) -> list[str]:
+    """Return the arguments of Pandoc to run the Lua filter `filter_path` with
+    the table `table_path`.
+
+    Parameters
+    ----------
+    filter_path : Path
+        The path to the Lua filter, see `filter_file`.
+    table_path : Path
+        The path to the JSON table of the note, see `write_table`.
+
+    Returns
+    -------
+    list[str]
+        The arguments to add to Pandoc's command line.
+    """
+    return ["--lua-filter", str(filter_path), "-M", f"{_TABLE_FIELD}={table_path}"]
+
+
+###############################################################################
+def correction_table(
+    markdown: str,
+    directory: Path,
+    remove_citations: bool,
+    attachments: Optional[list[str]] = None,
+) -> dict[str, Union[bool, dict[str, str]]]:
+    """Return the table of the corrected links, tags and dates of the
+    Markdown text `markdown` for the Lua filter.
+
+    The links are corrected by `obs2org.parse_org_mode.resolve_links`, only
+    the links that change are added. Lines of tags and dates are added with
+    the whitespace collapsed, like the text of a line of Pandoc's AST. Lines
+    in fenced code blocks and inline code are skipped.
+
+    Parameters
+    ----------
+    markdown : str
+        The Markdown text of the note.
+    directory : Path
+        The directory the Org-Mode files to link to are located in.
+    remove_citations : bool
+        Whether to treat citations in double brackets as normal links.
+    attachments : Optional[list[str]], optional
+        If this is not `None`, the file names of all links to attachments are
+        appended to this list.
+
+    Returns
+    -------
+    dict[str, Union[bool, dict[str, str]]]
+        The table: `links` maps the links to the Org-Mode links, `tags` the
+        `Keywords:` lines to the Org-Mode tags and `dates` the lines
+        containing a date to the date.
+    """
+    links: dict[str, str] = {}
+    tags: dict[str, str] = {}
+    dates: dict[str, str] = {}
+    in_code = False
+    for line in markdown.splitlines():
+        if _fence_regexp.match(line):
+            in_code = not in_code
+            continue
+        if in_code:
+            continue
+        text = " ".join(line.split())
+        if text.startswith(_KEYWORDS):
+            tag_list = text[len(_KEYWORDS) :].strip()
+            if is_tag_list(text=tag_list, start=0, end=len(tag_list)):
+                tags[text] = org_tags(tag_list)
+        date = date_of_line(text)
+        if date is not None:
+            dates[text] = date
+        for link in link_candidates(_inline_code_regexp.sub(repl="", string=text)):
+            if link in links or (link.startswith("[[@") and not remove_citations):
+                continue
+            org_link = resolve_links(
+                text=link, directory=directory, attachments=attachments
+            )
+            if org_link != link:
+                links[link] = org_link
+
+    return {
+        "links": links,
+        "tags": tags,
+        "dates": dates,
+        "remove_citations": remove_citations,
+    }
+
+
+###############################################################################
+def link_candidates(text: str) -> list[str]:
+    """Return the innermost wiki-style links `[[...]]` of the line `text`.
+
+    Parameters
+    ----------
+    text : str
+        A line of text.
+
+    Returns
+    -------
+    list[str]
+        The links, including the brackets.
+    """
+    candidates = []
+    start = text.find("[[")
+    while start != -1:
+        end = text.find("]]", start + 2)
+        if end == -1:
+            break
+        inner_start = text.rfind("[[", start, end)
+        candidates.append(text[inner_start : end + 2])
+        start = text.find("[[", end + 2)
+
+    return candidates
+
+
+###############################################################################
+def write_table(table: dict[str, Union[bool, dict[str, str]]]) -> Path:
+    """Write the table `table` to a temporary JSON file.
+
+    The caller has to delete the file.
+
+    Parameters
+    ----------
+    table : dict[str, Union[bool, dict[str, str]]]
+        The table of a note, see `correction_table`.
+
+    Returns
+    -------
+    Path
+        The path to the JSON file.
+
+    Raises
+    ------
+    OSError
+        If the file can't be written.
+    """
+    import tempfile  # pylint: disable=import-outside-toplevel
+
+    f_d, name = tempfile.mkstemp(prefix="obs2org-", suffix=".json")
+    with os.fdopen(f_d, mode="w", encoding="utf-8") as file:
+        json.dump(table, file, ensure_ascii=False)
+
+    return Path(name)
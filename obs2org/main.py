@@ -10,26 +10,32 @@
 from __future__ import annotations
 
 import argparse
-import asyncio
-import subprocess  # nosec
-from os import path, walk
-from pathlib import Path, PurePath
-from typing import Coroutine, NamedTuple
+from os import path
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 
 from obs2org import VERSION
-from obs2org.convert import convert_single_file, correct_org_mode
 
+if TYPE_CHECKING:
+    from obs2org.attachments import AttachmentCollector
+    from obs2org.bibliography import Bibliography
+    from obs2org.file_table import FilePaths, FileTable
+    from obs2org.journal import Journal
+    from obs2org.limits import PandocLimits, Quarantine
+    from obs2org.link_map import LinkMap
+    from obs2org.output import OutputCommitter
+    from obs2org.pandoc_info import PandocInfo
+    from obs2org.sources import VaultSource
+    from obs2org.walk import FileStream
 
-################################################################################
-class FilePaths(NamedTuple):
-    """Class holding the path to the Markdown file to convert and the path to the
-    Org-Mode file to generate.
-    """
+# The modules doing the actual conversion are imported when they are needed,
+# so `--help` and `--version` and converting a single file don't pay for
+# importing what they don't use.
 
-    in_file: Path
-    """Path to the Markdown file to convert."""
-    out_file: Path
-    """Path to the generated Org-Mode file."""
+
+_FILES_FROM_MAX_PENDING = 1000
+"""The number of found files waiting to be converted using `--files-from`, if
+`--max-pending` isn't given."""
 
 
 __descriptionText: str = (
@@ -66,25 +72,118 @@ Converts all markdown files with a suffix of '.md' in the directory
 './Markdown' and its subdirectories to files in Org-Mode format with
 the same base filename but a '.org' suffix in the directory '../Org'.
 
+python -m obs2org serve
+
+Runs Obs2Org as a server, which keeps the index of headings and the
+capabilities of Pandoc in memory. While the server is running, invocations
+of 'python -m obs2org' with the argument '--daemon' are forwarded to the
+server, all invocations are if the environment variable 'OBS2ORG_SOCKET' is
+set. 'python -m obs2org stop' stops the server.
+
+python -m obs2org ./Markdown -o ../Org/ --shard 1/2
+python -m obs2org ./Markdown -o ../Org/ --shard 2/2
+python -m obs2org merge ../Org/
+
+Converts the markdown files in two parts, which can run on different
+machines sharing the directory '../Org', and corrects the links after both
+have finished.
+
+python -m obs2org ./Markdown -o ../notes.tar.gz
+
+Converts all markdown files in the directory './Markdown' and its
+subdirectories and writes the Org-Mode files into the archive
+'../notes.tar.gz', without creating them in a directory.
+
+python -m obs2org ./Markdown -o ../Org/ --changed-since HEAD~1
+
+Converts only the markdown files in './Markdown' that have changed since
+the git revision 'HEAD~1' and the files linking to them.
+
+python -m obs2org ./Markdown -o ../Org/ --git v1.0
+
+Converts the markdown files in the directory './Markdown' as they are in
+the git revision 'v1.0', without checking it out. Instead of a directory,
+a tar or zip archive like 'vault.tar.gz' can be converted too, without
+extracting it.
+
+git diff -z --name-only HEAD~1 -- '*.md' | python -m obs2org --files-from - -o ../Org/
+
+Converts the markdown files git lists as changed, the paths are read from
+stdin. The Org-Mode files are placed relative to the current working
+directory, the root of the vault, which can be changed using '--root'.
+
+python -m obs2org ./Markdown -o ../Org/ --transclude-depth 2
+
+Expands the embedded notes and sections, like '![[Note#Heading]]', in the
+Org-Mode files. Embeds in embedded sections are expanded too, embeds in these
+stay links.
+
+python -m obs2org ./Markdown -o ../Org/ --predict-ids
+
+Corrects the links of every file as soon as it has been converted, the ids
+of the headings of the files it links to are computed from their markdown
+files if they haven't been converted yet.
+
+python -m obs2org ./Markdown -o ../Org/ --ast
+
+Corrects the links, tags and dates in Pandoc's JSON AST of the markdown
+files, links and dates in code blocks aren't changed.
+
+python -m obs2org ./Markdown -o ../Org/ --lua-filter
+
+Corrects the links, tags and dates while Pandoc converts the markdown
+files, using a Lua filter, Pandoc's output isn't corrected afterwards.
+
 See website https://github.com/Release-Candidate/Obs2Org for details."""
 
 
 ################################################################################
-async def main() -> None:
-    """The program's main entry point."""
-    cmd_line_args, cmd_line_parser = _parse_command_line()
+def main(argv: Optional[list[str]] = None) -> None:
+    """The program's main entry point.
+
+    Parameters
+    ----------
+    argv : Optional[list[str]], optional
+        The command line arguments without the program name, by default
+        `sys.argv[1:]`.
+    """
+    if argv is None:
+        import sys  # pylint: disable=import-outside-toplevel
+
+        argv = sys.argv[1:]
+
+    if argv[:1] == ["serve"]:
+        from obs2org.daemon import serve  # pylint: disable=import-outside-toplevel
+
+        serve(argv=argv[1:])
+        return
+
+    if argv[:1] == ["merge"]:
+        from obs2org.shard import merge_main  # pylint: disable=import-outside-toplevel
+
+        merge_main(argv=argv[1:])
+        return
 
-    await _convert_files(cmd_line_args=cmd_line_args, cmd_line_parser=cmd_line_parser)
+    cmd_line_args, cmd_line_parser = _parse_command_line(argv=argv)
+
+    _convert_files(cmd_line_args=cmd_line_args, cmd_line_parser=cmd_line_parser)
 
 
 ###############################################################################
-def _parse_command_line() -> tuple[argparse.Namespace, argparse.ArgumentParser]:
+def _parse_command_line(
+    argv: list[str],
+) -> tuple[argparse.Namespace, argparse.ArgumentParser]:
     """Parses the command line arguments of the program.
 
     Returns a tuple containing a `Namespace` object holding all
     parsed command line arguments and the command line parser object, an
     `argparse.ArgumentParser`.
 
+    Parameters
+    ----------
+    argv : list[str]
+        The command line arguments to parse, without the program name.
+
     Returns
     -------
     tuple[argparse.Namespace, argparse.ArgumentParser]
@@ -168,14 +267,279 @@ If MARKDOWN_FILES is a single file this is used as the
 filename of the converted file.
 If MARKDOWN_FILES are more than one file or a directory,
 this is used as the pathname of the directory to save the
-converted files to.""",
+converted files to.
+If OUT_PATH ends with '.tar', '.tar.gz', '.tgz',
+'.tar.zst', '.tzst' or '.zip', the converted files are
+written into this archive instead of a directory. Writing
+'.tar.zst' needs the Python package 'zstandard'.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--durable",
+        action="store_true",
+        dest="durable",
+        default=False,
+        help="""If this flag is set, the generated Org-Mode files and
+their directories are synced to disk before the program
+exits. Files whose content doesn't change are never
+written to, regardless of this flag.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "-a",
+        "--attachments",
+        action="store_true",
+        dest="attachments",
+        default=False,
+        help="""If this flag is set, the files the notes link to, like
+'[[image.png]]', are placed into OUT_PATH next to the
+Org-Mode files linking to them. Hard links are used if
+possible, attachments that are already there aren't
+copied again.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--timeout",
+        metavar="SECONDS",
+        type=float,
+        dest="timeout",
+        default=None,
+        help="""Stop Pandoc if converting a single file takes longer than
+SECONDS seconds.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--memory-limit",
+        metavar="MB",
+        type=int,
+        dest="memory_limit",
+        default=None,
+        help="""Stop Pandoc if converting a single file needs more than
+MB megabytes of memory.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--cpu-limit",
+        metavar="SECONDS",
+        type=int,
+        dest="cpu_limit",
+        default=None,
+        help="""Stop Pandoc if converting a single file needs more than
+SECONDS seconds of CPU time. Doesn't work on Windows.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--quarantine",
+        choices=["last", "skip"],
+        dest="quarantine",
+        default="last",
+        help="""What to do with files that have exceeded one of the limits
+above twice in an earlier run and haven't changed since.
+'last' converts them after all other files, 'skip'
+doesn't convert them. Default: 'last'. The list of these
+files is saved in the directory '.obs2org' in OUT_PATH.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--front-matter",
+        action="store_true",
+        dest="front_matter",
+        default=False,
+        help="""Add the keys of the YAML front matter of the markdown
+files that Pandoc ignores as Org-Mode keywords, 'tags'
+as '#+filetags:'.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--resume",
+        action="store_true",
+        dest="resume",
+        default=False,
+        help="""Continue an interrupted run: skip the files the last runs
+have converted and corrected, if neither the markdown file
+nor the Org-Mode file changed since. The finished files are
+saved in the directory '.obs2org' in OUT_PATH.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--plan",
+        action="store_true",
+        dest="plan",
+        default=False,
+        help="""Don't convert the files, print the number and size of the
+files to convert, how many of them changed since the last
+run and the estimated duration of the conversion, based
+on the earlier runs.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--shard",
+        metavar="i/N",
+        type=_shard_arg,
+        dest="shard",
+        default=None,
+        help="""Convert only the i-th of N parts of the markdown files,
+using Pandoc, and save their headings in the directory
+'.obs2org' in OUT_PATH. The links are not corrected,
+run 'python -m obs2org merge OUT_PATH' after all N shards
+have finished to do that.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--git",
+        metavar="REVISION",
+        type=str,
+        dest="git_revision",
+        default=None,
+        help="""Read the markdown files from the revision REVISION, like
+'HEAD~2', a branch or a tag, of the git repository
+containing MARKDOWN_FILES instead of the work tree,
+without checking it out.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--changed-since",
+        metavar="REVISION",
+        type=str,
+        dest="changed_since",
+        default=None,
+        help="""Convert only the markdown files that git reports as added,
+modified or renamed since the revision REVISION and the
+files linking to them, and delete the Org-Mode files of
+deleted markdown files. The links between the files are
+saved in the directory '.obs2org' in OUT_PATH by every
+run, all files are converted if there are no saved
+links yet.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--max-pending",
+        metavar="N",
+        type=int,
+        dest="max_pending",
+        default=None,
+        help="""Start converting the markdown files while the directories
+are still searched, holding at most N found files that
+haven't been converted or corrected yet. The files are
+converted in the order they are found instead of the
+biggest files first.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--files-from",
+        metavar="FILE",
+        dest="files_from",
+        default=None,
+        help="""Convert the markdown files listed in FILE, or read from
+stdin if FILE is '-', instead of MARKDOWN_FILES. The
+paths are separated by NUL characters, like the output
+of 'find -print0', or newlines. The files are converted
+while the list is read, at most '--max-pending' files
+wait to be converted. The Org-Mode files are placed
+relative to the directory given by '--root'.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--root",
+        metavar="DIR",
+        dest="root",
+        default=None,
+        help="""The root directory of the vault the files of '--files-from'
+are in. The Org-Mode file of every markdown file has the
+same path relative to OUT_PATH as the markdown file
+relative to DIR. Files outside of DIR are skipped.
+Default: the current working directory.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--bibliography",
+        metavar="FILE",
+        action="append",
+        dest="bibliography",
+        default=None,
+        help="""Look up the keys of the citations '[[cite:@Key]]' in the
+BibTeX '.bib' or CSL-JSON '.json' file FILE and report the
+keys that are not in it at the end. Can be given more than
+once. The keys are cached in the directory '.obs2org' in
+OUT_PATH, FILE is only read again if it has changed.""",
     )
 
-    return cmd_line_parser.parse_args(), cmd_line_parser
+    cmd_line_parser.add_argument(
+        "--predict-ids",
+        action="store_true",
+        dest="predict_ids",
+        default=False,
+        help="""Don't wait for the files a file links to before correcting
+it, compute the ids Pandoc gives the headings of the
+files that haven't been converted yet from their
+markdown files. Headings in lists and other unusual
+markdown can get other ids than Pandoc gives them.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--ast",
+        action="store_true",
+        dest="ast",
+        default=False,
+        help="""Correct the links, tags, dates and citations in Pandoc's
+JSON AST instead of the generated Org-Mode text, so
+links and dates in code blocks and inline code are never
+changed. Runs Pandoc twice for every file.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--lua-filter",
+        action="store_true",
+        dest="lua_filter",
+        default=False,
+        help="""Correct the links, tags and dates using a Lua filter while
+Pandoc converts the files, instead of correcting the
+generated Org-Mode text. The ids of the headings of the
+files that haven't been converted yet are computed from
+their markdown files, like '--predict-ids'. Needs Pandoc
+3.1.1 or newer, the files are corrected after converting
+them if Pandoc doesn't support the filter.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--transclude-depth",
+        metavar="N",
+        type=int,
+        dest="transclude_depth",
+        default=None,
+        help="""Expand the embedded notes and sections, like '![[Note]]'
+and '![[Note#Heading]]', after converting the files,
+instead of linking to them. Embeds inside of embedded
+sections are expanded up to a depth of N, embeds that are
+nested deeper or are part of a cycle stay links.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--daemon",
+        action="store_true",
+        dest="daemon",
+        default=False,
+        help="""Forward the arguments to a running Obs2Org server started
+with 'python -m obs2org serve', if there is one. The
+conversion uses the environment of the server.""",
+    )
+
+    cmd_line_parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        dest="no_daemon",
+        default=False,
+        help="""Don't forward the arguments to a running Obs2Org server
+started with 'python -m obs2org serve', even if the
+environment variable 'OBS2ORG_SOCKET' is set, convert the
+files in this process.""",
+    )
+
+    return cmd_line_parser.parse_args(argv), cmd_line_parser
 
 
 ###############################################################################
-async def _convert_files(
+def _convert_files(
     cmd_line_args: argparse.Namespace, cmd_line_parser: argparse.ArgumentParser
 ) -> None:
     """Convert the markdown files to Org-Mode files.
@@ -190,246 +554,1501 @@ async def _convert_files(
     cmd_line_parser : argparse.ArgumentParser
         The command line parser object to use.
     """
-    pandoc_path: str = _check_pandoc(
+    _check_file_list(cmd_line_args=cmd_line_args, cmd_line_parser=cmd_line_parser)
+    if cmd_line_args.plan:
+        _print_plan(cmd_line_args=cmd_line_args, cmd_line_parser=cmd_line_parser)
+        return
+
+    if cmd_line_args.lua_filter and cmd_line_args.ast:
+        cmd_line_parser.error("'--lua-filter' can't be used with '--ast'")
+    pandoc_info = _check_pandoc(
         cmd_line_args=cmd_line_args, cmd_line_parser=cmd_line_parser
     )
+    if cmd_line_args.lua_filter:
+        from obs2org.lua_filter import (  # pylint: disable=import-outside-toplevel
+            filter_supported,
+        )
 
-    if isinstance(cmd_line_args.files, list):
-        path_list: list[str] = cmd_line_args.files
-    else:
-        path_list = [cmd_line_args.files]
+        if not filter_supported(pandoc=pandoc_info):
+            print(
+                f"Pandoc {'.'.join(map(str, pandoc_info.version))} doesn't support"
+                " the Lua filter, correcting the files after converting them\n",
+                flush=True,
+            )
+            cmd_line_args.lua_filter = False
 
-    out_path = _check_out_path(
-        cmd_line_args=cmd_line_args,
-        cmd_line_parser=cmd_line_parser,
-        path_list=path_list,
+    from obs2org.heading_index import (  # pylint: disable=import-outside-toplevel
+        reset_run_headings,
     )
 
-    list_of_files: list[FilePaths] = []
-
-    for arg_path in path_list:
-        paths = _check_in_path(
+    source = _open_source(cmd_line_args=cmd_line_args, cmd_line_parser=cmd_line_parser)
+    reset_run_headings()
+    try:
+        _convert_all(
+            pandoc_info=pandoc_info,
+            cmd_line_args=cmd_line_args,
             cmd_line_parser=cmd_line_parser,
-            out_path=out_path,
-            arg_path=arg_path,
+            source=source,
         )
-        list_of_files.extend(paths)
-
-    await _do_convert_files(
-        pandoc_path=pandoc_path,
-        list_of_files=list_of_files,
-        add_uuid=cmd_line_args.generate_uuid,
-        remove_citations=cmd_line_args.remove_citations,
-    )
+    finally:
+        reset_run_headings()
+        if source is not None:
+            source.close()
 
 
-################################################################################
-def _check_pandoc(
+###############################################################################
+def _convert_all(
+    pandoc_info: PandocInfo,
     cmd_line_args: argparse.Namespace,
     cmd_line_parser: argparse.ArgumentParser,
-) -> str:
-    """Check if the given command to call Pandoc works.
-
-    If the command does not work, the program is exited with an error message.
+    source: Optional[VaultSource],
+) -> None:
+    """Convert the markdown files read from the file system or `source` to
+    Org-Mode files.
 
     Parameters
     ----------
+    pandoc_info : PandocInfo
+        The pandoc executable and it's capabilities.
     cmd_line_args : argparse.Namespace
-        The object holding all command line arguments, the pandoc command too.
+        The command line arguments of the program.
     cmd_line_parser : argparse.ArgumentParser
         The command line parser object to use.
-
-    Returns
-    -------
-    str
-        The command to call the Pandoc executable on success.
+    source : Optional[VaultSource]
+        The source to read the markdown files from, `None` for the file system.
     """
-    pandoc = cmd_line_args.pandoc_exe
+    from obs2org.archive import (  # pylint: disable=import-outside-toplevel
+        archive_suffix,
+    )
+
+    to_archive = archive_suffix(cmd_line_args.out_path) is not None
+    if to_archive and cmd_line_args.files_from is not None:
+        cmd_line_parser.error("'--files-from' can't be used with an archive")
+    if cmd_line_args.transclude_depth is not None:
+        if cmd_line_args.transclude_depth < 1:
+            cmd_line_parser.error(
+                f"the argument of '--transclude-depth' must be at least 1, not"
+                f" {cmd_line_args.transclude_depth}"
+            )
+        if to_archive:
+            cmd_line_parser.error("'--transclude-depth' can't be used with an archive")
+    streaming = (
+        cmd_line_args.max_pending is not None or cmd_line_args.files_from is not None
+    ) and not to_archive
+    if streaming:
+        _check_streaming(
+            cmd_line_args=cmd_line_args,
+            cmd_line_parser=cmd_line_parser,
+            source=source,
+        )
+    path_list, out_path, files = _collect_files(
+        cmd_line_args=cmd_line_args,
+        cmd_line_parser=cmd_line_parser,
+        create_dirs=not to_archive,
+        source=source,
+        walk=not streaming,
+    )
 
-    pandoc_version_arg = "--version"
+    if to_archive:
+        _convert_to_archive(
+            pandoc_info=pandoc_info,
+            files=files,
+            out_path=out_path,
+            cmd_line_args=cmd_line_args,
+            cmd_line_parser=cmd_line_parser,
+            source=source,
+        )
+        return
 
-    pandoc_out = subprocess.run(
-        args=" ".join([pandoc, pandoc_version_arg]),
-        check=False,
-        shell=True,
-        text=True,
-        capture_output=True,
+    from obs2org.output import (  # pylint: disable=import-outside-toplevel
+        OutputCommitter,
     )
 
-    if pandoc_out.returncode != 0 and pandoc_out.stderr != "":
-        cmd_line_parser.error(
-            f"Pandoc executable '{pandoc}' not found or does not work!\n"
-            f"Error message: '{pandoc_out.stderr.strip()}'\n"
-            f"Look at https://pandoc.org/installing.html for information on how to install\n"
-            f"pandoc"
+    committer = OutputCommitter(durable=cmd_line_args.durable)
+
+    if source is not None:
+        for option, name in (
+            (cmd_line_args.attachments, "--attachments"),
+            (cmd_line_args.resume, "--resume"),
+        ):
+            if option:
+                cmd_line_parser.error(
+                    f"'{name}' can't be used with an archive or '--git' as input"
+                )
+
+    attachments = None
+    if cmd_line_args.attachments:
+        if cmd_line_args.shard is not None:
+            cmd_line_parser.error("'--attachments' can't be used with '--shard'")
+        from obs2org.attachments import (  # pylint: disable=import-outside-toplevel
+            AttachmentCollector,
         )
 
-    return pandoc
+        attachments = AttachmentCollector(
+            out_root=Path(_out_directory(out_path=out_path)),
+            search_dirs=[
+                Path(arg_path if path.isdir(arg_path) else path.dirname(arg_path))
+                for arg_path in path_list
+            ],
+        )
 
+    from obs2org.limits import (  # pylint: disable=import-outside-toplevel
+        PandocLimits,
+        Quarantine,
+    )
 
-################################################################################
-def _check_in_path(
-    cmd_line_parser: argparse.ArgumentParser,
-    out_path: str,
-    arg_path: str,
-) -> list[FilePaths]:
-    """Check, if the given path contains Markdown files and return the path to
-    them and the Org-Mode file to generate.
-    Return the empty list else.
+    limits = PandocLimits(
+        timeout=cmd_line_args.timeout,
+        memory_mb=cmd_line_args.memory_limit,
+        cpu_seconds=cmd_line_args.cpu_limit,
+    )
 
-    Parameters
-    ----------
-    cmd_line_parser : argparse.ArgumentParser
-        The command line parser object to use.
-    out_path : str
-        The path to write the generated Org-Mode files to.
-    arg_path : str
-        The path to check for Markdown files.
+    if cmd_line_args.shard is not None:
+        if cmd_line_args.bibliography is not None:
+            cmd_line_parser.error("'--bibliography' can't be used with '--shard'")
+        if cmd_line_args.changed_since is not None:
+            cmd_line_parser.error("'--changed-since' can't be used with '--shard'")
+        if streaming:
+            cmd_line_parser.error(
+                f"'{_streaming_option(cmd_line_args)}' can't be used with '--shard'"
+            )
+        if cmd_line_args.predict_ids:
+            cmd_line_parser.error("'--predict-ids' can't be used with '--shard'")
+        if cmd_line_args.ast:
+            cmd_line_parser.error("'--ast' can't be used with '--shard'")
+        if cmd_line_args.lua_filter:
+            cmd_line_parser.error("'--lua-filter' can't be used with '--shard'")
+        if cmd_line_args.transclude_depth is not None:
+            cmd_line_parser.error("'--transclude-depth' can't be used with '--shard'")
+        _convert_shard(
+            pandoc_info=pandoc_info,
+            files=files,
+            out_path=out_path,
+            cmd_line_args=cmd_line_args,
+            cmd_line_parser=cmd_line_parser,
+            committer=committer,
+            limits=limits,
+            source=source,
+        )
+        return
+
+    # The quarantine uses the size and modification time of the Markdown
+    # files in the file system.
+    quarantine = None
+    if source is None:
+        quarantine = Quarantine(out_path=_out_directory(out_path=out_path))
+
+    # Only a conversion to an output directory saves it's state in the
+    # directory `.obs2org`, a single Org-Mode file doesn't need it, except for
+    # the options reading the state of this run later.
+    save_state = (
+        path.isdir(out_path)
+        or cmd_line_args.resume
+        or cmd_line_args.changed_since is not None
+    )
 
-    Returns
-    -------
-    list[FilePaths]
-        The `FilePaths` of the Markdown file to convert and the Org-Mode file
-        to generate.
-    """
-    ret_list: list[FilePaths] = []
+    from obs2org.link_map import LinkMap  # pylint: disable=import-outside-toplevel
 
-    if path.isdir(arg_path):
-        dir_path_list = _walk_directory(out_path=out_path, arg_path=arg_path)
-        ret_list.extend(dir_path_list)
+    links = LinkMap(out_path=_out_directory(out_path=out_path))
+    bibliography = _read_bibliography(
+        cmd_line_args=cmd_line_args,
+        cmd_line_parser=cmd_line_parser,
+        out_path=Path(_out_directory(out_path=out_path)),
+    )
+    if cmd_line_args.changed_since is not None:
+        _select_changed(
+            files=files,
+            path_list=path_list,
+            out_path=out_path,
+            links=links,
+            cmd_line_args=cmd_line_args,
+            cmd_line_parser=cmd_line_parser,
+        )
 
-    elif path.isfile(arg_path):
-        file_obj = Path(arg_path)
-        out_file = path.join(out_path, file_obj.with_suffix(".org").name)
-        ret_list.append(FilePaths(in_file=file_obj, out_file=Path(out_file)))
+    from obs2org.journal import (  # pylint: disable=import-outside-toplevel
+        STAGE_CORRECTED,
+        Journal,
+    )
 
+    journal = Journal(
+        out_path=_out_directory(out_path=out_path),
+        resume=cmd_line_args.resume,
+        save=save_state,
+    )
+    stream = None
+    if streaming:
+        stream = _file_stream(
+            path_list=path_list,
+            out_path=out_path,
+            files=files,
+            cmd_line_args=cmd_line_args,
+            quarantine=quarantine,
+            journal=journal,
+        )
     else:
-        cmd_line_parser.error(f"no markdown file(s) found at path '{arg_path}'.")
-
-    return ret_list
+        if cmd_line_args.resume:
+            _skip_completed(files=files, journal=journal)
 
+        _order_files(
+            files=files,
+            quarantine=quarantine,
+            skip=cmd_line_args.quarantine == "skip",
+        )
 
-################################################################################
-def _walk_directory(out_path: str, arg_path: str) -> list[FilePaths]:
-    """Walk through the directory `arg_path` and add all Markdown files to the
-    list of files to convert.
+    import time  # pylint: disable=import-outside-toplevel
+
+    start_time = time.perf_counter()
+    finished = False
+    try:
+        if stream is None and len(files) == 1:
+            index = next(files.indices())
+            if _convert_single(
+                pandoc_info=pandoc_info,
+                file_paths=files.file_paths(index),
+                add_uuid=cmd_line_args.generate_uuid,
+                remove_citations=cmd_line_args.remove_citations,
+                committer=committer,
+                attachments=attachments,
+                limits=limits,
+                quarantine=quarantine,
+                front_matter=cmd_line_args.front_matter,
+                source=source,
+                links=links,
+                bibliography=bibliography,
+                ast=cmd_line_args.ast,
+                lua_filter=cmd_line_args.lua_filter,
+            ):
+                journal.record(
+                    out_file=files.file_paths(index).out_file,
+                    stage=STAGE_CORRECTED,
+                    size=files.size(index),
+                    mtime_ns=files.mtime_ns(index),
+                )
+        elif stream is not None or len(files) > 1:
+            import asyncio  # pylint: disable=import-outside-toplevel
 
-    Parameters
-    ----------
-    out_path : str
-        The path to write the generated Org-Mode files to.
-    arg_path : str
-        The directory to search for Markdown files.
+            from obs2org.scheduler import (  # pylint: disable=import-outside-toplevel
+                convert_files,
+            )
 
-    Returns
-    -------
-    list[FilePaths]
-        A list of found Markdown files and the paths to the Org-Mode file to
-        generate.
-    """
-    ret_list: list[FilePaths] = []
-    for dirpath, _, filenames in walk(top=arg_path, topdown=True, followlinks=True):
-        rel_dirpath = path.relpath(dirpath, arg_path)
-        out_dir = path.join(out_path, rel_dirpath)
-        Path(out_dir).mkdir(exist_ok=True, parents=True)
-        for file in filenames:
-            file_object = PurePath(file)
-            if file_object.suffix == ".md":
-                in_file = path.join(dirpath, file)
-                out_file = path.join(out_dir, file_object.with_suffix(".org"))
-                ret_list.append(
-                    FilePaths(in_file=Path(in_file), out_file=Path(out_file))
+            asyncio.run(
+                convert_files(
+                    pandoc_info=pandoc_info,
+                    files=files,
+                    add_uuid=cmd_line_args.generate_uuid,
+                    remove_citations=cmd_line_args.remove_citations,
+                    committer=committer,
+                    attachments=attachments,
+                    limits=limits,
+                    quarantine=quarantine,
+                    front_matter=cmd_line_args.front_matter,
+                    journal=journal,
+                    source=source,
+                    links=links,
+                    stream=stream,
+                    bibliography=bibliography,
+                    predict_ids=cmd_line_args.predict_ids,
+                    ast=cmd_line_args.ast,
+                    lua_filter=cmd_line_args.lua_filter,
+                )
+            )
+        finished = True
+    finally:
+        journal.close()
+        # Only a run of whole directories or archives has the links of all
+        # files of the vault.
+        if save_state:
+            links.save(
+                complete=finished
+                and cmd_line_args.files_from is None
+                and all(
+                    path.isdir(arg_path) or archive_suffix(arg_path) is not None
+                    for arg_path in path_list
                 )
+            )
+        if quarantine is not None:
+            quarantine.save()
+
+    if cmd_line_args.transclude_depth is not None and len(files) > 0:
+        from obs2org.transclusion import (  # pylint: disable=import-outside-toplevel
+            expand_files,
+        )
+
+        num_expanded = expand_files(
+            out_files=(files.file_paths(index).out_file for index in files.indices()),
+            depth=cmd_line_args.transclude_depth,
+            committer=committer,
+        )
+        committer.flush()
+        print(f"Expanded the embeds of {num_expanded} files")
+
+    if save_state and len(files) > 0:
+        from obs2org.plan import record_run  # pylint: disable=import-outside-toplevel
+
+        record_run(
+            files=files,
+            out_path=_out_directory(out_path=out_path),
+            seconds=time.perf_counter() - start_time,
+        )
 
-    return ret_list
+    if bibliography is not None:
+        bibliography.report()
+
+    if attachments is not None:
+        stats = attachments.stats()
+        print(
+            f"Attachments: {stats.linked} linked, {stats.cloned} cloned,"
+            f" {stats.copied} copied, {stats.unchanged} unchanged,"
+            f" {stats.missing} not found"
+        )
 
 
 ################################################################################
-def _check_out_path(
+def _collect_files(
     cmd_line_args: argparse.Namespace,
     cmd_line_parser: argparse.ArgumentParser,
-    path_list: list[str],
-) -> str:
-    """Validate the path to write the Org-Mode file(s) to and return the checked
-    path.
-    If the path is wrong, e.g. a path to a file for more than one Markdown file
-    to convert, the program exits with an error message.
+    create_dirs: bool = True,
+    source: Optional[VaultSource] = None,
+    walk: bool = True,
+) -> tuple[list[str], str, FileTable]:
+    """Check the input and output paths and collect the Markdown files to
+    convert.
 
     Parameters
     ----------
     cmd_line_args : argparse.Namespace
-        The object holding the command line arguments.
+        The command line arguments of the program.
     cmd_line_parser : argparse.ArgumentParser
-        The command line parser object.
-    path_list : list[str]
-        The list of paths to Markdown files to convert.
+        The command line parser object to use.
+    create_dirs : bool, optional
+        Whether to create the output directories, by default `True`.
+    source : Optional[VaultSource], optional
+        The source to read the Markdown files from, by default `None`, the
+        file system.
+    walk : bool, optional
+        Whether to add the Markdown files to the table, by default `True`. If
+        this is `False`, only the input paths are checked and the table is
+        empty, see `_file_stream`.
 
     Returns
     -------
-    str
-        The checked path to the Org-Mode file(s) on success, exits the program
-        on errors.
+    tuple[list[str], str, FileTable]
+        The input paths given on the command line, the checked output path and
+        the table of files to convert.
     """
-    out_path: str = cmd_line_args.out_path
+    from obs2org.file_table import FileTable  # pylint: disable=import-outside-toplevel
 
-    if path.basename(out_path) == "" or path.isdir(out_path):
-        print(f"Output to directory {out_path}")
-        Path(out_path).mkdir(exist_ok=True, parents=True)
+    if cmd_line_args.files_from is not None:
+        path_list: list[str] = [cmd_line_args.root or "."]
+    elif isinstance(cmd_line_args.files, list):
+        path_list = cmd_line_args.files
     else:
-        print(f"Output to file {out_path} {len(path_list)}")
-        if len(path_list) >= 1:
-            cmd_line_parser.error(
-                f"more than one markdown file to convert given,"
-                f" but just one output file '{out_path}'!"
+        path_list = [cmd_line_args.files]
+
+    out_path = _check_out_path(
+        cmd_line_args=cmd_line_args,
+        cmd_line_parser=cmd_line_parser,
+        path_list=path_list,
+    )
+
+    files = FileTable()
+
+    for arg_path in path_list:
+        if not walk:
+            if not path.isdir(arg_path) and not path.isfile(arg_path):
+                cmd_line_parser.error(
+                    f"no markdown file(s) found at path '{arg_path}'."
+                )
+            continue
+        _check_in_path(
+            cmd_line_parser=cmd_line_parser,
+            out_path=out_path,
+            arg_path=arg_path,
+            files=files,
+            create_dirs=create_dirs,
+            source=source,
+        )
+
+    return path_list, out_path, files
+
+
+################################################################################
+def _print_plan(
+    cmd_line_args: argparse.Namespace, cmd_line_parser: argparse.ArgumentParser
+) -> None:
+    """Print the work converting the files would do, without converting them.
+
+    Parameters
+    ----------
+    cmd_line_args : argparse.Namespace
+        The command line arguments of the program.
+    cmd_line_parser : argparse.ArgumentParser
+        The command line parser object to use.
+    """
+    # pylint: disable=import-outside-toplevel
+    from obs2org.limits import Quarantine
+    from obs2org.plan import make_plan, print_plan
+
+    source = _open_source(cmd_line_args=cmd_line_args, cmd_line_parser=cmd_line_parser)
+    try:
+        _, out_path, files = _collect_files(
+            cmd_line_args=cmd_line_args,
+            cmd_line_parser=cmd_line_parser,
+            create_dirs=False,
+            source=source,
+        )
+    finally:
+        if source is not None:
+            source.close()
+    out_dir = _out_directory(out_path=out_path)
+    if cmd_line_args.quarantine == "skip":
+        _order_files(
+            files=files,
+            quarantine=Quarantine(out_path=out_dir),
+            skip=True,
+        )
+
+    print_plan(plan=make_plan(files=files, out_path=out_dir), out_path=out_dir)
+
+
+################################################################################
+def _convert_shard(
+    pandoc_info: PandocInfo,
+    files: FileTable,
+    out_path: str,
+    cmd_line_args: argparse.Namespace,
+    cmd_line_parser: argparse.ArgumentParser,
+    committer: OutputCommitter,
+    limits: PandocLimits,
+    source: Optional[VaultSource] = None,
+) -> None:
+    """Convert the files of the shard given by `--shard` using Pandoc and
+    write the shard's partial index of headings.
+
+    The files that exceed the limits are not added to the quarantine, as more
+    than one shard would write the quarantine file at the same time.
+
+    Parameters
+    ----------
+    pandoc_info : PandocInfo
+        The pandoc executable and it's capabilities.
+    files : FileTable
+        All files to convert, of all shards.
+    out_path : str
+        The output directory.
+    cmd_line_args : argparse.Namespace
+        The command line arguments of the program.
+    cmd_line_parser : argparse.ArgumentParser
+        The command line parser object to use.
+    committer : OutputCommitter
+        The object to write the generated Org-Mode files with.
+    limits : PandocLimits
+        The limits of every Pandoc process.
+    source : Optional[VaultSource], optional
+        The source to read the Markdown files from, by default `None`, the
+        file system.
+    """
+    # pylint: disable=import-outside-toplevel
+    import asyncio
+
+    from obs2org.scheduler import convert_files
+    from obs2org.shard import in_shard, write_shard_index
+    from obs2org.state import relative_out_path
+
+    if not path.isdir(out_path):
+        cmd_line_parser.error("'--shard' needs an output directory")
+
+    num_files = len(files)
+    files.set_order(
+        index
+        for index in files.indices()
+        if in_shard(
+            rel_path=relative_out_path(
+                out_file=files.out_file(index), out_path=out_path
+            ),
+            shard=cmd_line_args.shard,
+        )
+    )
+
+    asyncio.run(
+        convert_files(
+            pandoc_info=pandoc_info,
+            files=files,
+            add_uuid=cmd_line_args.generate_uuid,
+            remove_citations=cmd_line_args.remove_citations,
+            committer=committer,
+            correct=False,
+            limits=limits,
+            source=source,
+        )
+    )
+
+    try:
+        index_file = write_shard_index(
+            out_path=out_path,
+            shard=cmd_line_args.shard,
+            out_files=(file_paths.out_file for file_paths in files),
+        )
+    except OSError as excp:
+        cmd_line_parser.error(f"can't write the index of the shard: {excp}")
+    print(
+        f"Converted {len(files)} of {num_files} files,"
+        f" index written to '{index_file}'"
+    )
+
+
+################################################################################
+def _convert_to_archive(
+    pandoc_info: PandocInfo,
+    files: FileTable,
+    out_path: str,
+    cmd_line_args: argparse.Namespace,
+    cmd_line_parser: argparse.ArgumentParser,
+    source: Optional[VaultSource] = None,
+) -> None:
+    """Convert and correct the files and write them into the archive
+    `out_path`, see `obs2org.archive`.
+
+    No output directory exists, so the quarantine, the journal and the
+    statistics of the run are not saved.
+
+    Parameters
+    ----------
+    pandoc_info : PandocInfo
+        The pandoc executable and it's capabilities.
+    files : FileTable
+        The files to convert, their Org-Mode files are in the virtual output
+        directory `out_path`.
+    out_path : str
+        The path to the archive to write.
+    cmd_line_args : argparse.Namespace
+        The command line arguments of the program.
+    cmd_line_parser : argparse.ArgumentParser
+        The command line parser object to use.
+    source : Optional[VaultSource], optional
+        The source to read the Markdown files from, by default `None`, the
+        file system.
+    """
+    # pylint: disable=import-outside-toplevel
+    from obs2org.archive import ArchiveCommitter, ArchiveError
+    from obs2org.limits import PandocLimits
+
+    for option, name in (
+        (cmd_line_args.attachments, "--attachments"),
+        (cmd_line_args.shard is not None, "--shard"),
+        (cmd_line_args.resume, "--resume"),
+        (cmd_line_args.durable, "--durable"),
+        (cmd_line_args.changed_since is not None, "--changed-since"),
+        (cmd_line_args.max_pending is not None, "--max-pending"),
+    ):
+        if option:
+            cmd_line_parser.error(f"'{name}' can't be used with an archive")
+
+    try:
+        committer = ArchiveCommitter(archive_path=Path(out_path))
+    except ArchiveError as excp:
+        cmd_line_parser.error(str(excp))
+
+    limits = PandocLimits(
+        timeout=cmd_line_args.timeout,
+        memory_mb=cmd_line_args.memory_limit,
+        cpu_seconds=cmd_line_args.cpu_limit,
+    )
+    bibliography = _read_bibliography(
+        cmd_line_args=cmd_line_args, cmd_line_parser=cmd_line_parser, out_path=None
+    )
+    files.set_order(files.biggest_first(files.indices()))
+
+    try:
+        if len(files) == 1:
+            _convert_single(
+                pandoc_info=pandoc_info,
+                file_paths=files.file_paths(next(files.indices())),
+                add_uuid=cmd_line_args.generate_uuid,
+                remove_citations=cmd_line_args.remove_citations,
+                committer=committer,
+                limits=limits,
+                front_matter=cmd_line_args.front_matter,
+                source=source,
+                bibliography=bibliography,
+                ast=cmd_line_args.ast,
+                lua_filter=cmd_line_args.lua_filter,
             )
+        elif len(files) > 1:
+            import asyncio
+
+            from obs2org.scheduler import convert_files
+
+            asyncio.run(
+                convert_files(
+                    pandoc_info=pandoc_info,
+                    files=files,
+                    add_uuid=cmd_line_args.generate_uuid,
+                    remove_citations=cmd_line_args.remove_citations,
+                    committer=committer,
+                    limits=limits,
+                    front_matter=cmd_line_args.front_matter,
+                    source=source,
+                    bibliography=bibliography,
+                    predict_ids=cmd_line_args.predict_ids,
+                    ast=cmd_line_args.ast,
+                    lua_filter=cmd_line_args.lua_filter,
+                )
+            )
+    except BaseException:
+        committer.discard()
+        raise
 
-    return out_path
+    try:
+        committer.close()
+    except OSError as excp:
+        cmd_line_parser.error(f"can't write the archive '{out_path}': {excp}")
+    print(f"Archive '{out_path}' written")
+    if bibliography is not None:
+        bibliography.report()
 
 
 ################################################################################
-async def _do_convert_files(
-    pandoc_path: str,
-    list_of_files: list[FilePaths],
-    remove_citations: bool,
-    add_uuid: bool,
+def _open_source(
+    cmd_line_args: argparse.Namespace, cmd_line_parser: argparse.ArgumentParser
+) -> Optional[VaultSource]:
+    """Return the source to read the Markdown files from, if they are not read
+    from the file system: the archive given as MARKDOWN_FILES or the git
+    revision given by `--git`.
+
+    Parameters
+    ----------
+    cmd_line_args : argparse.Namespace
+        The command line arguments of the program.
+    cmd_line_parser : argparse.ArgumentParser
+        The command line parser object to use.
+
+    Returns
+    -------
+    Optional[VaultSource]
+        The source, `None` if the files are read from the file system.
+    """
+    # pylint: disable=import-outside-toplevel
+    from obs2org.archive import archive_suffix
+
+    if isinstance(cmd_line_args.files, list):
+        path_list: list[str] = cmd_line_args.files
+    else:
+        path_list = [cmd_line_args.files]
+    archives = [
+        arg_path
+        for arg_path in path_list
+        if path.isfile(arg_path) and archive_suffix(arg_path) is not None
+    ]
+
+    if cmd_line_args.git_revision is not None:
+        if archives:
+            cmd_line_parser.error("'--git' can't be used with an archive as input")
+        from obs2org.sources import GitSource
+
+        return GitSource(revision=cmd_line_args.git_revision)
+
+    if not archives:
+        return None
+    if len(path_list) > 1:
+        cmd_line_parser.error(
+            f"the archive '{archives[0]}' must be the only markdown file to convert"
+        )
+
+    if cmd_line_args.changed_since is not None:
+        cmd_line_parser.error(
+            "'--changed-since' can't be used with an archive as input"
+        )
+    from obs2org.sources import ArchiveSource
+
+    return ArchiveSource(archive_path=Path(archives[0]))
+
+
+################################################################################
+def _check_streaming(
+    cmd_line_args: argparse.Namespace,
+    cmd_line_parser: argparse.ArgumentParser,
+    source: Optional[VaultSource],
+) -> None:
+    """Check the arguments of `--max-pending`, the program exits with an error
+    message if the options can't be used together.
+
+    Parameters
+    ----------
+    cmd_line_args : argparse.Namespace
+        The command line arguments of the program.
+    cmd_line_parser : argparse.ArgumentParser
+        The command line parser object to use.
+    source : Optional[VaultSource]
+        The source to read the markdown files from, `None` for the file system.
+    """
+    if cmd_line_args.max_pending is not None and cmd_line_args.max_pending < 1:
+        cmd_line_parser.error(
+            f"the argument of '--max-pending' must be at least 1, not"
+            f" {cmd_line_args.max_pending}"
+        )
+    option = _streaming_option(cmd_line_args)
+    if source is not None:
+        cmd_line_parser.error(
+            f"'{option}' can't be used with an archive or '--git' as input"
+        )
+    if cmd_line_args.changed_since is not None:
+        cmd_line_parser.error(f"'{option}' can't be used with '--changed-since'")
+
+
+################################################################################
+def _streaming_option(cmd_line_args: argparse.Namespace) -> str:
+    """Return the option converting the files while they are found, for error
+    messages.
+
+    Parameters
+    ----------
+    cmd_line_args : argparse.Namespace
+        The command line arguments of the program.
+
+    Returns
+    -------
+    str
+        `--files-from` or `--max-pending`.
+    """
+    return "--files-from" if cmd_line_args.files_from is not None else "--max-pending"
+
+
+################################################################################
+def _check_file_list(
+    cmd_line_args: argparse.Namespace, cmd_line_parser: argparse.ArgumentParser
+) -> None:
+    """Check the arguments of `--files-from` and `--root`, the program exits
+    with an error message if they are wrong.
+
+    Parameters
+    ----------
+    cmd_line_args : argparse.Namespace
+        The command line arguments of the program.
+    cmd_line_parser : argparse.ArgumentParser
+        The command line parser object to use.
+    """
+    files_from = cmd_line_args.files_from
+    if files_from is None:
+        if cmd_line_args.root is not None:
+            cmd_line_parser.error("'--root' can only be used with '--files-from'")
+        return
+
+    if isinstance(cmd_line_args.files, list):
+        cmd_line_parser.error(
+            "'--files-from' can't be used with markdown files or directories"
+            " given as arguments"
+        )
+    if cmd_line_args.plan:
+        cmd_line_parser.error("'--plan' can't be used with '--files-from'")
+    if files_from != "-" and not path.isfile(files_from):
+        cmd_line_parser.error(f"the list of files '{files_from}' doesn't exist")
+    if cmd_line_args.root is not None and not path.isdir(cmd_line_args.root):
+        cmd_line_parser.error(
+            f"the root directory '{cmd_line_args.root}' doesn't exist"
+        )
+
+
+################################################################################
+def _file_stream(
+    path_list: list[str],
+    out_path: str,
+    files: FileTable,
+    cmd_line_args: argparse.Namespace,
+    quarantine: Optional[Quarantine],
+    journal: Journal,
+) -> FileStream:
+    """Return the walk of the input paths to convert the files while
+    walking.
+
+    The files are converted in the order they are found, the files in the
+    quarantine after all other files or, if `--quarantine skip` is given, not
+    at all. With `--resume`, the files an earlier run has converted and
+    corrected are skipped, see `Journal.completed`.
+
+    Parameters
+    ----------
+    path_list : list[str]
+        The input paths given on the command line.
+    out_path : str
+        The output directory.
+    files : FileTable
+        The empty table to add the found files to.
+    cmd_line_args : argparse.Namespace
+        The command line arguments of the program.
+    quarantine : Optional[Quarantine]
+        The quarantine of files that exceeded the limits of Pandoc.
+    journal : Journal
+        The journal of the earlier runs.
+
+    Returns
+    -------
+    FileStream
+        The walk of the input paths.
+    """
+    # pylint: disable=import-outside-toplevel
+    from obs2org.walk import (
+        CONVERT,
+        CONVERT_LAST,
+        SKIP,
+        FileStream,
+        read_file_list,
+        walk_file_list,
+        walk_paths,
+    )
+
+    skip = cmd_line_args.quarantine == "skip"
+
+    def select(index: int) -> int:
+        """Return when to convert the file with index `index`."""
+        file_paths = files.file_paths(index)
+        if cmd_line_args.resume and journal.completed(
+            *file_paths, size=files.size(index), mtime_ns=files.mtime_ns(index)
+        ):
+            return SKIP
+        if (
+            quarantine is None
+            or len(quarantine) == 0
+            or not quarantine.contains(*file_paths)
+        ):
+            return CONVERT
+        if skip:
+            print(f"Skipping file '{file_paths.in_file}', it is in the quarantine")
+            return SKIP
+        return CONVERT_LAST
+
+    if cmd_line_args.files_from is not None:
+        directories = walk_file_list(
+            file_names=read_file_list(cmd_line_args.files_from),
+            root=path_list[0],
+            out_path=out_path,
+        )
+    else:
+        directories = walk_paths(path_list=path_list, out_path=out_path)
+
+    return FileStream(
+        directories=directories,
+        max_pending=cmd_line_args.max_pending or _FILES_FROM_MAX_PENDING,
+        select=select,
+    )
+
+
+################################################################################
+def _read_bibliography(
+    cmd_line_args: argparse.Namespace,
+    cmd_line_parser: argparse.ArgumentParser,
+    out_path: Optional[Path],
+) -> Optional[Bibliography]:
+    """Return the keys of the bibliographies given by `--bibliography`.
+
+    Parameters
+    ----------
+    cmd_line_args : argparse.Namespace
+        The command line arguments of the program.
+    cmd_line_parser : argparse.ArgumentParser
+        The command line parser object to use.
+    out_path : Optional[Path]
+        The output directory containing the cache of the keys, `None` to not
+        use a cache.
+
+    Returns
+    -------
+    Optional[Bibliography]
+        The keys of the bibliographies, `None` if no bibliography is given.
+    """
+    if cmd_line_args.bibliography is None:
+        return None
+
+    # pylint: disable=import-outside-toplevel
+    from obs2org.bibliography import Bibliography, BibliographyError
+
+    try:
+        bibliography = Bibliography(
+            bib_files=cmd_line_args.bibliography, out_path=out_path
+        )
+    except BibliographyError as excp:
+        cmd_line_parser.error(str(excp))
+    if bibliography.num_parsed > 0:
+        print(
+            f"Read {bibliography.num_parsed} of"
+            f" {len(cmd_line_args.bibliography)} bibliographies,"
+            f" {len(bibliography.keys)} keys"
+        )
+
+    return bibliography
+
+
+################################################################################
+def _shard_arg(text: str) -> object:
+    """Parse the argument of `--shard`, see `obs2org.shard.shard_arg`.
+
+    Parameters
+    ----------
+    text : str
+        The argument to parse.
+
+    Returns
+    -------
+    object
+        The parsed `Shard`.
+    """
+    from obs2org.shard import shard_arg  # pylint: disable=import-outside-toplevel
+
+    return shard_arg(text)
+
+
+################################################################################
+def _order_files(
+    files: FileTable, quarantine: Optional[Quarantine], skip: bool
+) -> None:
+    """Set the order to convert the files in: the biggest files first, so a
+    big file doesn't delay the end of the conversion, and the files in the
+    quarantine last. If `skip` is `True`, the files in the quarantine are
+    not converted at all.
+
+    Parameters
+    ----------
+    files : FileTable
+        The files to convert.
+    quarantine : Optional[Quarantine]
+        The quarantine of files that exceeded the limits of Pandoc, `None` if
+        no quarantine is used.
+    skip : bool
+        Whether to skip the files in the quarantine.
+    """
+    from array import array  # pylint: disable=import-outside-toplevel
+
+    normal = array("L")
+    quarantined = array("L")
+    for index in files.indices():
+        if (
+            quarantine is not None
+            and len(quarantine) > 0
+            and quarantine.contains(*files.file_paths(index))
+        ):
+            quarantined.append(index)
+        else:
+            normal.append(index)
+
+    order = files.biggest_first(normal)
+    if skip:
+        for index in quarantined:
+            print(
+                f"Skipping file '{files.file_paths(index).in_file}',"
+                " it is in the quarantine"
+            )
+    else:
+        order.extend(quarantined)
+    files.set_order(order)
+
+
+################################################################################
+def _select_changed(
+    files: FileTable,
+    path_list: list[str],
+    out_path: str,
+    links: LinkMap,
+    cmd_line_args: argparse.Namespace,
+    cmd_line_parser: argparse.ArgumentParser,
 ) -> None:
-    """Converts the files in the given list.
+    """Convert only the files that have changed since the revision given by
+    `--changed-since` and the files linking to changed, renamed or deleted
+    files, see `obs2org.changes.git_changes`. The Org-Mode files of deleted
+    Markdown files are deleted.
+
+    If no complete reverse-link map of an earlier run exists, all files are
+    converted, see `obs2org.link_map`.
+
+    Parameters
+    ----------
+    files : FileTable
+        The files to convert.
+    path_list : list[str]
+        The input paths given on the command line.
+    out_path : str
+        The output directory.
+    links : LinkMap
+        The reverse-link map of the earlier runs.
+    cmd_line_args : argparse.Namespace
+        The command line arguments of the program.
+    cmd_line_parser : argparse.ArgumentParser
+        The command line parser object to use.
+    """
+    # pylint: disable=import-outside-toplevel
+    from obs2org.changes import git_changes
+    from obs2org.sources import SourceError
+
+    revision = cmd_line_args.changed_since
+    changed: set[str] = set()
+    deleted: set[str] = set()
+    for arg_path in path_list:
+        try:
+            changes = git_changes(
+                arg_path=arg_path,
+                revision=revision,
+                to_revision=cmd_line_args.git_revision,
+            )
+        except SourceError as excp:
+            cmd_line_parser.error(str(excp))
+        changed.update(
+            _org_file(out_path=out_path, name=name) for name in changes.changed
+        )
+        deleted.update(
+            _org_file(out_path=out_path, name=name) for name in changes.deleted
+        )
+    deleted -= changed
+
+    for out_file in sorted(deleted):
+        links.remove(out_file=out_file)
+        try:
+            Path(out_file).unlink()
+            print(f"Deleted '{out_file}', the markdown file has been deleted")
+        except FileNotFoundError:
+            pass
+        except OSError as excp:
+            print(f"Error deleting file '{out_file}': {excp}")
+
+    if not links.complete:
+        print(
+            f"No links of an earlier run of all files saved in '{links.file_path}',"
+            " converting all files"
+        )
+        return
+
+    out_dir = _out_directory(out_path=out_path)
+    selected = changed | {
+        path.normpath(path.join(out_dir, linking))
+        for linking in links.linking_to(changed | deleted)
+    }
+    num_files = len(files)
+    files.set_order(
+        index for index in files.indices() if files.out_file(index) in selected
+    )
+    print(
+        f"Changed since '{revision}': {len(changed)} changed and {len(deleted)}"
+        f" deleted markdown files, converting {len(files)} of {num_files} files"
+    )
+
+
+################################################################################
+def _org_file(out_path: str, name: str) -> str:
+    """Return the normalized path of the Org-Mode file the Markdown file `name`
+    is converted to.
+
+    Parameters
+    ----------
+    out_path : str
+        The output directory.
+    name : str
+        The path of the Markdown file relative to the input directory, using
+        slashes.
+
+    Returns
+    -------
+    str
+        The normalized path of the Org-Mode file.
+    """
+    return path.normpath(
+        path.join(out_path, *path.splitext(name)[0].split("/")) + ".org"
+    )
+
+
+################################################################################
+def _skip_completed(files: FileTable, journal: Journal) -> None:
+    """Remove the files an earlier run has converted and corrected from the
+    files to convert, see `Journal.completed`.
+
+    Parameters
+    ----------
+    files : FileTable
+        The files to convert.
+    journal : Journal
+        The journal of the earlier runs.
+    """
+    num_files = len(files)
+    files.set_order(
+        index
+        for index in files.indices()
+        if not journal.completed(
+            *files.file_paths(index),
+            size=files.size(index),
+            mtime_ns=files.mtime_ns(index),
+        )
+    )
+    print(
+        f"Resuming: {num_files - len(files)} of {num_files} files are already"
+        f" converted, {journal.unfinished()} files have not been corrected and"
+        " are converted again"
+    )
+
+
+################################################################################
+def _out_directory(out_path: str) -> str:
+    """Return the output directory, the directory of the output file if
+    `out_path` isn't a directory.
+
+    Parameters
+    ----------
+    out_path : str
+        The checked output path, see `_check_out_path`.
+
+    Returns
+    -------
+    str
+        The output directory.
+    """
+    from obs2org.archive import (  # pylint: disable=import-outside-toplevel
+        archive_suffix,
+    )
+
+    if path.isdir(out_path) or archive_suffix(out_path) is not None:
+        return out_path
+
+    return path.dirname(out_path) or "."
 
-    First converts the files in `list_of_files` using pandoc and then fixes the
-    links to other Org-Mode files and tags and dates.
-    We have to do the conversion first, because links that need to be corrected
-    can point to files not generated yet and we must search the files the link
-    points to for the right section id.
+
+################################################################################
+def _convert_single(
+    pandoc_info: PandocInfo,
+    file_paths: FilePaths,
+    remove_citations: bool,
+    add_uuid: bool,
+    committer: OutputCommitter,
+    attachments: Optional[AttachmentCollector] = None,
+    limits: Optional[PandocLimits] = None,
+    quarantine: Optional[Quarantine] = None,
+    front_matter: bool = False,
+    source: Optional[VaultSource] = None,
+    links: Optional[LinkMap] = None,
+    bibliography: Optional[Bibliography] = None,
+    ast: bool = False,
+    lua_filter: bool = False,
+) -> bool:
+    """Convert and correct a single file, without using asyncio.
 
     Parameters
     ----------
-    pandoc_path : str
-        Path to the pandoc executable.
-    list_of_files : list[FilePaths]
-        List of `FilePaths` containing the path to the Markdown file to convert
-        and the Org-Mode file to generate.
+    pandoc_info : PandocInfo
+        The pandoc executable and it's capabilities.
+    file_paths : FilePaths
+        The path to the Markdown file to convert and the Org-Mode file to
+        generate.
     remove_citations : bool
         Whether to remove Pandoc-style citations to treat them as normal links,
         or not.
     add_uuid : bool
         Whether to add an UUID-header to each file.
+    committer : OutputCommitter
+        The object to write the generated Org-Mode file with.
+    attachments : Optional[AttachmentCollector], optional
+        The collector to place the attachments the file links to with, by
+        default `None`, which doesn't place the attachments.
+    limits : Optional[PandocLimits], optional
+        The limits of the Pandoc process, by default `None`, no limits.
+    quarantine : Optional[Quarantine], optional
+        The quarantine to add the file to if it exceeds the limits twice, by
+        default `None`.
+    front_matter : bool, optional
+        Whether to add the keys of the YAML front matter Pandoc ignores as
+        Org-Mode keywords, by default `False`.
+    source : Optional[VaultSource], optional
+        The source to read the Markdown file from, by default `None`, the
+        file system.
+    links : Optional[LinkMap], optional
+        The reverse-link map to save the links of the file in, by default
+        `None`.
+    bibliography : Optional[Bibliography], optional
+        The bibliography to look up the citations of the file in, by default
+        `None`.
+    ast : bool, optional
+        Whether to correct Pandoc's JSON AST instead of the Org-Mode text, by
+        default `False`.
+    lua_filter : bool, optional
+        Whether to correct the file using the Lua filter while converting it,
+        by default `False`.
+
+    Returns
+    -------
+    bool
+        `True` if the file has been converted and corrected, `False` on errors.
     """
-    convert_tasks: list[Coroutine[object, object, object]] = []
-    for convert_file in list_of_files:
-        convert_tasks.append(
-            asyncio.to_thread(
-                convert_single_file,
-                convert_file.in_file,
-                convert_file.out_file,
-                pandoc_path,
-            )
+    # pylint: disable=import-outside-toplevel
+    from obs2org.convert import convert_to_text, convert_with_filter, correct_org_mode
+    from obs2org.prescan import link_target_path, scan_markdown
+
+    data = None
+    if source is not None:
+        try:
+            data = source.read(file_paths.in_file)
+        except OSError as excp:
+            print(f"Error reading file '{file_paths.in_file}': {excp}\n", flush=True)
+            return False
+
+    record = None
+    if front_matter or links is not None:
+        # The content is passed to Pandoc, so the file is only read once.
+        try:
+            if data is None:
+                data = file_paths.in_file.read_bytes()
+            record = scan_markdown(data)
+        except OSError as excp:
+            print(f"Error reading file '{file_paths.in_file}': {excp}\n", flush=True)
+            return False
+
+    front_matter_keys = record.front_matter if front_matter and record else None
+    if lua_filter:
+        corrected = convert_with_filter(
+            file_paths.in_file,
+            file_paths.out_file,
+            pandoc_info,
+            remove_citations=remove_citations,
+            add_uuid=add_uuid,
+            committer=committer,
+            limits=limits,
+            quarantine=quarantine,
+            data=data,
+            attachments=attachments,
+            front_matter=front_matter_keys,
+            bibliography=bibliography,
+        )
+        if not corrected:
+            return False
+    else:
+        text = convert_to_text(
+            file_paths.in_file,
+            file_paths.out_file,
+            pandoc_info,
+            limits,
+            quarantine,
+            data,
+            ast,
+        )
+        if text is None:
+            return False
+        corrected = correct_org_mode(
+            file_paths.out_file,
+            remove_citations=remove_citations,
+            add_uuid=add_uuid,
+            committer=committer,
+            in_file=file_paths.in_file,
+            attachments=attachments,
+            text=text,
+            front_matter=front_matter_keys,
+            bibliography=bibliography,
+            pandoc=pandoc_info if ast else None,
+            limits=limits,
+        )
+    if links is not None and record is not None:
+        links.set_links(
+            out_file=file_paths.out_file,
+            targets=(
+                link_target_path(directory=file_paths.out_file.parent, target=target)
+                for target in record.links
+            ),
+        )
+    committer.flush()
+    return corrected
+
+
+################################################################################
+def _check_pandoc(
+    cmd_line_args: argparse.Namespace,
+    cmd_line_parser: argparse.ArgumentParser,
+) -> PandocInfo:
+    """Check if the given command to call Pandoc works and get it's version and
+    capabilities.
+
+    If the command does not work, the program is exited with an error message.
+    Pandoc is not run if it's capabilities are already cached, see
+    `probe_pandoc`.
+
+    Parameters
+    ----------
+    cmd_line_args : argparse.Namespace
+        The object holding all command line arguments, the pandoc command too.
+    cmd_line_parser : argparse.ArgumentParser
+        The command line parser object to use.
+
+    Returns
+    -------
+    PandocInfo
+        The path to the Pandoc executable and it's capabilities on success.
+    """
+    import subprocess  # nosec B404 pylint: disable=import-outside-toplevel
+
+    from obs2org.pandoc_info import (  # pylint: disable=import-outside-toplevel
+        probe_pandoc,
+    )
+
+    pandoc = cmd_line_args.pandoc_exe
+
+    try:
+        return probe_pandoc(pandoc=pandoc)
+    except (OSError, subprocess.SubprocessError) as excp:
+        cmd_line_parser.error(
+            f"Pandoc executable '{pandoc}' not found or does not work!\n"
+            f"Error message: '{excp}'\n"
+            f"Look at https://pandoc.org/installing.html for information on how to install\n"
+            f"pandoc"
+        )
+
+
+################################################################################
+def _check_in_path(
+    cmd_line_parser: argparse.ArgumentParser,
+    out_path: str,
+    arg_path: str,
+    files: FileTable,
+    create_dirs: bool = True,
+    source: Optional[VaultSource] = None,
+) -> None:
+    """Check, if the given path contains Markdown files and add them and the
+    Org-Mode files to generate to `files`.
+
+    If `source` is not `None`, the Markdown files are read from `source`, see
+    `obs2org.sources`, instead of the file system.
+
+    Parameters
+    ----------
+    cmd_line_parser : argparse.ArgumentParser
+        The command line parser object to use.
+    out_path : str
+        The path to write the generated Org-Mode files to.
+    arg_path : str
+        The path to check for Markdown files.
+    files : FileTable
+        The table to add the files to.
+    create_dirs : bool, optional
+        Whether to create the output directories, by default `True`.
+    source : Optional[VaultSource], optional
+        The source to read the Markdown files from, by default `None`, the
+        file system.
+    """
+    from obs2org.file_table import FileEntry  # pylint: disable=import-outside-toplevel
+
+    if source is not None:
+        from obs2org.sources import (  # pylint: disable=import-outside-toplevel
+            SourceError,
         )
 
-    await asyncio.gather(*convert_tasks)
+        num_files = files.num_entries
+        try:
+            source.add_files(
+                arg_path=arg_path,
+                out_path=out_path,
+                files=files,
+                create_dirs=create_dirs,
+            )
+        except SourceError as excp:
+            cmd_line_parser.error(str(excp))
+        if files.num_entries == num_files:
+            cmd_line_parser.error(f"no markdown file(s) found at path '{arg_path}'.")
+
+    elif path.isdir(arg_path):
+        _walk_directory(
+            out_path=out_path, arg_path=arg_path, files=files, create_dirs=create_dirs
+        )
 
-    # Can't run this asynchronously, as
-    # we need to look up headings in converted files.
-    for correct_file in list_of_files:
-        correct_org_mode(
-            correct_file.out_file, remove_citations=remove_citations, add_uuid=add_uuid
+    elif path.isfile(arg_path):
+        stat = Path(arg_path).stat()
+        out_dir = _out_directory(out_path=out_path)
+        out_name = None
+        if out_dir != out_path and path.basename(out_path) != "":
+            out_name = path.basename(out_path).removesuffix(".org")
+        files.add_directory(
+            in_dir=path.dirname(arg_path),
+            out_dir=out_dir,
+            out_name=out_name,
+            entries=[
+                FileEntry(
+                    name=path.basename(arg_path),
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                )
+            ],
         )
+
+    else:
+        cmd_line_parser.error(f"no markdown file(s) found at path '{arg_path}'.")
+
+
+################################################################################
+def _walk_directory(
+    out_path: str, arg_path: str, files: FileTable, create_dirs: bool = True
+) -> None:
+    """Walk through the directory `arg_path` and add all Markdown files to the
+    table of files to convert, see `obs2org.walk.walk_directory`.
+
+    Parameters
+    ----------
+    out_path : str
+        The path to write the generated Org-Mode files to.
+    arg_path : str
+        The directory to search for Markdown files.
+    files : FileTable
+        The table to add the files to.
+    create_dirs : bool, optional
+        Whether to create the output directories, by default `True`.
+    """
+    from obs2org.walk import walk_directory  # pylint: disable=import-outside-toplevel
+
+    for in_dir, out_dir, entries in walk_directory(
+        out_path=out_path, arg_path=arg_path, create_dirs=create_dirs
+    ):
+        files.add_directory(in_dir=in_dir, out_dir=out_dir, entries=entries)
+
+
+################################################################################
+def _check_out_path(
+    cmd_line_args: argparse.Namespace,
+    cmd_line_parser: argparse.ArgumentParser,
+    path_list: list[str],
+) -> str:
+    """Validate the path to write the Org-Mode file(s) to and return the checked
+    path.
+    If the path is wrong, e.g. a path to a file for more than one Markdown file
+    to convert, the program exits with an error message.
+
+    Parameters
+    ----------
+    cmd_line_args : argparse.Namespace
+        The object holding the command line arguments.
+    cmd_line_parser : argparse.ArgumentParser
+        The command line parser object.
+    path_list : list[str]
+        The list of paths to Markdown files to convert.
+
+    Returns
+    -------
+    str
+        The checked path to the Org-Mode file(s) on success, exits the program
+        on errors.
+    """
+    from obs2org.archive import (  # pylint: disable=import-outside-toplevel
+        archive_suffix,
+    )
+
+    out_path: str = cmd_line_args.out_path
+
+    if archive_suffix(out_path) is not None:
+        print(f"Output to archive {out_path}")
+        if path.isdir(out_path):
+            cmd_line_parser.error(f"the archive '{out_path}' is a directory!")
+    elif path.basename(out_path) == "" or path.isdir(out_path):
+        print(f"Output to directory {out_path}")
+        if not cmd_line_args.plan:
+            Path(out_path).mkdir(exist_ok=True, parents=True)
+    else:
+        print(f"Output to file {out_path}")
+        if cmd_line_args.files_from is not None:
+            cmd_line_parser.error(
+                f"'--files-from' needs an output directory, not the file"
+                f" '{out_path}'!"
+            )
+        if len(path_list) > 1 or any(path.isdir(arg) for arg in path_list):
+            cmd_line_parser.error(
+                f"more than one markdown file to convert given,"
+                f" but just one output file '{out_path}'!"
+            )
+
+    return out_path
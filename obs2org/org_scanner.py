@@ -0,0 +1,1290 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     org_scanner.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Linear-time scanners for the links, tags and dates of the Org-Mode text
+generated by Pandoc.
+
+Every scanner finds the same matches as the regexp in its docstring, which is
+how the text has been corrected before. The regexps need quadratic, some of
+them cubic, time on a line full of `[[`, because of their lookaheads up to the
+end of the line and their nested, lazy quantifiers. The scanners look up the
+next bracket, pipe or line end in sorted lists of the positions of these
+characters, which are built once per text, instead of searching the rest of
+the line again for every `[[`.
+
+The scanners return `ScanMatch` objects, which replace the text using `sub`
+like `re.sub` does.
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_left
+from typing import Callable, Iterator, NamedTuple, Optional, Tuple, Union
+
+from obs2org.regexp import LazyPattern
+
+# The patterns of the characters whose positions are looked up in the sorted
+# lists of `_Text`. `dot_word` is a dot followed by a word character,
+# `double_close` the first bracket of `]]`, `anchor` a character that starts
+# a `#heading` or a `|caption` and `special` a character that ends a link name.
+_POSITION_PATTERNS = {
+    "newline": r"\n",
+    "bracket": r"[\[\]]",
+    "close": r"\]",
+    "double_close": r"\](?=\])",
+    "dot": r"\.",
+    "dot_word": r"\.(?=\w)",
+    "hash": r"#",
+    "pipe": r"\|",
+    "anchor": r"[#|]",
+    "special": r"[#|\[\]]",
+    "star": r"\*",
+}
+
+# The compiled patterns of `_POSITION_PATTERNS`.
+_position_regexps: dict[str, LazyPattern[str]] = {
+    name: LazyPattern(pattern) for name, pattern in _POSITION_PATTERNS.items()
+}
+
+# Matches the first character that isn't whitespace.
+_non_space_regexp: LazyPattern[str] = LazyPattern(r"\S")
+
+# Matches the first character that ends a file name of a link to a file,
+# whitespace or `В`.
+_token_end_regexp: LazyPattern[str] = LazyPattern(r"[\sВ]")
+
+# Matches the first character that isn't a word character.
+_non_word_regexp: LazyPattern[str] = LazyPattern(r"\W")
+
+# Matches the first character that isn't a digit.
+_non_digit_regexp: LazyPattern[str] = LazyPattern(r"\D")
+
+# Matches the first character that isn't a star.
+_non_star_regexp: LazyPattern[str] = LazyPattern(r"[^*]")
+
+# Matches a word character.
+_word_regexp: LazyPattern[str] = LazyPattern(r"\w")
+
+# Matches a line containing nothing but a date, the first match group is the
+# date. A date must be on a line of it's own.
+_date_line_regexp: LazyPattern[str] = LazyPattern(
+    r"^[^\S\n]*(\d{1,4}[0-9.,/\\ -]\d{1,4}[0-9.,/\\ -]\d{1,4})[^\S\n]*$",
+    flags=re.MULTILINE,
+)
+
+# Matches a group reference `\1` of a replacement template.
+_group_reference_regexp: LazyPattern[str] = LazyPattern(r"\\(\d)")
+
+# The starts of links that aren't links to Org-Mode files.
+_URL_PREFIXES = ("http", "ftp", "file", "cite")
+
+# The starts of links that aren't links to attachments.
+_NO_ATTACHMENT_PREFIXES = ("file", "http", "ftp", "zotero", "cite:")
+
+# The type of the result of the part of a link after the link name, the end
+# of the link and the captured caption, if any.
+_LinkEnd = Optional[Tuple[int, Optional[str]]]
+
+
+################################################################################
+class ScanMatch(NamedTuple):
+    """Class holding a match of a scanner, with the same attributes and methods
+    `re.Match` has, that are used to replace the matched text.
+    """
+
+    start: int
+    """The index of the first character of the match."""
+    end: int
+    """The index after the last character of the match."""
+    captures: Tuple[str, ...]
+    """The texts of the match groups."""
+
+    ############################################################################
+    @property
+    def lastindex(self) -> int:
+        """The number of the last match group."""
+        return len(self.captures)
+
+    ############################################################################
+    def group(self, index: int) -> str:
+        """Return the text of the match group `index`.
+
+        Parameters
+        ----------
+        index : int
+            The number of the match group, starting at 1.
+
+        Returns
+        -------
+        str
+            The text of the match group.
+        """
+        return self.captures[index - 1]
+
+    ############################################################################
+    def expand(self, template: str) -> str:
+        """Return the replacement template `template` with the references to
+        match groups, like `\\1`, replaced by the texts of the match groups.
+
+        Parameters
+        ----------
+        template : str
+            The replacement template.
+
+        Returns
+        -------
+        str
+            The template with the texts of the match groups.
+        """
+        return _group_reference_regexp.sub(
+            lambda reference: self.group(int(reference.group(1))), template
+        )
+
+
+################################################################################
+class _Text:
+    """The text to scan and the positions of the characters the scanners look
+    up.
+
+    The lists of positions are built the first time they are needed. The
+    searches for the end of runs of whitespace and of file names remember
+    their last result, as they are repeated for the same run.
+    """
+
+    def __init__(self, text: str) -> None:
+        """Construct the lookup tables of the text `text`.
+
+        Parameters
+        ----------
+        text : str
+            The text to scan.
+        """
+        self.text = text
+        self._positions: dict[str, list[int]] = {}
+        self._runs: dict[str, Tuple[int, int]] = {}
+        self._file_link_ends: Optional[Tuple[list[int], list[int]]] = None
+
+    ############################################################################
+    def positions(self, name: str) -> list[int]:
+        """Return the sorted positions of the characters `name`.
+
+        Parameters
+        ----------
+        name : str
+            The name of the pattern in `_POSITION_PATTERNS`.
+
+        Returns
+        -------
+        list[int]
+            The positions of all characters matching the pattern.
+        """
+        positions = self._positions.get(name)
+        if positions is None:
+            positions = [
+                match.start() for match in _position_regexps[name].finditer(self.text)
+            ]
+            self._positions[name] = positions
+        return positions
+
+    ############################################################################
+    def next_position(self, name: str, pos: int) -> int:
+        """Return the first position of the characters `name` at or after
+        `pos`.
+
+        Parameters
+        ----------
+        name : str
+            The name of the pattern in `_POSITION_PATTERNS`.
+        pos : int
+            The position to start at.
+
+        Returns
+        -------
+        int
+            The position, the length of the text if there is none.
+        """
+        positions = self.positions(name)
+        index = bisect_left(positions, pos)
+        return positions[index] if index < len(positions) else len(self.text)
+
+    ############################################################################
+    def previous_position(self, name: str, pos: int) -> int:
+        """Return the last position of the characters `name` before `pos`.
+
+        Parameters
+        ----------
+        name : str
+            The name of the pattern in `_POSITION_PATTERNS`.
+        pos : int
+            The position to end at.
+
+        Returns
+        -------
+        int
+            The position, -1 if there is none.
+        """
+        positions = self.positions(name)
+        index = bisect_left(positions, pos)
+        return positions[index - 1] if index > 0 else -1
+
+    ############################################################################
+    def positions_between(self, name: str, start: int, end: int) -> list[int]:
+        """Return the positions of the characters `name` from `start` to
+        before `end`.
+
+        Parameters
+        ----------
+        name : str
+            The name of the pattern in `_POSITION_PATTERNS`.
+        start : int
+            The first position.
+        end : int
+            The position after the last position.
+
+        Returns
+        -------
+        list[int]
+            The sorted positions.
+        """
+        positions = self.positions(name)
+        return positions[bisect_left(positions, start) : bisect_left(positions, end)]
+
+    ############################################################################
+    def line_end(self, pos: int) -> int:
+        """Return the position of the newline ending the line of `pos`, the
+        length of the text for the last line."""
+        return self.next_position("newline", pos)
+
+    ############################################################################
+    def line_start(self, pos: int) -> int:
+        """Return the position of the first character of the line of `pos`."""
+        return self.previous_position("newline", pos) + 1
+
+    ############################################################################
+    def skip_space(self, pos: int) -> int:
+        """Return the first position at or after `pos` that isn't whitespace,
+        the length of the text if there is none."""
+        return self._run_end("space", _non_space_regexp, pos)
+
+    ############################################################################
+    def token_end(self, pos: int) -> int:
+        """Return the first position at or after `pos` that is whitespace or
+        a `В`, the length of the text if there is none."""
+        return self._run_end("token", _token_end_regexp, pos)
+
+    ############################################################################
+    def word_end(self, pos: int) -> int:
+        """Return the first position at or after `pos` that isn't a word
+        character."""
+        match = _non_word_regexp.search(self.text, pos)
+        return match.start() if match is not None else len(self.text)
+
+    ############################################################################
+    def digits_end(self, pos: int) -> int:
+        """Return the first position at or after `pos` that isn't a digit."""
+        match = _non_digit_regexp.search(self.text, pos)
+        return match.start() if match is not None else len(self.text)
+
+    ############################################################################
+    def dot_word_on_line(self, pos: int) -> bool:
+        """Return `True` if a dot followed by a word character is at or after
+        `pos` on the line of `pos`, like the lookahead `.*\\.\\w+`."""
+        return self.next_position("dot_word", pos) < self.line_end(pos)
+
+    ############################################################################
+    def last_double_close(self, pos: int) -> int:
+        """Return the position of the last `]]` on the line of `pos`, -1 if
+        there is none."""
+        close = self.previous_position("double_close", self.line_end(pos))
+        return close if close >= self.line_start(pos) else -1
+
+    ############################################################################
+    def file_link_ends(self) -> Tuple[list[int], list[int]]:
+        """Return the positions the name of a link to a file can end at and
+        the ends of these links, see `_file_link_tail`.
+
+        Returns
+        -------
+        Tuple[list[int], list[int]]
+            The sorted positions and the end of the link ending at each.
+        """
+        if self._file_link_ends is None:
+            starts: list[int] = []
+            ends: list[int] = []
+            candidates = sorted(self.positions("hash") + self.positions("double_close"))
+            for pos in candidates:
+                found = _anchor_end(self, pos, _file_link_tail)
+                if found is not None:
+                    starts.append(pos)
+                    ends.append(found[0])
+            self._file_link_ends = (starts, ends)
+        return self._file_link_ends
+
+    ############################################################################
+    def _run_end(self, name: str, regexp: LazyPattern[str], pos: int) -> int:
+        """Return the first match of `regexp` at or after `pos`, remember the
+        result of the last search.
+
+        Parameters
+        ----------
+        name : str
+            The name of the remembered result.
+        regexp : LazyPattern[str]
+            The regexp to search for.
+        pos : int
+            The position to start the search at.
+
+        Returns
+        -------
+        int
+            The position of the match, the length of the text if there is
+            none.
+        """
+        start, end = self._runs.get(name, (1, 0))
+        if start <= pos <= end:
+            return end
+        match = regexp.search(self.text, pos)
+        end = match.start() if match is not None else len(self.text)
+        self._runs[name] = (pos, end)
+        return end
+
+
+###############################################################################
+def sub(
+    scanner: Callable[[str], Iterator[ScanMatch]],
+    repl: Union[str, Callable[[ScanMatch], str]],
+    text: str,
+) -> str:
+    """Replace the matches of `scanner` in `text` by `repl`, like `re.sub`.
+
+    Parameters
+    ----------
+    scanner : Callable[[str], Iterator[ScanMatch]]
+        The scanner returning the matches of a text, like `internal_wikilinks`.
+    repl : Union[str, Callable[[ScanMatch], str]]
+        The replacement template or a function returning the replacement of a
+        match.
+    text : str
+        The text to replace the matches in.
+
+    Returns
+    -------
+    str
+        The text with the matches replaced.
+    """
+    parts: list[str] = []
+    last_end = 0
+    for match in scanner(text):
+        parts.append(text[last_end : match.start])
+        parts.append(repl(match) if callable(repl) else match.expand(repl))
+        last_end = match.end
+    if not parts:
+        return text
+
+    parts.append(text[last_end:])
+    return "".join(parts)
+
+
+###############################################################################
+def internal_wikilinks(text: str) -> Iterator[ScanMatch]:
+    """Return the links to headings in other files.
+
+    The first match group is the filename without suffix, the second match
+    group is the header name in the file to link to. Files with suffixes are
+    not matched.
+    `[[file#Heading]]` -> `file`, `Heading`
+
+    Matches the same as
+    `\\[\\[(?!https?|ftp|file|cite|.*\\.\\w+)(\\S[^\\[\\]]*)#(\\S[^\\[\\]]*?)(?:\\|.*)?\\]\\]`
+
+    Parameters
+    ----------
+    text : str
+        The text to scan.
+
+    Returns
+    -------
+    Iterator[ScanMatch]
+        The matches, in the order of the text.
+    """
+    return _link_matches(text=text, matcher=_match_internal_wikilink)
+
+
+###############################################################################
+def same_document_links(text: str) -> Iterator[ScanMatch]:
+    """Return the links to headings in the same file.
+
+    The first match group is the heading to link to.
+    `[[#Heading]]` -> `Heading`
+
+    Matches the same as `\\[\\[\\s*#\\s*([^#|\\[\\]]*)\\s*\\]\\]`
+
+    Parameters
+    ----------
+    text : str
+        The text to scan.
+
+    Returns
+    -------
+    Iterator[ScanMatch]
+        The matches, in the order of the text.
+    """
+    return _link_matches(text=text, matcher=_match_same_document_link)
+
+
+###############################################################################
+def named_wikilinks(text: str) -> Iterator[ScanMatch]:
+    """Return the links with a caption to other files.
+
+    The first match group is the filename, files with a suffix are not
+    matched.
+    `[[file|Caption]]` -> `file`
+
+    Matches the same as
+    `\\[\\[(?!#)(?!.*\\.\\w+)(\\S[^\\[\\]]*?)(?:#\\^?\\w+)?(?:#page=\\d+)?\\|(?:\\S[^\\[\\]]*)\\]\\]`
+
+    Parameters
+    ----------
+    text : str
+        The text to scan.
+
+    Returns
+    -------
+    Iterator[ScanMatch]
+        The matches, in the order of the text.
+    """
+    return _link_matches(text=text, matcher=_match_named_wikilink)
+
+
+###############################################################################
+def named_heading_links(text: str) -> Iterator[ScanMatch]:
+    """Return the links with a caption to headings in the same file.
+
+    The first match group is the heading to link to, the second the caption.
+    Links containing a suffix are not matched.
+    `[[#Heading|Caption]]` -> `#Heading`, `Caption`
+
+    Matches the same as
+    `\\[\\[(?!.*\\.\\w+)(#\\w[^\\[\\]]*?)(?:#\\^?\\w+)?(?:#page=\\d+)?\\|(\\S[^\\[\\]]*)\\]\\]`
+
+    Parameters
+    ----------
+    text : str
+        The text to scan.
+
+    Returns
+    -------
+    Iterator[ScanMatch]
+        The matches, in the order of the text.
+    """
+    return _link_matches(text=text, matcher=_match_named_heading_link)
+
+
+###############################################################################
+def named_file_links(text: str) -> Iterator[ScanMatch]:
+    """Return the links with a caption to files with a suffix.
+
+    The first match group is the filename, the second the link's caption.
+    `[[file.sfx|Caption]]` -> `file.sfx`, `Caption`
+
+    Matches the same as
+    `\\[\\[(?!#)(\\S[^\\[\\]]*?\\.\\w+)(?:#\\^?\\w+)?(?:#page=\\d+)?\\|(\\S[^\\[\\]]*)\\]\\]`
+
+    Parameters
+    ----------
+    text : str
+        The text to scan.
+
+    Returns
+    -------
+    Iterator[ScanMatch]
+        The matches, in the order of the text.
+    """
+    return _link_matches(text=text, matcher=_match_named_file_link)
+
+
+###############################################################################
+def file_links(text: str) -> Iterator[ScanMatch]:
+    """Return the links to files with a suffix.
+
+    The first match group is the filename.
+    `[[file.sfx]]` -> `file.sfx`
+
+    Matches the same as
+    `\\[\\[(?!#|(?:file|http[s]?|ftp|zotero|cite:))(\\S[^\\[\\]]*?\\.[^В\\s]+?)(?:#\\^?\\w+)?(?:#page=\\d+)?\\]\\]`
+
+    Parameters
+    ----------
+    text : str
+        The text to scan.
+
+    Returns
+    -------
+    Iterator[ScanMatch]
+        The matches, in the order of the text.
+    """
+    return _link_matches(text=text, matcher=_match_file_link)
+
+
+###############################################################################
+def file_only_links(text: str) -> Iterator[ScanMatch]:
+    """Return the links to other files without a heading.
+
+    The first match group is the filename without suffix. Links to files with
+    suffixes, to headings and URLs starting with `http`, `https` or `ftp` are
+    not matched.
+    `[[Note]]` -> `Note`
+
+    Matches the same as
+    `\\[\\[(?!\\*|https?|ftp|file|cite|[^\\[\\]]*\\.[^В\\s]+\\])\\s*([^#|\\[\\]]*)\\s*\\]\\]`
+
+    Parameters
+    ----------
+    text : str
+        The text to scan.
+
+    Returns
+    -------
+    Iterator[ScanMatch]
+        The matches, in the order of the text.
+    """
+    return _link_matches(text=text, matcher=_match_file_only_link)
+
+
+###############################################################################
+def citations(text: str) -> Iterator[ScanMatch]:
+    """Return the links to Pandoc citations.
+
+    The first match group is the link including the `@`.
+    `[[cite:@Link]]` -> `@Link`
+
+    Matches the same as `\\[\\[\\s*cite:(@.*?)\\s*\\]\\]`
+
+    Parameters
+    ----------
+    text : str
+        The text to scan.
+
+    Returns
+    -------
+    Iterator[ScanMatch]
+        The matches, in the order of the text.
+    """
+    return _link_matches(text=text, matcher=_match_citation)
+
+
+###############################################################################
+def dates(text: str) -> Iterator[ScanMatch]:
+    """Return the dates on a line of their own.
+
+    The first match group is the date. All variants of year, month and day
+    placements and the delimiters between them are matched. The match
+    includes the empty lines before the date and the empty lines after the
+    date, except for the last newline.
+
+    Matches the same as the multiline regexp
+    `^\\s*(\\d{1,4}[0-9.,/\\\\ -]\\d{1,4}[0-9.,/\\\\ -]\\d{1,4})\\s*$`
+
+    Parameters
+    ----------
+    text : str
+        The text to scan.
+
+    Returns
+    -------
+    Iterator[ScanMatch]
+        The matches, in the order of the text.
+    """
+    scanned = _Text(text)
+    last_end = 0
+    for date_line in _date_line_regexp.finditer(text):
+        date_start, date_end = date_line.span(1)
+        space_start = date_start
+        while space_start > 0 and text[space_start - 1].isspace():
+            space_start -= 1
+        start = max(last_end, space_start)
+        if start > 0 and text[start - 1] != "\n":
+            start = text.index("\n", start, date_start) + 1
+
+        next_text = scanned.skip_space(date_end)
+        last_end = (
+            len(text) if next_text == len(text) else text.rindex("\n", 0, next_text)
+        )
+        yield ScanMatch(
+            start=start, end=last_end, captures=(text[date_start:date_end],)
+        )
+
+
+###############################################################################
+def tags(text: str) -> Iterator[ScanMatch]:
+    """Return the headings followed by a line of hashtags.
+
+    The first match group is the heading, the third the list of tags and the
+    second the text in between.
+
+    Matches the same as the multiline regexp
+    `^(\\s*\\*{1,}\\s[^\\n]{1,})$([^*]*?)^\\s*Keywords:\\s*((?:#\\S[^\\n#,]*,?[^\\S\\n]*){1,})$`
+
+    Parameters
+    ----------
+    text : str
+        The text to scan.
+
+    Returns
+    -------
+    Iterator[ScanMatch]
+        The matches, in the order of the text.
+    """
+    scanned = _Text(text)
+    stars = scanned.positions("star")
+    last_end = 0
+    index = 0
+    while index < len(stars):
+        star = stars[index]
+        index += 1
+        # The match starts at the first line start of the whitespace before
+        # the star, as `^\s*` skips empty lines.
+        space_start = star
+        while space_start > last_end and text[space_start - 1].isspace():
+            space_start -= 1
+        if space_start > 0 and text[space_start - 1] != "\n":
+            newline = text.find("\n", space_start, star)
+            if newline == -1:
+                continue
+            space_start = newline + 1
+
+        match = _match_tags(scanned=scanned, start=space_start, star=star)
+        if match is not None:
+            yield match
+            last_end = match.end
+            index = bisect_left(stars, last_end)
+
+
+###############################################################################
+def date_of_line(line: str) -> Optional[str]:
+    """Return the date, if the line `line` contains nothing but a date, like
+    the lines matched by `dates`.
+
+    Parameters
+    ----------
+    line : str
+        The text of a single line.
+
+    Returns
+    -------
+    Optional[str]
+        The date without the whitespace around it, `None` if the line isn't a
+        date.
+    """
+    date_line = _date_line_regexp.fullmatch(line)
+    return date_line.group(1) if date_line is not None else None
+
+
+###############################################################################
+def _link_matches(
+    text: str, matcher: Callable[[_Text, int], Optional[ScanMatch]]
+) -> Iterator[ScanMatch]:
+    """Return the matches of `matcher` at the starts `[[` of links in `text`.
+
+    Parameters
+    ----------
+    text : str
+        The text to scan.
+    matcher : Callable[[_Text, int], Optional[ScanMatch]]
+        The function returning the match of the link starting at the given
+        position, `None` if the link doesn't match.
+
+    Returns
+    -------
+    Iterator[ScanMatch]
+        The matches, in the order of the text.
+    """
+    scanned = _Text(text)
+    start = text.find("[[")
+    while start != -1:
+        match = matcher(scanned, start)
+        if match is None:
+            start = text.find("[[", start + 1)
+        else:
+            yield match
+            start = text.find("[[", match.end)
+
+
+###############################################################################
+def _match_internal_wikilink(scanned: _Text, start: int) -> Optional[ScanMatch]:
+    """Return the match of `internal_wikilinks` at `start`, if any.
+
+    The file name is greedy, so the link is split at the last `#` that can be
+    followed by the heading. The heading is lazy, it ends at the first `|` on
+    a line with a later `]]`, which ends the link, or at the end of the
+    brackets if it is followed by `]]`.
+
+    Parameters
+    ----------
+    scanned : _Text
+        The text.
+    start : int
+        The position of `[[`.
+
+    Returns
+    -------
+    Optional[ScanMatch]
+        The match, `None` if the link doesn't match.
+    """
+    text = scanned.text
+    first = start + 2
+    if (
+        first >= len(text)
+        or text[first].isspace()
+        or text.startswith(_URL_PREFIXES, first)
+        or scanned.dot_word_on_line(first)
+    ):
+        return None
+
+    run_end = scanned.next_position("bracket", first + 1)
+    # A `#` right before the bracket, the heading starts with the bracket.
+    if run_end < len(text) and run_end - 1 > first and text[run_end - 1] == "#":
+        found = _heading_end(scanned=scanned, pos=run_end + 1)
+        if found is not None:
+            return ScanMatch(
+                start=start,
+                end=found[1],
+                captures=(text[first : run_end - 1], text[run_end : found[0]]),
+            )
+
+    if text.startswith("]]", run_end):
+        last_hash = run_end - 2
+    else:
+        last_hash = (
+            _last_heading_pipe(scanned=scanned, start=first + 1, end=run_end) - 2
+        )
+    hash_pos = scanned.previous_position("hash", last_hash + 1)
+    while hash_pos > first and text[hash_pos + 1].isspace():
+        hash_pos = scanned.previous_position("hash", hash_pos)
+    if hash_pos <= first:
+        return None
+
+    found = _heading_end(scanned=scanned, pos=hash_pos + 2)
+    if found is None:
+        return None
+    return ScanMatch(
+        start=start,
+        end=found[1],
+        captures=(text[first:hash_pos], text[hash_pos + 1 : found[0]]),
+    )
+
+
+###############################################################################
+def _heading_end(scanned: _Text, pos: int) -> Optional[Tuple[int, int]]:
+    """Return the end of the heading of an `internal_wikilinks` link whose
+    heading continues at `pos`, and the end of the link.
+
+    Parameters
+    ----------
+    scanned : _Text
+        The text.
+    pos : int
+        The position after the first character of the heading.
+
+    Returns
+    -------
+    Optional[Tuple[int, int]]
+        The end of the heading and the end of the link, `None` if the link
+        doesn't end.
+    """
+    run_end = scanned.next_position("bracket", pos)
+    pipe = scanned.next_position("pipe", pos)
+    while pipe < run_end:
+        close = scanned.last_double_close(pipe)
+        if close > pipe:
+            return pipe, close + 2
+        pipe = scanned.next_position("pipe", scanned.line_end(pipe))
+
+    if scanned.text.startswith("]]", run_end):
+        return run_end, run_end + 2
+    return None
+
+
+###############################################################################
+def _last_heading_pipe(scanned: _Text, start: int, end: int) -> int:
+    """Return the last `|` from `start` to before `end` that is followed by a
+    `]]` on the same line.
+
+    Parameters
+    ----------
+    scanned : _Text
+        The text.
+    start : int
+        The first position to search.
+    end : int
+        The position after the last position to search.
+
+    Returns
+    -------
+    int
+        The position of the `|`, -1 if there is none.
+    """
+    pipe = scanned.previous_position("pipe", end)
+    while pipe >= start:
+        close = scanned.last_double_close(pipe)
+        if close > pipe:
+            return pipe
+        pipe = scanned.previous_position("pipe", max(close, scanned.line_start(pipe)))
+    return -1
+
+
+###############################################################################
+def _match_same_document_link(scanned: _Text, start: int) -> Optional[ScanMatch]:
+    """Return the match of `same_document_links` at `start`, if any.
+
+    Parameters
+    ----------
+    scanned : _Text
+        The text.
+    start : int
+        The position of `[[`.
+
+    Returns
+    -------
+    Optional[ScanMatch]
+        The match, `None` if the link doesn't match.
+    """
+    text = scanned.text
+    hash_pos = scanned.skip_space(start + 2)
+    if not text.startswith("#", hash_pos):
+        return None
+
+    heading_start = scanned.skip_space(hash_pos + 1)
+    heading_end = scanned.next_position("special", heading_start)
+    if not text.startswith("]]", heading_end):
+        return None
+    return ScanMatch(
+        start=start, end=heading_end + 2, captures=(text[heading_start:heading_end],)
+    )
+
+
+###############################################################################
+def _match_named_wikilink(scanned: _Text, start: int) -> Optional[ScanMatch]:
+    """Return the match of `named_wikilinks` at `start`, if any.
+
+    Parameters
+    ----------
+    scanned : _Text
+        The text.
+    start : int
+        The position of `[[`.
+
+    Returns
+    -------
+    Optional[ScanMatch]
+        The match, `None` if the link doesn't match.
+    """
+    text = scanned.text
+    first = start + 2
+    if (
+        first >= len(text)
+        or text[first] == "#"
+        or text[first].isspace()
+        or scanned.dot_word_on_line(first)
+    ):
+        return None
+
+    run_end = scanned.next_position("bracket", first + 1)
+    for name_end in scanned.positions_between("anchor", first + 1, run_end):
+        found = _anchor_end(scanned, name_end, _caption_tail)
+        if found is not None:
+            return ScanMatch(
+                start=start, end=found[0], captures=(text[first:name_end],)
+            )
+    return None
+
+
+###############################################################################
+def _match_named_heading_link(scanned: _Text, start: int) -> Optional[ScanMatch]:
+    """Return the match of `named_heading_links` at `start`, if any.
+
+    Parameters
+    ----------
+    scanned : _Text
+        The text.
+    start : int
+        The position of `[[`.
+
+    Returns
+    -------
+    Optional[ScanMatch]
+        The match, `None` if the link doesn't match.
+    """
+    text = scanned.text
+    first = start + 2
+    if (
+        not text.startswith("#", first)
+        or _word_regexp.match(text, first + 1) is None
+        or scanned.dot_word_on_line(first)
+    ):
+        return None
+
+    run_end = scanned.next_position("bracket", first + 2)
+    for name_end in scanned.positions_between("anchor", first + 2, run_end):
+        found = _anchor_end(scanned, name_end, _caption_tail)
+        if found is not None and found[1] is not None:
+            return ScanMatch(
+                start=start, end=found[0], captures=(text[first:name_end], found[1])
+            )
+    return None
+
+
+###############################################################################
+def _match_named_file_link(scanned: _Text, start: int) -> Optional[ScanMatch]:
+    """Return the match of `named_file_links` at `start`, if any.
+
+    Parameters
+    ----------
+    scanned : _Text
+        The text.
+    start : int
+        The position of `[[`.
+
+    Returns
+    -------
+    Optional[ScanMatch]
+        The match, `None` if the link doesn't match.
+    """
+    text = scanned.text
+    first = start + 2
+    if first >= len(text) or text[first] == "#" or text[first].isspace():
+        return None
+
+    run_end = scanned.next_position("bracket", first + 1)
+    for dot in scanned.positions_between("dot", first + 1, run_end):
+        name_end = scanned.word_end(dot + 1)
+        if name_end == dot + 1:
+            continue
+        found = _anchor_end(scanned, name_end, _caption_tail)
+        if found is not None and found[1] is not None:
+            return ScanMatch(
+                start=start, end=found[0], captures=(text[first:name_end], found[1])
+            )
+    return None
+
+
+###############################################################################
+def _match_file_link(scanned: _Text, start: int) -> Optional[ScanMatch]:
+    """Return the match of `file_links` at `start`, if any.
+
+    The suffix of the file name may contain brackets, so the name ends at the
+    first position after the dot that can end the link, see
+    `_Text.file_link_ends`, as long as there is no whitespace before it.
+
+    Parameters
+    ----------
+    scanned : _Text
+        The text.
+    start : int
+        The position of `[[`.
+
+    Returns
+    -------
+    Optional[ScanMatch]
+        The match, `None` if the link doesn't match.
+    """
+    text = scanned.text
+    first = start + 2
+    if (
+        first >= len(text)
+        or text[first] == "#"
+        or text[first].isspace()
+        or text.startswith(_NO_ATTACHMENT_PREFIXES, first)
+    ):
+        return None
+
+    run_end = scanned.next_position("bracket", first + 1)
+    name_ends, link_ends = scanned.file_link_ends()
+    for dot in scanned.positions_between("dot", first + 1, run_end):
+        index = bisect_left(name_ends, dot + 2)
+        if index < len(name_ends) and name_ends[index] <= scanned.token_end(dot + 1):
+            return ScanMatch(
+                start=start,
+                end=link_ends[index],
+                captures=(text[first : name_ends[index]],),
+            )
+    return None
+
+
+###############################################################################
+def _match_file_only_link(scanned: _Text, start: int) -> Optional[ScanMatch]:
+    """Return the match of `file_only_links` at `start`, if any.
+
+    Parameters
+    ----------
+    scanned : _Text
+        The text.
+    start : int
+        The position of `[[`.
+
+    Returns
+    -------
+    Optional[ScanMatch]
+        The match, `None` if the link doesn't match.
+    """
+    text = scanned.text
+    first = start + 2
+    if text.startswith(("*",) + _URL_PREFIXES, first):
+        return None
+
+    name_start = scanned.skip_space(first)
+    name_end = scanned.next_position("special", name_start)
+    if not text.startswith("]]", name_end):
+        return None
+
+    # Not matching `[[file.sfx]]`, a dot followed by a suffix and a bracket.
+    for dot in scanned.positions_between("dot", first, name_end):
+        if scanned.next_position("close", dot + 2) < scanned.token_end(dot + 1):
+            return None
+    return ScanMatch(
+        start=start, end=name_end + 2, captures=(text[name_start:name_end],)
+    )
+
+
+###############################################################################
+def _match_citation(scanned: _Text, start: int) -> Optional[ScanMatch]:
+    """Return the match of `citations` at `start`, if any.
+
+    Parameters
+    ----------
+    scanned : _Text
+        The text.
+    start : int
+        The position of `[[`.
+
+    Returns
+    -------
+    Optional[ScanMatch]
+        The match, `None` if the link doesn't match.
+    """
+    text = scanned.text
+    cite = scanned.skip_space(start + 2)
+    if not text.startswith("cite:@", cite):
+        return None
+
+    link_start = cite + 5
+    line_end = scanned.line_end(link_start)
+    close = scanned.next_position("double_close", link_start + 1)
+    if close < line_end:
+        link_end = close
+    else:
+        # The whitespace before the `]]` may contain newlines.
+        close = scanned.skip_space(line_end)
+        if not text.startswith("]]", close):
+            return None
+        link_end = line_end
+    while text[link_end - 1].isspace():
+        link_end -= 1
+    return ScanMatch(start=start, end=close + 2, captures=(text[link_start:link_end],))
+
+
+###############################################################################
+def _match_tags(scanned: _Text, start: int, star: int) -> Optional[ScanMatch]:
+    """Return the match of `tags` of the heading starting at `star`, if any.
+
+    Parameters
+    ----------
+    scanned : _Text
+        The text.
+    start : int
+        The start of the first line of the match.
+    star : int
+        The position of the first star of the heading.
+
+    Returns
+    -------
+    Optional[ScanMatch]
+        The match, `None` if the heading isn't followed by tags.
+    """
+    text = scanned.text
+    stars_end = _non_star_regexp.search(text, star)
+    if stars_end is None or not text[stars_end.start()].isspace():
+        return None
+
+    heading_end = scanned.line_end(stars_end.start() + 1)
+    if heading_end == stars_end.start() + 1:
+        return None
+
+    # The text between the heading and the tags doesn't contain a star.
+    next_star = scanned.next_position("star", heading_end)
+    line = heading_end + 1
+    while line < next_star:
+        keywords = scanned.skip_space(line)
+        if keywords >= next_star:
+            break
+        if text.startswith("Keywords:", keywords):
+            tags_start = scanned.skip_space(keywords + 9)
+            tags_end = scanned.line_end(tags_start)
+            if is_tag_list(text=text, start=tags_start, end=tags_end):
+                return ScanMatch(
+                    start=start,
+                    end=tags_end,
+                    captures=(
+                        text[start:heading_end],
+                        text[heading_end:line],
+                        text[tags_start:tags_end],
+                    ),
+                )
+        line = scanned.line_end(keywords) + 1
+    return None
+
+
+###############################################################################
+def is_tag_list(text: str, start: int, end: int) -> bool:
+    """Return `True` if the text from `start` to `end` is a list of hashtags
+    like `#tag1, #tag2`.
+
+    Every tag starts at a `#`, which is followed by a character that isn't
+    whitespace. A tag may end with a comma followed by whitespace.
+
+    Parameters
+    ----------
+    text : str
+        The text.
+    start : int
+        The start of the list.
+    end : int
+        The end of the list, the end of its line.
+
+    Returns
+    -------
+    bool
+        `True` if the text is a list of hashtags.
+    """
+    if start >= end or text[start] != "#":
+        return False
+
+    tag = start
+    while True:
+        if tag + 1 >= end or text[tag + 1].isspace():
+            return False
+        next_tag = text.find("#", tag + 2, end)
+        tag_end = end if next_tag == -1 else next_tag
+        comma = text.find(",", tag + 2, tag_end)
+        if comma != -1 and text[comma + 1 : tag_end].strip():
+            return False
+        if next_tag == -1:
+            return True
+        tag = next_tag
+
+
+###############################################################################
+def _anchor_end(
+    scanned: _Text, pos: int, tail: Callable[[_Text, int], _LinkEnd]
+) -> _LinkEnd:
+    """Return the end of the optional block reference `#^block` and page
+    `#page=1` starting at `pos`, followed by `tail`.
+
+    Matches the same as `(?:#\\^?\\w+)?(?:#page=\\d+)?` followed by `tail`.
+
+    Parameters
+    ----------
+    scanned : _Text
+        The text.
+    pos : int
+        The position after the link name.
+    tail : Callable[[_Text, int], _LinkEnd]
+        The function matching the rest of the link.
+
+    Returns
+    -------
+    _LinkEnd
+        The result of `tail`, `None` if the link doesn't end.
+    """
+    text = scanned.text
+    if text.startswith("#", pos):
+        word_start = pos + 2 if text.startswith("^", pos + 1) else pos + 1
+        word_end = scanned.word_end(word_start)
+        if word_end > word_start:
+            found = _page_end(scanned, word_end, tail)
+            if found is not None:
+                return found
+    return _page_end(scanned, pos, tail)
+
+
+###############################################################################
+def _page_end(
+    scanned: _Text, pos: int, tail: Callable[[_Text, int], _LinkEnd]
+) -> _LinkEnd:
+    """Return the end of the optional page `#page=1` starting at `pos`,
+    followed by `tail`.
+
+    Parameters
+    ----------
+    scanned : _Text
+        The text.
+    pos : int
+        The position after the block reference.
+    tail : Callable[[_Text, int], _LinkEnd]
+        The function matching the rest of the link.
+
+    Returns
+    -------
+    _LinkEnd
+        The result of `tail`, `None` if the link doesn't end.
+    """
+    if scanned.text.startswith("#page=", pos):
+        digits_end = scanned.digits_end(pos + 6)
+        if digits_end > pos + 6:
+            found = tail(scanned, digits_end)
+            if found is not None:
+                return found
+    return tail(scanned, pos)
+
+
+###############################################################################
+def _caption_tail(scanned: _Text, pos: int) -> _LinkEnd:
+    """Return the end of the caption `|Caption]]` starting at `pos` and the
+    caption.
+
+    Parameters
+    ----------
+    scanned : _Text
+        The text.
+    pos : int
+        The position of the `|`.
+
+    Returns
+    -------
+    _LinkEnd
+        The end of the link and the caption, `None` if there is no caption.
+    """
+    text = scanned.text
+    if not text.startswith("|", pos) or pos + 1 >= len(text) or text[pos + 1].isspace():
+        return None
+
+    caption_end = scanned.next_position("bracket", pos + 2)
+    if not text.startswith("]]", caption_end):
+        return None
+    return caption_end + 2, text[pos + 1 : caption_end]
+
+
+###############################################################################
+def _file_link_tail(scanned: _Text, pos: int) -> _LinkEnd:
+    """Return the end of the `]]` at `pos`.
+
+    Parameters
+    ----------
+    scanned : _Text
+        The text.
+    pos : int
+        The position of the `]]`.
+
+    Returns
+    -------
+    _LinkEnd
+        The end of the link, `None` if there is no `]]` at `pos`.
+    """
+    if not scanned.text.startswith("]]", pos):
+        return None
+    return pos + 2, None
@@ -0,0 +1,238 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     output.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Module containing the output commit layer, which writes the generated
+Org-Mode files atomically and only if their content has changed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+
+################################################################################
+class FileState(NamedTuple):
+    """Class holding the state of an existing file, used to check if a write
+    would change the file's content.
+    """
+
+    size: int
+    """The size of the file in bytes."""
+    digest: Optional[bytes]
+    """The hash of the file's content, `None` if not calculated."""
+    atime_ns: int
+    """The last access time of the file in nanoseconds."""
+    mtime_ns: int
+    """The last modification time of the file in nanoseconds."""
+
+
+################################################################################
+class OutputCommitter:
+    """Writes files atomically, but skips all writes that would not change the
+    content of the file.
+
+    The new content is compared to the existing file, first by size, then by
+    hash. The existing file is only hashed if it has the same size as the new
+    content. The first state of every file committed to is remembered, so if a
+    file gets the same content it had before it has been touched by this
+    committer, the modification time is restored too. This needs the hash of
+    the first state, so it only works if the first content committed to the
+    file had the same size as the file.
+
+    If `durable` is `True`, every written file is synced to disk before it is
+    renamed to it's final name. The syncs of the files are not batched, the
+    rename must not reach the disk before the content of the file, or a crash
+    could leave an empty file. The syncs of the directories containing the
+    files are batched, every directory is synced once when `flush` is called.
+    """
+
+    on_disk = True
+    """Whether the committed files are written to the file system, `False` for
+    committers writing to an archive."""
+
+    def __init__(self, durable: bool = False) -> None:
+        """Construct a committer.
+
+        Parameters
+        ----------
+        durable : bool, optional
+            Whether to sync the written files to disk, by default False.
+        """
+        self.durable = durable
+        self._lock = threading.Lock()
+        self._originals: dict[Path, Optional[FileState]] = {}
+        self._directories: set[Path] = set()
+
+    ############################################################################
+    def commit(self, file_path: Path, text: str) -> bool:
+        """Write `text` to the file `file_path`, if the file's content differs
+        from `text`.
+
+        Parameters
+        ----------
+        file_path : Path
+            The path to the file to write.
+        text : str
+            The new content of the file.
+
+        Returns
+        -------
+        bool
+            `True` if the file has been written to, `False` if the file
+            already had the content `text`.
+        """
+        data = text.encode(encoding="utf-8")
+        digest = _hash_bytes(data)
+
+        current = _file_state(file_path)
+        if current is not None and current.size == len(data):
+            current = current._replace(digest=hash_file(file_path))
+        with self._lock:
+            self._originals.setdefault(file_path, current)
+
+        if current is not None and current.digest == digest:
+            return False
+
+        tmp_file = file_path.with_name(file_path.name + "~")
+        with tmp_file.open(mode="wb") as tmp:
+            tmp.write(data)
+            if self.durable:
+                tmp.flush()
+                os.fsync(tmp.fileno())
+
+        tmp_file.replace(file_path)
+        self._restore_times(file_path=file_path, digest=digest)
+        if self.durable:
+            with self._lock:
+                self._directories.add(file_path.parent)
+
+        return True
+
+    ############################################################################
+    def _restore_times(self, file_path: Path, digest: bytes) -> None:
+        """Restore the access and modification times of `file_path`, if the new
+        content is the same as the content the file had before it has been
+        first written to.
+
+        Parameters
+        ----------
+        file_path : Path
+            The path to the written file.
+        digest : bytes
+            The hash of the new content of the file.
+        """
+        with self._lock:
+            original = self._originals.get(file_path)
+        if original is not None and original.digest == digest:
+            os.utime(file_path, ns=(original.atime_ns, original.mtime_ns))
+
+    ############################################################################
+    def flush(self) -> None:
+        """Sync the directories of all files written since the last call to
+        disk.
+
+        Does nothing if this committer isn't durable.
+        """
+        with self._lock:
+            directories = self._directories
+            self._directories = set()
+
+        if os.name != "posix":
+            return
+
+        for directory in directories:
+            _fsync_directory(directory)
+
+
+################################################################################
+def _hash_bytes(data: bytes) -> bytes:
+    """Return the hash of `data`.
+
+    Parameters
+    ----------
+    data : bytes
+        The data to hash.
+
+    Returns
+    -------
+    bytes
+        The hash of `data`.
+    """
+    return hashlib.blake2b(data, digest_size=32).digest()
+
+
+################################################################################
+def _file_state(file_path: Path) -> Optional[FileState]:
+    """Return the `FileState` of the file `file_path` or `None`, if the file does
+    not exist.
+
+    The hash of the file's content is not calculated, `FileState.digest` is
+    `None`.
+
+    Parameters
+    ----------
+    file_path : Path
+        The path to the file.
+
+    Returns
+    -------
+    Optional[FileState]
+        The size and times of the file, `None` if the file doesn't exist.
+    """
+    try:
+        stat = file_path.stat()
+    except FileNotFoundError:
+        return None
+
+    return FileState(
+        size=stat.st_size,
+        digest=None,
+        atime_ns=stat.st_atime_ns,
+        mtime_ns=stat.st_mtime_ns,
+    )
+
+
+################################################################################
+def hash_file(file_path: Path) -> bytes:
+    """Return the hash of the content of the file `file_path`.
+
+    Parameters
+    ----------
+    file_path : Path
+        The path to the file to hash.
+
+    Returns
+    -------
+    bytes
+        The hash of the file's content.
+    """
+    file_hash = hashlib.blake2b(digest_size=32)
+    with file_path.open(mode="rb") as f_d:
+        for chunk in iter(lambda: f_d.read(1 << 16), b""):
+            file_hash.update(chunk)
+
+    return file_hash.digest()
+
+
+################################################################################
+def _fsync_directory(directory: Path) -> None:
+    """Sync the directory `directory` to disk.
+
+    Parameters
+    ----------
+    directory : Path
+        The path to the directory to sync.
+    """
+    f_d = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(f_d)
+    finally:
+        os.close(f_d)
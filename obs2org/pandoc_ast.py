@@ -0,0 +1,645 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     pandoc_ast.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Correct the links, tags, dates and citations of a note in Pandoc's JSON
+AST instead of the generated Org-Mode text, used by `--ast`.
+
+Pandoc converts the Markdown file to it's JSON AST, which is corrected by a
+single walk of the tree and then converted to Org-Mode by a second Pandoc
+run. As code blocks, inline code, math and raw blocks are separate elements of
+the tree, links and dates in them are never changed.
+
+The same rules as in `obs2org.parse_org_mode` are used:
+
+- A wiki-style link is the text of consecutive `Str`, `Space` and `SoftBreak`
+  elements from `[[` to `]]`, it is corrected by
+  `obs2org.parse_org_mode.resolve_links` and replaced by a raw Org-Mode
+  element.
+- A line of a paragraph starting with `Keywords:`, followed by hashtags, in
+  the section of a heading is removed and it's tags are appended to the
+  heading.
+- A line of a paragraph containing nothing but a date is replaced by the date
+  in angle brackets.
+- With `remove_citations`, a citation in double brackets, like `[[@Key]]`, is
+  replaced by the link `[[@Key]]`.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
+
+from obs2org.org_scanner import date_of_line, is_tag_list
+from obs2org.parse_org_mode import org_tags, resolve_links
+
+# The types of the block elements of the AST.
+_BLOCK_TYPES = frozenset(
+    (
+        "Plain",
+        "Para",
+        "LineBlock",
+        "CodeBlock",
+        "RawBlock",
+        "BlockQuote",
+        "OrderedList",
+        "BulletList",
+        "DefinitionList",
+        "Header",
+        "HorizontalRule",
+        "Table",
+        "Figure",
+        "Div",
+    )
+)
+
+# The types of the inline elements of the AST.
+_INLINE_TYPES = frozenset(
+    (
+        "Str",
+        "Emph",
+        "Underline",
+        "Strong",
+        "Strikeout",
+        "Superscript",
+        "Subscript",
+        "SmallCaps",
+        "Quoted",
+        "Cite",
+        "Code",
+        "Space",
+        "SoftBreak",
+        "LineBreak",
+        "Math",
+        "RawInline",
+        "Link",
+        "Image",
+        "Note",
+        "Span",
+    )
+)
+
+# The elements whose content is never corrected: code, math, raw Org-Mode
+# or HTML, links and images, which can't contain other links, and citations,
+# which are handled by `_AstCorrector.inlines`.
+_SKIPPED_TYPES = frozenset(
+    ("CodeBlock", "RawBlock", "Code", "Math", "RawInline", "Link", "Image", "Cite")
+)
+
+# The elements of the text a wiki-style link consists of.
+_TEXT_TYPES = frozenset(("Str", "Space", "SoftBreak"))
+
+# The elements ending a line of a paragraph.
+_BREAK_TYPES = frozenset(("SoftBreak", "LineBreak"))
+
+# The text of the `Keywords:` line of a section.
+_KEYWORDS = "Keywords:"
+
+# The separator between a heading and it's tags.
+_TAG_SEPARATOR = "\t\t\t"
+
+
+################################################################################
+class CorrectedAst(NamedTuple):
+    """Class holding the corrected AST of a note."""
+
+    text: str
+    """The corrected JSON AST."""
+    citation_keys: list[str]
+    """The keys of all citations of the note."""
+
+
+###############################################################################
+def correct_ast(
+    text: str,
+    directory: Path,
+    remove_citations: bool,
+    attachments: Optional[list[str]] = None,
+) -> CorrectedAst:
+    """Correct the links, tags, dates and citations of Pandoc's JSON AST
+    `text`.
+
+    Parameters
+    ----------
+    text : str
+        The JSON AST generated by Pandoc.
+    directory : Path
+        The directory the Org-Mode files to link to are located in.
+    remove_citations : bool
+        Whether to treat citations in double brackets as normal links.
+    attachments : Optional[list[str]], optional
+        If this is not `None`, the file names of all links to attachments are
+        appended to this list.
+
+    Returns
+    -------
+    CorrectedAst
+        The corrected JSON AST and the keys of the citations.
+
+    Raises
+    ------
+    ValueError
+        If `text` isn't a JSON AST generated by Pandoc.
+    """
+    document = _load(text)
+    corrector = _AstCorrector(
+        directory=directory,
+        remove_citations=remove_citations,
+        attachments=attachments,
+    )
+    document["blocks"] = corrector.walk(document["blocks"])
+
+    return CorrectedAst(
+        text=json.dumps(document, ensure_ascii=False),
+        citation_keys=corrector.citation_keys,
+    )
+
+
+###############################################################################
+def ast_heading_text(text: str) -> str:
+    """Return the headings of Pandoc's JSON AST `text` in the format of
+    `obs2org.heading_index.heading_text`.
+
+    Parameters
+    ----------
+    text : str
+        The JSON AST generated by Pandoc.
+
+    Returns
+    -------
+    str
+        The headings and their `:CUSTOM_ID:` properties.
+
+    Raises
+    ------
+    ValueError
+        If `text` isn't a JSON AST generated by Pandoc.
+    """
+    headings: list[str] = []
+    _collect_headings(value=_load(text)["blocks"], headings=headings)
+    return "\n".join(headings)
+
+
+###############################################################################
+def stringify(inlines: list[Any]) -> str:
+    """Return the text of the inline elements `inlines` without formatting,
+    like Pandoc's `stringify`.
+
+    Parameters
+    ----------
+    inlines : list[Any]
+        The inline elements.
+
+    Returns
+    -------
+    str
+        The text of the elements.
+    """
+    parts: list[str] = []
+    for element in inlines:
+        kind = element.get("t")
+        content = element.get("c")
+        if kind == "Str":
+            parts.append(content)
+        elif kind in ("Space", "SoftBreak", "LineBreak"):
+            parts.append(" ")
+        elif kind in ("Code", "Math"):
+            parts.append(content[1])
+        elif kind in ("Link", "Image", "Span", "Quoted", "Cite"):
+            parts.append(stringify(content[1]))
+        elif kind in ("RawInline", "Note"):
+            continue
+        elif isinstance(content, list):
+            parts.append(stringify(content))
+
+    return "".join(parts)
+
+
+################################################################################
+class _AstCorrector:
+    """The state of the walk of the AST of a single note."""
+
+    def __init__(
+        self,
+        directory: Path,
+        remove_citations: bool,
+        attachments: Optional[list[str]],
+    ) -> None:
+        """Construct the walk of an AST.
+
+        Parameters
+        ----------
+        directory : Path
+            The directory the Org-Mode files to link to are located in.
+        remove_citations : bool
+            Whether to treat citations in double brackets as normal links.
+        attachments : Optional[list[str]]
+            The list to append the file names of attachments to, `None` to not
+            collect them.
+        """
+        self.directory = directory
+        self.remove_citations = remove_citations
+        self.attachments = attachments
+        self.citation_keys: list[str] = []
+
+    ############################################################################
+    def walk(self, value: Any) -> Any:
+        """Correct the elements contained in `value` and return the corrected
+        value.
+
+        Lists of blocks and lists of inline elements are corrected, all other
+        values are searched for such lists.
+
+        Parameters
+        ----------
+        value : Any
+            A part of the AST.
+
+        Returns
+        -------
+        Any
+            The corrected part of the AST.
+        """
+        if isinstance(value, dict):
+            if value.get("t") not in _SKIPPED_TYPES and "c" in value:
+                value["c"] = self.walk(value["c"])
+            return value
+        if not isinstance(value, list) or not value:
+            return value
+
+        kinds = {
+            element.get("t") if isinstance(element, dict) else None for element in value
+        }
+        if kinds <= _BLOCK_TYPES:
+            value = self.blocks(value)
+        elif kinds <= _INLINE_TYPES:
+            value = self.inlines(value)
+
+        return [self.walk(element) for element in value]
+
+    ############################################################################
+    def blocks(self, blocks: list[Any]) -> list[Any]:
+        """Move the tags of the sections to their headings and add angle
+        brackets to the dates of the paragraphs in `blocks`.
+
+        Parameters
+        ----------
+        blocks : list[Any]
+            The block elements of a document, list item or other container.
+
+        Returns
+        -------
+        list[Any]
+            The corrected blocks.
+        """
+        heading: Optional[dict[str, Any]] = None
+        corrected: list[Any] = []
+        for block in blocks:
+            kind = block.get("t")
+            if kind == "Header":
+                heading = block
+            elif kind in ("Para", "Plain"):
+                lines = _lines(block["c"])
+                if heading is not None and _move_tags(heading=heading, lines=lines):
+                    heading = None
+                block["c"] = [inline for line in lines for inline in _mark_date(line)]
+                if not block["c"]:
+                    continue
+            corrected.append(block)
+
+        return corrected
+
+    ############################################################################
+    def inlines(self, inlines: list[Any]) -> list[Any]:
+        """Correct the citations and wiki-style links of the inline elements
+        `inlines`.
+
+        Parameters
+        ----------
+        inlines : list[Any]
+            The inline elements.
+
+        Returns
+        -------
+        list[Any]
+            The corrected inline elements.
+        """
+        if any(inline.get("t") == "Cite" for inline in inlines):
+            inlines = self._citations(inlines)
+
+        corrected: list[Any] = []
+        run: list[Any] = []
+        for inline in inlines:
+            if inline.get("t") in _TEXT_TYPES:
+                run.append(inline)
+                continue
+            corrected.extend(self._links(run))
+            run = []
+            corrected.append(inline)
+        corrected.extend(self._links(run))
+
+        return corrected
+
+    ############################################################################
+    def _citations(self, inlines: list[Any]) -> list[Any]:
+        """Save the keys of the citations in `inlines` and replace the
+        citations in double brackets by their text, if citations are removed.
+
+        Parameters
+        ----------
+        inlines : list[Any]
+            The inline elements containing citations.
+
+        Returns
+        -------
+        list[Any]
+            The inline elements, with the `Str` elements of the citations
+            merged with the brackets around them.
+        """
+        corrected: list[Any] = []
+        for pos, inline in enumerate(inlines):
+            if inline.get("t") != "Cite":
+                corrected.append(inline)
+                continue
+            citations, content = inline["c"]
+            self.citation_keys.extend(
+                citation.get("citationId", "") for citation in citations
+            )
+            if (
+                self.remove_citations
+                and corrected
+                and corrected[-1].get("t") == "Str"
+                and corrected[-1]["c"].endswith("[")
+                and pos + 1 < len(inlines)
+                and inlines[pos + 1].get("t") == "Str"
+                and inlines[pos + 1]["c"].startswith("]")
+            ):
+                # `[[@Key]]` is parsed as `[`, the citation `[@Key]` and `]`.
+                corrected.extend(content)
+            else:
+                corrected.append(inline)
+
+        return corrected
+
+    ############################################################################
+    def _links(self, run: list[Any]) -> list[Any]:
+        """Correct the wiki-style links in the text of the `Str`, `Space` and
+        `SoftBreak` elements `run`.
+
+        Parameters
+        ----------
+        run : list[Any]
+            Consecutive text elements.
+
+        Returns
+        -------
+        list[Any]
+            The text elements, the links replaced by raw Org-Mode elements.
+        """
+        text = "".join(
+            inline["c"] if inline.get("t") == "Str" else _separator(inline)
+            for inline in run
+        )
+        if "[[" not in text:
+            return run
+
+        corrected: list[Any] = []
+        last_end = 0
+        start = text.find("[[")
+        while start != -1:
+            end = text.find("]]", start + 2)
+            if end == -1:
+                break
+            inner_start = text.rfind("[[", start, end)
+            if text.find("\n", inner_start, end) != -1:
+                start = text.find("[[", end)
+                continue
+            end += 2
+            link = text[inner_start:end]
+            org_link = resolve_links(
+                text=link, directory=self.directory, attachments=self.attachments
+            )
+            if org_link != link:
+                corrected.extend(_text_inlines(text[last_end:inner_start]))
+                corrected.append({"t": "RawInline", "c": ["org", org_link]})
+                last_end = end
+            start = text.find("[[", end)
+
+        if last_end == 0:
+            return run
+
+        corrected.extend(_text_inlines(text[last_end:]))
+        return corrected
+
+
+###############################################################################
+def _load(text: str) -> dict[str, Any]:
+    """Return the parsed JSON AST `text`.
+
+    Parameters
+    ----------
+    text : str
+        The JSON AST generated by Pandoc.
+
+    Returns
+    -------
+    dict[str, Any]
+        The document.
+
+    Raises
+    ------
+    ValueError
+        If `text` isn't a JSON AST generated by Pandoc.
+    """
+    document = json.loads(text)
+    if not isinstance(document, dict) or not isinstance(document.get("blocks"), list):
+        raise ValueError("Pandoc didn't generate a JSON AST")
+
+    return document
+
+
+###############################################################################
+def _collect_headings(value: Any, headings: list[str]) -> None:
+    """Append the headings contained in `value` to `headings`.
+
+    Parameters
+    ----------
+    value : Any
+        A part of the AST.
+    headings : list[str]
+        The headings and their `:CUSTOM_ID:` properties.
+    """
+    if isinstance(value, list):
+        for element in value:
+            _collect_headings(value=element, headings=headings)
+    elif isinstance(value, dict) and value.get("t") not in _SKIPPED_TYPES:
+        if value.get("t") == "Header":
+            level, (identifier, _, _), inlines = value["c"]
+            if identifier:
+                headings.append(
+                    f"{'*' * level} {stringify(inlines)}\n:PROPERTIES:\n"
+                    f":CUSTOM_ID: {identifier}"
+                )
+        _collect_headings(value=value.get("c"), headings=headings)
+
+
+###############################################################################
+def _lines(inlines: list[Any]) -> list[list[Any]]:
+    """Split the inline elements of a paragraph into lines.
+
+    Parameters
+    ----------
+    inlines : list[Any]
+        The inline elements of a paragraph.
+
+    Returns
+    -------
+    list[list[Any]]
+        The lines, every line but the last ends with it's `SoftBreak` or
+        `LineBreak`.
+    """
+    lines: list[list[Any]] = [[]]
+    for inline in inlines:
+        lines[-1].append(inline)
+        if inline.get("t") in _BREAK_TYPES:
+            lines.append([])
+
+    return lines
+
+
+###############################################################################
+def _line_text(line: list[Any]) -> Optional[str]:
+    """Return the text of the line `line` without it's line break.
+
+    Parameters
+    ----------
+    line : list[Any]
+        The inline elements of the line.
+
+    Returns
+    -------
+    Optional[str]
+        The text, `None` if the line contains other elements than `Str` and
+        `Space`.
+    """
+    parts: list[str] = []
+    for inline in line:
+        kind = inline.get("t")
+        if kind == "Str":
+            parts.append(inline["c"])
+        elif kind == "Space":
+            parts.append(" ")
+        elif kind not in _BREAK_TYPES:
+            return None
+
+    return "".join(parts)
+
+
+###############################################################################
+def _move_tags(heading: dict[str, Any], lines: list[list[Any]]) -> bool:
+    """Remove the first line of `lines` containing `Keywords:` and hashtags
+    and append the tags to the heading `heading`.
+
+    Parameters
+    ----------
+    heading : dict[str, Any]
+        The `Header` element of the section of the paragraph.
+    lines : list[list[Any]]
+        The lines of the paragraph, see `_lines`.
+
+    Returns
+    -------
+    bool
+        `True` if the tags have been moved to the heading.
+    """
+    for index, line in enumerate(lines):
+        text = _line_text(line)
+        if text is None or not text.startswith(_KEYWORDS):
+            continue
+        tag_list = text[len(_KEYWORDS) :].strip()
+        if not is_tag_list(text=tag_list, start=0, end=len(tag_list)):
+            continue
+
+        heading["c"][2].append(
+            {"t": "RawInline", "c": ["org", _TAG_SEPARATOR + org_tags(tag_list)]}
+        )
+        del lines[index]
+        if index > 0 and index == len(lines):
+            # The line break before the removed last line.
+            lines[-1] = lines[-1][:-1]
+        return True
+
+    return False
+
+
+###############################################################################
+def _mark_date(line: list[Any]) -> list[Any]:
+    """Return the line `line` with the date in angle brackets, if it contains
+    nothing but a date.
+
+    Parameters
+    ----------
+    line : list[Any]
+        The inline elements of the line.
+
+    Returns
+    -------
+    list[Any]
+        The line, the date replaced by a raw Org-Mode date.
+    """
+    text = _line_text(line)
+    date = date_of_line(text) if text else None
+    if date is None:
+        return line
+
+    return [{"t": "RawInline", "c": ["org", f"<{date}>"]}] + [
+        inline for inline in line if inline.get("t") in _BREAK_TYPES
+    ]
+
+
+###############################################################################
+def _separator(inline: dict[str, Any]) -> str:
+    """Return the text of the `Space` or `SoftBreak` element `inline`.
+
+    Parameters
+    ----------
+    inline : dict[str, Any]
+        The `Space` or `SoftBreak` element.
+
+    Returns
+    -------
+    str
+        A space or a newline.
+    """
+    return "\n" if inline.get("t") == "SoftBreak" else " "
+
+
+###############################################################################
+def _text_inlines(text: str) -> list[Any]:
+    """Return the text `text` as `Str`, `Space` and `SoftBreak` elements.
+
+    Parameters
+    ----------
+    text : str
+        The text, containing spaces and newlines.
+
+    Returns
+    -------
+    list[Any]
+        The elements of the text.
+    """
+    inlines: list[Any] = []
+    for line_num, line in enumerate(text.split("\n")):
+        if line_num > 0:
+            inlines.append({"t": "SoftBreak"})
+        for word_num, word in enumerate(line.split(" ")):
+            if word_num > 0:
+                inlines.append({"t": "Space"})
+            if word:
+                inlines.append({"t": "Str", "c": word})
+
+    return inlines
@@ -0,0 +1,254 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     pandoc_info.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Probe the Pandoc executable for it's version and supported features.
+
+The result of the probe is cached on disk, keyed by the path and the
+modification time of the Pandoc executable, so Pandoc is only run again if
+it has been updated.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import shutil
+from pathlib import Path
+from typing import NamedTuple
+
+from obs2org.cache import cache_directory
+from obs2org.regexp import LazyPattern
+
+# Pandoc version that added the argument `--eol`.
+_EOL_VERSION: tuple[int, ...] = (2, 0)
+
+# The name of the cache file in the cache directory.
+_CACHE_FILE_NAME = "pandoc.json"
+
+# The results of the probes of this process, keyed by the path to the Pandoc
+# executable. The value is the modification time of the executable and the
+# result of the probe.
+_probe_memo: dict[str, tuple[int, PandocInfo]] = {}
+
+# The first match group is the version of Pandoc, in the first line of the
+# output of `pandoc --version`.
+# `pandoc 3.1.2` -> `3.1.2`
+_version_regexp: LazyPattern[str] = LazyPattern(r"^\S+\s+(\d+(?:\.\d+)*)")
+
+# The first match group is the list of features of Pandoc 3.
+# `Features: +server +lua` -> `+server +lua`
+_features_regexp: LazyPattern[str] = LazyPattern(r"^Features:(.*)$", flags=re.MULTILINE)
+
+# Matches the line about Lua support of Pandoc 2.
+_scripting_regexp: LazyPattern[str] = LazyPattern(
+    r"^Scripting engine:\s*Lua", flags=re.MULTILINE
+)
+
+
+################################################################################
+class PandocInfo(NamedTuple):
+    """Class holding the path, version and capabilities of a Pandoc executable."""
+
+    executable: str
+    """The absolute path to the Pandoc executable."""
+    version: tuple[int, ...]
+    """The version of Pandoc, like `(3, 1, 2)`."""
+    lua: bool
+    """Whether Pandoc supports Lua filters."""
+    eol: bool
+    """Whether Pandoc supports the argument `--eol`."""
+
+
+###############################################################################
+def probe_pandoc(pandoc: str) -> PandocInfo:
+    """Return the version and capabilities of the Pandoc executable `pandoc`.
+
+    Pandoc is only executed if the cached result doesn't match the path and
+    modification time of the executable. The result is also kept in memory, so
+    a long running process reads the cache only once.
+
+    Parameters
+    ----------
+    pandoc : str
+        The path to the Pandoc executable or the name of the executable if it
+        is in the PATH.
+
+    Returns
+    -------
+    PandocInfo
+        The version and capabilities of the Pandoc executable.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the Pandoc executable has not been found.
+    subprocess.SubprocessError
+        If the Pandoc executable does not work.
+    """
+    found_exe = shutil.which(pandoc)
+    if found_exe is None:
+        raise FileNotFoundError(f"'{pandoc}' not found")
+    executable = str(Path(found_exe).resolve())
+    mtime_ns = Path(executable).stat().st_mtime_ns
+
+    memo = _probe_memo.get(executable)
+    if memo is not None and memo[0] == mtime_ns:
+        return memo[1]
+
+    cache = _read_cache()
+    cached = cache.get(executable)
+    info = None
+    if cached is not None and cached.get("mtime_ns") == mtime_ns:
+        try:
+            info = _info_from_json(executable=executable, json_info=cached)
+        except (KeyError, TypeError, ValueError):
+            pass
+
+    if info is None:
+        info = _run_probe(executable=executable)
+        cache[executable] = _info_to_json(info=info, mtime_ns=mtime_ns)
+        _write_cache(cache=cache)
+
+    _probe_memo[executable] = (mtime_ns, info)
+
+    return info
+
+
+###############################################################################
+def _run_probe(executable: str) -> PandocInfo:
+    """Run Pandoc to get it's version and capabilities.
+
+    Parameters
+    ----------
+    executable : str
+        The absolute path to the Pandoc executable.
+
+    Returns
+    -------
+    PandocInfo
+        The version and capabilities of the Pandoc executable.
+
+    Raises
+    ------
+    subprocess.SubprocessError
+        If the Pandoc executable does not work.
+    """
+    import subprocess  # nosec B404 pylint: disable=import-outside-toplevel
+
+    version_out = subprocess.run(
+        args=[executable, "--version"],
+        check=False,
+        shell=False,  # nosec
+        encoding="utf-8",
+        capture_output=True,
+    )
+    version_match = _version_regexp.match(version_out.stdout)
+    if version_out.returncode != 0 or version_match is None:
+        raise subprocess.SubprocessError(
+            version_out.stderr.strip() or "unknown output of '--version'"
+        )
+
+    version = tuple(int(part) for part in version_match.group(1).split("."))
+    features_match = _features_regexp.search(version_out.stdout)
+    features = features_match.group(1).split() if features_match is not None else []
+
+    return PandocInfo(
+        executable=executable,
+        version=version,
+        lua="+lua" in features
+        or _scripting_regexp.search(version_out.stdout) is not None,
+        eol=version >= _EOL_VERSION,
+    )
+
+
+###############################################################################
+def _info_to_json(info: PandocInfo, mtime_ns: int) -> dict[str, object]:
+    """Return the JSON representation of `info` to save to the cache.
+
+    Parameters
+    ----------
+    info : PandocInfo
+        The Pandoc information to save.
+    mtime_ns : int
+        The modification time of the Pandoc executable.
+
+    Returns
+    -------
+    dict[str, object]
+        The JSON object to save to the cache.
+    """
+    return {
+        "mtime_ns": mtime_ns,
+        "version": list(info.version),
+        "lua": info.lua,
+        "eol": info.eol,
+    }
+
+
+###############################################################################
+def _info_from_json(executable: str, json_info: dict[str, object]) -> PandocInfo:
+    """Return the `PandocInfo` read from the cache.
+
+    Parameters
+    ----------
+    executable : str
+        The absolute path to the Pandoc executable.
+    json_info : dict[str, object]
+        The JSON object read from the cache.
+
+    Returns
+    -------
+    PandocInfo
+        The version and capabilities of the Pandoc executable.
+    """
+    return PandocInfo(
+        executable=executable,
+        version=tuple(int(part) for part in json_info["version"]),  # type: ignore
+        lua=bool(json_info["lua"]),
+        eol=bool(json_info["eol"]),
+    )
+
+
+###############################################################################
+def _read_cache() -> dict[str, dict[str, object]]:
+    """Return the content of the cache file, the empty dictionary if there is
+    no cache file or it can't be read.
+
+    Returns
+    -------
+    dict[str, dict[str, object]]
+        The cached Pandoc information, keyed by the path to the executable.
+    """
+    try:
+        with (cache_directory() / _CACHE_FILE_NAME).open(
+            mode="r", encoding="utf-8"
+        ) as f_d:
+            cache = json.load(f_d)
+    except (OSError, ValueError):
+        return {}
+
+    return cache if isinstance(cache, dict) else {}
+
+
+###############################################################################
+def _write_cache(cache: dict[str, dict[str, object]]) -> None:
+    """Write `cache` to the cache file, errors are ignored.
+
+    Parameters
+    ----------
+    cache : dict[str, dict[str, object]]
+        The Pandoc information to save, keyed by the path to the executable.
+    """
+    cache_file = cache_directory() / _CACHE_FILE_NAME
+    tmp_file = cache_file.with_name(cache_file.name + "~")
+    try:
+        cache_file.parent.mkdir(exist_ok=True, parents=True)
+        with tmp_file.open(mode="w", encoding="utf-8") as f_d:
+            json.dump(cache, f_d)
+        tmp_file.replace(cache_file)
+    except OSError:
+        pass
@@ -14,91 +14,38 @@ from __future__ import annotations
 
 import re
 from pathlib import Path, PurePath
-from typing import Match, Tuple
-from uuid import uuid4
-
-# The first match group is the filename without suffix, the second match group
-# is the header name in the file to link to.
-# Not matching files with suffixes.
-# `[[file#Heading]]` -> `file.org`, `#Heading`
-_internal_wikilink_regexp: re.Pattern[str] = re.compile(
-    r"\[\[(?!https?|ftp|file|cite|.*\.\w+)(\S[^\[\]]*)#(\S[^\[\]]*?)(?:\|.*)?\]\]"
-)
-
-# The first match group is the filename without suffix.
-# `[[Heading]]` -> `Heading.org`, `#Heading`
-# Not converting files with suffixes: `[[File.sfx]]`
-# Not converting links starting with `http`, `https` or `ftp`
-# `[[http://not/converted]]`
-_internal_wikilink_regexp_file_only: re.Pattern[str] = re.compile(
-    r"\[\[(?!\*|https?|ftp|file|cite|[^\[\]]*\.[^В\s]+\])\s*([^#|\[\]]*)\s*\]\]"
-)
-
-# The first match group is the heading to link to.
-# `[[#Heading]]` -> `#Heading`
-_internal_wikilink_same_doc_regexp: re.Pattern[str] = re.compile(
-    r"\[\[\s*#\s*([^#|\[\]]*)\s*\]\]"
-)
-
-# The first ,match group is the filename, the second the link's caption.
-# `[[file|Caption]]` -> `file`, `#Caption`
-# Not matching files with a suffix.
-_internal_wikilink_named_regexp: re.Pattern[str] = re.compile(
-    r"\[\[(?!#)(?!.*\.\w+)(\S[^\[\]]*?)(?:#\^?\w+)?(?:#page=\d+)?\|(?:\S[^\[\]]*)\]\]"
-)
-
-# The first, match group is the heading to link to.
-# `[[#Caption]]` -> `[[*Caption]]`
-# Not matching files with a suffix.
-_internal_header_named_regexp: re.Pattern[str] = re.compile(
-    r"\[\[(?!.*\.\w+)(#\w[^\[\]]*?)(?:#\^?\w+)?(?:#page=\d+)?\|(\S[^\[\]]*)\]\]"
-)
-
-# The first ,match group is the filename, the second the link's caption.
-# `[[file.sfx|Caption]]` -> `file.sfx`, `#Caption`
-_file_wikilink_named_regexp: re.Pattern[str] = re.compile(
-    r"\[\[(?!#)(\S[^\[\]]*?\.\w+)(?:#\^?\w+)?(?:#page=\d+)?\|(\S[^\[\]]*)\]\]"
-)
-
-# The first ,match group is the filename, the second the link's caption.
-# `[[file.sfx]]` -> `file.sfx`
-_file_wikilink_regexp: re.Pattern[str] = re.compile(
-    r"\[\[(?!#|(?:file|http[s]?|ftp|zotero|cite:))(\S[^\[\]]*?\.[^В\s]+?)(?:#\^?\w+)?(?:#page=\d+)?\]\]"
-)
+from typing import Optional, Tuple
 
-# Date regexp, to get all variants of year, month and day placements and the
-# delimiters between them. Date must be on a line of it's own.
-_date_regexp: re.Pattern[str] = re.compile(
-    r"^\s*(\d{1,4}[0-9.,/\\ -]\d{1,4}[0-9.,/\\ -]\d{1,4})\s*$", flags=re.MULTILINE
-)
-
-# Tag regexp, that captures the heading in the first match group, the list of
-# tags in the third match group and anything in between in the second match
-#  group.
-_tag_regexp: re.Pattern[str] = re.compile(
-    r"^(\s*\*{1,}\s[^\n]{1,})$([^*]*?)^\s*Keywords:\s*((?:#\S[^\n#,]*,?[^\S\n]*){1,})$",
-    flags=re.MULTILINE,
-)
+from obs2org import org_scanner
+from obs2org.heading_index import heading_text
+from obs2org.org_scanner import ScanMatch
+from obs2org.regexp import LazyPattern
 
 # Regexp to convert a comma separated list of hash-tags to Org-Mode style
-# tags.
-_tag_convert_regex = re.compile(r"(?:^\s*#)|(?:\s*,\s*#)|(?:$)")
+# tags. The comma separator only starts at the start of a run of whitespace,
+# the same match starting inside the run would take quadratic time to fail.
+_tag_convert_regex = LazyPattern(r"(?:^\s*#)|(?:(?<!\s)\s*,\s*#)|(?:$)")
 
 
 # Regexp to remove all characters from a tag, that Org-Mode doesn't like.
-_tag_remove_special_regex = re.compile(r"[^\w:]")
-
-# Contains the actual link (including the '@') the the first match group.
-# `[[cite:@Link]]` -> `@Link`
-_cite_regex: re.Pattern[str] = re.compile(r"\[\[\s*cite:(@.*?)\s*\]\]")
+_tag_remove_special_regex = LazyPattern(r"[^\w:]")
 
 # Pattern to match an Org-Roam file header.
-_header_regex: re.Pattern[str] = re.compile(
+_header_regex: LazyPattern[str] = LazyPattern(
     r"^\s*:PROPERTIES:\s*\n\s*:ID:\s*\S+\s*\n\s*:END:"
 )
 
+# Matches the keywords at the start of the file, up to and including the last
+# keyword line, like the `#+title:` and `#+author:` lines Pandoc generates.
+_keyword_header_regex: LazyPattern[str] = LazyPattern(
+    r"(?:[^\S\n]*\n|#\+[^\n]*\n)*#\+[^\n]*\n?"
+)
+
+# The keys of the front matter Pandoc converts to Org-Mode keywords itself.
+_PANDOC_FRONT_MATTER_KEYS = ("title", "author", "date", "subtitle")
+
 # Pattern to match the beginning of the file.
-_start_of_file_regex: re.Pattern[str] = re.compile(r"^")
+_start_of_file_regex: LazyPattern[str] = LazyPattern(r"^")
 
 
 ###############################################################################
@@ -107,6 +54,8 @@ def correct_org_mode_file(
     directory: Path,
     remove_citations: bool,
     add_uuid: bool,
+    attachments: Optional[list[str]] = None,
+    front_matter: Optional[dict[str, list[str]]] = None,
 ) -> str:
     """Parse Org-Mode formatted text and correct wiki-style links, tags and
     date strings.
@@ -126,6 +75,12 @@ def correct_org_mode_file(
         or not.
     add_uuid : bool
         Whether to add an UUID-header to each file.
+    attachments : Optional[list[str]], optional
+        If this is not `None`, the file names of all links to attachments,
+        like `image.png` of `[[image.png]]`, are appended to this list.
+    front_matter : Optional[dict[str, list[str]]], optional
+        The YAML front matter of the Markdown file. If this is not `None`, the
+        keys that Pandoc ignores are added as Org-Mode keywords.
 
     Returns
     -------
@@ -134,14 +89,91 @@ def correct_org_mode_file(
     """
     corrected_tags = _correct_org_mode_tags(text=text)
     corrected_dates = _correct_org_mode_date(text=corrected_tags)
-    if add_uuid:
-        corrected_dates = _add_uuid_header(text=corrected_dates)
+    corrected_dates = add_file_header(
+        text=corrected_dates, add_uuid=add_uuid, front_matter=front_matter
+    )
     if remove_citations:
         corrected_dates = _remove_pandoc_citations(text=corrected_dates)
-    corrected_links = _correct_org_mode_links(text=corrected_dates, directory=directory)
+    corrected_links = _correct_org_mode_links(
+        text=corrected_dates, directory=directory, attachments=attachments
+    )
     return corrected_links
 
 
+###############################################################################
+def resolve_links(
+    text: str, directory: Path, attachments: Optional[list[str]] = None
+) -> str:
+    """Correct the wiki-style links in `text`, without touching tags, dates or
+    citations.
+
+    Parameters
+    ----------
+    text : str
+        The Org-Mode text containing the links to correct.
+    directory : Path
+        The directory the Org-Mode files to link to are located in.
+    attachments : Optional[list[str]], optional
+        If this is not `None`, the file names of all links to attachments are
+        appended to this list.
+
+    Returns
+    -------
+    str
+        The text with working links, see `_correct_org_mode_links`.
+    """
+    return _correct_org_mode_links(
+        text=text, directory=directory, attachments=attachments
+    )
+
+
+###############################################################################
+def add_file_header(
+    text: str, add_uuid: bool, front_matter: Optional[dict[str, list[str]]]
+) -> str:
+    """Add the keywords of the front matter and the Org-Roam UUID header to
+    the Org-Mode text `text`.
+
+    Parameters
+    ----------
+    text : str
+        The Org-Mode text generated by Pandoc.
+    add_uuid : bool
+        Whether to add an UUID-header, if the text doesn't already have one.
+    front_matter : Optional[dict[str, list[str]]]
+        The YAML front matter of the Markdown file. If this is not `None`, the
+        keys that Pandoc ignores are added as Org-Mode keywords.
+
+    Returns
+    -------
+    str
+        The text with the added header.
+    """
+    if front_matter:
+        text = _add_front_matter(text=text, front_matter=front_matter)
+    if add_uuid:
+        text = _add_uuid_header(text=text)
+    return text
+
+
+###############################################################################
+def org_tags(tag_list: str) -> str:
+    """Return the list of hashtags `tag_list` as Org-Mode tags.
+
+    Parameters
+    ----------
+    tag_list : str
+        The hashtags, like `#tag1, #tag2`.
+
+    Returns
+    -------
+    str
+        The Org-Mode tags, like `:tag1:tag2:`.
+    """
+    tags = _tag_convert_regex.sub(repl=r":", string=tag_list)
+    return _tag_remove_special_regex.sub(repl=r"", string=tags)
+
+
 ###############################################################################
 def _correct_org_mode_tags(text: str) -> str:
     """Convert the hashtags of `text` to Org-Mode tags.
@@ -176,7 +208,7 @@ def _correct_org_mode_tags(text: str) -> str:
       :CUSTOM_ID: heading
       :END:
     """
-    return _tag_regexp.sub(repl=_tag_replace_func, string=text)
+    return org_scanner.sub(scanner=org_scanner.tags, repl=_tag_replace_func, text=text)
 
 
 ###############################################################################
@@ -200,7 +232,54 @@ def _correct_org_mode_date(text: str) -> str:
     --------
     `2021-05-28` is replaced by `<2021-05-28>`.
     """
-    return _date_regexp.sub(r"<\1>", text)
+    return org_scanner.sub(scanner=org_scanner.dates, repl=r"<\1>", text=text)
+
+
+###############################################################################
+def _add_front_matter(text: str, front_matter: dict[str, list[str]]) -> str:
+    """Add the keys of the YAML front matter Pandoc ignores as Org-Mode
+    keywords after the keywords Pandoc generated.
+
+    `tags` are added as `#+filetags:`, every other key `key` as `#+key:`
+    with the values separated by spaces. Keys without a value are ignored.
+
+    Parameters
+    ----------
+    text : str
+        The Org-Mode text generated by Pandoc.
+    front_matter : dict[str, list[str]]
+        The front matter of the Markdown file.
+
+    Returns
+    -------
+    str
+        The text with the added keywords.
+    """
+    keywords: list[str] = []
+    for key, values in front_matter.items():
+        if key.lower() in _PANDOC_FRONT_MATTER_KEYS or not values:
+            continue
+        if key.lower() == "tags":
+            tags = [
+                _tag_remove_special_regex.sub(
+                    repl="", string=value.replace(" ", "_").replace(":", "_")
+                )
+                for value in values
+            ]
+            if any(tags):
+                keywords.append(f"#+filetags: :{':'.join(tag for tag in tags if tag)}:")
+        else:
+            keywords.append(f"#+{key}: {' '.join(values)}")
+    if not keywords:
+        return text
+
+    header_end = _keyword_header_regex.match(text)
+    insert_at = header_end.end() if header_end is not None else 0
+    separator = (
+        "\n" if insert_at > 0 and text[insert_at - 1 : insert_at] != "\n" else ""
+    )
+
+    return text[:insert_at] + separator + "\n".join(keywords) + "\n" + text[insert_at:]
 
 
 ###############################################################################
@@ -224,6 +303,8 @@ def _add_uuid_header(text: str) -> str:
     """
     if _header_regex.match(string=text):
         return text
+    from uuid import uuid4  # pylint: disable=import-outside-toplevel
+
     uuid_string = f":PROPERTIES:\n:ID: {uuid4()}\n:END:\n"
     with_header = _start_of_file_regex.sub(repl=f"{uuid_string}\n", string=text)
     return with_header
@@ -243,12 +324,14 @@ def _remove_pandoc_citations(text: str) -> str:
     str
         The file content with removed `cite:` prefixes in links.
     """
-    no_cites = _cite_regex.sub(repl=r"[[\1]]", string=text)
+    no_cites = org_scanner.sub(scanner=org_scanner.citations, repl=r"[[\1]]", text=text)
     return no_cites
 
 
 ###############################################################################
-def _correct_org_mode_links(text: str, directory: Path) -> str:
+def _correct_org_mode_links(
+    text: str, directory: Path, attachments: Optional[list[str]] = None
+) -> str:
     """Correct wiki-style links in the Org-Mode text.
 
     Search for links to headings in other Org-Mode files and replace
@@ -260,6 +343,9 @@ def _correct_org_mode_links(text: str, directory: Path) -> str:
         The Org-Mode text to parse and correct.
     directory : Path
         The directory the Org-Mode files to link to are located in.
+    attachments : Optional[list[str]], optional
+        If this is not `None`, the file names of all links to attachments are
+        appended to this list.
 
     Returns
     -------
@@ -283,65 +369,111 @@ def _correct_org_mode_links(text: str, directory: Path) -> str:
     `[[#Heading]]` is changed to
     `[[*Heading]]`
     """
-    first_pass = _internal_wikilink_regexp.sub(
+    first_pass = org_scanner.sub(
+        scanner=org_scanner.internal_wikilinks,
         repl=lambda match_obj: _link_replace_func(
             match_obj=match_obj, directory=directory
         ),
-        string=text,
+        text=text,
     )
-    second_pass = _internal_wikilink_same_doc_regexp.sub(
-        repl=r"[[*\1]]", string=first_pass
+    second_pass = org_scanner.sub(
+        scanner=org_scanner.same_document_links, repl=r"[[*\1]]", text=first_pass
     )
 
-    third_pass = _internal_wikilink_named_regexp.sub(
+    third_pass = org_scanner.sub(
+        scanner=org_scanner.named_wikilinks,
         repl=lambda match_obj: _link_replace_func(
             match_obj=match_obj, directory=directory
         ),
-        string=second_pass,
+        text=second_pass,
     )
 
-    fourth_pass = _file_wikilink_named_regexp.sub(repl=r"[[\1][\2]]", string=third_pass)
+    fourth_pass = org_scanner.sub(
+        scanner=org_scanner.named_file_links,
+        repl=lambda match_obj: _file_link_replace_func(
+            match_obj=match_obj, template=r"[[\1][\2]]", attachments=attachments
+        ),
+        text=third_pass,
+    )
 
-    fifth_pass = _file_wikilink_regexp.sub(repl=r"[[file:\1]]", string=fourth_pass)
+    fifth_pass = org_scanner.sub(
+        scanner=org_scanner.file_links,
+        repl=lambda match_obj: _file_link_replace_func(
+            match_obj=match_obj, template=r"[[file:\1]]", attachments=attachments
+        ),
+        text=fourth_pass,
+    )
 
-    sixth_pass = _internal_header_named_regexp.sub(
-        repl=r"[[\1][\2]]", string=fifth_pass
+    sixth_pass = org_scanner.sub(
+        scanner=org_scanner.named_heading_links, repl=r"[[\1][\2]]", text=fifth_pass
     )
 
-    return _internal_wikilink_regexp_file_only.sub(
+    return org_scanner.sub(
+        scanner=org_scanner.file_only_links,
         repl=lambda match_obj: _link_replace_func(
             match_obj=match_obj, directory=directory
         ),
-        string=sixth_pass,
+        text=sixth_pass,
     )
 
 
 ###############################################################################
-def _tag_replace_func(match_obj: Match[str]) -> str:
-    """Return the `_tag_regexp` matches in the correct Org-Mode tag format.
+def _tag_replace_func(match_obj: ScanMatch) -> str:
+    """Return the `org_scanner.tags` matches in the correct Org-Mode tag format.
 
     Parameters
     ----------
-    match_obj : Match[str]
-        The `Match` object containing the 3 match groups of
-        `_tag_regexp`.
+    match_obj : ScanMatch
+        The match of `org_scanner.tags` containing the 3 match groups.
 
     Returns
     -------
     str
         The Org-Mode formatted replaced tags in the heading.
     """
-    tags = _tag_convert_regex.sub(repl=r":", string=match_obj.group(3))
     return (
         match_obj.group(1)
         + "\t\t\t"
-        + _tag_remove_special_regex.sub(repl=r"", string=tags)
+        + org_tags(match_obj.group(3))
         + match_obj.group(2)
     )
 
 
 ###############################################################################
-def _link_replace_func(match_obj: Match[str], directory: Path) -> str:
+def _file_link_replace_func(
+    match_obj: ScanMatch, template: str, attachments: Optional[list[str]]
+) -> str:
+    """Return the Org-Mode link to the file matched by `match_obj` and add the
+    file name to `attachments`.
+
+    Parameters
+    ----------
+    match_obj : ScanMatch
+        The match object of a link to a file, the first match group is the
+        file name.
+    template : str
+        The replacement template for `match_obj.expand`.
+    attachments : Optional[list[str]]
+        The list to append the file name to, nothing is appended if this is
+        `None`.
+
+    Returns
+    -------
+    str
+        The Org-Mode link to the file.
+    """
+    if attachments is not None:
+        # The link `[[file][Caption]]` of the named link pass is matched again
+        # by `org_scanner.file_links`, if the caption contains no spaces. The
+        # suffix of the file name may contain brackets, so the match's file
+        # name is `file][Caption`.
+        attachments.append(match_obj.group(1).split("][", maxsplit=1)[0])
+
+    return match_obj.expand(template)
+
+
+###############################################################################
+def _link_replace_func(match_obj: ScanMatch, directory: Path) -> str:
     """Search for the Org-Mode id of the given heading and replace that in
     the link.
 
@@ -352,8 +484,8 @@ def _link_replace_func(match_obj: Match[str], directory: Path) -> str:
 
     Parameters
     ----------
-    match_obj : Match[str]
-        The `Match` object holding the filename and the heading
+    match_obj : ScanMatch
+        The match holding the filename and the heading
         name without special characters.
     directory : Path
         The directory the Org-Mode files to link to are located in.
@@ -399,6 +531,7 @@ def _link_replace_func(match_obj: Match[str], directory: Path) -> str:
 def _parse_linkedfile(file_name: Path, heading_name: str) -> Tuple[str, str]:
     """Parse the Org-Mode file at `file_name` for the id of the given heading.
 
+    Only the headings of the file are searched, see `heading_text`.
     Return a tuple of strings `header_link`, `heading_name` with the
     id and the full name of the heading. If the heading has not been
     found, the id is the empty string `""` and heading_name is not the
@@ -419,14 +552,12 @@ def _parse_linkedfile(file_name: Path, heading_name: str) -> Tuple[str, str]:
     """
     heading_name_regexp = heading_name.strip()
 
-    with file_name.open(mode="r", encoding="utf-8") as f_d:
-        file_text = f_d.read()
-        header_link, heading_name = _parse_text_for_heading(
-            text=file_text,
-            file_name=file_name,
-            heading_name_regexp=heading_name_regexp,
-            heading_name=heading_name,
-        )
+    header_link, heading_name = _parse_text_for_heading(
+        text=heading_text(file_name=file_name),
+        file_name=file_name,
+        heading_name_regexp=heading_name_regexp,
+        heading_name=heading_name,
+    )
 
     return header_link, heading_name
 
@@ -0,0 +1,247 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     plan.py
+# Date:     19.10.2026
+# ===============================================================================
+"""The dry-run planner of `--plan` and the records of earlier runs it uses.
+
+Every conversion saves the size and modification time of each converted
+Markdown file in `.obs2org/manifest.json` and the number of bytes converted
+per second in `.obs2org/stats.json` in the output directory. `--plan` compares
+the Markdown files to the manifest to find the changed ones and estimates the
+duration of the conversion using the throughput of the earlier runs.
+"""
+
+from __future__ import annotations
+
+import json
+import statistics
+from os import path
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple, Optional, Union
+
+from obs2org.state import relative_out_path, state_directory
+
+if TYPE_CHECKING:
+    from obs2org.file_table import FileTable
+
+# The name of the manifest file in the state directory.
+_MANIFEST_FILE_NAME = "manifest.json"
+
+# The name of the statistics file in the state directory.
+_STATS_FILE_NAME = "stats.json"
+
+# The number of earlier runs to keep in the statistics file.
+_MAX_RUNS = 10
+
+
+################################################################################
+class Plan(NamedTuple):
+    """Class holding the work a conversion would do."""
+
+    files: int
+    """The number of Markdown files to convert and correct."""
+    bytes: int
+    """The size of all Markdown files to convert."""
+    new: int
+    """The number of files that have not been converted before."""
+    changed: int
+    """The number of files that changed since they have been converted."""
+    changed_bytes: int
+    """The size of the new and changed files."""
+    unchanged: int
+    """The number of files whose Org-Mode file doesn't change."""
+    estimate: Optional[float]
+    """The estimated duration in seconds, `None` if there are no earlier runs."""
+    runs: int
+    """The number of earlier runs the estimate is based on."""
+
+
+###############################################################################
+def make_plan(files: FileTable, out_path: Union[str, Path]) -> Plan:
+    """Return the work converting the files in `files` would do.
+
+    Parameters
+    ----------
+    files : FileTable
+        The files to convert.
+    out_path : Union[str, Path]
+        The output directory.
+
+    Returns
+    -------
+    Plan
+        The work the conversion would do.
+    """
+    manifest = _read_json(state_directory(out_path) / _MANIFEST_FILE_NAME)
+    total_bytes = 0
+    new = 0
+    changed = 0
+    changed_bytes = 0
+    for index in files.indices():
+        size = files.size(index)
+        total_bytes += size
+        out_file = files.out_file(index)
+        entry = manifest.get(relative_out_path(out_file=out_file, out_path=out_path))
+        if entry is None or not path.exists(out_file):
+            new += 1
+            changed_bytes += size
+        elif entry != [size, files.mtime_ns(index)]:
+            changed += 1
+            changed_bytes += size
+
+    stats = _read_json(state_directory(out_path) / _STATS_FILE_NAME)
+    throughputs = [
+        run["bytes"] / run["seconds"]
+        for run in stats.get("runs", [])
+        if isinstance(run, dict) and run.get("seconds", 0) > 0
+    ]
+    estimate = None
+    if throughputs:
+        estimate = total_bytes / statistics.median(throughputs)
+
+    return Plan(
+        files=len(files),
+        bytes=total_bytes,
+        new=new,
+        changed=changed,
+        changed_bytes=changed_bytes,
+        unchanged=len(files) - new - changed,
+        estimate=estimate,
+        runs=len(throughputs),
+    )
+
+
+###############################################################################
+def print_plan(plan: Plan, out_path: Union[str, Path]) -> None:
+    """Print the plan `plan`.
+
+    Parameters
+    ----------
+    plan : Plan
+        The plan to print.
+    out_path : Union[str, Path]
+        The output directory.
+    """
+    print(f"Plan for converting to '{out_path}':")
+    print(f"  convert and correct: {plan.files} files, {_format_bytes(plan.bytes)}")
+    print(
+        f"  new or changed:      {plan.new + plan.changed} files,"
+        f" {_format_bytes(plan.changed_bytes)} ({plan.new} new)"
+    )
+    print(f"  unchanged:           {plan.unchanged} files")
+    if plan.estimate is None:
+        print("  estimated duration:  unknown, no earlier runs recorded")
+    else:
+        print(
+            f"  estimated duration:  {plan.estimate:.1f} s"
+            f" (from {plan.runs} earlier runs)"
+        )
+
+
+###############################################################################
+def record_run(files: FileTable, out_path: Union[str, Path], seconds: float) -> None:
+    """Save the state of the converted Markdown files in the manifest and the
+    throughput of this run in the statistics, for later `--plan` runs.
+
+    Errors writing the files are ignored.
+
+    Parameters
+    ----------
+    files : FileTable
+        The converted files, with their size and modification time before
+        the conversion.
+    out_path : Union[str, Path]
+        The output directory.
+    seconds : float
+        The duration of the conversion in seconds.
+    """
+    state_dir = state_directory(out_path)
+    manifest = _read_json(state_dir / _MANIFEST_FILE_NAME)
+    total_bytes = 0
+    for index in files.indices():
+        total_bytes += files.size(index)
+        manifest[
+            relative_out_path(out_file=files.out_file(index), out_path=out_path)
+        ] = [
+            files.size(index),
+            files.mtime_ns(index),
+        ]
+
+    stats = _read_json(state_dir / _STATS_FILE_NAME)
+    runs = [run for run in stats.get("runs", []) if isinstance(run, dict)]
+    runs.append({"files": len(files), "bytes": total_bytes, "seconds": seconds})
+    stats["runs"] = runs[-_MAX_RUNS:]
+
+    _write_json(state_dir / _MANIFEST_FILE_NAME, manifest)
+    _write_json(state_dir / _STATS_FILE_NAME, stats)
+
+
+###############################################################################
+def _format_bytes(size: int) -> str:
+    """Return the size `size` in bytes in a human readable form.
+
+    Parameters
+    ----------
+    size : int
+        The size in bytes.
+
+    Returns
+    -------
+    str
+        The size, like `1.2 MB`.
+    """
+    value = float(size)
+    for unit in ("B", "kB", "MB"):
+        if value < 1000:
+            return f"{value:.1f} {unit}" if unit != "B" else f"{size} B"
+        value /= 1000
+
+    return f"{value:.1f} GB"
+
+
+###############################################################################
+def _read_json(file_path: Path) -> dict[str, Any]:
+    """Return the JSON object in the file `file_path`, the empty dictionary if
+    the file doesn't exist or can't be parsed.
+
+    Parameters
+    ----------
+    file_path : Path
+        The path to the JSON file.
+
+    Returns
+    -------
+    dict[str, Any]
+        The JSON object of the file.
+    """
+    try:
+        with file_path.open(mode="r", encoding="utf-8") as f_d:
+            content = json.load(f_d)
+    except (OSError, ValueError):
+        return {}
+
+    return content if isinstance(content, dict) else {}
+
+
+###############################################################################
+def _write_json(file_path: Path, content: dict[str, Any]) -> None:
+    """Write `content` to the JSON file `file_path`, errors are ignored.
+
+    Parameters
+    ----------
+    file_path : Path
+        The path to the JSON file.
+    content : dict[str, Any]
+        The JSON object to write.
+    """
+    tmp_file = file_path.with_name(file_path.name + "~")
+    try:
+        file_path.parent.mkdir(exist_ok=True, parents=True)
+        with tmp_file.open(mode="w", encoding="utf-8") as f_d:
+            json.dump(content, f_d)
+        tmp_file.replace(file_path)
+    except OSError:
+        pass
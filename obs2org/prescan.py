@@ -0,0 +1,256 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     prescan.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Scans the Markdown files before they are converted, to know which other
+notes they link to, their size, tags and YAML front matter.
+
+Every file is read once, as bytes, and scanned by a single regexp matching
+wiki-links and hashtags. Only the front matter and the matched tokens are
+decoded.
+"""
+
+from __future__ import annotations
+
+import re
+from os import path
+from pathlib import Path
+from typing import NamedTuple
+
+from obs2org.regexp import LazyPattern
+
+# The tokenizer of the Markdown files. The first match group is the target of
+# a wiki-link, without the heading and caption parts, the second match group
+# is a hashtag without the `#`.
+# `[[file#Heading|Caption]]` -> `file`
+# `text #tag/subtag` -> `tag/subtag`
+_token_regexp: LazyPattern[bytes] = LazyPattern(
+    rb"\[\[([^\[\]|#\n]*)|(?<![^\s(])#([^\s#\[\](){},;:!?\"'`]+)"
+)
+
+# Matches the YAML front matter at the start of the file, the first match
+# group is the YAML text.
+_front_matter_regexp: LazyPattern[bytes] = LazyPattern(
+    rb"\A(?:\xef\xbb\xbf)?---[^\S\n]*\r?\n(.*?)^(?:---|\.\.\.)[^\S\n]*$",
+    flags=re.MULTILINE | re.DOTALL,
+)
+
+# Matches a line `key: value` of the front matter. The first match group is
+# the key, the second the value.
+_yaml_key_regexp: LazyPattern[str] = LazyPattern(r"^([^\s:#-][^:]*?):(?:\s+(.*?))?\s*$")
+
+# Matches a list item `  - value` of the front matter, the first match group is
+# the value.
+_yaml_item_regexp: LazyPattern[str] = LazyPattern(r"^\s+-\s+(.*?)\s*$")
+
+# Matches the URL schemes of link targets that aren't notes, like the link
+# scanners of `obs2org.org_scanner` do.
+# `https://some.com/link`
+_url_regexp: LazyPattern[str] = LazyPattern(
+    r"^\s*(?:https?|ftp|file|zotero|cite):", flags=re.IGNORECASE
+)
+
+
+################################################################################
+class NoteRecord(NamedTuple):
+    """Class holding the information about a Markdown file gathered by the
+    pre-scan.
+    """
+
+    size: int
+    """The size of the Markdown file in bytes."""
+    links: frozenset[str]
+    """The targets of the wiki-links, see `scan_note`."""
+    tags: frozenset[str]
+    """The inline hashtags, without the `#`."""
+    front_matter: dict[str, list[str]]
+    """The keys and values of the YAML front matter, every value is a list."""
+
+
+###############################################################################
+def scan_note(in_file: Path) -> NoteRecord:
+    """Scan the Markdown file `in_file` for it's front matter, wiki-links and
+    hashtags.
+
+    The link targets are the link texts before any heading or caption, like
+    they are used to build the path of the Org-Mode file the link points to.
+    Links to headings in the same file, citations like `[[@Key]]`, URLs like
+    `[[https://some.com]]` and links to attachments like `[[image.png]]` are
+    ignored, a `.md` suffix is removed. Hashtags consisting only of digits
+    aren't tags, like in Obsidian.
+
+    Parameters
+    ----------
+    in_file : Path
+        The path to the Markdown file to scan.
+
+    Returns
+    -------
+    NoteRecord
+        The information about the Markdown file.
+    """
+    with in_file.open(mode="rb") as f_d:
+        data = f_d.read()
+
+    return scan_markdown(data)
+
+
+###############################################################################
+def scan_markdown(data: bytes) -> NoteRecord:
+    """Scan the content `data` of a Markdown file for it's front matter,
+    wiki-links and hashtags, see `scan_note`.
+
+    Parameters
+    ----------
+    data : bytes
+        The UTF-8 encoded content of the Markdown file.
+
+    Returns
+    -------
+    NoteRecord
+        The information about the Markdown file.
+    """
+    front_matter: dict[str, list[str]] = {}
+    start = 0
+    front_match = _front_matter_regexp.match(data)
+    if front_match is not None:
+        front_matter = parse_front_matter(
+            text=front_match.group(1).decode(encoding="utf-8", errors="replace")
+        )
+        start = front_match.end()
+
+    links: set[str] = set()
+    tags: set[str] = set()
+    for match in _token_regexp.finditer(data, start):
+        if match.group(1) is not None:
+            target = _note_target(
+                match.group(1).decode(encoding="utf-8", errors="replace").strip()
+            )
+            if target:
+                links.add(target)
+        else:
+            tag = match.group(2).decode(encoding="utf-8", errors="replace")
+            tag = tag.rstrip(".")
+            if tag and not tag.isdigit():
+                tags.add(tag)
+
+    return NoteRecord(
+        size=len(data),
+        links=frozenset(links),
+        tags=frozenset(tags),
+        front_matter=front_matter,
+    )
+
+
+###############################################################################
+def parse_front_matter(text: str) -> dict[str, list[str]]:
+    """Parse the simple YAML of a front matter.
+
+    Only the YAML used in the front matter of notes is supported: top level
+    keys with a single value, a flow list `[a, b]` or a block list of items
+    `- a`. Everything else is ignored.
+
+    Parameters
+    ----------
+    text : str
+        The YAML text, without the `---` lines.
+
+    Returns
+    -------
+    dict[str, list[str]]
+        The keys and their values.
+    """
+    front_matter: dict[str, list[str]] = {}
+    key = None
+    for line in text.splitlines():
+        item_match = _yaml_item_regexp.match(line)
+        if item_match is not None and key is not None:
+            front_matter[key].append(_yaml_scalar(item_match.group(1)))
+            continue
+
+        key_match = _yaml_key_regexp.match(line)
+        if key_match is None:
+            key = None
+            continue
+
+        key = key_match.group(1).strip()
+        value = key_match.group(2) or ""
+        if value.startswith("[") and value.endswith("]"):
+            front_matter[key] = [
+                _yaml_scalar(item) for item in value[1:-1].split(",") if item.strip()
+            ]
+        elif value:
+            front_matter[key] = [_yaml_scalar(value)]
+        else:
+            front_matter[key] = []
+
+    return front_matter
+
+
+###############################################################################
+def _yaml_scalar(value: str) -> str:
+    """Return the YAML scalar `value` without quotes.
+
+    Parameters
+    ----------
+    value : str
+        The scalar.
+
+    Returns
+    -------
+    str
+        The value without surrounding quotes and whitespace.
+    """
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+
+    return value
+
+
+###############################################################################
+def _note_target(target: str) -> str:
+    """Return the target `target` of a wiki-link, if it links to a note.
+
+    Parameters
+    ----------
+    target : str
+        The link text before any heading or caption.
+
+    Returns
+    -------
+    str
+        The target without a `.md` suffix, the empty string if the link is a
+        citation, an URL or links to a file that isn't a note, like an image.
+    """
+    if target.startswith("@") or _url_regexp.match(target) is not None:
+        return ""
+    stem, suffix = path.splitext(target)
+    if suffix.lower() == ".md":
+        return stem
+    if suffix and not any(char.isspace() for char in suffix):
+        return ""
+    return target
+
+
+###############################################################################
+def link_target_path(directory: Path, target: str) -> str:
+    """Return the normalized path of the Org-Mode file a link with target
+    `target` in the directory `directory` points to.
+
+    Parameters
+    ----------
+    directory : Path
+        The directory of the Org-Mode file containing the link.
+    target : str
+        The link's target, one of `NoteRecord.links`.
+
+    Returns
+    -------
+    str
+        The normalized path to the linked Org-Mode file.
+    """
+    return path.normpath(directory / (target + ".org"))
@@ -0,0 +1,70 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     regexp.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Regexps that are compiled on their first use, not when the module defining
+them is imported.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, AnyStr, Generic, Optional
+
+
+################################################################################
+class LazyPattern(Generic[AnyStr]):
+    """A regexp that is compiled the first time it is used.
+
+    All attributes and methods of `re.Pattern`, like `sub` or `finditer`, are
+    forwarded to the compiled pattern.
+    """
+
+    __slots__ = ("_pattern", "_flags", "_compiled")
+
+    def __init__(self, pattern: AnyStr, flags: int = 0) -> None:
+        """Construct a regexp that is compiled on it's first use.
+
+        Parameters
+        ----------
+        pattern : AnyStr
+            The regexp.
+        flags : int, optional
+            The flags to compile the regexp with, by default 0.
+        """
+        self._pattern = pattern
+        self._flags = flags
+        self._compiled: Optional[re.Pattern[AnyStr]] = None
+
+    ############################################################################
+    @property
+    def compiled(self) -> re.Pattern[AnyStr]:
+        """The compiled regexp.
+
+        Returns
+        -------
+        re.Pattern[AnyStr]
+            The compiled regexp.
+        """
+        if self._compiled is None:
+            self._compiled = re.compile(self._pattern, flags=self._flags)
+        return self._compiled
+
+    ############################################################################
+    def __getattr__(self, name: str) -> Any:
+        """Forward all other attributes to the compiled regexp.
+
+        Parameters
+        ----------
+        name : str
+            The name of the attribute of `re.Pattern`.
+
+        Returns
+        -------
+        Any
+            The attribute of the compiled regexp.
+        """
+        return getattr(self.compiled, name)
@@ -0,0 +1,1259 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     scheduler.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Schedules the conversion and correction of more than one file using
+asyncio, every file is converted and corrected in a worker thread.
+
+A fixed number of worker coroutines takes the files to convert from the
+`FileTable`, no coroutine or `Path` is created for all files up front. If a
+`FileStream` is given, the table is filled while the files are converted: a
+producer walks the directories and passes the files to the workers using a
+bounded queue.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+from array import array
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+)
+
+from obs2org.convert import (
+    convert_single_file,
+    convert_to_text,
+    convert_with_filter,
+    correct_org_mode,
+)
+from obs2org.heading_ids import predicted_heading_text
+from obs2org.heading_index import discard_predicted_headings, set_predicted_headings
+from obs2org.journal import STAGE_CONVERTED, STAGE_CORRECTED
+from obs2org.prescan import NoteRecord, link_target_path, scan_markdown
+from obs2org.walk import CONVERT, SKIP
+
+if TYPE_CHECKING:
+    from obs2org.attachments import AttachmentCollector
+    from obs2org.bibliography import Bibliography
+    from obs2org.file_table import FilePaths, FileTable
+    from obs2org.journal import Journal
+    from obs2org.limits import PandocLimits, Quarantine
+    from obs2org.link_map import LinkMap
+    from obs2org.output import OutputCommitter
+    from obs2org.pandoc_info import PandocInfo
+    from obs2org.sources import VaultSource
+    from obs2org.walk import FileStream
+
+# The number of files converted at the same time, the number of threads of
+# asyncio's default executor.
+_NUM_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+# The state of a file that isn't converted in this run.
+_NOT_IN_RUN = 0
+
+# The state of a file that hasn't been converted yet.
+_PENDING = 1
+
+# The state of a file that has been converted.
+_CONVERTED = 2
+
+# The maximum size of the Markdown files read to predict their headings, that
+# are kept until they are converted, so they are only read once.
+_MAX_READ_AHEAD_BYTES = 64 * 1024 * 1024
+
+
+################################################################################
+class _FilterCorrection(NamedTuple):
+    """Class holding the arguments of `convert_with_filter` that are the same
+    for all files."""
+
+    remove_citations: bool
+    """Whether to treat citations in double brackets as normal links."""
+    add_uuid: bool
+    """Whether to add an UUID-header to each file."""
+    attachments: Optional[AttachmentCollector]
+    """The collector to place the attachments with, `None` to not place
+    them."""
+    front_matter: bool
+    """Whether to add the front matter of the Markdown files as keywords."""
+    bibliography: Optional[Bibliography]
+    """The bibliography to look up the citations in."""
+
+
+################################################################################
+class _Corrections:
+    """The files waiting to be corrected until all files they link to have been
+    converted.
+
+    Only the files that are waiting are kept, as `FilePaths` and `NoteRecord`,
+    for all other files only their state is saved, a single byte per file.
+    While the directories are walked, a link to a file that hasn't been found
+    yet delays the correction until the file is found or the walk has
+    finished. If the heading ids are predicted, links to files that haven't
+    been converted yet don't delay the correction.
+    If `max_pending` is given, at most this many files are held at the same
+    time, from being queued for the conversion until they have been corrected,
+    see `reserve`. If all held files wait for other files, the output of
+    Pandoc of the waiting files in `texts` is moved to temporary files.
+    """
+
+    def __init__(
+        self,
+        files: FileTable,
+        correct: bool,
+        walking: bool = False,
+        predict: bool = False,
+        max_pending: Optional[int] = None,
+        texts: Optional[dict[str, str]] = None,
+    ) -> None:
+        """Construct the state of the conversion of the files in `files`.
+
+        Parameters
+        ----------
+        files : FileTable
+            The files to convert.
+        correct : bool
+            Whether the files are corrected after converting them.
+        walking : bool, optional
+            Whether files are added to `files` while converting, by default
+            `False`. `walk_finished` must be called after adding the last
+            file.
+        predict : bool, optional
+            Whether the heading ids of files that haven't been converted yet
+            are predicted from their Markdown files, by default `False`.
+        max_pending : Optional[int], optional
+            The maximum number of files held at the same time, by default
+            `None`, no limit.
+        texts : Optional[dict[str, str]], optional
+            The output of Pandoc of the converted files, the key is the
+            normalized path to the Org-Mode file, by default `None`.
+        """
+        self.files = files
+        self.correct = correct
+        self._walking = walking
+        self._predict = predict
+        self._predicted: set[int] = set()
+        self._waiting_for_path: dict[str, list[int]] = {}
+        self.ready: asyncio.Queue[Optional[tuple[int, FilePaths, NoteRecord]]] = (
+            asyncio.Queue()
+        )
+        self._states = bytearray(files.num_entries)
+        for index in files.indices():
+            self._states[index] = _PENDING
+        self._waiting_for: dict[int, list[int]] = {}
+        self._num_waiting: dict[int, int] = {}
+        self._waiting: dict[int, tuple[int, FilePaths, NoteRecord]] = {}
+        self._read_ahead: dict[int, bytes] = {}
+        self._read_ahead_bytes = 0
+        self._max_pending = max_pending
+        self._num_held = 0
+        self._num_held_waiting = 0
+        self._held_changed = asyncio.Event()
+        self._texts = texts
+        self._spilled: set[int] = set()
+        self._spill_dir: Optional[tempfile.TemporaryDirectory[str]] = None
+        self._spill_writes: Optional[asyncio.Future[None]] = None
+
+    ############################################################################
+    def add(self, start: int, pending: Iterable[int]) -> None:
+        """Add the files with an index of at least `start`, which have been
+        added to the table, the files `pending` are converted in this run.
+
+        Parameters
+        ----------
+        start : int
+            The index of the first added file.
+        pending : Iterable[int]
+            The indices of the added files to convert.
+        """
+        self._states.extend(bytes(self.files.num_entries - len(self._states)))
+        for index in pending:
+            self._states[index] = _PENDING
+
+        if not self._waiting_for_path:
+            return
+        for index in range(start, self.files.num_entries):
+            waiting = self._waiting_for_path.pop(self.files.out_file(index), None)
+            if waiting is None:
+                continue
+            if self._states[index] == _PENDING:
+                self._waiting_for.setdefault(index, []).extend(waiting)
+            else:
+                for waiting_index in waiting:
+                    self._release(waiting_index)
+
+    ############################################################################
+    def walk_finished(self) -> None:
+        """Mark the walk as finished, the files waiting for links to files
+        that haven't been found don't wait any longer."""
+        self._walking = False
+        for waiting in self._waiting_for_path.values():
+            for index in waiting:
+                self._release(index)
+        self._waiting_for_path.clear()
+
+    ############################################################################
+    def keep_data(self, index: int, data: bytes) -> None:
+        """Keep the content `data` of the Markdown file with index `index`,
+        which has been read before converting it, if there is room left, see
+        `_MAX_READ_AHEAD_BYTES`.
+
+        Parameters
+        ----------
+        index : int
+            The index of the file.
+        data : bytes
+            The content of the Markdown file.
+        """
+        if (
+            index in self._read_ahead
+            or self._read_ahead_bytes + len(data) > _MAX_READ_AHEAD_BYTES
+        ):
+            return
+        self._read_ahead[index] = data
+        self._read_ahead_bytes += len(data)
+
+    ############################################################################
+    def take_data(self, index: int) -> Optional[bytes]:
+        """Return and forget the content of the Markdown file with index
+        `index` saved by `keep_data`.
+
+        Parameters
+        ----------
+        index : int
+            The index of the file.
+
+        Returns
+        -------
+        Optional[bytes]
+            The content of the file, `None` if it hasn't been kept.
+        """
+        data = self._read_ahead.pop(index, None)
+        if data is not None:
+            self._read_ahead_bytes -= len(data)
+        return data
+
+    ############################################################################
+    async def reserve(self) -> None:
+        """Wait until less than `max_pending` files are held and hold one more
+        file.
+
+        A file is held until `finished` is called for it. If all held files
+        wait for files that haven't been converted or found yet, their output
+        of Pandoc is moved to temporary files and they aren't held any more,
+        so they don't block the conversion of the files they wait for.
+        """
+        if self._max_pending is None:
+            return
+        while self._num_held >= self._max_pending:
+            if self._num_held_waiting == self._num_held:
+                await self._spill()
+                continue
+            self._held_changed.clear()
+            await self._held_changed.wait()
+        self._num_held += 1
+
+    ############################################################################
+    def finished(self, index: int) -> None:
+        """Stop holding the file with index `index`, which has been corrected
+        or isn't corrected.
+
+        Parameters
+        ----------
+        index : int
+            The index of the file.
+        """
+        if self._max_pending is None:
+            return
+        if index in self._spilled:
+            self._spilled.remove(index)
+            return
+        self._num_held -= 1
+        self._held_changed.set()
+
+    ############################################################################
+    async def _spill(self) -> None:
+        """Move the output of Pandoc of the waiting files to temporary files
+        and stop holding them."""
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.TemporaryDirectory(prefix="obs2org-")
+        spilled = []
+        for index in self._waiting:
+            if index in self._spilled:
+                continue
+            self._spilled.add(index)
+            if self._texts is not None:
+                text = self._texts.pop(self.files.out_file(index), None)
+                if text is not None:
+                    spilled.append((self._spill_path(index), text))
+        self._num_held -= self._num_held_waiting
+        self._num_held_waiting = 0
+
+        self._spill_writes = asyncio.ensure_future(
+            asyncio.to_thread(_write_texts, spilled)
+        )
+        await self._spill_writes
+
+    ############################################################################
+    async def read_spilled(self, index: int) -> Optional[str]:
+        """Return the output of Pandoc of the file with index `index`, which
+        has been moved to a temporary file, and delete the temporary file.
+
+        Parameters
+        ----------
+        index : int
+            The index of the file.
+
+        Returns
+        -------
+        Optional[str]
+            The output of Pandoc, `None` if the file hasn't been moved to a
+            temporary file.
+        """
+        if index not in self._spilled:
+            return None
+        if self._spill_writes is not None:
+            await self._spill_writes
+        spill_path = self._spill_path(index)
+        try:
+            return await asyncio.to_thread(_read_text, spill_path)
+        except FileNotFoundError:
+            return None
+
+    ############################################################################
+    def close(self) -> None:
+        """Delete the temporary files of the output of Pandoc."""
+        if self._spill_dir is not None:
+            self._spill_dir.cleanup()
+            self._spill_dir = None
+
+    ############################################################################
+    def _spill_path(self, index: int) -> Path:
+        """Return the path to the temporary file of the output of Pandoc of
+        the file with index `index`.
+
+        Parameters
+        ----------
+        index : int
+            The index of the file.
+
+        Returns
+        -------
+        Path
+            The path to the temporary file.
+        """
+        assert self._spill_dir is not None  # nosec
+        return Path(self._spill_dir.name) / f"{index}.txt"
+
+    ############################################################################
+    def _release(self, index: int) -> None:
+        """Queue the file with index `index` for the correction, if it doesn't
+        wait for any other file.
+
+        Parameters
+        ----------
+        index : int
+            The index of the file that waited for a file which has been
+            converted or isn't converted in this run.
+        """
+        self._num_waiting[index] -= 1
+        if self._num_waiting[index] == 0:
+            del self._num_waiting[index]
+            if index not in self._spilled:
+                self._num_held_waiting -= 1
+            self.ready.put_nowait(self._waiting.pop(index))
+
+    ############################################################################
+    def to_predict(self, file_paths: FilePaths, record: NoteRecord) -> list[int]:
+        """Return the indices of the files the file `file_paths` links to,
+        that haven't been converted and whose headings haven't been predicted
+        yet.
+
+        The returned files are marked as predicted.
+
+        Parameters
+        ----------
+        file_paths : FilePaths
+            The paths of the file to correct.
+        record : NoteRecord
+            The result of the pre-scan of the Markdown file.
+
+        Returns
+        -------
+        list[int]
+            The indices of the files to predict the headings of.
+        """
+        if not self._predict:
+            return []
+        directory = file_paths.out_file.parent
+        indices = []
+        for target in record.links:
+            dependency = self.files.index_of(
+                link_target_path(directory=directory, target=target)
+            )
+            if (
+                dependency is not None
+                and self._states[dependency] == _PENDING
+                and dependency not in self._predicted
+            ):
+                self._predicted.add(dependency)
+                indices.append(dependency)
+
+        return indices
+
+    ############################################################################
+    def is_pending(self, index: int) -> bool:
+        """Return `True` if the file with index `index` is converted in this
+        run, but hasn't been converted yet.
+
+        Parameters
+        ----------
+        index : int
+            The index of the file.
+
+        Returns
+        -------
+        bool
+            `True` if the file hasn't been converted yet.
+        """
+        return self._states[index] == _PENDING
+
+    ############################################################################
+    def converted(
+        self, index: int, file_paths: FilePaths, record: Optional[NoteRecord]
+    ) -> None:
+        """Mark the file with index `index` as converted and queue the files
+        that can now be corrected in `ready`.
+
+        Parameters
+        ----------
+        index : int
+            The index of the converted file.
+        file_paths : FilePaths
+            The paths of the converted file.
+        record : Optional[NoteRecord]
+            The result of the pre-scan of the Markdown file, `None` if the
+            files are not corrected.
+        """
+        self._states[index] = _CONVERTED
+        for waiting in self._waiting_for.pop(index, []):
+            self._release(waiting)
+
+        if not self.correct or record is None:
+            self.finished(index)
+            return
+
+        directory = file_paths.out_file.parent
+        dependencies = set()
+        not_found = set()
+        for target in record.links:
+            target_path = link_target_path(directory=directory, target=target)
+            dependency = self.files.index_of(target_path)
+            if dependency is None:
+                if self._walking:
+                    not_found.add(target_path)
+            elif self._states[dependency] == _PENDING and not self._predict:
+                dependencies.add(dependency)
+
+        if not dependencies and not not_found:
+            self.ready.put_nowait((index, file_paths, record))
+            return
+
+        for dependency in dependencies:
+            self._waiting_for.setdefault(dependency, []).append(index)
+        for target_path in not_found:
+            self._waiting_for_path.setdefault(target_path, []).append(index)
+        self._num_waiting[index] = len(dependencies) + len(not_found)
+        self._waiting[index] = (index, file_paths, record)
+        self._num_held_waiting += 1
+        self._held_changed.set()
+
+
+################################################################################
+async def convert_files(
+    pandoc_info: PandocInfo,
+    files: FileTable,
+    remove_citations: bool,
+    add_uuid: bool,
+    committer: OutputCommitter,
+    correct: bool = True,
+    attachments: Optional[AttachmentCollector] = None,
+    limits: Optional[PandocLimits] = None,
+    quarantine: Optional[Quarantine] = None,
+    front_matter: bool = False,
+    journal: Optional[Journal] = None,
+    source: Optional[VaultSource] = None,
+    links: Optional[LinkMap] = None,
+    stream: Optional[FileStream] = None,
+    bibliography: Optional[Bibliography] = None,
+    predict_ids: bool = False,
+    ast: bool = False,
+    lua_filter: bool = False,
+) -> None:
+    """Converts the files in the given table.
+
+    Converts the files in `files` using pandoc and fixes the links to
+    other Org-Mode files and tags and dates.
+    A file is corrected as soon as it and all files it links to have been
+    converted, because links that need to be corrected can point to files not
+    generated yet and we must search the files the link points to for the
+    right section id. Links to files that aren't converted in this run don't
+    delay the correction.
+    The output of Pandoc is kept in memory until the file is corrected, so
+    every file is only written once. Only if the files are not corrected, the
+    output of Pandoc is written to the files.
+    Every Markdown file is scanned once for it's links and front matter
+    before converting it. The files are converted in the order of `files`.
+    If `stream` is not `None`, `files` must be empty, the files are added
+    while they are converted, in the order of the walk. At most
+    `stream.max_pending` files wait to be converted or hold the output of
+    Pandoc in memory, the walk waits until a file has been corrected. If all
+    of them wait for other files, their output is moved to temporary files.
+    If `predict_ids` is `True`, a file doesn't wait for the files it links to,
+    the heading ids of the files that haven't been converted yet are
+    predicted from their Markdown files, see `obs2org.heading_ids`.
+    If `lua_filter` is `True`, the files are corrected by the Lua filter while
+    Pandoc converts them, see `obs2org.lua_filter`. The headings of the files
+    they link to that haven't been converted yet are predicted.
+
+    Parameters
+    ----------
+    pandoc_info : PandocInfo
+        The pandoc executable and it's capabilities.
+    files : FileTable
+        The table of the Markdown files to convert and the Org-Mode files to
+        generate.
+    remove_citations : bool
+        Whether to remove Pandoc-style citations to treat them as normal links,
+        or not.
+    add_uuid : bool
+        Whether to add an UUID-header to each file.
+    committer : OutputCommitter
+        The object to write the generated Org-Mode files with.
+    correct : bool, optional
+        Whether to correct the generated files, by default `True`. If this is
+        `False`, the files are only converted using Pandoc.
+    attachments : Optional[AttachmentCollector], optional
+        The collector to place the attachments the files link to with, by
+        default `None`, which doesn't place the attachments.
+    limits : Optional[PandocLimits], optional
+        The limits of every Pandoc process, by default `None`, no limits.
+    quarantine : Optional[Quarantine], optional
+        The quarantine to add the files to that exceed the limits twice, by
+        default `None`.
+    front_matter : bool, optional
+        Whether to add the keys of the YAML front matter Pandoc ignores as
+        Org-Mode keywords, by default `False`.
+    journal : Optional[Journal], optional
+        The journal to record the finished stages of the files in, by default
+        `None`.
+    source : Optional[VaultSource], optional
+        The source to read the Markdown files from, by default `None`, which
+        reads them from the file system.
+    links : Optional[LinkMap], optional
+        The reverse-link map to save the links of the converted files in, by
+        default `None`. Only used if the files are corrected.
+    stream : Optional[FileStream], optional
+        The walk of the directories to add the files to convert from, by
+        default `None`. After the conversion, the order of `files` is set to
+        the converted files.
+    bibliography : Optional[Bibliography], optional
+        The bibliography to look up the citations of the corrected files in,
+        by default `None`.
+    predict_ids : bool, optional
+        Whether to predict the heading ids of the files that haven't been
+        converted yet, instead of waiting for them, by default `False`.
+    ast : bool, optional
+        Whether to correct Pandoc's JSON AST instead of the Org-Mode text, see
+        `obs2org.pandoc_ast`, by default `False`.
+    lua_filter : bool, optional
+        Whether to correct the files using the Lua filter, by default `False`.
+        Pandoc must support the filter, see
+        `obs2org.lua_filter.filter_supported`.
+    """
+    filter_correction = None
+    if correct and lua_filter:
+        filter_correction = _FilterCorrection(
+            remove_citations=remove_citations,
+            add_uuid=add_uuid,
+            attachments=attachments,
+            front_matter=front_matter,
+            bibliography=bibliography,
+        )
+    texts: Optional[dict[str, str]] = (
+        {} if correct and filter_correction is None else None
+    )
+    corrections = _Corrections(
+        files=files,
+        correct=correct and filter_correction is None,
+        walking=stream is not None,
+        predict=predict_ids or filter_correction is not None,
+        max_pending=None if stream is None else stream.max_pending,
+        texts=texts,
+    )
+
+    correctors = []
+    if texts is not None:
+        correctors = [
+            asyncio.create_task(
+                _correct_worker(
+                    corrections=corrections,
+                    texts=texts,
+                    remove_citations=remove_citations,
+                    add_uuid=add_uuid,
+                    committer=committer,
+                    attachments=attachments,
+                    front_matter=front_matter,
+                    journal=journal,
+                    bibliography=bibliography,
+                    source=source,
+                    pandoc_info=pandoc_info if ast else None,
+                    limits=limits,
+                )
+            )
+            for _ in range(_NUM_WORKERS)
+        ]
+
+    producer = None
+    if stream is None:
+        shared_indices = files.indices()
+        worker_indices = [
+            _iterate(shared_indices) for _ in range(min(_NUM_WORKERS, len(files)))
+        ]
+    else:
+        queue: asyncio.Queue[Optional[int]] = asyncio.Queue(maxsize=stream.max_pending)
+        producer = asyncio.create_task(
+            _produce(
+                stream=stream,
+                corrections=corrections,
+                queue=queue,
+                num_workers=_NUM_WORKERS,
+            )
+        )
+        worker_indices = [_dequeue(queue) for _ in range(_NUM_WORKERS)]
+
+    await asyncio.gather(
+        *(
+            _convert_worker(
+                pandoc_info=pandoc_info,
+                indices=indices,
+                corrections=corrections,
+                committer=committer,
+                texts=texts,
+                limits=limits,
+                quarantine=quarantine,
+                journal=journal,
+                source=source,
+                links=links,
+                ast=ast,
+                filter_correction=filter_correction,
+            )
+            for indices in worker_indices
+        )
+    )
+    if producer is not None:
+        await producer
+
+    # All files have been converted, so every file waiting for a correction
+    # is in the queue before the end markers.
+    for _ in correctors:
+        corrections.ready.put_nowait(None)
+    await asyncio.gather(*correctors)
+    corrections.close()
+    if predict_ids or filter_correction is not None:
+        discard_predicted_headings()
+    committer.flush()
+
+
+################################################################################
+async def correct_files(
+    out_files: Iterable[Path],
+    remove_citations: bool,
+    add_uuid: bool,
+    committer: OutputCommitter,
+) -> None:
+    """Corrects the already converted Org-Mode files `out_files`.
+
+    A fixed number of workers takes the files from `out_files`, which is only
+    iterated once and may be a generator.
+
+    Parameters
+    ----------
+    out_files : Iterable[Path]
+        The paths to the Org-Mode files to correct.
+    remove_citations : bool
+        Whether to remove Pandoc-style citations to treat them as normal links,
+        or not.
+    add_uuid : bool
+        Whether to add an UUID-header to each file.
+    committer : OutputCommitter
+        The object to write the corrected Org-Mode files with.
+    """
+    shared_files = iter(out_files)
+    await asyncio.gather(
+        *(
+            _correct_file_worker(
+                out_files=shared_files,
+                remove_citations=remove_citations,
+                add_uuid=add_uuid,
+                committer=committer,
+            )
+            for _ in range(_NUM_WORKERS)
+        )
+    )
+    committer.flush()
+
+
+################################################################################
+async def _correct_file_worker(
+    out_files: Iterator[Path],
+    remove_citations: bool,
+    add_uuid: bool,
+    committer: OutputCommitter,
+) -> None:
+    """Correct the Org-Mode files taken from `out_files`, until there are no
+    more files to correct.
+
+    Parameters
+    ----------
+    out_files : Iterator[Path]
+        The paths to the Org-Mode files to correct, shared by all workers.
+    remove_citations : bool
+        Whether to remove Pandoc-style citations to treat them as normal links,
+        or not.
+    add_uuid : bool
+        Whether to add an UUID-header to each file.
+    committer : OutputCommitter
+        The object to write the corrected Org-Mode files with.
+    """
+    for out_file in out_files:
+        await asyncio.to_thread(
+            correct_org_mode,
+            out_file,
+            remove_citations=remove_citations,
+            add_uuid=add_uuid,
+            committer=committer,
+        )
+
+
+################################################################################
+async def _produce(
+    stream: FileStream,
+    corrections: _Corrections,
+    queue: asyncio.Queue[Optional[int]],
+    num_workers: int,
+) -> None:
+    """Walk the directories of `stream`, add the files to the table and queue
+    the indices of the files to convert in `queue`.
+
+    Waits while `stream.max_pending` files are held, so at most this many files
+    have been found, but not converted or not corrected yet, see
+    `_Corrections.reserve`. One end marker `None` is queued for every worker
+    after the last file.
+
+    Parameters
+    ----------
+    stream : FileStream
+        The walk of the directories.
+    corrections : _Corrections
+        The state of the conversion, containing the table of files.
+    queue : asyncio.Queue[Optional[int]]
+        The queue to put the indices of the files to convert in.
+    num_workers : int
+        The number of workers reading from the queue.
+    """
+    files = corrections.files
+    order = array("L")
+    last = array("L")
+    try:
+        while True:
+            directory = await asyncio.to_thread(next, stream.directories, None)
+            if directory is None:
+                break
+            start = files.num_entries
+            files.add_directory(
+                in_dir=directory.in_dir,
+                out_dir=directory.out_dir,
+                entries=directory.entries,
+            )
+            now = array("L")
+            num_last = len(last)
+            for index in range(start, files.num_entries):
+                selected = stream.select(index)
+                if selected == CONVERT:
+                    now.append(index)
+                elif selected != SKIP:
+                    last.append(index)
+            corrections.add(start=start, pending=now + last[num_last:])
+            for index in now:
+                order.append(index)
+                await corrections.reserve()
+                await queue.put(index)
+
+        corrections.walk_finished()
+        for index in last:
+            order.append(index)
+            await corrections.reserve()
+            await queue.put(index)
+    finally:
+        files.set_order(order)
+        for _ in range(num_workers):
+            await queue.put(None)
+
+
+################################################################################
+async def _iterate(indices: Iterator[int]) -> AsyncIterator[int]:
+    """Return the indices of the iterator `indices`, which is shared by all
+    workers, as an asynchronous iterator.
+
+    Parameters
+    ----------
+    indices : Iterator[int]
+        The indices of the files to convert.
+
+    Yields
+    ------
+    AsyncIterator[int]
+        The indices of the files to convert.
+    """
+    for index in indices:
+        yield index
+
+
+################################################################################
+async def _dequeue(queue: asyncio.Queue[Optional[int]]) -> AsyncIterator[int]:
+    """Return the indices in `queue` until the end marker `None` is read.
+
+    Parameters
+    ----------
+    queue : asyncio.Queue[Optional[int]]
+        The queue of the indices of the files to convert.
+
+    Yields
+    ------
+    AsyncIterator[int]
+        The indices of the files to convert.
+    """
+    while True:
+        index = await queue.get()
+        if index is None:
+            return
+        yield index
+
+
+################################################################################
+async def _read_note(in_file: Path) -> tuple[Optional[bytes], NoteRecord]:
+    """Read and scan the Markdown file `in_file` in a worker thread.
+
+    The content is passed to Pandoc, so the file is only read once.
+
+    Parameters
+    ----------
+    in_file : Path
+        The path to the Markdown file to scan.
+
+    Returns
+    -------
+    tuple[Optional[bytes], NoteRecord]
+        The content of the file and the information about it, `None` and an
+        empty record if the file can't be read. The error is reported when
+        converting the file.
+    """
+    try:
+        data = await asyncio.to_thread(in_file.read_bytes)
+    except OSError:
+        return None, NoteRecord(
+            size=0, links=frozenset(), tags=frozenset(), front_matter={}
+        )
+    return data, await asyncio.to_thread(scan_markdown, data)
+
+
+################################################################################
+async def _read_source(source: VaultSource, in_file: Path) -> Optional[bytes]:
+    """Read the Markdown file `in_file` from `source` in a worker thread.
+
+    Parameters
+    ----------
+    source : VaultSource
+        The source to read the file from.
+    in_file : Path
+        The path of the Markdown file.
+
+    Returns
+    -------
+    Optional[bytes]
+        The content of the file, `None` if it can't be read. The error is
+        printed.
+    """
+    try:
+        return await asyncio.to_thread(source.read, in_file)
+    except OSError as excp:
+        print(f"Error reading file '{in_file}': {excp}\n", flush=True)
+        return None
+
+
+################################################################################
+async def _predict_headings(
+    corrections: _Corrections, indices: list[int], source: Optional[VaultSource]
+) -> None:
+    """Predict the headings of the files with the indices `indices`, which
+    haven't been converted yet, from their Markdown files.
+
+    Parameters
+    ----------
+    corrections : _Corrections
+        The state of the conversion.
+    indices : list[int]
+        The indices of the files to predict the headings of.
+    source : Optional[VaultSource]
+        The source to read the Markdown files from, `None` for the file system.
+    """
+    for index in indices:
+        file_paths = corrections.files.file_paths(index)
+        try:
+            if source is None:
+                data = await asyncio.to_thread(file_paths.in_file.read_bytes)
+            else:
+                data = await asyncio.to_thread(source.read, file_paths.in_file)
+        except OSError:
+            continue
+        text = await asyncio.to_thread(predicted_heading_text, data)
+        if corrections.is_pending(index):
+            set_predicted_headings(file_name=file_paths.out_file, text=text)
+            corrections.keep_data(index=index, data=data)
+
+
+################################################################################
+async def _convert_worker(
+    pandoc_info: PandocInfo,
+    indices: AsyncIterator[int],
+    corrections: _Corrections,
+    committer: OutputCommitter,
+    texts: Optional[dict[str, str]],
+    limits: Optional[PandocLimits],
+    quarantine: Optional[Quarantine],
+    journal: Optional[Journal],
+    source: Optional[VaultSource],
+    links: Optional[LinkMap],
+    ast: bool = False,
+    filter_correction: Optional[_FilterCorrection] = None,
+) -> None:
+    """Convert the files with the indices taken from `indices` using Pandoc,
+    until there are no more files to convert.
+
+    Parameters
+    ----------
+    pandoc_info : PandocInfo
+        The pandoc executable and it's capabilities.
+    indices : AsyncIterator[int]
+        The indices of the files to convert, taken from the same table or
+        queue by all workers.
+    corrections : _Corrections
+        The state of the conversion, every converted file is passed to it.
+    committer : OutputCommitter
+        The object to write the generated Org-Mode file with.
+    texts : Optional[dict[str, str]]
+        If this is not `None`, the output of Pandoc is saved in this dictionary
+        instead of the file, the key is the normalized path to the Org-Mode
+        file.
+    limits : Optional[PandocLimits]
+        The limits of the Pandoc process.
+    quarantine : Optional[Quarantine]
+        The quarantine to add the file to, if it exceeds the limits twice.
+    journal : Optional[Journal]
+        The journal to record the converted files in.
+    source : Optional[VaultSource]
+        The source to read the Markdown files from, `None` for the file system.
+    links : Optional[LinkMap]
+        The reverse-link map to save the links of the converted files in.
+    ast : bool, optional
+        Whether to save Pandoc's JSON AST in `texts` instead of the Org-Mode
+        text, by default `False`.
+    filter_correction : Optional[_FilterCorrection], optional
+        If this is not `None`, the files are corrected by the Lua filter and
+        written, instead of saving them in `texts`. By default `None`.
+    """
+    files = corrections.files
+    async for index in indices:
+        file_paths = files.file_paths(index)
+        record = None
+        converted = False
+        try:
+            data = corrections.take_data(index)
+            if data is None and source is not None:
+                data = await _read_source(source=source, in_file=file_paths.in_file)
+                if data is None:
+                    continue
+            if texts is None and filter_correction is None:
+                converted = await asyncio.to_thread(
+                    convert_single_file,
+                    file_paths.in_file,
+                    file_paths.out_file,
+                    pandoc_info,
+                    committer,
+                    limits,
+                    quarantine,
+                    data,
+                )
+            else:
+                if data is None:
+                    data, record = await _read_note(file_paths.in_file)
+                else:
+                    record = await asyncio.to_thread(scan_markdown, data)
+                if filter_correction is not None:
+                    converted = await _convert_with_filter(
+                        pandoc_info=pandoc_info,
+                        index=index,
+                        record=record,
+                        corrections=corrections,
+                        committer=committer,
+                        limits=limits,
+                        quarantine=quarantine,
+                        source=source,
+                        data=data,
+                        filter_correction=filter_correction,
+                    )
+                elif texts is not None:
+                    text = await asyncio.to_thread(
+                        convert_to_text,
+                        file_paths.in_file,
+                        file_paths.out_file,
+                        pandoc_info,
+                        limits,
+                        quarantine,
+                        data,
+                        ast,
+                    )
+                    if text is not None:
+                        texts[files.out_file(index)] = text
+                        converted = True
+                if converted and links is not None and record is not None:
+                    links.set_links(
+                        out_file=file_paths.out_file,
+                        targets=(
+                            link_target_path(
+                                directory=file_paths.out_file.parent, target=target
+                            )
+                            for target in record.links
+                        ),
+                    )
+            if converted and journal is not None:
+                journal.record(
+                    out_file=file_paths.out_file,
+                    stage=(
+                        STAGE_CONVERTED
+                        if filter_correction is None
+                        else STAGE_CORRECTED
+                    ),
+                    size=files.size(index),
+                    mtime_ns=files.mtime_ns(index),
+                )
+        finally:
+            corrections.converted(index=index, file_paths=file_paths, record=record)
+
+
+################################################################################
+async def _convert_with_filter(
+    pandoc_info: PandocInfo,
+    index: int,
+    record: NoteRecord,
+    corrections: _Corrections,
+    committer: OutputCommitter,
+    limits: Optional[PandocLimits],
+    quarantine: Optional[Quarantine],
+    source: Optional[VaultSource],
+    data: Optional[bytes],
+    filter_correction: _FilterCorrection,
+) -> bool:
+    """Predict the headings of the files the file with index `index` links to
+    and convert and correct it using the Lua filter.
+
+    Parameters
+    ----------
+    pandoc_info : PandocInfo
+        The pandoc executable and it's capabilities.
+    index : int
+        The index of the file to convert.
+    record : NoteRecord
+        The result of the pre-scan of the Markdown file.
+    corrections : _Corrections
+        The state of the conversion.
+    committer : OutputCommitter
+        The object to write the generated Org-Mode file with.
+    limits : Optional[PandocLimits]
+        The limits of the Pandoc process.
+    quarantine : Optional[Quarantine]
+        The quarantine to add the file to, if it exceeds the limits twice.
+    source : Optional[VaultSource]
+        The source to read the Markdown files from, `None` for the file system.
+    data : Optional[bytes]
+        The content of the Markdown file read from `source`.
+    filter_correction : _FilterCorrection
+        The arguments of the correction.
+
+    Returns
+    -------
+    bool
+        `True` if the file has been converted and written.
+    """
+    file_paths = corrections.files.file_paths(index)
+    await _predict_headings(
+        corrections=corrections,
+        indices=corrections.to_predict(file_paths=file_paths, record=record),
+        source=source,
+    )
+    return await asyncio.to_thread(
+        convert_with_filter,
+        file_paths.in_file,
+        file_paths.out_file,
+        pandoc_info,
+        filter_correction.remove_citations,
+        filter_correction.add_uuid,
+        committer,
+        limits,
+        quarantine,
+        data,
+        filter_correction.attachments,
+        record.front_matter if filter_correction.front_matter else None,
+        filter_correction.bibliography,
+    )
+
+
+################################################################################
+async def _correct_worker(
+    corrections: _Corrections,
+    texts: dict[str, str],
+    remove_citations: bool,
+    add_uuid: bool,
+    committer: OutputCommitter,
+    attachments: Optional[AttachmentCollector],
+    front_matter: bool,
+    journal: Optional[Journal],
+    bibliography: Optional[Bibliography],
+    source: Optional[VaultSource],
+    pandoc_info: Optional[PandocInfo] = None,
+    limits: Optional[PandocLimits] = None,
+) -> None:
+    """Correct the links, tags and dates of the files in the queue
+    `corrections.ready`, until the end marker `None` is read.
+
+    Parameters
+    ----------
+    corrections : _Corrections
+        The state of the conversion, containing the queue of files to correct.
+    texts : dict[str, str]
+        The output of Pandoc, the key is the normalized path to the Org-Mode
+        file. Files that are not in `texts` have not been converted and are
+        not corrected.
+    remove_citations : bool
+        Whether to remove Pandoc-style citations to treat them as normal links,
+        or not.
+    add_uuid : bool
+        Whether to add an UUID-header to each file.
+    committer : OutputCommitter
+        The object to write the corrected Org-Mode file with.
+    attachments : Optional[AttachmentCollector]
+        The collector to place the attachments the file links to with.
+    front_matter : bool
+        Whether to add the front matter of the Markdown file as keywords.
+    journal : Optional[Journal]
+        The journal to record the corrected files in.
+    bibliography : Optional[Bibliography]
+        The bibliography to look up the citations in.
+    source : Optional[VaultSource]
+        The source to read the Markdown files to predict the headings of
+        from, `None` for the file system.
+    pandoc_info : Optional[PandocInfo], optional
+        If this is not `None`, `texts` contains Pandoc's JSON AST, which is
+        converted to Org-Mode using this Pandoc after correcting it. By
+        default `None`.
+    limits : Optional[PandocLimits], optional
+        The limits of the Pandoc process converting the JSON AST, by default
+        `None`.
+    """
+    while True:
+        item = await corrections.ready.get()
+        if item is None:
+            return
+
+        index, file_paths, record = item
+        text = texts.pop(os.path.normpath(file_paths.out_file), None)
+        if text is None:
+            text = await corrections.read_spilled(index)
+        if text is None:
+            corrections.finished(index)
+            continue
+
+        try:
+            await _predict_headings(
+                corrections=corrections,
+                indices=corrections.to_predict(file_paths=file_paths, record=record),
+                source=source,
+            )
+            corrected = await asyncio.to_thread(
+                correct_org_mode,
+                file_paths.out_file,
+                remove_citations=remove_citations,
+                add_uuid=add_uuid,
+                committer=committer,
+                in_file=file_paths.in_file,
+                attachments=attachments,
+                text=text,
+                front_matter=record.front_matter if front_matter else None,
+                bibliography=bibliography,
+                pandoc=pandoc_info,
+                limits=limits,
+            )
+        finally:
+            corrections.finished(index)
+        if corrected and journal is not None:
+            journal.record(
+                out_file=file_paths.out_file,
+                stage=STAGE_CORRECTED,
+                size=corrections.files.size(index),
+                mtime_ns=corrections.files.mtime_ns(index),
+            )
+
+
+################################################################################
+def _write_texts(texts: list[tuple[Path, str]]) -> None:
+    """Write the output of Pandoc to temporary files.
+
+    Parameters
+    ----------
+    texts : list[tuple[Path, str]]
+        The paths to the temporary files and the text to write to them.
+    """
+    for spill_path, text in texts:
+        spill_path.write_text(text, encoding="utf-8")
+
+
+################################################################################
+def _read_text(spill_path: Path) -> str:
+    """Read the output of Pandoc from the temporary file `spill_path` and
+    delete the file.
+
+    Parameters
+    ----------
+    spill_path : Path
+        The path to the temporary file.
+
+    Returns
+    -------
+    str
+        The content of the file.
+    """
+    text = spill_path.read_text(encoding="utf-8")
+    spill_path.unlink()
+    return text
@@ -0,0 +1,384 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     shard.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Sharded conversion, to spread the conversion of a big vault over more than
+one machine or process.
+
+`python -m obs2org DIR -o OUT --shard i/N` converts only the i-th of N parts
+of the Markdown files using Pandoc and saves the headings of the generated
+files in the partial index `OUT/.obs2org/shard-i-of-N.json`. The links are not
+corrected.
+
+`python -m obs2org merge OUT` reads the partial indexes of all N shards and
+corrects the links, tags and dates of all generated files. The merge can be
+sharded too, `python -m obs2org merge OUT --shard i/N` corrects only the
+files of the i-th part.
+
+The files are assigned to the shards using the CRC32 of the path of the
+generated Org-Mode file relative to the output directory, so every machine
+gets the same partition, regardless of the absolute paths.
+"""
+
+from __future__ import annotations
+
+import json
+import zlib
+from os import path
+from pathlib import Path
+from typing import Iterable, NamedTuple, Union
+
+from obs2org.heading_index import add_headings, cached_headings, heading_text
+from obs2org.state import relative_out_path, state_directory
+
+# The file name of the partial index of a shard, relative to the state
+# directory.
+_INDEX_FILE_NAME = "shard-{index}-of-{count}.json"
+
+# Glob matching the file names of all partial indexes.
+_INDEX_FILE_GLOB = "shard-*-of-*.json"
+
+
+################################################################################
+class Shard(NamedTuple):
+    """Class holding the number of a shard and the number of all shards."""
+
+    index: int
+    """The number of the shard, starting at 1."""
+    count: int
+    """The number of shards."""
+
+
+################################################################################
+class IndexEntry(NamedTuple):
+    """Class holding the data of a generated Org-Mode file in a partial
+    index.
+    """
+
+    mtime_ns: int
+    """The modification time of the Org-Mode file after it's conversion."""
+    size: int
+    """The size of the Org-Mode file after it's conversion."""
+    headings: str
+    """The headings of the Org-Mode file, as returned by `heading_text`."""
+
+
+###############################################################################
+def parse_shard(text: str) -> Shard:
+    """Parse the argument of `--shard`, which is of the form `i/N`, where
+    `1 <= i <= N`.
+
+    Parameters
+    ----------
+    text : str
+        The argument to parse.
+
+    Returns
+    -------
+    Shard
+        The parsed shard.
+
+    Raises
+    ------
+    ValueError
+        If `text` is not of the form `i/N` or `i` is not between 1 and N.
+    """
+    index_text, sep, count_text = text.partition("/")
+    if sep != "/":
+        raise ValueError(f"the shard '{text}' is not of the form 'i/N'")
+
+    index = int(index_text)
+    count = int(count_text)
+    if not 1 <= index <= count:
+        raise ValueError(
+            f"the shard '{text}' is not between 1/{count} and {count}/{count}"
+        )
+
+    return Shard(index=index, count=count)
+
+
+###############################################################################
+def in_shard(rel_path: Union[str, Path], shard: Shard) -> bool:
+    """Return `True` if the file with the relative path `rel_path` belongs to
+    the shard `shard`.
+
+    Parameters
+    ----------
+    rel_path : Union[str, Path]
+        The path of the Org-Mode file relative to the output directory.
+    shard : Shard
+        The shard to check.
+
+    Returns
+    -------
+    bool
+        `True` if the file belongs to the shard, `False` else.
+    """
+    key = Path(path.normpath(rel_path)).as_posix().encode(encoding="utf-8")
+
+    return zlib.crc32(key) % shard.count == shard.index - 1
+
+
+###############################################################################
+def write_shard_index(
+    out_path: Union[str, Path], shard: Shard, out_files: Iterable[Path]
+) -> Path:
+    """Write the partial index of the shard `shard` containing the headings of
+    the generated Org-Mode files `out_files`.
+
+    Files that don't exist, because their conversion failed, are skipped.
+    The partial indexes of earlier runs with another number of shards are
+    deleted, so they don't mix with the indexes of this run.
+
+    Parameters
+    ----------
+    out_path : Union[str, Path]
+        The output directory.
+    shard : Shard
+        The shard the files belong to.
+    out_files : Iterable[Path]
+        The paths to the Org-Mode files generated by this shard.
+
+    Returns
+    -------
+    Path
+        The path to the written partial index.
+    """
+    files: dict[str, dict[str, object]] = {}
+    for out_file in out_files:
+        try:
+            stat = out_file.stat()
+            headings = heading_text(file_name=out_file)
+        except (OSError, ValueError) as excp:
+            print(f"Error reading file '{out_file}': {excp}")
+            continue
+        files[relative_out_path(out_file=out_file, out_path=out_path)] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "headings": headings,
+        }
+
+    index_file = state_directory(out_path) / _INDEX_FILE_NAME.format(
+        index=shard.index, count=shard.count
+    )
+    index_file.parent.mkdir(exist_ok=True, parents=True)
+    tmp_file = index_file.with_name(index_file.name + "~")
+    with tmp_file.open(mode="w", encoding="utf-8") as f_d:
+        json.dump({"shard": list(shard), "files": files}, f_d)
+    tmp_file.replace(index_file)
+
+    for other_file in index_file.parent.glob(_INDEX_FILE_GLOB):
+        if not other_file.name.endswith(f"-of-{shard.count}.json"):
+            try:
+                other_file.unlink()
+            except FileNotFoundError:
+                pass
+
+    return index_file
+
+
+###############################################################################
+def read_shard_indexes(out_path: Union[str, Path]) -> dict[str, IndexEntry]:
+    """Read and combine the partial indexes of all shards in the output
+    directory `out_path`.
+
+    Parameters
+    ----------
+    out_path : Union[str, Path]
+        The output directory.
+
+    Returns
+    -------
+    dict[str, IndexEntry]
+        The combined index, the key is the path of the Org-Mode file relative
+        to the output directory.
+
+    Raises
+    ------
+    ValueError
+        If there are no partial indexes, an index can't be parsed, the
+        indexes have been generated with a different number of shards or the
+        index of a shard is missing.
+    OSError
+        If a partial index can't be read.
+    """
+    index_files = sorted(state_directory(out_path).glob(_INDEX_FILE_GLOB))
+    if not index_files:
+        raise ValueError(f"no shard indexes found in '{state_directory(out_path)}'")
+
+    shard_count = None
+    found: set[int] = set()
+    combined: dict[str, IndexEntry] = {}
+    for index_file in index_files:
+        with index_file.open(mode="r", encoding="utf-8") as f_d:
+            index = json.load(f_d)
+        try:
+            shard = Shard(*index["shard"])
+            files = index["files"].items()
+        except (KeyError, TypeError, AttributeError) as excp:
+            raise ValueError(f"invalid shard index '{index_file}'") from excp
+
+        if shard_count is not None and shard.count != shard_count:
+            raise ValueError(
+                f"the shard index '{index_file}' is of {shard.count} shards,"
+                f" not {shard_count}"
+            )
+        shard_count = shard.count
+        found.add(shard.index)
+
+        for rel_path, entry in files:
+            combined[rel_path] = IndexEntry(
+                mtime_ns=int(entry["mtime_ns"]),
+                size=int(entry["size"]),
+                headings=str(entry["headings"]),
+            )
+
+    missing = [
+        f"{index}/{shard_count}"
+        for index in range(1, (shard_count or 0) + 1)
+        if index not in found
+    ]
+    if missing:
+        raise ValueError(f"the indexes of the shards {', '.join(missing)} are missing")
+
+    return combined
+
+
+###############################################################################
+def load_index(out_path: Union[str, Path], index: dict[str, IndexEntry]) -> None:
+    """Add the headings of the combined index `index` to the heading index, so
+    the generated files don't have to be scanned again.
+
+    Files that are already in the heading index are not changed.
+
+    Parameters
+    ----------
+    out_path : Union[str, Path]
+        The output directory.
+    index : dict[str, IndexEntry]
+        The combined index returned by `read_shard_indexes`.
+    """
+    for rel_path, entry in index.items():
+        file_name = Path(out_path) / rel_path
+        if cached_headings(file_name=file_name) is None:
+            add_headings(
+                file_name=file_name,
+                mtime_ns=entry.mtime_ns,
+                size=entry.size,
+                text=entry.headings,
+            )
+
+
+###############################################################################
+def merge_main(argv: list[str]) -> None:
+    """Combine the partial indexes of the shards and correct the generated
+    files, this is the command `python -m obs2org merge`.
+
+    Parameters
+    ----------
+    argv : list[str]
+        The command line arguments after `merge`.
+    """
+    # pylint: disable=import-outside-toplevel
+    import argparse
+    import asyncio
+
+    from obs2org.output import OutputCommitter
+    from obs2org.scheduler import correct_files
+
+    cmd_line_parser = argparse.ArgumentParser(
+        prog="python -m obs2org merge",
+        description="""Combine the indexes of the shards generated using
+'--shard' and correct the links, tags and dates of the generated Org-Mode
+files.""",
+    )
+    cmd_line_parser.add_argument(
+        "out_path",
+        metavar="OUT_PATH",
+        help="""The output directory of the shards.""",
+    )
+    cmd_line_parser.add_argument(
+        "--shard",
+        metavar="i/N",
+        type=shard_arg,
+        dest="shard",
+        default=None,
+        help="""Correct only the i-th of N parts of the files.""",
+    )
+    cmd_line_parser.add_argument(
+        "-n",
+        "--no-cite",
+        action="store_true",
+        dest="remove_citations",
+        default=False,
+        help="""Treat links like '[[@Name]]' like normal links instead of
+Pandoc citations.""",
+    )
+    cmd_line_parser.add_argument(
+        "-u",
+        "--uuid",
+        action="store_true",
+        dest="generate_uuid",
+        default=False,
+        help="""Add a header with an UUID to every file.""",
+    )
+    cmd_line_parser.add_argument(
+        "--durable",
+        action="store_true",
+        dest="durable",
+        default=False,
+        help="""Sync the corrected files and their directories to disk
+before the program exits.""",
+    )
+    cmd_line_args = cmd_line_parser.parse_args(argv)
+
+    try:
+        index = read_shard_indexes(out_path=cmd_line_args.out_path)
+    except (OSError, ValueError) as excp:
+        cmd_line_parser.error(str(excp))
+
+    load_index(out_path=cmd_line_args.out_path, index=index)
+
+    shard = cmd_line_args.shard
+    asyncio.run(
+        correct_files(
+            out_files=(
+                Path(cmd_line_args.out_path) / rel_path
+                for rel_path in sorted(index)
+                if shard is None or in_shard(rel_path=rel_path, shard=shard)
+            ),
+            remove_citations=cmd_line_args.remove_citations,
+            add_uuid=cmd_line_args.generate_uuid,
+            committer=OutputCommitter(durable=cmd_line_args.durable),
+        )
+    )
+
+
+###############################################################################
+def shard_arg(text: str) -> Shard:
+    """Parse the argument of `--shard` for `argparse`.
+
+    Parameters
+    ----------
+    text : str
+        The argument to parse.
+
+    Returns
+    -------
+    Shard
+        The parsed shard.
+
+    Raises
+    ------
+    argparse.ArgumentTypeError
+        If the argument is not a valid shard.
+    """
+    import argparse  # pylint: disable=import-outside-toplevel
+
+    try:
+        return parse_shard(text=text)
+    except ValueError as excp:
+        raise argparse.ArgumentTypeError(str(excp)) from excp
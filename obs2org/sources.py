@@ -0,0 +1,673 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     sources.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Sources of the Markdown files that are not read from the file system: a
+tar or zip archive or a revision of a git repository.
+
+The Markdown files of a source are added to the `FileTable` like the files of
+a directory, an archive is used like a directory: the file `a/b.md` in the
+archive `notes.zip` is `notes.zip/a/b.md`. The files of a git revision have the
+paths they have in the work tree, but they don't need to exist there. Only the
+Markdown files are read, using `VaultSource.read`, their content is passed to
+Pandoc using stdin. Neither the archive nor the revision is extracted to the
+file system.
+"""
+
+from __future__ import annotations
+
+import posixpath
+import subprocess  # nosec B404
+import threading
+import time
+from os import path
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Iterable, Iterator, Optional
+
+from obs2org.archive import archive_suffix
+from obs2org.file_table import FileEntry
+from obs2org.state import relative_out_path
+
+if TYPE_CHECKING:
+    import zipfile
+
+    from obs2org.file_table import FileTable
+
+# The suffix of the Markdown files.
+_MD_SUFFIX = ".md"
+
+# The file mode of symbolic links in a git tree.
+_GIT_SYMLINK_MODE = "120000"
+
+
+################################################################################
+class SourceError(Exception):
+    """The source of the Markdown files can't be read."""
+
+
+################################################################################
+class VaultSource:
+    """Base class of the sources of Markdown files, see the module
+    documentation.
+
+    The content of the files is read by more than one thread at the same time.
+    """
+
+    ############################################################################
+    def add_files(
+        self, arg_path: str, out_path: str, files: FileTable, create_dirs: bool
+    ) -> None:
+        """Add the Markdown files at the path `arg_path` of the source to
+        `files`.
+
+        Parameters
+        ----------
+        arg_path : str
+            The path given on the command line.
+        out_path : str
+            The path to write the generated Org-Mode files to.
+        files : FileTable
+            The table to add the files to.
+        create_dirs : bool
+            Whether to create the output directories.
+
+        Raises
+        ------
+        SourceError
+            If the source can't be read.
+        """
+        raise NotImplementedError
+
+    ############################################################################
+    def read(self, in_file: Path) -> bytes:
+        """Return the content of the Markdown file `in_file`.
+
+        Parameters
+        ----------
+        in_file : Path
+            The path of the Markdown file, as added by `add_files`.
+
+        Returns
+        -------
+        bytes
+            The content of the file.
+
+        Raises
+        ------
+        OSError
+            If the file can't be read.
+        """
+        raise NotImplementedError
+
+    ############################################################################
+    def close(self) -> None:
+        """Release the files and processes used to read the source."""
+
+
+################################################################################
+class ArchiveSource(VaultSource):
+    """Reads the Markdown files of a tar or zip archive.
+
+    A tar archive is read once, when the files are added, and the content of
+    the Markdown files is kept in memory until it is read, as compressed tar
+    archives can't be read in any other order. The files of a zip archive are
+    read when they are needed.
+    """
+
+    def __init__(self, archive_path: Path) -> None:
+        """Construct the source of the archive `archive_path`.
+
+        Parameters
+        ----------
+        archive_path : Path
+            The path to the archive, it's suffix must be one of
+            `obs2org.archive.ARCHIVE_SUFFIXES`.
+
+        Raises
+        ------
+        SourceError
+            If the file isn't an archive.
+        """
+        self.suffix = archive_suffix(archive_path)
+        if self.suffix is None:
+            raise SourceError(f"'{archive_path}' is not a tar or zip archive")
+
+        self.archive_path = archive_path
+        self._lock = threading.Lock()
+        self._contents: dict[str, bytes] = {}
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._zip_members: dict[str, zipfile.ZipInfo] = {}
+
+    ############################################################################
+    def add_files(
+        self, arg_path: str, out_path: str, files: FileTable, create_dirs: bool
+    ) -> None:
+        """Add the Markdown files of the archive to `files`, see
+        `VaultSource.add_files`.
+
+        Parameters
+        ----------
+        arg_path : str
+            The path to the archive.
+        out_path : str
+            The path to write the generated Org-Mode files to.
+        files : FileTable
+            The table to add the files to.
+        create_dirs : bool
+            Whether to create the output directories.
+
+        Raises
+        ------
+        SourceError
+            If the archive can't be read.
+        """
+        # pylint: disable=import-outside-toplevel
+        import tarfile
+        import zipfile
+
+        members = self._zip_entries() if self.suffix == ".zip" else self._tar_entries()
+        try:
+            entries = _group_entries(members)
+        except (OSError, tarfile.TarError, zipfile.BadZipFile) as excp:
+            raise SourceError(f"can't read '{arg_path}': {excp}") from excp
+
+        _add_entries(
+            files=files,
+            in_root=arg_path,
+            out_root=out_path,
+            entries=entries,
+            create_dirs=create_dirs,
+        )
+
+    ############################################################################
+    def _tar_entries(self) -> Iterator[tuple[str, FileEntry]]:
+        """Read the tar archive and return the paths of the Markdown files in
+        the archive and their entries, their content is saved in memory.
+
+        Yields
+        ------
+        tuple[str, FileEntry]
+            The path of the file in the archive and it's entry.
+        """
+        # pylint: disable=import-outside-toplevel
+        import tarfile
+
+        with self.archive_path.open(mode="rb") as archive_file:
+            stream: IO[bytes] = archive_file
+            if self.suffix in (".tar.zst", ".tzst"):
+                stream = _zstd_reader(archive_file)
+            with tarfile.open(fileobj=stream, mode="r|*") as tar:
+                for member in tar:
+                    name = _member_name(member.name)
+                    if name is None or not member.isfile():
+                        continue
+                    member_file = tar.extractfile(member)
+                    if member_file is None:
+                        continue
+                    with self._lock:
+                        self._contents[name] = member_file.read()
+                    yield name, FileEntry(
+                        name=posixpath.basename(name),
+                        size=member.size,
+                        mtime_ns=int(member.mtime) * 1_000_000_000,
+                    )
+
+    ############################################################################
+    def _zip_entries(self) -> Iterator[tuple[str, FileEntry]]:
+        """Return the paths of the Markdown files in the zip archive and their
+        entries.
+
+        Yields
+        ------
+        tuple[str, FileEntry]
+            The path of the file in the archive and it's entry.
+        """
+        # pylint: disable=import-outside-toplevel
+        import zipfile
+
+        with self._lock:
+            if self._zip is None:
+                self._zip = zipfile.ZipFile(self.archive_path, mode="r")
+            zip_file = self._zip
+        for info in zip_file.infolist():
+            name = _member_name(info.filename)
+            if name is None or info.is_dir():
+                continue
+            with self._lock:
+                self._zip_members[name] = info
+            yield name, FileEntry(
+                name=posixpath.basename(name),
+                size=info.file_size,
+                mtime_ns=int(time.mktime((*info.date_time, 0, 0, -1))) * 1_000_000_000,
+            )
+
+    ############################################################################
+    def read(self, in_file: Path) -> bytes:
+        """Return the content of the Markdown file `in_file` in the archive.
+
+        The content of a file in a tar archive can only be read once.
+
+        Parameters
+        ----------
+        in_file : Path
+            The path of the Markdown file, in the virtual directory
+            `archive_path`.
+
+        Returns
+        -------
+        bytes
+            The content of the file.
+
+        Raises
+        ------
+        OSError
+            If the file isn't in the archive or can't be read.
+        """
+        import zipfile  # pylint: disable=import-outside-toplevel
+
+        name = relative_out_path(out_file=in_file, out_path=self.archive_path)
+        with self._lock:
+            content = self._contents.pop(name, None)
+            if content is not None:
+                return content
+            info = self._zip_members.get(name)
+            if info is None or self._zip is None:
+                raise OSError(f"'{name}' not found in '{self.archive_path}'")
+            try:
+                return self._zip.read(info)
+            except (zipfile.BadZipFile, RuntimeError, ValueError) as excp:
+                raise OSError(str(excp)) from excp
+
+    ############################################################################
+    def close(self) -> None:
+        """Close the zip archive and forget the content of the tar archive."""
+        with self._lock:
+            zip_file, self._zip = self._zip, None
+            self._contents = {}
+            self._zip_members = {}
+        if zip_file is not None:
+            zip_file.close()
+
+
+################################################################################
+class GitSource(VaultSource):
+    """Reads the Markdown files of a revision of a git repository, without
+    checking it out.
+
+    The Markdown files are listed using `git ls-tree` and read using a single
+    `git cat-file --batch` process. All paths given on the command line must
+    be in the same repository.
+    """
+
+    def __init__(self, revision: str, git: str = "git") -> None:
+        """Construct the source of the revision `revision`.
+
+        Parameters
+        ----------
+        revision : str
+            The revision, a commit, branch, tag or tree, like `HEAD~2`.
+        git : str, optional
+            The git executable, by default "git".
+        """
+        self.revision = revision
+        self.git = git
+        self._lock = threading.Lock()
+        self._blobs: dict[str, str] = {}
+        self._git_dir: Optional[str] = None
+        self._process: Optional[subprocess.Popen[bytes]] = None
+
+    ############################################################################
+    def add_files(
+        self, arg_path: str, out_path: str, files: FileTable, create_dirs: bool
+    ) -> None:
+        """Add the Markdown files at the path `arg_path` in the revision to
+        `files`, see `VaultSource.add_files`.
+
+        If `arg_path` isn't a directory of the work tree, it is the path to a
+        single Markdown file, which doesn't need to exist in the work tree.
+
+        Parameters
+        ----------
+        arg_path : str
+            The path to the directory or Markdown file.
+        out_path : str
+            The path to write the generated Org-Mode files to.
+        files : FileTable
+            The table to add the files to.
+        create_dirs : bool
+            Whether to create the output directories.
+
+        Raises
+        ------
+        SourceError
+            If git fails, for example if the revision doesn't exist.
+        """
+        if path.isdir(arg_path):
+            run_dir, pathspec = arg_path, "."
+        else:
+            run_dir, pathspec = path.dirname(arg_path) or ".", path.basename(arg_path)
+        if self._git_dir is None:
+            self._git_dir = run_dir
+
+        mtime_ns = self._commit_time_ns(run_dir=run_dir)
+        entries = _group_entries(
+            (name, entry._replace(mtime_ns=mtime_ns))
+            for name, entry in self._tree_entries(run_dir=run_dir, pathspec=pathspec)
+        )
+        _add_entries(
+            files=files,
+            in_root=run_dir if pathspec != "." else arg_path,
+            out_root=out_path,
+            entries=entries,
+            create_dirs=create_dirs,
+        )
+
+    ############################################################################
+    def _commit_time_ns(self, run_dir: str) -> int:
+        """Return the commit time of the revision in nanoseconds, 0 if the
+        revision is a tree.
+
+        Parameters
+        ----------
+        run_dir : str
+            The directory to run git in.
+
+        Returns
+        -------
+        int
+            The commit time of the revision.
+        """
+        try:
+            output = run_git(
+                git=self.git,
+                run_dir=run_dir,
+                args=["show", "-s", "--format=%ct", self.revision, "--"],
+            )
+            return int(output.split()[0]) * 1_000_000_000
+        except (SourceError, ValueError, IndexError):
+            return 0
+
+    ############################################################################
+    def _tree_entries(
+        self, run_dir: str, pathspec: str
+    ) -> Iterator[tuple[str, FileEntry]]:
+        """Return the paths of the Markdown files in the tree of the revision
+        and their entries, their blob ids are saved.
+
+        Parameters
+        ----------
+        run_dir : str
+            The directory to run git in, the paths are relative to this
+            directory.
+        pathspec : str
+            The path to list the files of.
+
+        Yields
+        ------
+        tuple[str, FileEntry]
+            The path of the file relative to `run_dir` and it's entry, the
+            modification time is 0.
+        """
+        output = run_git(
+            git=self.git,
+            run_dir=run_dir,
+            args=["ls-tree", "-r", "-z", "--long", self.revision, "--", pathspec],
+        )
+        for line in output.split(b"\0"):
+            header, _, name_bytes = line.partition(b"\t")
+            fields = header.decode(encoding="utf-8", errors="replace").split()
+            name = _member_name(name_bytes.decode(encoding="utf-8", errors="replace"))
+            if (
+                len(fields) != 4
+                or fields[1] != "blob"
+                or fields[0] == _GIT_SYMLINK_MODE
+                or name is None
+            ):
+                continue
+            with self._lock:
+                self._blobs[path.normpath(path.join(run_dir, name))] = fields[2]
+            yield name, FileEntry(
+                name=posixpath.basename(name), size=int(fields[3]), mtime_ns=0
+            )
+
+    ############################################################################
+    def read(self, in_file: Path) -> bytes:
+        """Return the content of the Markdown file `in_file` in the revision.
+
+        Parameters
+        ----------
+        in_file : Path
+            The path of the Markdown file in the work tree.
+
+        Returns
+        -------
+        bytes
+            The content of the file.
+
+        Raises
+        ------
+        OSError
+            If the file can't be read.
+        """
+        with self._lock:
+            blob = self._blobs.get(path.normpath(in_file))
+            if blob is None:
+                raise OSError(f"'{in_file}' not found in revision '{self.revision}'")
+            process = self._cat_file()
+            if process.stdin is None or process.stdout is None:
+                raise OSError("can't read from 'git cat-file'")
+            process.stdin.write(blob.encode(encoding="ascii") + b"\n")
+            process.stdin.flush()
+            header = process.stdout.readline().split()
+            if len(header) != 3 or header[1] != b"blob":
+                raise OSError(f"can't read '{in_file}' from git: {header!r}")
+            content = process.stdout.read(int(header[2]))
+            process.stdout.read(1)
+
+        return content
+
+    ############################################################################
+    def _cat_file(self) -> subprocess.Popen[bytes]:
+        """Return the process of `git cat-file --batch`, start it if it isn't
+        running.
+
+        Returns
+        -------
+        subprocess.Popen[bytes]
+            The running process.
+        """
+        if self._process is None or self._process.poll() is not None:
+            # pylint: disable=consider-using-with
+            self._process = subprocess.Popen(  # nosec
+                [self.git, "-C", self._git_dir or ".", "cat-file", "--batch"],
+                shell=False,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+
+        return self._process
+
+    ############################################################################
+    def close(self) -> None:
+        """Stop the process of `git cat-file`."""
+        with self._lock:
+            process, self._process = self._process, None
+        if process is None:
+            return
+
+        if process.stdin is not None:
+            process.stdin.close()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        if process.stdout is not None:
+            process.stdout.close()
+
+
+###############################################################################
+def run_git(git: str, run_dir: str, args: list[str]) -> bytes:
+    """Run git in the directory `run_dir` and return it's output.
+
+    Parameters
+    ----------
+    git : str
+        The git executable.
+    run_dir : str
+        The directory to run git in.
+    args : list[str]
+        The arguments of git.
+
+    Returns
+    -------
+    bytes
+        The output of git.
+
+    Raises
+    ------
+    SourceError
+        If git can't be run or fails.
+    """
+    try:
+        result = subprocess.run(  # nosec
+            [git, "-C", run_dir, *args],
+            shell=False,
+            check=False,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+    except OSError as excp:
+        raise SourceError(f"can't run '{git}': {excp}") from excp
+    if result.returncode != 0:
+        raise SourceError(
+            f"git error: '{result.stderr.decode(errors='replace').strip()}'"
+        )
+
+    return result.stdout
+
+
+###############################################################################
+def _member_name(name: str) -> Optional[str]:
+    """Return the normalized path of the archive member or git tree entry
+    `name`, if it is a Markdown file, `None` else.
+
+    Absolute paths and paths outside of the archive are ignored too, their
+    Org-Mode files would be written outside of the output directory.
+
+    Parameters
+    ----------
+    name : str
+        The path of the member.
+
+    Returns
+    -------
+    Optional[str]
+        The normalized path using slashes, `None` if the member isn't a
+        Markdown file or it's path is not allowed.
+    """
+    normalized = posixpath.normpath(name.replace("\\", "/"))
+    if (
+        normalized.startswith("/")
+        or normalized == ".."
+        or normalized.startswith("../")
+        or not normalized.endswith(_MD_SUFFIX)
+        or posixpath.basename(normalized) == _MD_SUFFIX
+        or (len(normalized) > 1 and normalized[1] == ":")
+    ):
+        return None
+
+    return normalized
+
+
+###############################################################################
+def _group_entries(
+    members: Iterable[tuple[str, FileEntry]],
+) -> dict[str, list[FileEntry]]:
+    """Group the Markdown files `members` by their directory.
+
+    Parameters
+    ----------
+    members : Iterable[tuple[str, FileEntry]]
+        The paths of the files and their entries.
+
+    Returns
+    -------
+    dict[str, list[FileEntry]]
+        The entries, the key is the directory of the files, using slashes,
+        the empty string for the root directory.
+    """
+    entries: dict[str, list[FileEntry]] = {}
+    for name, entry in members:
+        entries.setdefault(posixpath.dirname(name), []).append(entry)
+
+    return entries
+
+
+###############################################################################
+def _add_entries(
+    files: FileTable,
+    in_root: str,
+    out_root: str,
+    entries: dict[str, list[FileEntry]],
+    create_dirs: bool,
+) -> None:
+    """Add the Markdown files `entries` to `files`.
+
+    Parameters
+    ----------
+    files : FileTable
+        The table to add the files to.
+    in_root : str
+        The directory the paths of the files are relative to.
+    out_root : str
+        The directory to write the Org-Mode files to.
+    entries : dict[str, list[FileEntry]]
+        The files, grouped by their directory, see `_group_entries`.
+    create_dirs : bool
+        Whether to create the output directories.
+    """
+    for directory in sorted(entries):
+        parts = directory.split("/") if directory else []
+        out_dir = path.join(out_root, *parts)
+        if create_dirs:
+            Path(out_dir).mkdir(exist_ok=True, parents=True)
+        files.add_directory(
+            in_dir=path.join(in_root, *parts),
+            out_dir=out_dir,
+            entries=entries[directory],
+        )
+
+
+###############################################################################
+def _zstd_reader(archive_file: IO[bytes]) -> IO[bytes]:
+    """Return a stream decompressing the zstd compressed `archive_file`.
+
+    Parameters
+    ----------
+    archive_file : IO[bytes]
+        The compressed file.
+
+    Returns
+    -------
+    IO[bytes]
+        The decompressed stream.
+
+    Raises
+    ------
+    SourceError
+        If the package `zstandard` isn't installed.
+    """
+    try:
+        import zstandard  # pylint: disable=import-outside-toplevel
+    except ImportError as excp:
+        raise SourceError(
+            "reading '.tar.zst' archives needs the Python package 'zstandard',"
+            " install it using 'pip install zstandard'"
+        ) from excp
+
+    return zstandard.ZstdDecompressor().stream_reader(archive_file)
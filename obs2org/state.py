@@ -0,0 +1,59 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     state.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Location of the files Obs2Org saves it's state in, next to the generated
+Org-Mode files.
+"""
+
+from __future__ import annotations
+
+from os import path
+from pathlib import Path
+from typing import Union
+
+# The name of the directory in the output directory containing the state.
+STATE_DIR_NAME = ".obs2org"
+
+
+###############################################################################
+def state_directory(out_path: Union[str, Path]) -> Path:
+    """Return the path to the directory containing Obs2Org's state files for
+    the output directory `out_path`.
+
+    The directory is not created.
+
+    Parameters
+    ----------
+    out_path : Union[str, Path]
+        The directory the Org-Mode files are written to.
+
+    Returns
+    -------
+    Path
+        The path to the state directory.
+    """
+    return Path(out_path) / STATE_DIR_NAME
+
+
+###############################################################################
+def relative_out_path(out_file: Union[str, Path], out_path: Union[str, Path]) -> str:
+    """Return the path of the Org-Mode file `out_file` relative to the output
+    directory `out_path`, using slashes as separators.
+
+    Parameters
+    ----------
+    out_file : Union[str, Path]
+        The path to the generated Org-Mode file.
+    out_path : Union[str, Path]
+        The output directory.
+
+    Returns
+    -------
+    str
+        The relative path of the Org-Mode file.
+    """
+    return Path(path.relpath(out_file, out_path)).as_posix()
@@ -0,0 +1,447 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     transclusion.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Expand the embedded notes and sections, like `![[Note]]` and
+`![[Note#Heading]]`, in the generated Org-Mode files, see
+`--transclude-depth`.
+
+The embeds are expanded after all files have been converted and corrected.
+The correction has already replaced every embed by a link to the Org-Mode file
+and the id of the heading, like `![[file:Note.org::#heading][Heading]]`, using
+the same lookup as every other link, see `obs2org.parse_org_mode`. The
+expansion replaces the link by the section of the heading, or the whole file
+if the link doesn't contain a heading id. The headings of the section are
+demoted to be below the heading containing the embed, their `:CUSTOM_ID:`
+properties are removed and the links of the section are changed to be
+relative to the directory of the embedding file. Embeds in an embedded section
+are expanded too, up to the maximum depth. An embed of a section that is
+already being expanded is a cycle and is left as a link.
+
+The sections are extracted once per run and cached by the path of the file,
+the heading id and the hash of the file's content, see `FragmentCache`.
+"""
+
+from __future__ import annotations
+
+import re
+from hashlib import blake2b
+from os import path
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, Iterable, NamedTuple, Optional, Tuple
+
+from obs2org.regexp import LazyPattern
+
+if TYPE_CHECKING:
+    from obs2org.output import OutputCommitter
+
+# The marker of an embed Obs2Org has converted to a link to an Org-Mode file.
+_EMBED_MARKER = "![[file:"
+
+# Matches an embed converted to a link to an Org-Mode file, with an optional
+# heading id and an optional caption. The first group is the path to the file,
+# the second the heading id.
+_embed_regex: LazyPattern[str] = LazyPattern(
+    r"!\[\[file:([^\]\n]+?\.org)(?:::#([^\]\n]+))?\](?:\[[^\]\n]*\])?\]"
+)
+
+# Matches an Org-Mode heading line, the group is the stars of the heading.
+_heading_regex: LazyPattern[str] = LazyPattern(r"^(\*+)[^\S\n]", flags=re.MULTILINE)
+
+# Matches the property drawers Pandoc generates for the heading ids.
+_custom_id_drawer_regex: LazyPattern[str] = LazyPattern(
+    r"^:PROPERTIES:\n:CUSTOM_ID:[^\n]*\n:END:\n", flags=re.MULTILINE
+)
+
+# Matches the keywords and the Org-Roam header at the start of a file, which
+# aren't part of the embedded content.
+_file_header_regex: LazyPattern[str] = LazyPattern(
+    r"(?:[^\S\n]*\n|#\+[^\n]*\n|:PROPERTIES:\n:ID:[^\n]*\n:END:\n)*"
+)
+
+# Matches the path of a link to a file, the group is the path.
+_file_link_regex: LazyPattern[str] = LazyPattern(r"\[\[file:([^\]\n]+?)(?=::|\])")
+
+
+################################################################################
+class _Embed(NamedTuple):
+    """Class holding the target of an embed, the file and the heading id."""
+
+    file_name: Path
+    """The normalized path to the Org-Mode file."""
+    heading_id: Optional[str]
+    """The id of the embedded heading, `None` for the whole file."""
+
+
+################################################################################
+class FragmentCache:
+    """Cache of the sections extracted from the Org-Mode files.
+
+    The Org-Mode files are read once and the sections are extracted once per
+    path, heading id and hash of the file's content, no matter how many files
+    embed them.
+    """
+
+    def __init__(self) -> None:
+        """Construct an empty cache."""
+        self._texts: dict[Path, Optional[Tuple[str, str]]] = {}
+        self._fragments: dict[Tuple[Path, Optional[str], str], Optional[str]] = {}
+        self.extracted = 0
+        """The number of sections that have been extracted."""
+
+    ############################################################################
+    def fragment(self, embed: _Embed) -> Optional[str]:
+        """Return the section `embed.heading_id` of the file `embed.file_name`.
+
+        The heading id and the property drawers of all headings are removed,
+        the headings keep their level. Embeds in the section are not
+        expanded.
+
+        Parameters
+        ----------
+        embed : _Embed
+            The file and the heading id of the section.
+
+        Returns
+        -------
+        Optional[str]
+            The section, `None` if the file or the heading has not been found.
+        """
+        content = self._text(embed.file_name)
+        if content is None:
+            return None
+
+        text, digest = content
+        key = (embed.file_name, embed.heading_id, digest)
+        if key not in self._fragments:
+            self._fragments[key] = _extract(text=text, heading_id=embed.heading_id)
+            self.extracted += 1
+            if self._fragments[key] is None:
+                print(
+                    f"Error, heading '{embed.heading_id}' not found in file"
+                    f" '{embed.file_name.absolute()}', embed won't be expanded!"
+                )
+
+        return self._fragments[key]
+
+    ############################################################################
+    def _text(self, file_name: Path) -> Optional[Tuple[str, str]]:
+        """Return the content of the file `file_name` and it's hash.
+
+        Parameters
+        ----------
+        file_name : Path
+            The normalized path to the Org-Mode file.
+
+        Returns
+        -------
+        Optional[Tuple[str, str]]
+            The content and it's hash, `None` if the file can't be read.
+        """
+        if file_name not in self._texts:
+            try:
+                text = file_name.read_text(encoding="utf-8")
+                self._texts[file_name] = (
+                    text,
+                    blake2b(text.encode(encoding="utf-8"), digest_size=16).hexdigest(),
+                )
+            except OSError as excp:
+                print(
+                    f"Error, embedded file '{file_name.absolute()}' can't be read,"
+                    f" embed won't be expanded: {excp}"
+                )
+                self._texts[file_name] = None
+
+        return self._texts[file_name]
+
+
+################################################################################
+def expand_files(
+    out_files: Iterable[Path], depth: int, committer: OutputCommitter
+) -> int:
+    """Expand the embeds in the Org-Mode files `out_files` and write the
+    changed files.
+
+    The expanded texts of all files are generated before the first file is
+    written, so every embedded section is taken from the unexpanded file and
+    nested embeds are expanded up to `depth` no matter the order of the
+    files.
+
+    Parameters
+    ----------
+    out_files : Iterable[Path]
+        The paths to the generated Org-Mode files.
+    depth : int
+        The maximum depth of nested embeds, at least 1. Embeds that are nested
+        deeper are left as links.
+    committer : OutputCommitter
+        The object to write the expanded files with.
+
+    Returns
+    -------
+    int
+        The number of files containing expanded embeds.
+    """
+    cache = FragmentCache()
+    expanded: list[Tuple[Path, str]] = []
+    for out_file in out_files:
+        file_name = Path(path.normpath(out_file))
+        try:
+            text = file_name.read_text(encoding="utf-8")
+        except OSError as excp:
+            print(f"Error reading file '{file_name}': {excp}")
+            continue
+        if _EMBED_MARKER not in text:
+            continue
+        new_text = expand_text(text=text, file_name=file_name, depth=depth, cache=cache)
+        if new_text != text:
+            expanded.append((file_name, new_text))
+
+    for file_name, new_text in expanded:
+        committer.commit(file_path=file_name, text=new_text)
+
+    return len(expanded)
+
+
+################################################################################
+def expand_text(
+    text: str,
+    file_name: Path,
+    depth: int,
+    cache: FragmentCache,
+    stack: Tuple[_Embed, ...] = (),
+) -> str:
+    """Return the Org-Mode text `text` of the file `file_name` with the embeds
+    replaced by the sections they embed.
+
+    Parameters
+    ----------
+    text : str
+        The Org-Mode text containing the embeds.
+    file_name : Path
+        The normalized path to the Org-Mode file containing `text`, the paths
+        of the embeds are relative to it's directory.
+    depth : int
+        The number of levels of embeds to expand, the embeds in `text` are
+        left as links if this is smaller than 1.
+    cache : FragmentCache
+        The cache of the extracted sections.
+    stack : Tuple[_Embed, ...], optional
+        The embeds that are being expanded, to find cycles. By default the
+        empty tuple, `text` is the whole file `file_name`.
+
+    Returns
+    -------
+    str
+        The text with the expanded embeds.
+    """
+    if depth < 1 or _EMBED_MARKER not in text:
+        return text
+
+    if not stack:
+        stack = (_Embed(file_name=file_name, heading_id=None),)
+    directory = file_name.parent
+    parts: list[str] = []
+    last_end = 0
+    for match in _embed_regex.finditer(text):
+        embed = _Embed(
+            file_name=Path(path.normpath(directory / match.group(1))),
+            heading_id=match.group(2),
+        )
+        if embed in stack:
+            print(
+                f"Error, embed '{match.group(0)}' in file '{file_name.absolute()}'"
+                " is a cycle, it won't be expanded!"
+            )
+            continue
+        fragment = cache.fragment(embed)
+        if fragment is None:
+            continue
+
+        fragment = expand_text(
+            text=fragment,
+            file_name=embed.file_name,
+            depth=depth - 1,
+            cache=cache,
+            stack=stack + (embed,),
+        )
+        fragment = _rebase_links(
+            text=fragment, from_dir=embed.file_name.parent, to_dir=directory
+        )
+        fragment = _demote_headings(
+            text=fragment, level=_enclosing_level(text=text, pos=match.start()) + 1
+        )
+        parts.append(text[last_end : match.start()])
+        parts.append(
+            _place(text=text, start=match.start(), end=match.end(), fragment=fragment)
+        )
+        last_end = match.end()
+
+    parts.append(text[last_end:])
+    return "".join(parts)
+
+
+################################################################################
+def _extract(text: str, heading_id: Optional[str]) -> Optional[str]:
+    """Return the section of the heading with the id `heading_id` of `text`.
+
+    The section ends before the next heading with the same or a smaller
+    level. If `heading_id` is `None`, the whole text without the keywords and
+    the Org-Roam header at the start is returned. The property drawers of the
+    heading ids are removed.
+
+    Parameters
+    ----------
+    text : str
+        The Org-Mode text of the file.
+    heading_id : Optional[str]
+        The id of the heading, `None` for the whole text.
+
+    Returns
+    -------
+    Optional[str]
+        The section, `None` if there is no heading with the id `heading_id`.
+    """
+    if heading_id is None:
+        header = _file_header_regex.match(text)
+        section = text[header.end() if header is not None else 0 :]
+    else:
+        id_match = re.search(
+            r"^:CUSTOM_ID:[^\S\n]*" + re.escape(heading_id) + r"[^\S\n]*$",
+            text,
+            flags=re.MULTILINE,
+        )
+        if id_match is None:
+            return None
+        heading_match = None
+        for heading_match in _heading_regex.finditer(text, 0, id_match.start()):
+            pass
+        if heading_match is None:
+            return None
+        level = len(heading_match.group(1))
+        end_match = re.compile(
+            r"^\*{1," + str(level) + r"}[^\S\n]", flags=re.MULTILINE
+        ).search(text, id_match.end())
+        section = text[
+            heading_match.start() : (
+                end_match.start() if end_match is not None else len(text)
+            )
+        ]
+
+    return _custom_id_drawer_regex.sub("", section).strip("\n")
+
+
+################################################################################
+def _enclosing_level(text: str, pos: int) -> int:
+    """Return the level of the heading the position `pos` of `text` is in.
+
+    Parameters
+    ----------
+    text : str
+        The Org-Mode text.
+    pos : int
+        The position in `text`.
+
+    Returns
+    -------
+    int
+        The number of stars of the last heading before `pos`, 0 if there is no
+        heading before `pos`.
+    """
+    level = 0
+    for heading_match in _heading_regex.finditer(text, 0, pos):
+        level = len(heading_match.group(1))
+    return level
+
+
+################################################################################
+def _demote_headings(text: str, level: int) -> str:
+    """Change the levels of the headings of `text`, so the highest headings
+    have the level `level`.
+
+    Parameters
+    ----------
+    text : str
+        The Org-Mode text of a section.
+    level : int
+        The level of the highest headings of `text`.
+
+    Returns
+    -------
+    str
+        The text with the changed headings.
+    """
+    levels = [len(stars) for stars in _heading_regex.findall(text)]
+    if not levels or min(levels) == level:
+        return text
+
+    shift = level - min(levels)
+    return _heading_regex.sub(
+        lambda match: "*" * (len(match.group(1)) + shift) + match.group(0)[-1], text
+    )
+
+
+################################################################################
+def _rebase_links(text: str, from_dir: Path, to_dir: Path) -> str:
+    """Change the relative links to files in `text` from the directory
+    `from_dir` to `to_dir`.
+
+    Parameters
+    ----------
+    text : str
+        The Org-Mode text containing the links.
+    from_dir : Path
+        The directory the links of `text` are relative to.
+    to_dir : Path
+        The directory the links should be relative to.
+
+    Returns
+    -------
+    str
+        The text with the changed links.
+    """
+    if from_dir == to_dir:
+        return text
+
+    def rebase(match: re.Match[str]) -> str:
+        link = match.group(1)
+        if path.isabs(link) or link.startswith("~"):
+            return match.group(0)
+        rebased = path.relpath(path.join(from_dir, link), to_dir)
+        return "[[file:" + PurePosixPath(*Path(rebased).parts).as_posix()
+
+    return _file_link_regex.sub(rebase, text)
+
+
+################################################################################
+def _place(text: str, start: int, end: int, fragment: str) -> str:
+    """Return the section `fragment` to replace the embed from `start` to `end`
+    of `text` with.
+
+    A section starting with a heading starts on a line of it's own and the
+    text after the embed starts on a new line.
+
+    Parameters
+    ----------
+    text : str
+        The Org-Mode text containing the embed.
+    start : int
+        The start of the embed in `text`.
+    end : int
+        The end of the embed in `text`.
+    fragment : str
+        The section to insert.
+
+    Returns
+    -------
+    str
+        The section with the needed newlines.
+    """
+    if start > 0 and text[start - 1] != "\n" and fragment.startswith("*"):
+        fragment = "\n" + fragment
+    if end < len(text) and text[end] != "\n":
+        fragment += "\n"
+    return fragment
@@ -0,0 +1,340 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  Obs2Org
+# File:     walk.py
+# Date:     19.10.2026
+# ===============================================================================
+"""Walk the input directories and yield the Markdown files directory by
+directory, so the conversion can start before the walk has finished, see
+`--max-pending`.
+
+The Markdown files can also be read from a list of file names, see
+`--files-from`, instead of walking the directories.
+"""
+
+from __future__ import annotations
+
+from os import fsdecode, path, scandir, stat
+from pathlib import Path
+from stat import S_ISREG
+from typing import Any, Callable, Iterable, Iterator, NamedTuple
+
+from obs2org.file_table import FileEntry
+
+# Convert the file as soon as it has been found.
+CONVERT = 0
+
+# Convert the file after all other files, like the files in the quarantine.
+CONVERT_LAST = 1
+
+# Don't convert the file.
+SKIP = 2
+
+# The maximum number of bytes to read from a list of file names at once.
+_BLOCK_SIZE = 65536
+
+
+################################################################################
+class DirectoryFiles(NamedTuple):
+    """Class holding the Markdown files found in a single directory."""
+
+    in_dir: str
+    """The directory containing the Markdown files."""
+    out_dir: str
+    """The directory to write the Org-Mode files to."""
+    entries: list[FileEntry]
+    """The Markdown files in `in_dir`."""
+
+
+################################################################################
+class FileStream(NamedTuple):
+    """Class holding the walk of the input directories, the files are
+    converted while walking."""
+
+    directories: Iterator[DirectoryFiles]
+    """The directories found by the walk, read in a worker thread."""
+    max_pending: int
+    """The maximum number of files found, but not converted or not corrected
+    yet."""
+    select: Callable[[int], int]
+    """Return when to convert the file with the given index in the
+    `FileTable`: `CONVERT`, `CONVERT_LAST` or `SKIP`."""
+
+
+################################################################################
+def walk_directory(
+    out_path: str, arg_path: str, create_dirs: bool = True
+) -> Iterator[DirectoryFiles]:
+    """Walk through the directory `arg_path` and yield the Markdown files of
+    every directory.
+
+    The size and modification time of the files are read while walking, the
+    OS returns them together with the directory entries on most systems. The
+    directories are yielded in the order of a depth first walk, sorted by
+    name.
+
+    Parameters
+    ----------
+    out_path : str
+        The path to write the generated Org-Mode files to.
+    arg_path : str
+        The directory to search for Markdown files.
+    create_dirs : bool, optional
+        Whether to create the output directories, by default `True`.
+
+    Yields
+    ------
+    Iterator[DirectoryFiles]
+        The Markdown files of every directory containing Markdown files.
+    """
+    directories = [arg_path]
+    while directories:
+        dirpath = directories.pop()
+        out_dir = path.join(out_path, path.relpath(dirpath, arg_path))
+        if create_dirs:
+            Path(out_dir).mkdir(exist_ok=True, parents=True)
+        entries: list[FileEntry] = []
+        sub_directories: list[str] = []
+        try:
+            with scandir(dirpath) as dir_entries:
+                for entry in dir_entries:
+                    try:
+                        if entry.is_dir():
+                            sub_directories.append(entry.path)
+                        elif _is_markdown(entry.name):
+                            stat = entry.stat()
+                            entries.append(
+                                FileEntry(
+                                    name=entry.name,
+                                    size=stat.st_size,
+                                    mtime_ns=stat.st_mtime_ns,
+                                )
+                            )
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+        directories.extend(sorted(sub_directories, reverse=True))
+        if entries:
+            yield DirectoryFiles(in_dir=dirpath, out_dir=out_dir, entries=entries)
+
+
+################################################################################
+def walk_paths(path_list: list[str], out_path: str) -> Iterator[DirectoryFiles]:
+    """Walk through the input paths `path_list` and yield the Markdown files
+    of every directory, see `walk_directory`.
+
+    A Markdown file given in `path_list` is yielded as a directory containing
+    only this file.
+
+    Parameters
+    ----------
+    path_list : list[str]
+        The Markdown files and directories given on the command line.
+    out_path : str
+        The output directory.
+
+    Yields
+    ------
+    Iterator[DirectoryFiles]
+        The Markdown files of every directory containing Markdown files.
+    """
+    for arg_path in path_list:
+        if path.isdir(arg_path):
+            yield from walk_directory(out_path=out_path, arg_path=arg_path)
+            continue
+
+        try:
+            file_stat = stat(arg_path)
+        except OSError:
+            continue
+        yield DirectoryFiles(
+            in_dir=path.dirname(arg_path),
+            out_dir=out_path,
+            entries=[
+                FileEntry(
+                    name=path.basename(arg_path),
+                    size=file_stat.st_size,
+                    mtime_ns=file_stat.st_mtime_ns,
+                )
+            ],
+        )
+
+
+################################################################################
+def _is_markdown(file_name: str) -> bool:
+    """Return `True` if the file `file_name` is a Markdown file to convert.
+
+    Parameters
+    ----------
+    file_name : str
+        The name of the file, without the directory.
+
+    Returns
+    -------
+    bool
+        `True` if the name ends with `.md` and isn't just `.md`.
+    """
+    return file_name.endswith(".md") and file_name != ".md"
+
+
+################################################################################
+def read_file_list(file_name: str) -> Iterator[str]:
+    """Yield the file names of the list in the file `file_name`, or of stdin
+    if `file_name` is `-`.
+
+    The file names are separated by NUL characters, like the output of
+    `find -print0` or `git diff -z`, or by newlines. The separator is the
+    first NUL or newline read. The list is read while the names are yielded,
+    so the files can be converted while the list is still written. Empty
+    names are skipped.
+
+    Parameters
+    ----------
+    file_name : str
+        The path to the file containing the list, `-` for stdin.
+
+    Yields
+    ------
+    Iterator[str]
+        The file names.
+
+    Raises
+    ------
+    OSError
+        If the list can't be read.
+    """
+    if file_name == "-":
+        import sys  # pylint: disable=import-outside-toplevel
+
+        yield from _split_file_list(sys.stdin.buffer)
+        return
+
+    with open(file_name, mode="rb") as file_list:
+        yield from _split_file_list(file_list)
+
+
+################################################################################
+def walk_file_list(
+    file_names: Iterable[str], root: str, out_path: str, create_dirs: bool = True
+) -> Iterator[DirectoryFiles]:
+    """Yield the Markdown files `file_names` as the files of their
+    directories.
+
+    Consecutive files in the same directory are yielded together. The
+    Org-Mode file of a Markdown file has the same path relative to
+    `out_path` as the Markdown file relative to `root`. Files that don't end
+    with `.md` or are given more than once are skipped silently, so the list
+    may contain all changed files of a vault. Files that don't exist or
+    aren't inside of `root` are skipped and the reason is printed.
+
+    Parameters
+    ----------
+    file_names : Iterable[str]
+        The paths to the Markdown files, relative to the current working
+        directory or absolute, see `read_file_list`.
+    root : str
+        The directory the paths of the Org-Mode files are relative to, the
+        root of the vault.
+    out_path : str
+        The output directory.
+    create_dirs : bool, optional
+        Whether to create the output directories, by default `True`.
+
+    Yields
+    ------
+    Iterator[DirectoryFiles]
+        The Markdown files of every run of files in the same directory.
+    """
+    abs_root = path.abspath(root)
+    seen: set[str] = set()
+    in_dir = None
+    out_dir = ""
+    entries: list[FileEntry] = []
+    for file_name in file_names:
+        normalized = path.normpath(file_name)
+        if normalized in seen or not _is_markdown(path.basename(normalized)):
+            continue
+        file_dir = path.dirname(normalized)
+        try:
+            relative_dir = path.relpath(path.abspath(file_dir or "."), abs_root)
+        except ValueError:
+            relative_dir = path.pardir
+        if relative_dir == path.pardir or relative_dir.startswith(
+            path.pardir + path.sep
+        ):
+            print(f"Skipping file '{file_name}', it isn't inside of '{root}'")
+            continue
+        try:
+            file_stat = stat(normalized)
+        except OSError as excp:
+            print(f"Skipping file '{file_name}': {excp}")
+            continue
+        if not S_ISREG(file_stat.st_mode):
+            print(f"Skipping '{file_name}', it isn't a file")
+            continue
+
+        seen.add(normalized)
+        if file_dir != in_dir:
+            if entries:
+                yield DirectoryFiles(
+                    in_dir=in_dir or "", out_dir=out_dir, entries=entries
+                )
+                entries = []
+            in_dir = file_dir
+            out_dir = path.normpath(path.join(out_path, relative_dir))
+            if create_dirs:
+                Path(out_dir).mkdir(exist_ok=True, parents=True)
+        entries.append(
+            FileEntry(
+                name=path.basename(normalized),
+                size=file_stat.st_size,
+                mtime_ns=file_stat.st_mtime_ns,
+            )
+        )
+
+    if entries:
+        yield DirectoryFiles(in_dir=in_dir or "", out_dir=out_dir, entries=entries)
+
+
+################################################################################
+def _split_file_list(file_list: Any) -> Iterator[str]:
+    """Yield the file names read from the binary stream `file_list`, see
+    `read_file_list`.
+
+    Parameters
+    ----------
+    file_list : Any
+        The binary stream to read, like `sys.stdin.buffer`.
+
+    Yields
+    ------
+    Iterator[str]
+        The file names.
+    """
+    separator = b""
+    pending = b""
+    while True:
+        block = file_list.read1(_BLOCK_SIZE)
+        if not block:
+            break
+        pending += block
+        if not separator:
+            if b"\0" in pending:
+                separator = b"\0"
+            elif b"\n" in pending:
+                separator = b"\n"
+            else:
+                continue
+        *names, pending = pending.split(separator)
+        for name in names:
+            if separator == b"\n":
+                name = name.rstrip(b"\r")
+            if name:
+                yield fsdecode(name)
+
+    if separator == b"\n":
+        pending = pending.rstrip(b"\r")
+    if pending:
+        yield fsdecode(pending)
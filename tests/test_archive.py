@@ -0,0 +1,113 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_archive.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test writing the generated Org-Mode files into an archive."""
+
+import importlib.util
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from obs2org.archive import ArchiveCommitter, ArchiveError, archive_suffix
+from obs2org.heading_index import heading_text, set_pending_headings
+
+
+################################################################################
+def test_archive_suffix() -> None:
+    """Test recognizing the paths of archives."""
+    assert archive_suffix("out/notes.tar.gz") == ".tar.gz"  # nosec
+    assert archive_suffix("notes.TGZ") == ".tgz"  # nosec
+    assert archive_suffix("notes.zip") == ".zip"  # nosec
+    assert archive_suffix("notes.tar") == ".tar"  # nosec
+    assert archive_suffix("notes.tar.zst") == ".tar.zst"  # nosec
+    assert archive_suffix("out/") is None  # nosec
+    assert archive_suffix("notes.org") is None  # nosec
+    assert archive_suffix(".zip") is None  # nosec
+
+
+################################################################################
+@pytest.mark.parametrize("name", ["notes.tar", "notes.tar.gz", "notes.tgz"])
+def test_tar_archive(tmp_path: Path, name: str) -> None:
+    """Test writing a tar archive."""
+    archive_path = tmp_path / name
+    committer = ArchiveCommitter(archive_path=archive_path)
+
+    assert committer.commit(  # nosec
+        file_path=archive_path / "dir" / "Note.org", text="* Überschrift\n"
+    )
+    assert committer.commit(file_path=archive_path / "a.org", text="a\n")  # nosec
+    assert not archive_path.exists()  # nosec
+    committer.close()
+
+    assert not (tmp_path / (name + "~")).exists()  # nosec
+    assert not (tmp_path / name / "dir").exists()  # nosec
+    with tarfile.open(archive_path, mode="r:*") as tar:
+        assert tar.getnames() == ["dir/Note.org", "a.org"]  # nosec
+        member = tar.extractfile("dir/Note.org")
+        assert member is not None  # nosec
+        assert member.read().decode(encoding="utf-8") == "* Überschrift\n"  # nosec
+
+
+################################################################################
+def test_zip_archive(tmp_path: Path) -> None:
+    """Test writing a zip archive."""
+    archive_path = tmp_path / "notes.zip"
+    committer = ArchiveCommitter(archive_path=archive_path)
+
+    committer.commit(file_path=archive_path / "dir" / "Note.org", text="text\n")
+    committer.close()
+
+    with zipfile.ZipFile(archive_path) as zip_file:
+        assert zip_file.namelist() == ["dir/Note.org"]  # nosec
+        assert zip_file.read("dir/Note.org") == b"text\n"  # nosec
+
+
+################################################################################
+def test_zstd_archive(tmp_path: Path) -> None:
+    """Test the error if the package `zstandard` isn't installed."""
+    if importlib.util.find_spec("zstandard") is not None:
+        pytest.skip("zstandard is installed")
+
+    with pytest.raises(ArchiveError, match="zstandard"):
+        ArchiveCommitter(archive_path=tmp_path / "notes.tar.zst")
+    assert list(tmp_path.iterdir()) == []  # nosec
+
+
+################################################################################
+def test_discard(tmp_path: Path) -> None:
+    """Test that an incomplete archive is deleted and doesn't replace the
+    archive of an earlier run."""
+    archive_path = tmp_path / "notes.tar"
+    archive_path.write_bytes(b"old")
+    committer = ArchiveCommitter(archive_path=archive_path)
+    committer.commit(file_path=archive_path / "a.org", text="a\n")
+    committer.discard()
+
+    assert archive_path.read_bytes() == b"old"  # nosec
+    assert not (tmp_path / "notes.tar~").exists()  # nosec
+    with pytest.raises(OSError):
+        committer.commit(file_path=archive_path / "b.org", text="b\n")
+
+
+################################################################################
+def test_headings_in_memory(tmp_path: Path) -> None:
+    """Test that the headings of the files in the archive are kept in memory
+    until the archive is closed."""
+    archive_path = tmp_path / "notes.tar"
+    out_file = archive_path / "Note.org"
+    heading = "* Heading\n:PROPERTIES:\n:CUSTOM_ID: heading"
+    committer = ArchiveCommitter(archive_path=archive_path)
+    set_pending_headings(file_name=out_file, text=heading)
+    committer.commit(file_path=out_file, text=heading)
+
+    assert heading_text(file_name=out_file) == heading  # nosec
+    committer.close()
+    with pytest.raises(OSError):
+        heading_text(file_name=out_file)
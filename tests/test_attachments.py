@@ -0,0 +1,86 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_attachments.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test placing the attachments of the notes into the output directory."""
+
+from pathlib import Path
+
+import pytest
+
+from obs2org.attachments import AttachmentCollector
+from obs2org.parse_org_mode import correct_org_mode_file
+
+
+################################################################################
+@pytest.fixture
+def vault(tmp_path: Path) -> Path:
+    """Return the path to a vault with two notes in different directories and
+    an attachment in the directory `attachments`.
+    """
+    in_dir = tmp_path / "in"
+    (in_dir / "sub").mkdir(parents=True)
+    (in_dir / "attachments").mkdir()
+    (in_dir / "attachments" / "image.png").write_bytes(b"\x89PNG image data")
+    (in_dir / "sub" / "local.pdf").write_bytes(b"%PDF local")
+    return tmp_path
+
+
+################################################################################
+def test_collect_names() -> None:
+    """Test that the names of the linked attachments are collected."""
+    names: list[str] = []
+    text = correct_org_mode_file(
+        "[[image.png]] and [[doc.pdf|The Doc]] and [[Note]]",
+        Path("."),
+        remove_citations=False,
+        add_uuid=False,
+        attachments=names,
+    )
+    assert text.startswith("[[file:image.png]] and [[doc.pdf][The Doc]]")  # nosec
+    assert names == ["doc.pdf", "image.png"]  # nosec
+
+
+################################################################################
+def test_place_deduplicated(vault: Path) -> None:
+    """Test that an attachment used by two notes is stored once."""
+    out_dir = vault / "out"
+    collector = AttachmentCollector(out_root=out_dir, search_dirs=[vault / "in"])
+
+    collector.place_all(
+        names=["image.png"], in_dir=vault / "in", out_dir=out_dir / "sub"
+    )
+    collector.place_all(
+        names=["image.png", "local.pdf", "missing.png", "../escape.png"],
+        in_dir=vault / "in" / "sub",
+        out_dir=out_dir,
+    )
+
+    first = out_dir / "sub" / "image.png"
+    second = out_dir / "image.png"
+    assert first.read_bytes() == b"\x89PNG image data"  # nosec
+    assert first.stat().st_ino == second.stat().st_ino  # nosec
+    assert (out_dir / "local.pdf").read_bytes() == b"%PDF local"  # nosec
+    assert not (vault / "escape.png").exists()  # nosec
+    stats = collector.stats()
+    assert stats.missing == 1  # nosec
+    assert stats.linked + stats.cloned + stats.copied == 3  # nosec
+
+
+################################################################################
+def test_place_unchanged(vault: Path) -> None:
+    """Test that attachments already in place are not copied again."""
+    out_dir = vault / "out"
+    out_dir.mkdir()
+    (out_dir / "image.png").write_bytes(b"\x89PNG image data")
+    mtime = (out_dir / "image.png").stat().st_mtime_ns
+
+    collector = AttachmentCollector(out_root=out_dir, search_dirs=[vault / "in"])
+    collector.place_all(names=["image.png"], in_dir=vault / "in", out_dir=out_dir)
+
+    assert (out_dir / "image.png").stat().st_mtime_ns == mtime  # nosec
+    assert collector.stats().unchanged == 1  # nosec
@@ -0,0 +1,91 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_bibliography.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test looking up the citation keys in the bibliographies."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from obs2org.bibliography import Bibliography, BibliographyError, parse_bibliography
+
+# A BibTeX bibliography.
+_BIBTEX = """@Comment{jabref-meta: databaseType:bibtex;}
+@string{ acm = "ACM" }
+@article{Knuth:1984,
+  title = {Literate Programming},
+  author = {Knuth, Donald},
+}
+@Book ( dijkstra-76 , title = "A Discipline of Programming")
+"""
+
+
+################################################################################
+def test_parse_bibtex(tmp_path: Path) -> None:
+    """Test reading the keys of a BibTeX file."""
+    bib_file = tmp_path / "refs.bib"
+    bib_file.write_text(_BIBTEX, encoding="utf-8")
+
+    assert parse_bibliography(bib_file) == ["Knuth:1984", "dijkstra-76"]  # nosec
+
+
+################################################################################
+def test_parse_csl_json(tmp_path: Path) -> None:
+    """Test reading the keys of a CSL-JSON file."""
+    bib_file = tmp_path / "refs.json"
+    bib_file.write_text(
+        json.dumps([{"id": "Key1", "type": "book"}, {"type": "no id"}, {"id": 2}]),
+        encoding="utf-8",
+    )
+    assert parse_bibliography(bib_file) == ["Key1", "2"]  # nosec
+
+    bib_file.write_text("{", encoding="utf-8")
+    with pytest.raises(BibliographyError):
+        parse_bibliography(bib_file)
+    with pytest.raises(BibliographyError):
+        parse_bibliography(tmp_path / "refs.yaml")
+
+
+################################################################################
+def test_check_citations(tmp_path: Path) -> None:
+    """Test reporting the unknown citation keys."""
+    bib_file = tmp_path / "refs.bib"
+    bib_file.write_text(_BIBTEX, encoding="utf-8")
+    bibliography = Bibliography(bib_files=[bib_file], out_path=None)
+
+    bibliography.check(
+        text="[[cite:@Knuth:1984]] and [[cite:@dijkstra-76, p. 5; @Missing]].",
+        file_name="a.org",
+    )
+    bibliography.check(text="[[cite:@Missing.]] [[Knuth:1984]]", file_name="b.org")
+    assert bibliography.unknown_keys() == {"Missing": ["a.org", "b.org"]}  # nosec
+
+
+################################################################################
+def test_cache(tmp_path: Path) -> None:
+    """Test that a bibliography is only parsed again if it has changed."""
+    bib_file = tmp_path / "refs.bib"
+    bib_file.write_text(_BIBTEX, encoding="utf-8")
+    out_path = tmp_path / "out"
+
+    assert (
+        Bibliography(bib_files=[bib_file], out_path=out_path).num_parsed == 1
+    )  # nosec
+    assert (out_path / ".obs2org" / "bibliography.json").is_file()  # nosec
+    cached = Bibliography(bib_files=[bib_file], out_path=out_path)
+    assert cached.num_parsed == 0  # nosec
+    assert cached.keys == {"Knuth:1984", "dijkstra-76"}  # nosec
+
+    bib_file.write_text(_BIBTEX + "@misc{New,\n}\n", encoding="utf-8")
+    changed = Bibliography(bib_files=[bib_file], out_path=out_path)
+    assert changed.num_parsed == 1  # nosec
+    assert "New" in changed.keys  # nosec
+
+    with pytest.raises(BibliographyError):
+        Bibliography(bib_files=[tmp_path / "missing.bib"], out_path=out_path)
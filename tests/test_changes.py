@@ -0,0 +1,141 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_changes.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test converting only the Markdown files changed since a git revision."""
+
+import shutil
+import subprocess  # nosec B404
+import sys
+from pathlib import Path
+
+import pytest
+
+from obs2org.changes import git_changes
+from obs2org.main import main
+from obs2org.sources import SourceError
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("git") is None, reason="git is not installed"
+)
+
+
+################################################################################
+@pytest.fixture(name="repo")
+def fixture_repo(tmp_path: Path) -> Path:
+    """Return a git repository containing a committed vault."""
+    repo = tmp_path / "repo"
+    (repo / "Sub").mkdir(parents=True)
+    (repo / "A.md").write_text("# A\n\n[[B]]\n", encoding="utf-8")
+    (repo / "B.md").write_text("# B\n", encoding="utf-8")
+    (repo / "C.md").write_text("# C\n", encoding="utf-8")
+    (repo / "Sub" / "D.md").write_text("# D\n", encoding="utf-8")
+    (repo / "Sub" / "image.png").write_bytes(b"\x89PNG")
+    _git(repo, "init", "-q")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-q", "-m", "Vault")
+
+    return repo
+
+
+################################################################################
+def _git(repo: Path, *args: str) -> None:
+    """Run git in the repository `repo`."""
+    subprocess.run(  # nosec
+        ["git", "-C", str(repo), "-c", "user.name=Test", "-c", "user.email=t@t"]
+        + list(args),
+        check=True,
+        capture_output=True,
+    )
+
+
+################################################################################
+def test_git_changes(repo: Path) -> None:
+    """Test the changed, renamed, deleted and untracked files."""
+    (repo / "C.md").write_text("# C changed\n", encoding="utf-8")
+    _git(repo, "mv", "Sub/D.md", "Sub/E.md")
+    (repo / "B.md").unlink()
+    (repo / "Sub" / "image.png").write_bytes(b"changed")
+    (repo / "New.md").write_text("# New\n", encoding="utf-8")
+
+    changes = git_changes(arg_path=str(repo), revision="HEAD")
+    assert sorted(changes.changed) == ["C.md", "New.md", "Sub/E.md"]  # nosec
+    assert sorted(changes.deleted) == ["B.md", "Sub/D.md"]  # nosec
+
+    sub_changes = git_changes(arg_path=str(repo / "Sub"), revision="HEAD")
+    assert sub_changes.changed == ["E.md"]  # nosec
+    assert sub_changes.deleted == ["D.md"]  # nosec
+
+    file_changes = git_changes(arg_path=str(repo / "C.md"), revision="HEAD")
+    assert file_changes.changed == ["C.md"]  # nosec
+    assert file_changes.deleted == []  # nosec
+
+
+################################################################################
+def test_between_revisions(repo: Path) -> None:
+    """Test the changes between two revisions, ignoring the work tree."""
+    (repo / "C.md").write_text("# C changed\n", encoding="utf-8")
+    _git(repo, "commit", "-q", "-a", "-m", "Change")
+    (repo / "A.md").write_text("# A changed\n", encoding="utf-8")
+
+    changes = git_changes(arg_path=str(repo), revision="HEAD~1", to_revision="HEAD")
+    assert changes.changed == ["C.md"]  # nosec
+    assert changes.deleted == []  # nosec
+
+    with pytest.raises(SourceError):
+        git_changes(arg_path=str(repo), revision="no_such_revision")
+
+
+################################################################################
+def test_changed_since(
+    repo: Path, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Test that only the changed files and the files linking to renamed files
+    are converted and the Org-Mode files of deleted files are deleted."""
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    sys.argv = ["", str(repo), f"-o={out_dir}", "--changed-since=HEAD"]
+    main()
+    assert (out_dir / ".obs2org" / "backlinks.json").is_file()  # nosec
+    assert "converting all files" in capsys.readouterr().out  # nosec
+
+    _git(repo, "mv", "B.md", "B2.md")
+    (repo / "Sub" / "D.md").unlink()
+    main()
+    out = capsys.readouterr().out
+
+    assert not (out_dir / "B.org").exists()  # nosec
+    assert not (out_dir / "Sub" / "D.org").exists()  # nosec
+    assert (out_dir / "B2.org").is_file()  # nosec
+    assert f"Converting file '{repo / 'A.md'}'" in out  # nosec
+    assert f"Converting file '{repo / 'B2.md'}'" in out  # nosec
+    assert f"Converting file '{repo / 'C.md'}'" not in out  # nosec
+
+
+################################################################################
+def test_changed_since_partial_map(
+    repo: Path, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Test that the links saved by a run of a single file don't count as the
+    links of the whole vault."""
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    sys.argv = ["", str(repo / "B.md"), f"-o={out_dir}"]
+    main()
+    assert (out_dir / "B.org").is_file()  # nosec
+
+    (repo / "B.md").write_text("# B changed\n", encoding="utf-8")
+    sys.argv = ["", str(repo), f"-o={out_dir}", "--changed-since=HEAD"]
+    main()
+    assert "converting all files" in capsys.readouterr().out  # nosec
+    assert (out_dir / "A.org").is_file()  # nosec
+
+    (repo / "B.md").write_text("# B changed again\n", encoding="utf-8")
+    main()
+    out = capsys.readouterr().out
+    assert "converting 2 of 4 files" in out  # nosec
+    assert f"Converting file '{repo / 'A.md'}'" in out  # nosec
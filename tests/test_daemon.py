@@ -0,0 +1,101 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_daemon.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test the Obs2Org server and the client forwarding requests to it."""
+
+import shutil
+import socket
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from obs2org.daemon import client_main, serve
+
+
+################################################################################
+@pytest.mark.skipif(
+    not hasattr(socket, "AF_UNIX"), reason="Unix domain sockets not supported"
+)
+def test_resolve_link(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test resolving a link using the server and stopping the server."""
+    server_socket = tmp_path / "obs2org.sock"
+    monkeypatch.setenv("OBS2ORG_SOCKET", str(server_socket))
+    (tmp_path / "Books.org").write_text(
+        "* Lisp Cookbook\n:PROPERTIES:\n:CUSTOM_ID: lisp-cookbook\n:END:\n",
+        encoding="utf-8",
+    )
+
+    server = threading.Thread(target=serve, args=([],))
+    server.start()
+    for _ in range(100):
+        if server_socket.exists():
+            break
+        time.sleep(0.05)
+
+    assert (  # nosec
+        client_main(argv=["resolve-link", str(tmp_path), "[[Books#Lisp Cookbook]]"])
+        == 0
+    )
+    assert client_main(argv=["stop"]) == 0  # nosec
+    server.join(timeout=10)
+
+    captured = capsys.readouterr()
+    assert (  # nosec
+        "[[file:Books.org::#lisp-cookbook][Lisp Cookbook]]\n" in captured.out
+    )
+    assert not server_socket.exists()  # nosec
+    assert client_main(argv=["--version"]) is None  # nosec
+
+
+################################################################################
+@pytest.mark.skipif(
+    not hasattr(socket, "AF_UNIX"), reason="Unix domain sockets not supported"
+)
+@pytest.mark.skipif(shutil.which("pandoc") is None, reason="needs Pandoc")
+def test_convert(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test that a conversion is only forwarded to the server with `--daemon`
+    and converting a file using the server."""
+    server_socket = tmp_path / "obs2org.sock"
+    monkeypatch.delenv("OBS2ORG_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    shutil.copy("./tests/fixtures/dir/test1.md", tmp_path / "note.md")
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+
+    server = threading.Thread(target=serve, args=([],))
+    server.start()
+    for _ in range(100):
+        if server_socket.exists():
+            break
+        time.sleep(0.05)
+
+    args = [str(tmp_path / "note.md"), "-o", f"{out_dir}/"]
+    assert client_main(argv=args) is None  # nosec
+    assert client_main(argv=args + ["--daemon", "--no-daemon"]) is None  # nosec
+    assert not (out_dir / "note.org").exists()  # nosec
+
+    assert client_main(argv=args + ["--daemon"]) == 0  # nosec
+    assert (out_dir / "note.org").is_file()  # nosec
+    (out_dir / "note.org").unlink()
+    assert client_main(argv=["reconvert"]) == 0  # nosec
+    assert client_main(argv=["stop"]) == 0  # nosec
+    server.join(timeout=10)
+
+    captured = capsys.readouterr()
+    assert "Converting file" in captured.out  # nosec
+    assert (out_dir / "note.org").is_file()  # nosec
@@ -0,0 +1,46 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_file_table.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test the compact table of the files to convert."""
+
+from os import path
+from pathlib import Path
+
+from obs2org.file_table import FileEntry, FilePaths, FileTable
+
+
+################################################################################
+def test_file_table() -> None:
+    """Test the lookup, order and iteration of the files in the table."""
+    files = FileTable()
+    files.add_directory(
+        in_dir="in",
+        out_dir="out",
+        entries=[FileEntry("b.md", 10, 1), FileEntry("a b.md", 2000, 2)],
+    )
+    files.add_directory(
+        in_dir=path.join("in", "sub"),
+        out_dir=path.join("out", "sub"),
+        entries=[FileEntry("a.md", 300, 3)],
+    )
+    files.add_directory(in_dir="empty", out_dir="out", entries=[])
+
+    assert len(files) == 3 and files.num_entries == 3  # nosec
+    assert files.index_of(path.join("out", "b.org")) == 1  # nosec
+    assert files.index_of(path.join("out", "sub", "a.org")) == 2  # nosec
+    assert files.index_of(path.join("out", "a.org")) is None  # nosec
+    assert files.index_of(path.join("out", "b.md")) is None  # nosec
+    assert files.out_file(0) == path.join("out", "a b.org")  # nosec
+    assert (files.size(2), files.mtime_ns(2)) == (300, 3)  # nosec
+
+    files.set_order(files.biggest_first(index for index in files.indices() if index))
+    assert list(files.indices()) == [2, 1]  # nosec
+    assert list(files) == [  # nosec
+        FilePaths(Path("in", "sub", "a.md"), Path("out", "sub", "a.org")),
+        FilePaths(Path("in", "b.md"), Path("out", "b.org")),
+    ]
@@ -0,0 +1,166 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_heading_ids.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test computing the heading ids Pandoc generates."""
+
+import re
+import shutil
+import subprocess  # nosec B404
+
+import pytest
+
+from obs2org.heading_ids import (
+    markdown_headings,
+    pandoc_identifier,
+    predicted_heading_text,
+)
+
+# Markdown headings Pandoc's `auto_identifiers` must handle.
+_MARKDOWN = """---
+title: "Front Matter"
+tags: [a, b]
+---
+
+# Heading 1
+
+Some text.
+
+## Heading 1
+
+### Heading 1 {#explicit}
+
+## *Emphasis* and **strong** and _under_score_ text
+
+## A [link](https://example.com "title") and ![image](pic.png)
+
+## Code `x = 1` in `spans`
+
+## 2021-10-19 Dates and 3 numbers
+
+## 123
+
+## Umlaute äöü und ß
+
+## Dashes -- and --- and ellipsis...
+
+## Entities &amp; &copy; and escaped \\* \\_ \\#
+
+## Closing hashes ##
+
+##No space is no heading
+
+## Attributes {.class key=value}
+
+Setext Heading
+==============
+
+Second Setext
+-------------
+
+> # Quoted heading
+>
+> Quoted Setext
+> -------------
+
+```
+# Not a heading
+```
+
+~~~~ python
+## Not a heading either
+~~~~
+
+<div>
+# After a tag
+</div>
+
+Paragraph
+# Not a heading after a paragraph
+
+- Item
+- Another item
+
+#   Spaces   between   words   #
+
+# <https://autolink.example.com> and <span>html</span>
+
+# Heading 1
+"""
+
+
+################################################################################
+def test_pandoc_identifier() -> None:
+    """Test generating the id of a single heading."""
+    assert pandoc_identifier("Heading 1") == "heading-1"  # nosec
+    assert pandoc_identifier("*Emphasis* and `code`") == "emphasis-and-code"  # nosec
+    assert pandoc_identifier("[Link](target.md) text") == "link-text"  # nosec
+    assert pandoc_identifier("2021 Dates") == "dates"  # nosec
+    assert (
+        pandoc_identifier("snake_case and dots.txt") == "snake_case-and-dots.txt"
+    )  # nosec
+    assert pandoc_identifier("Ärger & Co.") == "ärger-co."  # nosec
+    assert pandoc_identifier("A -- B") == "a-b"  # nosec
+    assert pandoc_identifier("123") == ""  # nosec
+
+
+################################################################################
+def test_markdown_headings() -> None:
+    """Test the ids of headings with the same text, explicit ids and headings
+    in code blocks."""
+    headings = markdown_headings(
+        "# Title\n\n## Title\n\n```\n# Code\n```\n\n## Title {#own .class}\n\n"
+        "Text\n# No heading\n\n## 42\n\nSetext\n------\n\n- Item\n  -----\n"
+    )
+
+    assert [(heading.level, heading.id) for heading in headings] == [  # nosec
+        (1, "title"),
+        (2, "title-1"),
+        (2, "own"),
+        (2, "section"),
+        (2, "setext"),
+    ]
+    assert headings[2].title == "Title"  # nosec
+
+
+################################################################################
+def test_predicted_heading_text() -> None:
+    """Test the predicted headings in the format of the heading index."""
+    assert predicted_heading_text(  # nosec
+        "# First\n\n## Second Heading\n".encode(encoding="utf-8")
+    ) == (
+        "* First\n:PROPERTIES:\n:CUSTOM_ID: first\n"
+        "** Second Heading\n:PROPERTIES:\n:CUSTOM_ID: second-heading"
+    )
+
+
+################################################################################
+@pytest.mark.skipif(shutil.which("pandoc") is None, reason="needs Pandoc")
+def test_same_ids_as_pandoc() -> None:
+    """Compare the computed ids with the ids of the Org-Mode file generated by
+    Pandoc."""
+    org_text = subprocess.run(  # nosec
+        [
+            "pandoc",
+            "-f",
+            "markdown",
+            "-t",
+            "org",
+            "-s",
+            "--toc",
+            "--wrap=none",
+        ],
+        input=_MARKDOWN,
+        capture_output=True,
+        encoding="utf-8",
+        check=True,
+    ).stdout
+    pandoc_ids = re.findall(r"^:CUSTOM_ID: (.*)$", org_text, flags=re.MULTILINE)
+
+    assert [  # nosec
+        heading.id for heading in markdown_headings(_MARKDOWN)
+    ] == pandoc_ids
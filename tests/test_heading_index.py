@@ -0,0 +1,139 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_heading_index.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test the extraction of headings of linked Org-Mode files."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from obs2org.heading_ids import predicted_heading_text
+from obs2org.heading_index import (
+    heading_text,
+    headings_written,
+    reset_run_headings,
+    set_pending_headings,
+    set_predicted_headings,
+)
+from obs2org.parse_org_mode import _parse_linkedfile
+
+_ORG_TEXT = """#+title: Test
+
+* Bücher
+:PROPERTIES:
+:CUSTOM_ID: bücher
+:END:
+Some text.
+*bold* text at the start of a line.
+
+** Computer / Programming			:Book:
+:PROPERTIES:
+:CUSTOM_ID: computer-programming
+:END:
+"""
+
+
+################################################################################
+def test_heading_text(tmp_path: Path) -> None:
+    """Test that only the headings with a custom id are extracted."""
+    org_file = tmp_path / "test.org"
+    org_file.write_text(_ORG_TEXT, encoding="utf-8")
+
+    assert heading_text(file_name=org_file) == (  # nosec
+        "* Bücher\n:PROPERTIES:\n:CUSTOM_ID: bücher\n"
+        "** Computer / Programming\t\t\t:Book:\n:PROPERTIES:\n"
+        ":CUSTOM_ID: computer-programming"
+    )
+
+
+################################################################################
+def test_heading_cache(tmp_path: Path) -> None:
+    """Test that a changed file is scanned again."""
+    org_file = tmp_path / "cached.org"
+    org_file.write_text("* Old\n:PROPERTIES:\n:CUSTOM_ID: old\n:END:\n")
+    os.utime(org_file, ns=(1_000_000_000, 1_000_000_000))
+    assert _parse_linkedfile(file_name=org_file, heading_name="old") == (  # nosec
+        "::#old",
+        "Old",
+    )
+
+    org_file.write_text("* New\n:PROPERTIES:\n:CUSTOM_ID: new\n:END:\n")
+    assert _parse_linkedfile(file_name=org_file, heading_name="new") == (  # nosec
+        "::#new",
+        "New",
+    )
+
+
+################################################################################
+def test_pending_headings(tmp_path: Path) -> None:
+    """Test that the headings of a file that has not been written yet are
+    used."""
+    org_file = tmp_path / "pending.org"
+    set_pending_headings(file_name=org_file, text=_ORG_TEXT)
+    assert _parse_linkedfile(file_name=org_file, heading_name="Bücher") == (  # nosec
+        "::#bücher",
+        "Bücher",
+    )
+
+    text = "* Written\n:PROPERTIES:\n:CUSTOM_ID: written\n:END:\n"
+    org_file.write_text(text, encoding="utf-8")
+    headings_written(file_name=org_file, text=text)
+    assert heading_text(file_name=org_file) == (  # nosec
+        "* Written\n:PROPERTIES:\n:CUSTOM_ID: written"
+    )
+
+
+################################################################################
+def test_predicted_headings(tmp_path: Path) -> None:
+    """Test that the predicted headings are used until the file has been
+    converted."""
+    org_file = tmp_path / "predicted.org"
+    set_predicted_headings(
+        file_name=org_file,
+        text=predicted_heading_text("# Bücher {#books}\n".encode(encoding="utf-8")),
+    )
+    assert _parse_linkedfile(file_name=org_file, heading_name="Bücher") == (  # nosec
+        "::#books",
+        "Bücher",
+    )
+
+    set_pending_headings(file_name=org_file, text=_ORG_TEXT)
+    assert _parse_linkedfile(file_name=org_file, heading_name="Bücher") == (  # nosec
+        "::#bücher",
+        "Bücher",
+    )
+    set_predicted_headings(file_name=org_file, text="")
+    assert heading_text(file_name=org_file) != ""  # nosec
+
+
+################################################################################
+def test_reset_run_headings(tmp_path: Path) -> None:
+    """Test that pending headings are keyed by the absolute path and don't
+    survive the end of a run or a change of the working directory."""
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    text = "* Other\n:PROPERTIES:\n:CUSTOM_ID: other\n:END:\n"
+    (tmp_path / "b" / "note.org").write_text(text, encoding="utf-8")
+    old_cwd = Path.cwd()
+    try:
+        os.chdir(tmp_path / "a")
+        set_pending_headings(file_name=Path("note.org"), text=_ORG_TEXT)
+        assert heading_text(file_name=tmp_path / "a" / "note.org") != ""  # nosec
+
+        os.chdir(tmp_path / "b")
+        assert heading_text(file_name=Path("note.org")) == (  # nosec
+            "* Other\n:PROPERTIES:\n:CUSTOM_ID: other"
+        )
+
+        os.chdir(tmp_path / "a")
+        reset_run_headings()
+        with pytest.raises(FileNotFoundError):
+            heading_text(file_name=Path("note.org"))
+    finally:
+        os.chdir(old_cwd)
@@ -0,0 +1,97 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_journal.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test the journal of finished files used by `--resume`."""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+from obs2org.journal import STAGE_CONVERTED, STAGE_CORRECTED, Journal
+from obs2org.main import main
+
+
+################################################################################
+def test_journal(tmp_path: Path) -> None:
+    """Test the detection of finished and half finished files."""
+    in_file = tmp_path / "note.md"
+    in_file.write_text("# Note\n", encoding="utf-8")
+    out_file = tmp_path / "out" / "note.org"
+    out_file.parent.mkdir()
+    out_file.write_text("* Note\n", encoding="utf-8")
+    stat = in_file.stat()
+    other_file = tmp_path / "out" / "other.org"
+
+    journal = Journal(out_path=tmp_path / "out", resume=False)
+    journal.record(out_file, STAGE_CONVERTED, stat.st_size, stat.st_mtime_ns)
+    journal.record(out_file, STAGE_CORRECTED, stat.st_size, stat.st_mtime_ns)
+    journal.record(other_file, STAGE_CONVERTED, 1, 1)
+    journal.close()
+    with journal.file_path.open(mode="a", encoding="utf-8") as f_d:
+        f_d.write('{"file": "killed while writ')
+
+    journal = Journal(out_path=tmp_path / "out", resume=True)
+    assert journal.completed(  # nosec
+        in_file, out_file, size=stat.st_size, mtime_ns=stat.st_mtime_ns
+    )
+    assert not journal.completed(  # nosec
+        in_file, out_file, size=stat.st_size + 1, mtime_ns=stat.st_mtime_ns
+    )
+    assert journal.unfinished() == 1  # nosec
+
+    out_file.write_text("* Changed by hand\n", encoding="utf-8")
+    assert not journal.completed(  # nosec
+        in_file, out_file, size=stat.st_size, mtime_ns=stat.st_mtime_ns
+    )
+    journal.close()
+
+    journal = Journal(out_path=tmp_path / "out", resume=False)
+    assert journal.entry(other_file) is None  # nosec
+    journal.close()
+
+
+################################################################################
+@pytest.mark.skipif(shutil.which("pandoc") is None, reason="needs Pandoc")
+def test_resume(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Test that `--resume` skips the files of the last run."""
+    shutil.copytree("./tests/fixtures/dir", tmp_path / "in")
+    (tmp_path / "in" / "second.md").write_text("# Second\n", encoding="utf-8")
+    out_dir = f"{tmp_path / 'out'}/"
+    main([str(tmp_path / "in"), "-o", out_dir, "--no-daemon"])
+    capsys.readouterr()
+
+    (tmp_path / "in" / "test1.md").touch()
+    main([str(tmp_path / "in"), "-o", out_dir, "--resume", "--no-daemon"])
+
+    captured = capsys.readouterr()
+    assert "Resuming: 1 of 2 files are already converted" in captured.out  # nosec
+    assert "Converting file" in captured.out  # nosec
+
+
+################################################################################
+@pytest.mark.skipif(shutil.which("pandoc") is None, reason="needs Pandoc")
+def test_no_state_of_single_file(tmp_path: Path) -> None:
+    """Test that the conversion of a file to an Org-Mode file doesn't save
+    any state, but a conversion to a directory does."""
+    shutil.copy("./tests/fixtures/dir/test1.md", tmp_path / "note.md")
+    (tmp_path / "out").mkdir()
+    main(
+        [
+            str(tmp_path / "note.md"),
+            "-o",
+            str(tmp_path / "out" / "note.org"),
+            "--no-daemon",
+        ]
+    )
+
+    assert (tmp_path / "out" / "note.org").is_file()  # nosec
+    assert not (tmp_path / "out" / ".obs2org").exists()  # nosec
+
+    main([str(tmp_path / "note.md"), "-o", f"{tmp_path / 'out'}/", "--no-daemon"])
+    assert (tmp_path / "out" / ".obs2org" / "journal.log").is_file()  # nosec
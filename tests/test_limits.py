@@ -0,0 +1,104 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_limits.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test the limits of Pandoc and the quarantine of files exceeding them."""
+
+import os
+import shutil
+import signal
+from pathlib import Path
+
+import pytest
+
+from obs2org.convert import convert_to_text, run_pandoc
+from obs2org.limits import LimitExceeded, PandocLimits, Quarantine, exceeded_limit
+from obs2org.pandoc_info import PandocInfo, probe_pandoc
+
+
+################################################################################
+@pytest.fixture
+def slow_pandoc(tmp_path: Path) -> PandocInfo:
+    """Return a Pandoc executable that counts it's calls in the file `calls`
+    and never finishes.
+    """
+    exe = tmp_path / "slow_pandoc"
+    exe.write_text(f"#!/bin/sh\necho x >> '{tmp_path / 'calls'}'\nexec sleep 10\n")
+    exe.chmod(0o755)
+    return PandocInfo(
+        executable=str(exe),
+        version=(3, 0),
+        lua=False,
+        eol=True,
+    )
+
+
+################################################################################
+@pytest.mark.skipif(os.name != "posix", reason="needs a shell script")
+def test_timeout_quarantine(tmp_path: Path, slow_pandoc: PandocInfo) -> None:
+    """Test that a file timing out twice is added to the quarantine."""
+    in_file = tmp_path / "slow.md"
+    in_file.write_text("# Slow\n", encoding="utf-8")
+    out_file = tmp_path / "out" / "slow.org"
+    quarantine = Quarantine(out_path=tmp_path / "out")
+
+    text = convert_to_text(
+        in_file, out_file, slow_pandoc, PandocLimits(timeout=0.2), quarantine
+    )
+
+    assert text is None  # nosec
+    assert (tmp_path / "calls").read_text().count("x") == 2  # nosec
+    assert quarantine.contains(in_file=in_file, out_file=out_file)  # nosec
+
+    quarantine.save()
+    saved = Quarantine(out_path=tmp_path / "out")
+    assert saved.contains(in_file=in_file, out_file=out_file)  # nosec
+
+    in_file.write_text("# Slow, but changed\n", encoding="utf-8")
+    assert not saved.contains(in_file=in_file, out_file=out_file)  # nosec
+
+
+################################################################################
+@pytest.mark.skipif(shutil.which("pandoc") is None, reason="needs Pandoc")
+def test_memory_limit(tmp_path: Path) -> None:
+    """Test that Pandoc is stopped if it needs too much memory."""
+    in_file = tmp_path / "big.md"
+    in_file.write_text("- item *emph* [link](x)\n" * 50_000, encoding="utf-8")
+
+    with pytest.raises(expected_exception=LimitExceeded):
+        run_pandoc(
+            in_file=in_file,
+            pandoc=probe_pandoc(pandoc="pandoc"),
+            limits=PandocLimits(memory_mb=1),
+        )
+
+
+################################################################################
+@pytest.mark.skipif(os.name != "posix", reason="needs a shell script")
+def test_cpu_limit(tmp_path: Path) -> None:
+    """Test that the CPU time limit is set before Pandoc runs and that only
+    the signals of the CPU time limit count as exceeding it."""
+    exe = tmp_path / "ulimit_pandoc"
+    exe.write_text("#!/bin/sh\nulimit -t\n")
+    exe.chmod(0o755)
+    pandoc = PandocInfo(executable=str(exe), version=(3, 0), lua=False, eol=True)
+
+    text = run_pandoc(
+        in_file=tmp_path / "note.md",
+        pandoc=pandoc,
+        limits=PandocLimits(cpu_seconds=7),
+    )
+
+    assert text.strip() == "7"  # nosec
+    cpu_limit = PandocLimits(cpu_seconds=7)
+    assert exceeded_limit(returncode=-signal.SIGXCPU, limits=cpu_limit)  # nosec
+    assert exceeded_limit(returncode=-signal.SIGKILL, limits=cpu_limit)  # nosec
+    assert not exceeded_limit(returncode=-signal.SIGSEGV, limits=cpu_limit)  # nosec
+    assert not exceeded_limit(returncode=1, limits=cpu_limit)  # nosec
+    assert not exceeded_limit(
+        returncode=-signal.SIGXCPU, limits=PandocLimits()
+    )  # nosec
@@ -0,0 +1,86 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_link_map.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test the reverse-link map of the generated Org-Mode files."""
+
+import json
+from pathlib import Path
+
+from obs2org.link_map import LinkMap
+
+
+################################################################################
+def test_link_map(tmp_path: Path) -> None:
+    """Test setting, replacing and removing the links of files."""
+    links = LinkMap(out_path=tmp_path)
+    assert not links.complete  # nosec
+
+    links.set_links(
+        out_file=tmp_path / "A.org",
+        targets=[str(tmp_path / "B.org"), str(tmp_path / "Sub" / "C.org")],
+    )
+    links.set_links(out_file=tmp_path / "D.org", targets=[str(tmp_path / "B.org")])
+    assert links.linking_to([tmp_path / "B.org"]) == {"A.org", "D.org"}  # nosec
+    assert links.linking_to([tmp_path / "Sub" / "C.org"]) == {"A.org"}  # nosec
+    assert links.linking_to([tmp_path / "A.org"]) == set()  # nosec
+
+    links.set_links(out_file=tmp_path / "A.org", targets=[str(tmp_path / "D.org")])
+    assert links.linking_to([tmp_path / "B.org"]) == {"D.org"}  # nosec
+    assert links.linking_to([tmp_path / "Sub" / "C.org"]) == set()  # nosec
+    assert links.linking_to([tmp_path / "D.org"]) == {"A.org"}  # nosec
+
+    links.remove(out_file=tmp_path / "D.org")
+    assert links.linking_to([tmp_path / "B.org"]) == set()  # nosec
+
+
+################################################################################
+def test_save_load(tmp_path: Path) -> None:
+    """Test saving the map and reading it in the next run."""
+    links = LinkMap(out_path=tmp_path)
+    links.set_links(
+        out_file=tmp_path / "Sub" / "A.org", targets=[str(tmp_path / "B.org")]
+    )
+    links.save(complete=True)
+
+    assert json.loads(  # nosec
+        (tmp_path / ".obs2org" / "backlinks.json").read_text(encoding="utf-8")
+    ) == {"complete": True, "backlinks": {"B.org": ["Sub/A.org"]}}
+    loaded = LinkMap(out_path=tmp_path)
+    assert loaded.complete  # nosec
+    assert loaded.linking_to([tmp_path / "B.org"]) == {"Sub/A.org"}  # nosec
+
+
+################################################################################
+def test_partial_map(tmp_path: Path) -> None:
+    """Test that the map of a run of some files isn't complete, until a run of
+    all files, and that a complete map stays complete."""
+    links = LinkMap(out_path=tmp_path)
+    links.set_links(out_file=tmp_path / "A.org", targets=[str(tmp_path / "B.org")])
+    links.save()
+
+    partial = LinkMap(out_path=tmp_path)
+    assert not partial.complete  # nosec
+    assert partial.linking_to([tmp_path / "B.org"]) == {"A.org"}  # nosec
+    partial.save(complete=True)
+
+    complete = LinkMap(out_path=tmp_path)
+    assert complete.complete  # nosec
+    complete.set_links(out_file=tmp_path / "C.org", targets=[])
+    complete.save()
+    assert LinkMap(out_path=tmp_path).complete  # nosec
+
+
+################################################################################
+def test_broken_file(tmp_path: Path) -> None:
+    """Test that a broken map file is ignored."""
+    (tmp_path / ".obs2org").mkdir()
+    (tmp_path / ".obs2org" / "backlinks.json").write_text("[", encoding="utf-8")
+
+    links = LinkMap(out_path=tmp_path)
+    assert not links.complete  # nosec
+    assert links.linking_to([tmp_path / "B.org"]) == set()  # nosec
@@ -0,0 +1,139 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_lua_filter.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test the correction of the notes using the Lua filter."""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+from obs2org.lua_filter import (
+    correction_table,
+    filter_file,
+    filter_supported,
+    link_candidates,
+)
+from obs2org.main import main
+from obs2org.pandoc_info import PandocInfo
+
+
+################################################################################
+def _pandoc(version: tuple[int, ...], lua: bool) -> PandocInfo:
+    """Return the information about a Pandoc executable."""
+    return PandocInfo(
+        executable="pandoc",
+        version=version,
+        lua=lua,
+        eol=True,
+    )
+
+
+################################################################################
+def test_filter_supported() -> None:
+    """Test the check of the Pandoc version and Lua support."""
+    assert filter_supported(_pandoc(version=(3, 1, 1), lua=True)) is True  # nosec
+    assert filter_supported(_pandoc(version=(3, 9), lua=True)) is True  # nosec
+    assert filter_supported(_pandoc(version=(3, 1), lua=True)) is False  # nosec
+    assert filter_supported(_pandoc(version=(2, 19, 2), lua=True)) is False  # nosec
+    assert filter_supported(_pandoc(version=(3, 9), lua=False)) is False  # nosec
+
+
+################################################################################
+def test_link_candidates() -> None:
+    """Test the search for the innermost links of a line."""
+    assert link_candidates("a [[b]] c [[d|e]]") == ["[[b]]", "[[d|e]]"]  # nosec
+    assert link_candidates("[[a [[b]] c]]") == ["[[b]]"]  # nosec
+    assert link_candidates("[[a] b") == []  # nosec
+
+
+################################################################################
+def test_correction_table(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Test the table of links, tags and dates, links in code are skipped."""
+    table = correction_table(
+        markdown="# Heading\n\nKeywords:  #tag1,  #tag2\n\n 2021-10-19\n\n"
+        "See [[#Heading]], `[[Code]]` and [[@Key]].\n\n"
+        "```\n[[Fenced]]\n```\n",
+        directory=tmp_path,
+        remove_citations=False,
+    )
+
+    assert table == {  # nosec
+        "links": {"[[#Heading]]": "[[*Heading]]"},
+        "tags": {"Keywords: #tag1, #tag2": ":tag1:tag2:"},
+        "dates": {"2021-10-19": "2021-10-19"},
+        "remove_citations": False,
+    }
+    assert capsys.readouterr().out == ""  # nosec
+
+
+################################################################################
+def test_filter_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test writing the filter to the cache directory."""
+    monkeypatch.setenv("OBS2ORG_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr("obs2org.lua_filter._filter_memo", {})
+
+    path = filter_file()
+
+    assert path.parent == tmp_path  # nosec
+    assert path.read_text(encoding="utf-8").startswith(  # nosec
+        "-- Generated by Obs2Org"
+    )
+    assert filter_file() == path  # nosec
+
+
+################################################################################
+@pytest.mark.skipif(shutil.which("pandoc") is None, reason="needs Pandoc")
+def test_convert_lua_filter(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Test converting notes with `--lua-filter`, code blocks aren't changed
+    and links to a note converted later use the predicted ids."""
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    (vault / "Target.md").write_text("# Target\n\n## Some Section\n", encoding="utf-8")
+    (vault / "Note.md").write_text(
+        "# Note\n\nKeywords: #tag\n\n2021-10-19\n\n"
+        "Link [[Target#Some Section]] and [[@Key]].\n\n"
+        "```\n[[Target#Some Section]]\n2021-10-19\n```\n"
+        + "Text to make the note bigger than the target.\n" * 5,
+        encoding="utf-8",
+    )
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+
+    main([str(vault), "-o", str(out_dir), "--lua-filter", "-n", "--no-daemon"])
+
+    captured = capsys.readouterr()
+    assert captured.err == ""  # nosec
+    assert "not found in file" not in captured.out  # nosec
+    note = (out_dir / "Note.org").read_text(encoding="utf-8")
+    assert note.startswith(  # nosec
+        "* Note\t\t\t:tag:\n:PROPERTIES:\n:CUSTOM_ID: note\n:END:\n"
+        "<2021-10-19>\n\n"
+        "Link [[file:Target.org::#some-section][Some Section]]"
+        " and [[file:@Key.org][@Key]].\n\n"
+        "#+begin_example\n[[Target#Some Section]]\n2021-10-19\n#+end_example\n"
+    )
+
+
+################################################################################
+@pytest.mark.skipif(shutil.which("pandoc") is None, reason="needs Pandoc")
+def test_lua_filter_fallback(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test correcting the Org-Mode text if Pandoc doesn't support the
+    filter."""
+    monkeypatch.setattr("obs2org.lua_filter.filter_supported", lambda pandoc: False)
+    (tmp_path / "Note.md").write_text("# Note\n\n2021-10-19\n", encoding="utf-8")
+
+    main([str(tmp_path / "Note.md"), "-o", str(tmp_path), "--lua-filter"])
+
+    captured = capsys.readouterr()
+    assert "doesn't support the Lua filter" in captured.out  # nosec
+    assert "<2021-10-19>" in (tmp_path / "Note.org").read_text(  # nosec
+        encoding="utf-8"
+    )
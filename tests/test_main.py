@@ -11,6 +11,9 @@
 import filecmp
 import runpy
 import sys
+import tarfile
+import zipfile
+from pathlib import Path
 from typing import List
 from unittest import mock
 
@@ -186,3 +189,212 @@ def test_convert_test3(capsys: pytest.CaptureFixture[str]) -> None:
         )
         is True
     )
+
+
+################################################################################
+def test_convert_archive(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Test conversion of all fixtures into a zip archive."""
+    run_obs2org(["./tests/fixtures/", f"-o={tmp_path / 'notes.zip'}"])
+
+    captured = capsys.readouterr()
+    assert captured.err == ""  # nosec
+    assert captured.out.find("OK") > 1  # nosec
+    with zipfile.ZipFile(tmp_path / "notes.zip") as archive:
+        for name, fixture in (
+            ("dir/test1.org", "test1_orig.org"),
+            ("test2.org", "test2_orig.org"),
+            ("dir1/Test 3.org", "Test 3_orig.org"),
+        ):
+            with open(f"./tests/fixtures/{fixture}", mode="rb") as f_d:
+                assert archive.read(name) == f_d.read()  # nosec
+
+
+################################################################################
+def test_convert_from_archive(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Test conversion of all fixtures read from a tar archive."""
+    with tarfile.open(tmp_path / "fixtures.tar.gz", mode="w:gz") as archive:
+        archive.add("./tests/fixtures/", arcname=".")
+    run_obs2org([str(tmp_path / "fixtures.tar.gz"), f"-o={tmp_path / 'from_archive'}"])
+
+    captured = capsys.readouterr()
+    assert captured.err == ""  # nosec
+    assert captured.out.find("OK") > 1  # nosec
+    assert (  # nosec
+        filecmp.cmp(
+            tmp_path / "from_archive" / "dir1" / "Test 3.org",
+            "./tests/fixtures/Test 3_orig.org",
+            shallow=False,
+        )
+        is True
+    )
+
+
+################################################################################
+def test_convert_predict_ids(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Test conversion of all fixtures with predicted heading ids."""
+    run_obs2org(["./tests/fixtures/", f"-o={tmp_path}", "--predict-ids"])
+
+    captured = capsys.readouterr()
+    assert captured.err == ""  # nosec
+    assert captured.out.find("OK") > 1  # nosec
+    for name, fixture in (
+        ("dir/test1.org", "test1_orig.org"),
+        ("test2.org", "test2_orig.org"),
+        ("dir1/Test 3.org", "Test 3_orig.org"),
+    ):
+        assert (  # nosec
+            filecmp.cmp(
+                tmp_path / name,
+                f"./tests/fixtures/{fixture}",
+                shallow=False,
+            )
+            is True
+        )
+
+
+################################################################################
+@pytest.mark.parametrize(
+    "no_cite,test3_fixture",
+    [([], "Test 3_orig.org"), (["-n"], "Test 3_orig_no_cite.org")],
+)
+def test_convert_ast(
+    tmp_path: Path,
+    capsys: pytest.CaptureFixture[str],
+    no_cite: List[str],
+    test3_fixture: str,
+) -> None:
+    """Test conversion of all fixtures using Pandoc's AST, only the empty lines
+    around the dates differ."""
+    run_obs2org(["./tests/fixtures/", f"-o={tmp_path}", "--ast", *no_cite])
+
+    captured = capsys.readouterr()
+    assert captured.err == ""  # nosec
+    assert captured.out.find("OK") > 1  # nosec
+    for name, fixture in (
+        ("dir/test1.org", "test1_orig.org"),
+        ("test2.org", "test2_orig.org"),
+        ("dir1/Test 3.org", test3_fixture),
+    ):
+        with open(tmp_path / name, encoding="utf-8") as f_d:
+            converted = [line for line in f_d.read().splitlines() if line]
+        with open(f"./tests/fixtures/{fixture}", encoding="utf-8") as f_d:
+            expected = [line for line in f_d.read().splitlines() if line]
+        assert converted == expected  # nosec
+
+
+################################################################################
+@pytest.mark.parametrize(
+    "no_cite,test3_fixture",
+    [([], "Test 3_orig.org"), (["-n"], "Test 3_orig_no_cite.org")],
+)
+def test_convert_lua_filter(
+    tmp_path: Path,
+    capsys: pytest.CaptureFixture[str],
+    no_cite: List[str],
+    test3_fixture: str,
+) -> None:
+    """Test conversion of all fixtures using the Lua filter, only the empty
+    lines around the dates differ."""
+    run_obs2org(["./tests/fixtures/", f"-o={tmp_path}", "--lua-filter", *no_cite])
+
+    captured = capsys.readouterr()
+    assert captured.err == ""  # nosec
+    for name, fixture in (
+        ("dir/test1.org", "test1_orig.org"),
+        ("test2.org", "test2_orig.org"),
+        ("dir1/Test 3.org", test3_fixture),
+    ):
+        with open(tmp_path / name, encoding="utf-8") as f_d:
+            converted = [line for line in f_d.read().splitlines() if line]
+        with open(f"./tests/fixtures/{fixture}", encoding="utf-8") as f_d:
+            expected = [line for line in f_d.read().splitlines() if line]
+        assert converted == expected  # nosec
+
+
+################################################################################
+def test_convert_streaming(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Test conversion of all fixtures while walking the directories."""
+    run_obs2org(["./tests/fixtures/", f"-o={tmp_path}", "--max-pending=1"])
+
+    captured = capsys.readouterr()
+    assert captured.err == ""  # nosec
+    assert captured.out.find("OK") > 1  # nosec
+    for name, fixture in (
+        ("dir/test1.org", "test1_orig.org"),
+        ("test2.org", "test2_orig.org"),
+        ("dir1/Test 3.org", "Test 3_orig.org"),
+    ):
+        assert (  # nosec
+            filecmp.cmp(
+                tmp_path / name,
+                f"./tests/fixtures/{fixture}",
+                shallow=False,
+            )
+            is True
+        )
+
+
+################################################################################
+def test_convert_files_from(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Test conversion of the fixtures listed in a file, relative to the
+    root."""
+    file_list = tmp_path / "files.txt"
+    file_list.write_bytes(
+        b"./tests/fixtures/dir/test1.md\0./tests/fixtures/test2.md\0"
+        b"./tests/fixtures/dir1/Test 3.md\0./tests/fixtures/test1_orig.org\0"
+    )
+    out_dir = tmp_path / "out"
+
+    run_obs2org(
+        [
+            f"--files-from={file_list}",
+            "--root=./tests/fixtures",
+            f"-o={out_dir}/",
+            "--no-daemon",
+        ]
+    )
+
+    captured = capsys.readouterr()
+    assert captured.err == ""  # nosec
+    for name, fixture in (
+        ("dir/test1.org", "test1_orig.org"),
+        ("test2.org", "test2_orig.org"),
+        ("dir1/Test 3.org", "Test 3_orig.org"),
+    ):
+        assert filecmp.cmp(  # nosec
+            out_dir / name, f"./tests/fixtures/{fixture}", shallow=False
+        )
+
+
+################################################################################
+def test_convert_to_file(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Test conversion of a single file to an output file with another name,
+    the files it links to aren't converted."""
+    out_file = tmp_path / "Converted.org"
+
+    run_obs2org(["./tests/fixtures/test2.md", f"-o={out_file}", "--no-daemon"])
+
+    captured = capsys.readouterr()
+    assert captured.err == ""  # nosec
+    assert f"Output to file {out_file}\n" in captured.out  # nosec
+    with open("./tests/fixtures/test2_orig.org", encoding="utf-8") as f_d:
+        expected = f_d.read().splitlines()[:8]
+    assert out_file.read_text(encoding="utf-8").splitlines()[:8] == expected  # nosec
+
+
+################################################################################
+def test_files_from_errors(capsys: pytest.CaptureFixture[str]) -> None:
+    """Test the errors of wrong arguments of `--files-from` and `--root`."""
+    for args, message in (
+        (["--root=./tests"], "'--root' can only be used with '--files-from'"),
+        (["--files-from=missing.txt"], "the list of files 'missing.txt'"),
+        (["./tests", "--files-from=-"], "'--files-from' can't be used with"),
+        (["--files-from=-", "-o=out.org"], "'--files-from' needs an output"),
+    ):
+        with pytest.raises(SystemExit):
+            run_obs2org(args + ["--no-daemon"])
+        assert message in capsys.readouterr().err  # nosec
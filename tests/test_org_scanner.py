@@ -0,0 +1,257 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_org_scanner.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test the linear-time scanners of links, tags and dates against the regexps
+they replace, and their time on adversarial input.
+"""
+
+import re
+import time
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pytest
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from obs2org import org_scanner
+from obs2org.org_scanner import ScanMatch
+from obs2org.parse_org_mode import _tag_convert_regex
+
+################################################################################
+# The regexps the scanners replace, the reference of the results.
+_REGEXPS: dict[Callable[[str], Iterator[ScanMatch]], "re.Pattern[str]"] = {
+    org_scanner.internal_wikilinks: re.compile(
+        r"\[\[(?!https?|ftp|file|cite|.*\.\w+)(\S[^\[\]]*)#(\S[^\[\]]*?)(?:\|.*)?\]\]"
+    ),
+    org_scanner.file_only_links: re.compile(
+        r"\[\[(?!\*|https?|ftp|file|cite|[^\[\]]*\.[^В\s]+\])\s*([^#|\[\]]*)\s*\]\]"
+    ),
+    org_scanner.same_document_links: re.compile(r"\[\[\s*#\s*([^#|\[\]]*)\s*\]\]"),
+    org_scanner.named_wikilinks: re.compile(
+        r"\[\[(?!#)(?!.*\.\w+)(\S[^\[\]]*?)(?:#\^?\w+)?(?:#page=\d+)?\|(?:\S[^\[\]]*)\]\]"
+    ),
+    org_scanner.named_heading_links: re.compile(
+        r"\[\[(?!.*\.\w+)(#\w[^\[\]]*?)(?:#\^?\w+)?(?:#page=\d+)?\|(\S[^\[\]]*)\]\]"
+    ),
+    org_scanner.named_file_links: re.compile(
+        r"\[\[(?!#)(\S[^\[\]]*?\.\w+)(?:#\^?\w+)?(?:#page=\d+)?\|(\S[^\[\]]*)\]\]"
+    ),
+    org_scanner.file_links: re.compile(
+        r"\[\[(?!#|(?:file|http[s]?|ftp|zotero|cite:))(\S[^\[\]]*?\.[^В\s]+?)(?:#\^?\w+)?(?:#page=\d+)?\]\]"
+    ),
+    org_scanner.dates: re.compile(
+        r"^\s*(\d{1,4}[0-9.,/\\ -]\d{1,4}[0-9.,/\\ -]\d{1,4})\s*$", flags=re.MULTILINE
+    ),
+    org_scanner.tags: re.compile(
+        r"^(\s*\*{1,}\s[^\n]{1,})$([^*]*?)^\s*Keywords:\s*((?:#\S[^\n#,]*,?[^\S\n]*){1,})$",
+        flags=re.MULTILINE,
+    ),
+    org_scanner.citations: re.compile(r"\[\[\s*cite:(@.*?)\s*\]\]"),
+}
+
+# The pieces the random texts are made of, the characters and words the
+# regexps look for.
+_TOKENS = [
+    "[[",
+    "]]",
+    "[",
+    "]",
+    "#",
+    "|",
+    ".",
+    "a",
+    "Note",
+    "1",
+    "2021",
+    " ",
+    "\n",
+    "\t",
+    "^",
+    "#page=",
+    "*",
+    "* ",
+    "@",
+    ",",
+    "-",
+    "/",
+    "В",
+    "http",
+    "file",
+    "cite:",
+    "cite:@",
+    "zotero",
+    "Keywords:",
+    "Keywords: #",
+]
+
+# The random texts.
+_texts = st.lists(st.sampled_from(_TOKENS), max_size=40).map("".join) | st.text(
+    max_size=40
+)
+
+# The maximum time in seconds to scan an adversarial text of `_ADVERSARIAL_SIZE`
+# characters, per scanner. The regexps need seconds to minutes for the same
+# texts.
+_BUDGETS = {
+    org_scanner.internal_wikilinks: 1.0,
+    org_scanner.file_only_links: 1.0,
+    org_scanner.same_document_links: 1.0,
+    org_scanner.named_wikilinks: 1.0,
+    org_scanner.named_heading_links: 1.0,
+    org_scanner.named_file_links: 1.0,
+    org_scanner.file_links: 1.0,
+    org_scanner.dates: 1.0,
+    org_scanner.tags: 1.0,
+    org_scanner.citations: 1.0,
+}
+
+# The length of an adversarial text.
+_ADVERSARIAL_SIZE = 50_000
+
+# Texts the regexps need at least quadratic time for, a prefix followed by a
+# repeated part.
+_ADVERSARIAL = [
+    ("[[", "a#|"),
+    ("[[a#", "|#"),
+    ("[[a", "|"),
+    ("[[#a", "|"),
+    ("[[a", ".b"),
+    ("[[", "."),
+    ("", "[[a."),
+    ("", "[[a#b"),
+    ("[[#a", "\n"),
+    ("[[#", " "),
+    ("[[cite:@", " "),
+    ("", "[[cite:@a"),
+    ("\n* a\nKeywords: ", "\n"),
+    ("* a\n", "x\n"),
+    ("", "* a\n"),
+    ("", "\n"),
+    ("1-1-1", "\n"),
+    ("", "[[a.b|c"),
+]
+
+
+################################################################################
+def _reference(
+    scanner: Callable[[str], Iterator[ScanMatch]], text: str
+) -> list[tuple[int, int, tuple[str, ...]]]:
+    """Return the matches of the regexp replaced by `scanner`."""
+    return [
+        (match.start(), match.end(), match.groups())
+        for match in _REGEXPS[scanner].finditer(text)
+    ]
+
+
+################################################################################
+def _scanned(
+    scanner: Callable[[str], Iterator[ScanMatch]], text: str
+) -> list[tuple[int, int, tuple[str, ...]]]:
+    """Return the matches of `scanner`."""
+    return [(match.start, match.end, match.captures) for match in scanner(text)]
+
+
+################################################################################
+@pytest.mark.parametrize("scanner", list(_REGEXPS), ids=lambda s: s.__name__)
+@settings(max_examples=400, deadline=None)
+@given(text=_texts)
+def test_same_matches(scanner: Callable[[str], Iterator[ScanMatch]], text: str) -> None:
+    """Test that the scanners match the same as the regexps they replace."""
+    assert _scanned(scanner, text) == _reference(scanner, text)  # nosec
+
+
+################################################################################
+@pytest.mark.parametrize("scanner", list(_REGEXPS), ids=lambda s: s.__name__)
+def test_same_matches_fixture(scanner: Callable[[str], Iterator[ScanMatch]]) -> None:
+    """Test that the scanners match the same as the regexps they replace in a
+    converted note."""
+    text = (Path(__file__).parent / "fixtures" / "test1_orig.org").read_text(
+        encoding="utf-8"
+    )
+    text += "\n* Heading\nKeywords: #tag1, #tag2\n\n  2021-05-28 \n"
+    text += "[[cite:@Book]] [[#Own]] [[Note|Caption]] [[image.png]] [[a.pdf|PDF]]\n"
+
+    assert _scanned(scanner, text) == _reference(scanner, text)  # nosec
+
+
+################################################################################
+@pytest.mark.parametrize("scanner", list(_BUDGETS), ids=lambda s: s.__name__)
+@pytest.mark.parametrize("prefix,part", _ADVERSARIAL)
+def test_time_budget(
+    scanner: Callable[[str], Iterator[ScanMatch]], prefix: str, part: str
+) -> None:
+    """Test that the scanners stay within their time budget on the texts the
+    regexps need quadratic time for."""
+    text = prefix + part * (_ADVERSARIAL_SIZE // len(part)) + "x"
+
+    start = time.perf_counter()
+    list(scanner(text))
+    assert time.perf_counter() - start < _BUDGETS[scanner]  # nosec
+
+
+################################################################################
+@pytest.mark.parametrize("scanner", list(_BUDGETS), ids=lambda s: s.__name__)
+@settings(max_examples=30, deadline=None)
+@given(
+    prefix=st.lists(st.sampled_from(_TOKENS), max_size=3).map("".join),
+    part=st.lists(st.sampled_from(_TOKENS), min_size=1, max_size=4).map("".join),
+    suffix=st.sampled_from(["", "]]", "\n", "x", "|x]]"]),
+)
+def test_time_budget_random(
+    scanner: Callable[[str], Iterator[ScanMatch]], prefix: str, part: str, suffix: str
+) -> None:
+    """Test that the scanners stay within their time budget on long texts
+    made of a repeated random part."""
+    text = prefix + part * (_ADVERSARIAL_SIZE // len(part)) + suffix
+
+    start = time.perf_counter()
+    list(scanner(text))
+    assert time.perf_counter() - start < _BUDGETS[scanner]  # nosec
+
+
+################################################################################
+@settings(max_examples=400, deadline=None)
+@given(
+    tags=st.lists(st.sampled_from(["#", "a", ",", " ", "\t", "-"]), max_size=30).map(
+        "".join
+    )
+)
+def test_tag_convert(tags: str) -> None:
+    """Test that the regexp converting tags matches the same as before it only
+    started the comma separator at the start of whitespace."""
+    reference = re.sub(r"(?:^\s*#)|(?:\s*,\s*#)|(?:$)", ":", tags)
+
+    assert _tag_convert_regex.sub(":", tags) == reference  # nosec
+
+
+################################################################################
+def test_tag_convert_budget() -> None:
+    """Test the time to convert a list of tags containing a lot of spaces."""
+    tags = "#a" + " " * _ADVERSARIAL_SIZE + "b"
+
+    start = time.perf_counter()
+    _tag_convert_regex.sub(":", tags)
+    assert time.perf_counter() - start < 0.5  # nosec
+
+
+################################################################################
+def test_sub() -> None:
+    """Test replacing the matches using a template and a function."""
+    text = "See [[#Heading]] and [[#Other]]."
+
+    assert (  # nosec
+        org_scanner.sub(org_scanner.same_document_links, r"[[*\1]]", text)
+        == "See [[*Heading]] and [[*Other]]."
+    )
+    assert (  # nosec
+        org_scanner.sub(
+            org_scanner.same_document_links, lambda match: match.group(1), text
+        )
+        == "See Heading and Other."
+    )
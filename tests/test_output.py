@@ -0,0 +1,121 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_output.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test the output commit layer `OutputCommitter`."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from obs2org.convert import convert_single_file
+from obs2org.output import OutputCommitter
+from obs2org.pandoc_info import PandocInfo
+
+
+################################################################################
+def test_commit_new_file(tmp_path: Path) -> None:
+    """Test writing a file that doesn't exist yet."""
+    out_file = tmp_path / "new.org"
+    committer = OutputCommitter()
+
+    assert committer.commit(file_path=out_file, text="* Heading\n") is True  # nosec
+    assert out_file.read_text(encoding="utf-8") == "* Heading\n"  # nosec
+    assert not (tmp_path / "new.org~").exists()  # nosec
+
+
+################################################################################
+def test_skip_unchanged(tmp_path: Path) -> None:
+    """Test that writing the same content again doesn't touch the file."""
+    out_file = tmp_path / "same.org"
+    out_file.write_bytes("* Überschrift\n".encode(encoding="utf-8"))
+    os.utime(out_file, ns=(1_000_000_000, 1_000_000_000))
+
+    committer = OutputCommitter()
+
+    assert (
+        committer.commit(file_path=out_file, text="* Überschrift\n") is False
+    )  # nosec
+    assert out_file.stat().st_mtime_ns == 1_000_000_000  # nosec
+
+
+################################################################################
+def test_restore_mtime(tmp_path: Path) -> None:
+    """Test that the modification time is restored, if the file gets it's
+    original content back. The first new content must have the same size, so
+    the original content is hashed.
+    """
+    out_file = tmp_path / "restored.org"
+    out_file.write_text("corrected\n", encoding="utf-8")
+    os.utime(out_file, ns=(1_000_000_000, 1_000_000_000))
+
+    committer = OutputCommitter()
+
+    assert committer.commit(file_path=out_file, text="raw text\n\n") is True  # nosec
+    assert out_file.stat().st_mtime_ns != 1_000_000_000  # nosec
+    assert committer.commit(file_path=out_file, text="corrected\n") is True  # nosec
+    assert out_file.stat().st_mtime_ns == 1_000_000_000  # nosec
+
+
+################################################################################
+def test_hash_same_size(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the existing file is only hashed if it has the same size as
+    the new content."""
+    hashed: list[Path] = []
+    monkeypatch.setattr(
+        "obs2org.output.hash_file",
+        lambda file_path: hashed.append(file_path) or b"",
+    )
+    out_file = tmp_path / "sizes.org"
+    out_file.write_text("old\n", encoding="utf-8")
+    committer = OutputCommitter()
+
+    assert committer.commit(file_path=out_file, text="longer\n") is True  # nosec
+    assert hashed == []  # nosec
+    assert committer.commit(file_path=out_file, text="other\n\n") is True  # nosec
+    assert hashed == [out_file]  # nosec
+
+
+################################################################################
+def test_durable_flush(tmp_path: Path) -> None:
+    """Test that a durable committer writes the files before `flush`."""
+    out_file = tmp_path / "durable.org"
+    committer = OutputCommitter(durable=True)
+
+    assert committer.commit(file_path=out_file, text="text\n") is True  # nosec
+    assert out_file.read_text(encoding="utf-8") == "text\n"  # nosec
+    committer.flush()
+    assert out_file.read_text(encoding="utf-8") == "text\n"  # nosec
+    assert committer.commit(file_path=out_file, text="text\n") is False  # nosec
+
+
+################################################################################
+@pytest.mark.skipif(os.name != "posix", reason="needs a shell script")
+def test_failed_pandoc_keeps_output(tmp_path: Path) -> None:
+    """Test that the output of a Pandoc failing without an error message
+    doesn't replace the existing Org-Mode file."""
+    exe = tmp_path / "failing_pandoc"
+    exe.write_text("#!/bin/sh\nexit 1\n")
+    exe.chmod(0o755)
+    pandoc = PandocInfo(
+        executable=str(exe),
+        version=(3, 0),
+        lua=False,
+        eol=True,
+    )
+    in_file = tmp_path / "note.md"
+    in_file.write_text("# Note\n", encoding="utf-8")
+    out_file = tmp_path / "note.org"
+    out_file.write_text("* Note\n", encoding="utf-8")
+
+    converted = convert_single_file(
+        path=in_file, out_path=out_file, pandoc=pandoc, committer=OutputCommitter()
+    )
+
+    assert converted is False  # nosec
+    assert out_file.read_text(encoding="utf-8") == "* Note\n"  # nosec
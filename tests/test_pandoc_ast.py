@@ -0,0 +1,121 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_pandoc_ast.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test correcting Pandoc's JSON AST."""
+
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from obs2org.main import main
+from obs2org.pandoc_ast import ast_heading_text, correct_ast, stringify
+
+
+################################################################################
+def _str(text: str) -> list[dict]:
+    """Return the text `text` as `Str` and `Space` elements."""
+    inlines: list[dict] = []
+    for word in text.split(" "):
+        if inlines:
+            inlines.append({"t": "Space"})
+        inlines.append({"t": "Str", "c": word})
+    return inlines
+
+
+# The AST of a note with tags, a date, a link and a code block.
+_AST = {
+    "pandoc-api-version": [1, 23, 1],
+    "meta": {},
+    "blocks": [
+        {"t": "Header", "c": [1, ["my-heading", [], []], _str("My Heading")]},
+        {"t": "Para", "c": _str("Keywords: #tag1, #tag2")},
+        {
+            "t": "Para",
+            "c": [*_str("2021-05-28"), {"t": "SoftBreak"}, *_str("Some text")],
+        },
+        {
+            "t": "Para",
+            "c": [
+                *_str("See [[#My Heading]] and"),
+                {"t": "Code", "c": [["", [], []], "[[#My Heading]]"]},
+            ],
+        },
+        {"t": "CodeBlock", "c": [["", [], []], "[[#My Heading]]\n2021-05-28"]},
+    ],
+}
+
+
+################################################################################
+def test_correct_ast(tmp_path: Path) -> None:
+    """Test correcting tags, dates and links, but not code."""
+    corrected = correct_ast(
+        text=json.dumps(_AST), directory=tmp_path, remove_citations=False
+    )
+    blocks = json.loads(corrected.text)["blocks"]
+
+    assert blocks[0]["c"][2][-1] == {  # nosec
+        "t": "RawInline",
+        "c": ["org", "\t\t\t:tag1:tag2:"],
+    }
+    assert blocks[1]["c"][:2] == [  # nosec
+        {"t": "RawInline", "c": ["org", "<2021-05-28>"]},
+        {"t": "SoftBreak"},
+    ]
+    assert {"t": "RawInline", "c": ["org", "[[*My Heading]]"]} in blocks[2][  # nosec
+        "c"
+    ]
+    assert blocks[2]["c"][-1]["c"][1] == "[[#My Heading]]"  # nosec
+    assert blocks[3] == _AST["blocks"][4]  # nosec
+    assert corrected.citation_keys == []  # nosec
+
+
+################################################################################
+def test_ast_heading_text() -> None:
+    """Test the headings of an AST in the format of the heading index."""
+    assert ast_heading_text(json.dumps(_AST)) == (  # nosec
+        "* My Heading\n:PROPERTIES:\n:CUSTOM_ID: my-heading"
+    )
+    assert (
+        stringify(  # nosec
+            [{"t": "Emph", "c": _str("a b")}, {"t": "Code", "c": [["", [], []], "c"]}]
+        )
+        == "a bc"
+    )
+    with pytest.raises(ValueError):
+        ast_heading_text("[]")
+
+
+################################################################################
+@pytest.mark.skipif(shutil.which("pandoc") is None, reason="needs Pandoc")
+def test_convert_ast(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Test converting notes with `--ast`, the code blocks are not changed."""
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    (vault / "Target.md").write_text("# Target\n\n## Some Section\n", encoding="utf-8")
+    (vault / "Note.md").write_text(
+        "# Note\n\nKeywords: #tag\n\n2021-10-19\n\n"
+        "Link [[Target#Some Section]] and [[@Key]].\n\n"
+        "```\n[[Target#Some Section]]\n2021-10-19\n```\n",
+        encoding="utf-8",
+    )
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+
+    main([str(vault), "-o", str(out_dir), "--ast", "-n", "--no-daemon"])
+
+    captured = capsys.readouterr()
+    assert captured.err == ""  # nosec
+    assert (out_dir / "Note.org").read_text(encoding="utf-8") == (  # nosec
+        "* Note\t\t\t:tag:\n:PROPERTIES:\n:CUSTOM_ID: note\n:END:\n"
+        "<2021-10-19>\n\n"
+        "Link [[file:Target.org::#some-section][Some Section]]"
+        " and [[file:@Key.org][@Key]].\n\n"
+        "#+begin_example\n[[Target#Some Section]]\n2021-10-19\n#+end_example\n"
+    )
@@ -0,0 +1,42 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_pandoc_info.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test the probe of the Pandoc executable and it's cache."""
+
+import subprocess  # nosec B404
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from obs2org import pandoc_info
+from obs2org.pandoc_info import probe_pandoc
+
+
+################################################################################
+def test_probe_not_found(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the probe of a not existing Pandoc executable."""
+    monkeypatch.setenv("OBS2ORG_CACHE_DIR", str(tmp_path))
+    with pytest.raises(expected_exception=FileNotFoundError):
+        probe_pandoc(pandoc="does_not_exist")
+
+
+################################################################################
+def test_probe_cached(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that Pandoc isn't run again, if the probe's result is cached."""
+    monkeypatch.setenv("OBS2ORG_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(pandoc_info, "_probe_memo", {})
+    info = probe_pandoc(pandoc="pandoc")
+    assert info.version >= (1,)  # nosec
+    assert (tmp_path / "pandoc.json").is_file()  # nosec
+
+    monkeypatch.setattr(pandoc_info, "_probe_memo", {})
+    with mock.patch.object(
+        subprocess, "run", side_effect=AssertionError("Pandoc has been run")
+    ):
+        assert probe_pandoc(pandoc="pandoc") == info  # nosec
@@ -0,0 +1,60 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_plan.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test the dry-run planner of `--plan`."""
+
+import os
+from pathlib import Path
+
+from obs2org.file_table import FileEntry, FileTable
+from obs2org.plan import make_plan, record_run
+
+
+################################################################################
+def _make_table(in_dir: Path, out_dir: Path) -> FileTable:
+    """Return the table of the Markdown files in `in_dir`."""
+    files = FileTable()
+    files.add_directory(
+        in_dir=str(in_dir),
+        out_dir=str(out_dir),
+        entries=[
+            FileEntry(
+                name=in_file.name,
+                size=in_file.stat().st_size,
+                mtime_ns=in_file.stat().st_mtime_ns,
+            )
+            for in_file in in_dir.glob("*.md")
+        ],
+    )
+    return files
+
+
+################################################################################
+def test_plan(tmp_path: Path) -> None:
+    """Test the detection of new and changed files and the estimate."""
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    for name in ("a", "b", "c"):
+        in_file = tmp_path / f"{name}.md"
+        in_file.write_text("# Heading\n" * 10, encoding="utf-8")
+
+    files = _make_table(in_dir=tmp_path, out_dir=out_dir)
+    plan = make_plan(files=files, out_path=out_dir)
+    assert (plan.files, plan.bytes, plan.new) == (3, 300, 3)  # nosec
+    assert plan.estimate is None  # nosec
+
+    for name in ("a", "b"):
+        (out_dir / f"{name}.org").write_text("* Heading\n", encoding="utf-8")
+    record_run(files=files, out_path=out_dir, seconds=2.0)
+    os.utime(tmp_path / "b.md", ns=(1_000_000_000, 1_000_000_000))
+
+    files = _make_table(in_dir=tmp_path, out_dir=out_dir)
+    plan = make_plan(files=files, out_path=out_dir)
+    assert (plan.new, plan.changed, plan.unchanged) == (1, 1, 1)  # nosec
+    assert plan.changed_bytes == 200  # nosec
+    assert plan.estimate == 2.0 and plan.runs == 1  # nosec
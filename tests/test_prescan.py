@@ -0,0 +1,74 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_prescan.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test the pre-scan of the Markdown files and the front matter keywords."""
+
+from pathlib import Path
+
+from obs2org.parse_org_mode import correct_org_mode_file
+from obs2org.prescan import scan_note
+
+################################################################################
+_NOTE = """---
+title: A Note
+tags: [one, "two words"]
+aliases:
+  - Other Name
+empty:
+---
+# Heading #notatag
+
+Text with #tag/sub and #123, a [[Linked Note#Heading|caption]] and
+[[other]] and a [[#Local Heading]], [[Third.md]], [[v1.2 notes]].
+A citation [[@Key]], an image ![[pic.png]] and a [[sub/file.pdf#page=2]].
+URLs [[https://some.com/link]] and [[ftp://some.com/dir]].
+"""
+
+
+################################################################################
+def test_scan_note(tmp_path: Path) -> None:
+    """Test the front matter, links, tags and size of a scanned note."""
+    in_file = tmp_path / "note.md"
+    in_file.write_text(_NOTE, encoding="utf-8")
+
+    record = scan_note(in_file)
+
+    assert record.size == len(_NOTE.encode("utf-8"))  # nosec
+    assert record.links == {"Linked Note", "other", "Third", "v1.2 notes"}  # nosec
+    assert record.tags == {"notatag", "tag/sub"}  # nosec
+    assert record.front_matter == {  # nosec
+        "title": ["A Note"],
+        "tags": ["one", "two words"],
+        "aliases": ["Other Name"],
+        "empty": [],
+    }
+
+
+################################################################################
+def test_front_matter_keywords() -> None:
+    """Test that the front matter Pandoc ignores is added as keywords."""
+    text = "#+title: A Note\n\n* Heading\n"
+    corrected = correct_org_mode_file(
+        text,
+        directory=Path("."),
+        remove_citations=False,
+        add_uuid=False,
+        front_matter={
+            "title": ["A Note"],
+            "tags": ["one", "two words"],
+            "aliases": ["Other Name"],
+            "empty": [],
+        },
+    )
+
+    assert corrected == (  # nosec
+        "#+title: A Note\n"
+        "#+filetags: :one:two_words:\n"
+        "#+aliases: Other Name\n"
+        "\n* Heading\n"
+    )
@@ -0,0 +1,119 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_shard.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test the sharded conversion and the merge of the shard's indexes."""
+
+import filecmp
+import os
+import subprocess  # nosec B404
+import sys
+from pathlib import Path
+
+import pytest
+
+from obs2org.heading_index import cached_headings
+from obs2org.shard import (
+    Shard,
+    in_shard,
+    load_index,
+    parse_shard,
+    read_shard_indexes,
+    write_shard_index,
+)
+
+
+################################################################################
+def test_parse_shard() -> None:
+    """Test parsing the argument of `--shard`."""
+    assert parse_shard("2/3") == Shard(index=2, count=3)  # nosec
+    for illegal in ("0/3", "4/3", "1", "a/b"):
+        with pytest.raises(expected_exception=ValueError):
+            parse_shard(illegal)
+
+
+################################################################################
+def test_partition() -> None:
+    """Test that every file belongs to exactly one shard."""
+    rel_paths = [f"dir{num % 7}/note {num}.org" for num in range(200)]
+    for count in (1, 2, 5):
+        for rel_path in rel_paths:
+            shards = [
+                index
+                for index in range(1, count + 1)
+                if in_shard(rel_path=rel_path, shard=Shard(index=index, count=count))
+            ]
+            assert len(shards) == 1  # nosec
+
+
+################################################################################
+def test_merge_indexes(tmp_path: Path) -> None:
+    """Test combining the partial indexes of two shards and deleting them by a
+    run with another number of shards."""
+    first = tmp_path / "first.org"
+    first.write_text("* A\n:PROPERTIES:\n:CUSTOM_ID: a\n:END:\n", encoding="utf-8")
+    second = tmp_path / "dir" / "second.org"
+    second.parent.mkdir()
+    second.write_text("* B\n", encoding="utf-8")
+
+    write_shard_index(out_path=tmp_path, shard=Shard(1, 2), out_files=[first])
+    with pytest.raises(expected_exception=ValueError):
+        read_shard_indexes(out_path=tmp_path)
+
+    write_shard_index(out_path=tmp_path, shard=Shard(2, 2), out_files=[second])
+    index = read_shard_indexes(out_path=tmp_path)
+    assert sorted(index) == ["dir/second.org", "first.org"]  # nosec
+    assert index["first.org"].headings == "* A\n:PROPERTIES:\n:CUSTOM_ID: a"  # nosec
+
+    write_shard_index(out_path=tmp_path, shard=Shard(1, 1), out_files=[second])
+    assert sorted(read_shard_indexes(out_path=tmp_path)) == ["dir/second.org"]  # nosec
+
+    merged = tmp_path / "merged"
+    load_index(out_path=merged, index=index)
+    cached = cached_headings(file_name=merged / "first.org")
+    assert cached is not None and cached[2] == index["first.org"].headings  # nosec
+
+
+################################################################################
+def test_sharded_conversion(tmp_path: Path) -> None:
+    """Test converting the fixtures in 3 processes and merging the result."""
+    out_dir = tmp_path / "out"
+    env = dict(os.environ, OBS2ORG_SOCKET=str(tmp_path / "no.sock"))
+    shards = [
+        subprocess.Popen(  # nosec
+            [
+                sys.executable,
+                "-m",
+                "obs2org",
+                "./tests/fixtures/",
+                f"-o={out_dir}/",
+                f"--shard={index}/3",
+            ],
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        for index in range(1, 4)
+    ]
+    for shard in shards:
+        assert shard.wait() == 0  # nosec
+
+    merge = subprocess.run(  # nosec
+        [sys.executable, "-m", "obs2org", "merge", str(out_dir)],
+        env=env,
+        check=False,
+        stdout=subprocess.DEVNULL,
+    )
+    assert merge.returncode == 0  # nosec
+
+    for out_file, orig_file in (
+        ("dir/test1.org", "test1_orig.org"),
+        ("test2.org", "test2_orig.org"),
+        ("dir1/Test 3.org", "Test 3_orig.org"),
+    ):
+        assert filecmp.cmp(  # nosec
+            out_dir / out_file, Path("./tests/fixtures") / orig_file, shallow=False
+        )
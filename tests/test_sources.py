@@ -0,0 +1,142 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_sources.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test reading the Markdown files from archives and git revisions."""
+
+import io
+import shutil
+import subprocess  # nosec B404
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from obs2org.file_table import FileTable
+from obs2org.sources import ArchiveSource, GitSource, SourceError, VaultSource
+
+# The files of the test vault.
+_VAULT = {
+    "Note.md": b"# Note\n\n[[Sub/Other]]\n",
+    "Sub/Other.md": "# Überschrift\n".encode(encoding="utf-8"),
+    "Sub/image.png": b"\x89PNG",
+    "../outside.md": b"outside",
+    "/absolute.md": b"absolute",
+}
+
+
+################################################################################
+def _files_of(source: VaultSource, arg_path: str, out_path: str) -> dict[str, bytes]:
+    """Add the files of `source` to a table and return the content of every
+    Markdown file, the key is the path of the Org-Mode file."""
+    files = FileTable()
+    source.add_files(
+        arg_path=arg_path, out_path=out_path, files=files, create_dirs=False
+    )
+
+    contents: dict[str, bytes] = {}
+    for in_file, out_file in files:
+        contents[out_file.relative_to(out_path).as_posix()] = source.read(in_file)
+
+    return contents
+
+
+################################################################################
+@pytest.mark.parametrize("name", ["vault.tar", "vault.tar.gz", "vault.zip"])
+def test_archive_source(tmp_path: Path, name: str) -> None:
+    """Test reading the Markdown files of an archive."""
+    archive_path = tmp_path / name
+    if name.endswith(".zip"):
+        with zipfile.ZipFile(archive_path, mode="w") as zip_file:
+            for member, data in _VAULT.items():
+                zip_file.writestr(member, data)
+    else:
+        with tarfile.open(
+            archive_path, mode="w:gz" if name.endswith("gz") else "w"
+        ) as tar:
+            for member, data in _VAULT.items():
+                info = tarfile.TarInfo(name=member)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+
+    source = ArchiveSource(archive_path=archive_path)
+    try:
+        assert _files_of(  # nosec
+            source=source, arg_path=str(archive_path), out_path=str(tmp_path / "out")
+        ) == {
+            "Note.org": _VAULT["Note.md"],
+            "Sub/Other.org": _VAULT["Sub/Other.md"],
+        }
+        with pytest.raises(OSError):
+            source.read(archive_path / "missing.md")
+    finally:
+        source.close()
+
+
+################################################################################
+def test_broken_archive(tmp_path: Path) -> None:
+    """Test the error if the archive can't be read."""
+    archive_path = tmp_path / "broken.zip"
+    archive_path.write_bytes(b"no zip file")
+
+    with pytest.raises(SourceError):
+        ArchiveSource(archive_path=archive_path).add_files(
+            arg_path=str(archive_path),
+            out_path=str(tmp_path),
+            files=FileTable(),
+            create_dirs=False,
+        )
+
+
+################################################################################
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_git_source(tmp_path: Path) -> None:
+    """Test reading the Markdown files of a git revision, which differ from
+    the work tree."""
+    repo = tmp_path / "repo"
+    (repo / "Sub").mkdir(parents=True)
+    for member in ("Note.md", "Sub/Other.md", "Sub/image.png"):
+        (repo / member).write_bytes(_VAULT[member])
+
+    def git(*args: str) -> None:
+        subprocess.run(  # nosec
+            ["git", "-C", str(repo), "-c", "user.name=Test", "-c", "user.email=t@t"]
+            + list(args),
+            check=True,
+            capture_output=True,
+        )
+
+    git("init", "-q")
+    git("add", ".")
+    git("commit", "-q", "-m", "Vault")
+    (repo / "Note.md").write_bytes(b"changed")
+    (repo / "Sub" / "Other.md").unlink()
+
+    source = GitSource(revision="HEAD")
+    try:
+        assert _files_of(  # nosec
+            source=source, arg_path=str(repo), out_path=str(tmp_path / "out")
+        ) == {
+            "Note.org": _VAULT["Note.md"],
+            "Sub/Other.org": _VAULT["Sub/Other.md"],
+        }
+        assert _files_of(  # nosec
+            source=source,
+            arg_path=str(repo / "Sub" / "Other.md"),
+            out_path=str(tmp_path / "single"),
+        ) == {"Other.org": _VAULT["Sub/Other.md"]}
+    finally:
+        source.close()
+
+    with pytest.raises(SourceError):
+        GitSource(revision="no_such_revision").add_files(
+            arg_path=str(repo),
+            out_path=str(tmp_path),
+            files=FileTable(),
+            create_dirs=False,
+        )
@@ -0,0 +1,176 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_transclusion.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test the expansion of embedded notes and sections."""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+from obs2org.main import main
+from obs2org.output import OutputCommitter
+from obs2org.transclusion import FragmentCache, expand_files, expand_text
+
+_OTHER = """#+title: Other
+
+* Other
+:PROPERTIES:
+:CUSTOM_ID: other
+:END:
+Intro ![[file:sub/Deep.org::#deep][Deep]]
+
+** Section
+:PROPERTIES:
+:CUSTOM_ID: section
+:END:
+Section text
+*** Child
+:PROPERTIES:
+:CUSTOM_ID: child
+:END:
+Child text
+
+** Next
+:PROPERTIES:
+:CUSTOM_ID: next
+:END:
+Next text
+"""
+
+_DEEP = """* Deep
+:PROPERTIES:
+:CUSTOM_ID: deep
+:END:
+Deep text [[file:image.png]] ![[file:../Other.org::#next][Next]]
+"""
+
+
+################################################################################
+def _vault(tmp_path: Path) -> None:
+    """Write the Org-Mode files `Other.org` and `sub/Deep.org`."""
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "Other.org").write_text(_OTHER, encoding="utf-8")
+    (tmp_path / "sub" / "Deep.org").write_text(_DEEP, encoding="utf-8")
+
+
+################################################################################
+def test_expand_section(tmp_path: Path) -> None:
+    """Test expanding a section below the heading of the embed, the section is
+    extracted once."""
+    _vault(tmp_path)
+    cache = FragmentCache()
+    text = (
+        "* Note\nA\n![[file:Other.org::#section][Section]]\n"
+        "B ![[file:Other.org::#section][S]]"
+    )
+
+    expanded = expand_text(
+        text=text, file_name=tmp_path / "Note.org", depth=1, cache=cache
+    )
+
+    assert expanded == (  # nosec
+        "* Note\nA\n** Section\nSection text\n*** Child\nChild text\nB \n"
+        "** Section\nSection text\n*** Child\nChild text"
+    )
+    assert cache.extracted == 1  # nosec
+
+
+################################################################################
+def test_expand_nested(tmp_path: Path) -> None:
+    """Test expanding a whole file with nested embeds, the links are relative to
+    the embedding file and embeds deeper than the depth stay links."""
+    _vault(tmp_path)
+
+    assert expand_text(  # nosec
+        text="![[file:Other.org][Other]]",
+        file_name=tmp_path / "Note.org",
+        depth=2,
+        cache=FragmentCache(),
+    ) == (
+        "* Other\nIntro \n** Deep\nDeep text [[file:sub/image.png]]"
+        " ![[file:Other.org::#next][Next]]\n\n"
+        "** Section\nSection text\n*** Child\nChild text\n\n"
+        "** Next\nNext text"
+    )
+    assert (  # nosec
+        expand_text(
+            text="![[file:Other.org::#next][Next]]",
+            file_name=tmp_path / "Note.org",
+            depth=0,
+            cache=FragmentCache(),
+        )
+        == "![[file:Other.org::#next][Next]]"
+    )
+
+
+################################################################################
+def test_expand_cycle(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Test that an embed of a section that is being expanded stays a link."""
+    (tmp_path / "A.org").write_text(
+        "* A\n:PROPERTIES:\n:CUSTOM_ID: a\n:END:\n![[file:B.org::#b][B]]\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "B.org").write_text(
+        "* B\n:PROPERTIES:\n:CUSTOM_ID: b\n:END:\n![[file:A.org::#a][A]]\n",
+        encoding="utf-8",
+    )
+
+    expand_files(
+        out_files=[tmp_path / "A.org", tmp_path / "B.org"],
+        depth=5,
+        committer=OutputCommitter(),
+    )
+
+    assert (tmp_path / "A.org").read_text(encoding="utf-8") == (  # nosec
+        "* A\n:PROPERTIES:\n:CUSTOM_ID: a\n:END:\n"
+        "** B\n*** A\n![[file:B.org::#b][B]]\n"
+    )
+    assert "is a cycle" in capsys.readouterr().out  # nosec
+
+
+################################################################################
+def test_expand_missing(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Test that embeds of missing files and headings stay links."""
+    _vault(tmp_path)
+    text = "![[file:Missing.org][M]] ![[file:Other.org::#missing][M]]"
+
+    assert (  # nosec
+        expand_text(
+            text=text, file_name=tmp_path / "Note.org", depth=1, cache=FragmentCache()
+        )
+        == text
+    )
+    captured = capsys.readouterr().out
+    assert "can't be read" in captured  # nosec
+    assert "heading 'missing' not found" in captured  # nosec
+
+
+################################################################################
+@pytest.mark.skipif(shutil.which("pandoc") is None, reason="needs Pandoc")
+def test_convert_transclude(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Test converting notes with `--transclude-depth`."""
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    (vault / "Target.md").write_text(
+        "# Target\n\n## Some Section\n\nEmbedded text\n\n## Other\n\nNot embedded\n",
+        encoding="utf-8",
+    )
+    (vault / "Note.md").write_text(
+        "# Note\n\n![[Target#Some Section]]\n\nAfter\n", encoding="utf-8"
+    )
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+
+    main([str(vault), "-o", str(out_dir), "--transclude-depth", "1", "--no-daemon"])
+
+    assert "Expanded the embeds of 1 files" in capsys.readouterr().out  # nosec
+    assert (out_dir / "Note.org").read_text(encoding="utf-8") == (  # nosec
+        "* Note\n:PROPERTIES:\n:CUSTOM_ID: note\n:END:\n"
+        "** Some Section\nEmbedded text\n\nAfter\n"
+    )
@@ -0,0 +1,240 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2021 Roland Csaszar
+#
+# Project:  obs2org
+# File:     test_walk.py
+# Date:     19.Oct.2026
+#
+# ==============================================================================
+"""Test walking the directories while converting the files."""
+
+import asyncio
+import io
+from pathlib import Path
+
+import pytest
+
+from obs2org.file_table import FileEntry, FileTable
+from obs2org.output import OutputCommitter
+from obs2org.pandoc_info import PandocInfo
+from obs2org.prescan import NoteRecord
+from obs2org.scheduler import _Corrections, _predict_headings, convert_files
+from obs2org.walk import _split_file_list, walk_file_list, walk_paths
+
+
+################################################################################
+def _record(*links: str) -> NoteRecord:
+    """Return the pre-scan result of a note linking to `links`."""
+    return NoteRecord(size=0, links=frozenset(links), tags=frozenset(), front_matter={})
+
+
+################################################################################
+def test_walk_paths(tmp_path: Path) -> None:
+    """Test the order of the walk and the files given on the command line."""
+    vault = tmp_path / "vault"
+    (vault / "b").mkdir(parents=True)
+    (vault / "a" / "empty").mkdir(parents=True)
+    for name in ("Note.md", "a/A.md", "b/B.md", "b/image.png", ".md"):
+        (vault / name).write_text("# Note\n", encoding="utf-8")
+    single = tmp_path / "Single.md"
+    single.write_text("# Single\n", encoding="utf-8")
+    out_path = tmp_path / "out"
+
+    directories = list(
+        walk_paths(path_list=[str(vault), str(single)], out_path=str(out_path))
+    )
+    assert [  # nosec
+        (Path(in_dir), sorted(entry.name for entry in entries))
+        for in_dir, _, entries in directories
+    ] == [
+        (vault, ["Note.md"]),
+        (vault / "a", ["A.md"]),
+        (vault / "b", ["B.md"]),
+        (tmp_path, ["Single.md"]),
+    ]
+    assert (out_path / "a" / "empty").is_dir()  # nosec
+
+
+################################################################################
+def test_wait_for_walk(tmp_path: Path) -> None:
+    """Test that a file linking to a file that hasn't been found yet is only
+    corrected when the linked file has been converted or the walk has
+    finished."""
+
+    async def run() -> None:
+        files = FileTable()
+        corrections = _Corrections(files=files, correct=True, walking=True)
+        entry = FileEntry(name="A.md", size=1, mtime_ns=1)
+        files.add_directory(
+            in_dir=str(tmp_path), out_dir=str(tmp_path), entries=[entry]
+        )
+        corrections.add(start=0, pending=[0])
+
+        corrections.converted(
+            index=0, file_paths=files.file_paths(0), record=_record("B", "Missing")
+        )
+        assert corrections.ready.empty()  # nosec
+
+        files.add_directory(
+            in_dir=str(tmp_path),
+            out_dir=str(tmp_path),
+            entries=[entry._replace(name="B.md")],
+        )
+        corrections.add(start=1, pending=[1])
+        corrections.converted(index=1, file_paths=files.file_paths(1), record=_record())
+        assert corrections.ready.get_nowait()[0] == 1  # nosec
+        assert corrections.ready.empty()  # nosec
+
+        corrections.walk_finished()
+        assert corrections.ready.get_nowait()[0] == 0  # nosec
+
+    asyncio.run(run())
+
+
+################################################################################
+def test_max_pending(tmp_path: Path) -> None:
+    """Test that at most `max_pending` files are held and that the output of
+    files waiting for files that haven't been found is moved to temporary
+    files."""
+
+    async def run() -> None:
+        files = FileTable()
+        texts: dict[str, str] = {}
+        corrections = _Corrections(
+            files=files, correct=True, walking=True, max_pending=1, texts=texts
+        )
+        entry = FileEntry(name="A.md", size=1, mtime_ns=1)
+        files.add_directory(
+            in_dir=str(tmp_path),
+            out_dir=str(tmp_path),
+            entries=[entry, entry._replace(name="B.md")],
+        )
+        corrections.add(start=0, pending=[0, 1])
+
+        await corrections.reserve()
+        corrections.converted(index=0, file_paths=files.file_paths(0), record=_record())
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(corrections.reserve(), timeout=0.1)
+        assert corrections.ready.get_nowait()[0] == 0  # nosec
+        corrections.finished(0)
+
+        await asyncio.wait_for(corrections.reserve(), timeout=1)
+        texts[files.out_file(1)] = "* B\n"
+        corrections.converted(
+            index=1, file_paths=files.file_paths(1), record=_record("Missing")
+        )
+        await asyncio.wait_for(corrections.reserve(), timeout=1)
+        assert corrections.ready.empty()  # nosec
+        assert not texts  # nosec
+
+        corrections.walk_finished()
+        assert corrections.ready.get_nowait()[0] == 1  # nosec
+        assert await corrections.read_spilled(1) == "* B\n"  # nosec
+        corrections.finished(1)
+        corrections.close()
+
+    asyncio.run(run())
+
+
+################################################################################
+def test_read_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the content of the scanned Markdown files and of the files
+    read to predict their headings is passed to Pandoc."""
+    (tmp_path / "A.md").write_bytes(b"# A\n\n[[B]]\n")
+    (tmp_path / "B.md").write_bytes(b"# B\n")
+    files = FileTable()
+    entry = FileEntry(name="A.md", size=1, mtime_ns=1)
+    files.add_directory(
+        in_dir=str(tmp_path),
+        out_dir=str(tmp_path),
+        entries=[entry, entry._replace(name="B.md")],
+    )
+    pandoc_data: dict[str, bytes] = {}
+
+    def run_pandoc(in_file: Path, data: bytes, **_: object) -> str:
+        pandoc_data[in_file.name] = data
+        return f"* {in_file.stem}\n"
+
+    monkeypatch.setattr("obs2org.convert.run_pandoc", run_pandoc)
+    asyncio.run(
+        convert_files(
+            pandoc_info=PandocInfo(
+                executable="pandoc", version=(3,), lua=False, eol=True
+            ),
+            files=files,
+            remove_citations=False,
+            add_uuid=False,
+            committer=OutputCommitter(),
+            predict_ids=True,
+        )
+    )
+    assert pandoc_data == {  # nosec
+        "A.md": b"# A\n\n[[B]]\n",
+        "B.md": b"# B\n",
+    }
+
+    async def predict() -> None:
+        corrections = _Corrections(files=files, correct=True, predict=True)
+        await _predict_headings(corrections=corrections, indices=[1], source=None)
+        assert corrections.take_data(1) == b"# B\n"  # nosec
+        assert corrections.take_data(1) is None  # nosec
+
+    asyncio.run(predict())
+
+
+################################################################################
+def test_split_file_list() -> None:
+    """Test reading NUL and newline separated lists of file names."""
+    assert list(  # nosec
+        _split_file_list(io.BytesIO(b"a b.md\0dir/c\nd.md\0\0e.md"))
+    ) == ["a b.md", "dir/c\nd.md", "e.md"]
+    assert list(_split_file_list(io.BytesIO(b"a.md\r\n\nb.md\nc.md\r\n"))) == [  # nosec
+        "a.md",
+        "b.md",
+        "c.md",
+    ]
+    assert list(_split_file_list(io.BytesIO(b""))) == []  # nosec
+
+
+################################################################################
+def test_walk_file_list(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test the output directories relative to the root and the skipped
+    files."""
+    vault = tmp_path / "vault"
+    (vault / "a" / "b").mkdir(parents=True)
+    for name in ("Note.md", "a/A.md", "a/A2.md", "a/b/B.md", "a/image.png"):
+        (vault / name).write_text("# Note\n", encoding="utf-8")
+    (tmp_path / "Outside.md").write_text("# Outside\n", encoding="utf-8")
+    monkeypatch.chdir(vault)
+
+    directories = list(
+        walk_file_list(
+            file_names=[
+                "a/A.md",
+                "./a/A2.md",
+                "a/image.png",
+                "a/b/B.md",
+                "Note.md",
+                "a/A.md",
+                "../Outside.md",
+                "Missing.md",
+            ],
+            root=".",
+            out_path=str(tmp_path / "out"),
+        )
+    )
+
+    assert [  # nosec
+        (in_dir, Path(out_dir), [entry.name for entry in entries])
+        for in_dir, out_dir, entries in directories
+    ] == [
+        ("a", tmp_path / "out" / "a", ["A.md", "A2.md"]),
+        ("a/b", tmp_path / "out" / "a" / "b", ["B.md"]),
+        ("", tmp_path / "out", ["Note.md"]),
+    ]
+    assert (tmp_path / "out" / "a" / "b").is_dir()  # nosec
+    output = capsys.readouterr().out
+    assert "Skipping file '../Outside.md', it isn't inside of '.'" in output  # nosec
+    assert "Skipping file 'Missing.md'" in output  # nosec